@@ -0,0 +1,64 @@
+"""add category closure table
+
+Revision ID: 0160_category_closure
+Revises: 0159_add_theme_docs
+Create Date: 2026-10-16 09:00:00
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0160_category_closure"
+down_revision: str | Sequence[str] | None = "0159_add_theme_docs"
+branch_labels: str | Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "category_closure",
+        sa.Column("ancestor_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("descendant_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("depth", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["ancestor_id"], ["categories.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["descendant_id"], ["categories.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("ancestor_id", "descendant_id"),
+    )
+    op.create_index(
+        "ix_category_closure_descendant_id",
+        "category_closure",
+        ["descendant_id"],
+        unique=False,
+    )
+
+    # Backfill from the existing parent links. The depth guard keeps a corrupted
+    # (cyclic) hierarchy from recursing forever; such rows are rebuilt by the app.
+    op.execute(
+        """
+        INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE tree(ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM categories
+            UNION
+            SELECT tree.ancestor_id, categories.id, tree.depth + 1
+            FROM tree JOIN categories ON categories.parent_id = tree.descendant_id
+            WHERE tree.depth < 64 AND categories.id <> tree.ancestor_id
+        )
+        SELECT ancestor_id, descendant_id, MIN(depth)
+        FROM tree
+        GROUP BY ancestor_id, descendant_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_category_closure_descendant_id", table_name="category_closure")
+    op.drop_table("category_closure")
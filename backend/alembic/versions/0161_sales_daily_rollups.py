@@ -0,0 +1,47 @@
+"""add sales daily rollups
+
+Revision ID: 0161_sales_daily_rollups
+Revises: 0160_category_closure
+Create Date: 2026-10-16 10:00:00
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0161_sales_daily_rollups"
+down_revision: str | Sequence[str] | None = "0160_category_closure"
+branch_labels: str | Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # Rows are filled lazily by the admin dashboard for closed days, so there is
+    # nothing to backfill here.
+    op.create_table(
+        "sales_daily_rollups",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("sales_amount", sa.Numeric(14, 2), nullable=False),
+        sa.Column("gross_sales_amount", sa.Numeric(14, 2), nullable=False),
+        sa.Column("refunds_amount", sa.Numeric(14, 2), nullable=False),
+        sa.Column("missing_refunds_amount", sa.Numeric(14, 2), nullable=False),
+        sa.Column("net_sales_amount", sa.Numeric(14, 2), nullable=False),
+        sa.Column("orders_count", sa.Integer(), nullable=False),
+        sa.Column("orders_by_status", sa.JSON(), nullable=False),
+        sa.Column(
+            "computed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("day"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sales_daily_rollups")
@@ -0,0 +1,98 @@
+"""add product search documents
+
+Revision ID: 0162_product_search_documents
+Revises: 0161_sales_daily_rollups
+Create Date: 2026-10-16 11:00:00
+"""
+
+from __future__ import annotations
+
+import unicodedata
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0162_product_search_documents"
+down_revision: str | Sequence[str] | None = "0161_sales_daily_rollups"
+branch_labels: str | Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+_TABLES = ("products", "product_translations")
+
+
+def _normalize(value: str | None) -> str:
+    raw = (value or "").strip()
+    if not raw:
+        return ""
+    normalized = unicodedata.normalize("NFKD", raw)
+    return "".join(ch for ch in normalized if not unicodedata.combining(ch)).lower()
+
+
+def _backfill(table_name: str) -> None:
+    conn = op.get_bind()
+    with_name = table_name == "products"
+    table = sa.table(
+        table_name,
+        sa.column("id", postgresql.UUID(as_uuid=True)),
+        sa.column("name", sa.String()),
+        sa.column("short_description", sa.String()),
+        sa.column("long_description", sa.Text()),
+        sa.column("search_document", sa.Text()),
+        sa.column("search_name", sa.String()),
+    )
+    rows = conn.execute(
+        sa.select(
+            table.c.id,
+            table.c.name,
+            table.c.short_description,
+            table.c.long_description,
+        )
+    ).all()
+    for row_id, name, short_description, long_description in rows:
+        parts = (_normalize(v) for v in (name, short_description, long_description))
+        values = {"search_document": " ".join(part for part in parts if part)}
+        if with_name:
+            values["search_name"] = _normalize(name)
+        conn.execute(table.update().where(table.c.id == row_id).values(**values))
+
+
+def upgrade() -> None:
+    op.add_column(
+        "products",
+        sa.Column(
+            "search_name", sa.String(length=160), nullable=False, server_default=""
+        ),
+    )
+    for table_name in _TABLES:
+        op.add_column(
+            table_name,
+            sa.Column("search_document", sa.Text(), nullable=False, server_default=""),
+        )
+        _backfill(table_name)
+
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table_name in _TABLES:
+        op.create_index(
+            f"ix_{table_name}_search_document_trgm",
+            table_name,
+            ["search_document"],
+            postgresql_using="gin",
+            postgresql_ops={"search_document": "gin_trgm_ops"},
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        for table_name in _TABLES:
+            op.drop_index(
+                f"ix_{table_name}_search_document_trgm", table_name=table_name
+            )
+    for table_name in reversed(_TABLES):
+        op.drop_column(table_name, "search_document")
+    op.drop_column("products", "search_name")
@@ -0,0 +1,54 @@
+"""add composite indexes for keyset pagination
+
+Revision ID: 0163_keyset_pagination_indexes
+Revises: 0162_product_search_documents
+Create Date: 2026-10-16 13:00:00
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0163_keyset_pagination_indexes"
+down_revision: str | Sequence[str] | None = "0162_product_search_documents"
+branch_labels: str | Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # (created_at, id) serves both created_at range filters (the dashboard's live
+    # order scan) and the (created_at DESC, id DESC) keyset ordering.
+    op.create_index(
+        "ix_orders_created_at_id", "orders", ["created_at", "id"], unique=False
+    )
+    op.create_index(
+        "ix_products_created_at_id", "products", ["created_at", "id"], unique=False
+    )
+    op.create_index(
+        "ix_products_sort_order_created_at_id",
+        "products",
+        # Matches the (sort_order ASC, created_at DESC, id DESC) recommended
+        # ordering so the scan needs no sort step.
+        ["sort_order", sa.text("created_at DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+    op.create_index("ix_products_name_id", "products", ["name", "id"], unique=False)
+    op.create_index(
+        "ix_media_assets_created_at_id",
+        "media_assets",
+        ["created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_assets_created_at_id", table_name="media_assets")
+    op.drop_index("ix_products_name_id", table_name="products")
+    op.drop_index("ix_products_sort_order_created_at_id", table_name="products")
+    op.drop_index("ix_products_created_at_id", table_name="products")
+    op.drop_index("ix_orders_created_at_id", table_name="orders")
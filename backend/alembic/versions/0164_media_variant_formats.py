@@ -0,0 +1,43 @@
+"""key media variants by (asset, profile, format)
+
+Revision ID: 0164_media_variant_formats
+Revises: 0163_keyset_pagination_indexes
+Create Date: 2026-10-16 16:00:00
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0164_media_variant_formats"
+down_revision: str | Sequence[str] | None = "0163_keyset_pagination_indexes"
+branch_labels: str | Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # Variants used to be JPEG only; WebP/AVIF renditions now share the profile.
+    op.execute(
+        sa.text("UPDATE media_variants SET format = 'jpeg' WHERE format IS NULL")
+    )
+    with op.batch_alter_table("media_variants") as batch_op:
+        batch_op.drop_constraint("uq_media_variant_asset_profile", type_="unique")
+        batch_op.create_unique_constraint(
+            "uq_media_variant_asset_profile_format", ["asset_id", "profile", "format"]
+        )
+
+
+def downgrade() -> None:
+    op.execute(sa.text("DELETE FROM media_variants WHERE format <> 'jpeg'"))
+    with op.batch_alter_table("media_variants") as batch_op:
+        batch_op.drop_constraint(
+            "uq_media_variant_asset_profile_format", type_="unique"
+        )
+        batch_op.create_unique_constraint(
+            "uq_media_variant_asset_profile", ["asset_id", "profile"]
+        )
@@ -0,0 +1,74 @@
+"""add shipping locker city aggregates
+
+Revision ID: 0165_shipping_locker_cities
+Revises: 0164_media_variant_formats
+Create Date: 2026-10-16 18:00:00
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0165_shipping_locker_cities"
+down_revision: str | Sequence[str] | None = "0164_media_variant_formats"
+branch_labels: str | Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+def _provider_enum() -> sa.Enum:
+    bind = op.get_bind()
+    backend = (bind.dialect.name or "").lower()
+    if backend == "postgresql":
+        # Created by 0156_sameday_easybox_mirror.
+        return postgresql.ENUM(
+            "sameday", name="shippinglockerprovider", create_type=False
+        )
+    return sa.Enum("sameday", name="shippinglockerprovider", native_enum=False)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "shipping_locker_cities",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column(
+            "provider", _provider_enum(), nullable=False, server_default="sameday"
+        ),
+        sa.Column("city_key", sa.String(length=120), nullable=False),
+        sa.Column("city", sa.String(length=120), nullable=False),
+        sa.Column("county", sa.String(length=120), nullable=True),
+        sa.Column("lat", sa.Float(), nullable=False),
+        sa.Column("lng", sa.Float(), nullable=False),
+        sa.Column("locker_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "provider", "city_key", name="uq_shipping_locker_cities_provider_city"
+        ),
+    )
+    op.create_index(
+        "ix_shipping_locker_cities_city_key_prefix",
+        "shipping_locker_cities",
+        ["city_key"],
+        unique=False,
+        postgresql_ops={"city_key": "text_pattern_ops"},
+    )
+    # Rows are filled by the next mirror sync (or lazily on the first lookup).
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_shipping_locker_cities_city_key_prefix",
+        table_name="shipping_locker_cities",
+    )
+    op.drop_table("shipping_locker_cities")
@@ -0,0 +1,48 @@
+"""add order document export status
+
+Revision ID: 0166_order_document_export_status
+Revises: 0165_shipping_locker_cities
+Create Date: 2026-10-16 20:00:00
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0166_order_document_export_status"
+down_revision: str | Sequence[str] | None = "0165_shipping_locker_cities"
+branch_labels: str | Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "order_document_exports",
+        sa.Column(
+            "status",
+            sa.Enum(
+                "pending",
+                "running",
+                "succeeded",
+                "failed",
+                name="orderdocumentexportstatus",
+                native_enum=False,
+            ),
+            nullable=False,
+            server_default="succeeded",
+        ),
+    )
+    op.add_column(
+        "order_document_exports",
+        sa.Column("error_message", sa.String(length=1000), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("order_document_exports", "error_message")
+    op.drop_column("order_document_exports", "status")
@@ -0,0 +1,49 @@
+"""add webhook queue columns
+
+Revision ID: 0168_webhook_queue
+Revises: 0167_email_outbox
+Create Date: 2026-10-16 21:00:00
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0168_webhook_queue"
+down_revision: str | Sequence[str] | None = "0167_email_outbox"
+branch_labels: str | Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+_TABLES = ("stripe_webhook_events", "paypal_webhook_events")
+
+
+def upgrade() -> None:
+    for table in _TABLES:
+        op.add_column(
+            table,
+            sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.add_column(
+            table,
+            sa.Column("dead_lettered_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.add_column(
+            table, sa.Column("order_key", sa.String(length=255), nullable=True)
+        )
+        op.create_index(f"ix_{table}_next_attempt_at", table, ["next_attempt_at"])
+        op.create_index(f"ix_{table}_order_key", table, ["order_key"])
+
+
+def downgrade() -> None:
+    for table in _TABLES:
+        op.drop_index(f"ix_{table}_order_key", table_name=table)
+        op.drop_index(f"ix_{table}_next_attempt_at", table_name=table)
+        op.drop_column(table, "order_key")
+        op.drop_column(table, "dead_lettered_at")
+        op.drop_column(table, "next_attempt_at")
@@ -0,0 +1,29 @@
+"""index product sale windows
+
+Revision ID: 0169_product_sale_window_indexes
+Revises: 0168_webhook_queue
+Create Date: 2026-10-16 22:00:00
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0169_product_sale_window_indexes"
+down_revision: str | Sequence[str] | None = "0168_webhook_queue"
+branch_labels: str | Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_products_sale_start_at", "products", ["sale_start_at"])
+    op.create_index("ix_products_sale_end_at", "products", ["sale_end_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_products_sale_end_at", table_name="products")
+    op.drop_index("ix_products_sale_start_at", table_name="products")
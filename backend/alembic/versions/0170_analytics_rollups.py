@@ -0,0 +1,76 @@
+"""add analytics rollups
+
+Revision ID: 0170_analytics_rollups
+Revises: 0169_product_sale_window_indexes
+Create Date: 2026-10-16 23:00:00
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0170_analytics_rollups"
+down_revision: str | Sequence[str] | None = "0169_product_sale_window_indexes"
+branch_labels: str | Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "analytics_daily_sessions",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("event", sa.String(length=80), nullable=False),
+        sa.Column("registers", sa.LargeBinary(), nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("day", "event"),
+    )
+    op.create_table(
+        "analytics_order_attributions",
+        sa.Column("order_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("session_id", sa.String(length=100), nullable=False),
+        sa.Column("source", sa.String(length=120), nullable=False),
+        sa.Column("medium", sa.String(length=120), nullable=True),
+        sa.Column("campaign", sa.String(length=200), nullable=True),
+        sa.Column("attributed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["order_id"], ["orders.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("order_id"),
+    )
+    op.create_index(
+        "ix_analytics_order_attributions_attributed_at",
+        "analytics_order_attributions",
+        ["attributed_at"],
+    )
+    op.create_table(
+        "analytics_rollup_state",
+        sa.Column("name", sa.String(length=40), nullable=False),
+        sa.Column("covered_from", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("covered_to", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("analytics_rollup_state")
+    op.drop_index(
+        "ix_analytics_order_attributions_attributed_at",
+        table_name="analytics_order_attributions",
+    )
+    op.drop_table("analytics_order_attributions")
+    op.drop_table("analytics_daily_sessions")
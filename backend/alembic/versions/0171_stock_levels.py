@@ -0,0 +1,84 @@
+"""add stock levels
+
+Revision ID: 0171_stock_levels
+Revises: 0170_analytics_rollups
+Create Date: 2026-10-17 01:00:00
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0171_stock_levels"
+down_revision: str | Sequence[str] | None = "0170_analytics_rollups"
+branch_labels: str | Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stock_levels",
+        sa.Column("item_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("product_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("variant_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("on_hand", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "reserved_in_carts", sa.Integer(), nullable=False, server_default="0"
+        ),
+        sa.Column(
+            "reserved_in_orders", sa.Integer(), nullable=False, server_default="0"
+        ),
+        sa.Column("available", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("threshold", sa.Integer(), nullable=True),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["variant_id"], ["product_variants.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("item_id"),
+    )
+    op.create_index("ix_stock_levels_product_id", "stock_levels", ["product_id"])
+    op.create_index("ix_stock_levels_on_hand", "stock_levels", ["on_hand"])
+    op.create_index("ix_stock_levels_available", "stock_levels", ["available"])
+    op.create_index("ix_stock_levels_threshold", "stock_levels", ["threshold"])
+
+    # Seed stock on hand and thresholds; reservations are filled in by the
+    # first reconcile run of the stock_levels worker.
+    op.execute(
+        """
+        INSERT INTO stock_levels (item_id, product_id, variant_id, on_hand, available, threshold)
+        SELECT p.id, p.id, NULL, p.stock_quantity, p.stock_quantity,
+               COALESCE(p.low_stock_threshold, c.low_stock_threshold)
+        FROM products p
+        LEFT JOIN categories c ON c.id = p.category_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO stock_levels (item_id, product_id, variant_id, on_hand, available, threshold)
+        SELECT v.id, v.product_id, v.id, v.stock_quantity, v.stock_quantity,
+               COALESCE(p.low_stock_threshold, c.low_stock_threshold)
+        FROM product_variants v
+        JOIN products p ON p.id = v.product_id
+        LEFT JOIN categories c ON c.id = p.category_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_stock_levels_threshold", table_name="stock_levels")
+    op.drop_index("ix_stock_levels_available", table_name="stock_levels")
+    op.drop_index("ix_stock_levels_on_hand", table_name="stock_levels")
+    op.drop_index("ix_stock_levels_product_id", table_name="stock_levels")
+    op.drop_table("stock_levels")
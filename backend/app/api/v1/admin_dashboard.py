@@ -19,10 +19,11 @@ from fastapi import (
     Response,
     status,
 )
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy import (
     String,
     Text,
+    and_,
     case,
     cast,
     delete,
@@ -89,6 +90,7 @@ from app.schemas.inventory import (
 from app.services import exporter as exporter_service
 from app.services import inventory as inventory_service
 from app.services import catalog as catalog_service
+from app.services import csv_stream
 from app.models.address import Address
 from app.models.order import (
     Order,
@@ -113,13 +115,15 @@ from app.models.admin_dashboard_settings import AdminDashboardAlertThresholds
 from app.models.promo import PromoCode, StripeCouponMapping
 from app.models.coupons_v2 import Promotion
 from app.models.user_export import UserDataExportJob, UserDataExportStatus
-from app.models.analytics_event import AnalyticsEvent
 from app.models.webhook import PayPalWebhookEvent, StripeWebhookEvent
 from app.services import auth as auth_service
 from app.services import audit_chain as audit_chain_service
 from app.services import email as email_service
 from app.services import admin_reports as admin_reports_service
 from app.services import private_storage
+from app.services import analytics_rollups
+from app.services import sales_rollups
+from app.services import stock_levels
 from app.services import user_export as user_export_service
 from app.services import self_service
 from app.services import pii as pii_service
@@ -296,10 +300,7 @@ async def admin_summary(
     range_to: date | None = Query(default=None),
 ) -> dict:
     now = datetime.now(timezone.utc)
-    successful_statuses = (OrderStatus.paid, OrderStatus.shipped, OrderStatus.delivered)
-    sales_statuses = (*successful_statuses, OrderStatus.refunded)
-    test_order_ids = select(OrderTag.order_id).where(OrderTag.tag == "test")
-    exclude_test_orders = Order.id.notin_(test_order_ids)
+    exclude_test_orders = sales_rollups.exclude_test_orders()
 
     if (range_from is None) != (range_to is None):
         raise HTTPException(
@@ -324,325 +325,136 @@ async def admin_summary(
         effective_range_days = range_days
 
     products_total = await session.scalar(
-        select(func.count()).select_from(Product).where(Product.is_deleted.is_(False))
-    )
-    orders_total = await session.scalar(
-        select(func.count()).select_from(Order).where(exclude_test_orders)
-    )
-    users_total = await session.scalar(select(func.count()).select_from(User))
-
-    low_stock_threshold = func.coalesce(
-        Product.low_stock_threshold,
-        Category.low_stock_threshold,
-        DEFAULT_LOW_STOCK_DASHBOARD_THRESHOLD,
-    )
-    low_stock = await session.scalar(
         select(func.count())
         .select_from(Product)
         .join(Category, Product.category_id == Category.id)
-        .where(
-            Product.is_deleted.is_(False),
-            Product.is_active.is_(True),
-            Product.stock_quantity < low_stock_threshold,
-        )
-    )
-
-    since = now - timedelta(days=30)
-    sales_30d = await session.scalar(
-        select(func.coalesce(func.sum(Order.total_amount), 0)).where(
-            Order.created_at >= since,
-            Order.status.in_(successful_statuses),
-            exclude_test_orders,
-        )
-    )
-    gross_sales_30d = await session.scalar(
-        select(func.coalesce(func.sum(Order.total_amount), 0)).where(
-            Order.created_at >= since,
-            Order.status.in_(sales_statuses),
-            exclude_test_orders,
-        )
-    )
-    refunds_30d = await session.scalar(
-        select(func.coalesce(func.sum(OrderRefund.amount), 0))
-        .select_from(OrderRefund)
-        .join(Order, OrderRefund.order_id == Order.id)
-        .where(
-            Order.created_at >= since,
-            Order.status.in_(sales_statuses),
-            exclude_test_orders,
-        )
-    )
-    missing_refunds_30d = await session.scalar(
-        select(func.coalesce(func.sum(Order.total_amount), 0))
-        .select_from(Order)
-        .outerjoin(OrderRefund, OrderRefund.order_id == Order.id)
-        .where(
-            Order.created_at >= since,
-            Order.status == OrderStatus.refunded,
-            OrderRefund.id.is_(None),
-            exclude_test_orders,
-        )
-    )
-    net_sales_30d = (
-        (gross_sales_30d or 0) - (refunds_30d or 0) - (missing_refunds_30d or 0)
-    )
-    orders_30d = await session.scalar(
-        select(func.count())
-        .select_from(Order)
-        .where(Order.created_at >= since, exclude_test_orders)
-    )
-
-    sales_range = await session.scalar(
-        select(func.coalesce(func.sum(Order.total_amount), 0)).where(
-            Order.created_at >= start,
-            Order.created_at < end,
-            Order.status.in_(successful_statuses),
-            exclude_test_orders,
-        )
-    )
-    gross_sales_range = await session.scalar(
-        select(func.coalesce(func.sum(Order.total_amount), 0)).where(
-            Order.created_at >= start,
-            Order.created_at < end,
-            Order.status.in_(sales_statuses),
-            exclude_test_orders,
-        )
-    )
-    refunds_range = await session.scalar(
-        select(func.coalesce(func.sum(OrderRefund.amount), 0))
-        .select_from(OrderRefund)
-        .join(Order, OrderRefund.order_id == Order.id)
-        .where(
-            Order.created_at >= start,
-            Order.created_at < end,
-            Order.status.in_(sales_statuses),
-            exclude_test_orders,
-        )
-    )
-    missing_refunds_range = await session.scalar(
-        select(func.coalesce(func.sum(Order.total_amount), 0))
-        .select_from(Order)
-        .outerjoin(OrderRefund, OrderRefund.order_id == Order.id)
-        .where(
-            Order.created_at >= start,
-            Order.created_at < end,
-            Order.status == OrderStatus.refunded,
-            OrderRefund.id.is_(None),
-            exclude_test_orders,
-        )
+        .where(Product.is_deleted.is_(False))
     )
-    net_sales_range = (
-        (gross_sales_range or 0) - (refunds_range or 0) - (missing_refunds_range or 0)
+    low_stock, stockouts = await stock_levels.low_stock_counts(
+        session, default_threshold=DEFAULT_LOW_STOCK_DASHBOARD_THRESHOLD
     )
-    orders_range = await session.scalar(
-        select(func.count())
-        .select_from(Order)
-        .where(Order.created_at >= start, Order.created_at < end, exclude_test_orders)
+    orders_total = await session.scalar(
+        select(func.count()).select_from(Order).where(exclude_test_orders)
     )
+    users_total = await session.scalar(select(func.count()).select_from(User))
 
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     yesterday_start = today_start - timedelta(days=1)
-
-    today_orders = await session.scalar(
-        select(func.count())
-        .select_from(Order)
-        .where(
-            Order.created_at >= today_start, Order.created_at < now, exclude_test_orders
-        )
-    )
-    yesterday_orders = await session.scalar(
-        select(func.count())
-        .select_from(Order)
-        .where(
-            Order.created_at >= yesterday_start,
-            Order.created_at < today_start,
-            exclude_test_orders,
-        )
-    )
-    today_sales = await session.scalar(
-        select(func.coalesce(func.sum(Order.total_amount), 0)).where(
-            Order.created_at >= today_start,
-            Order.created_at < now,
-            Order.status.in_(successful_statuses),
-            exclude_test_orders,
-        )
-    )
-    yesterday_sales = await session.scalar(
-        select(func.coalesce(func.sum(Order.total_amount), 0)).where(
-            Order.created_at >= yesterday_start,
-            Order.created_at < today_start,
-            Order.status.in_(successful_statuses),
-            exclude_test_orders,
-        )
-    )
-    gross_today_sales = await session.scalar(
-        select(func.coalesce(func.sum(Order.total_amount), 0)).where(
-            Order.created_at >= today_start,
-            Order.created_at < now,
-            Order.status.in_(sales_statuses),
-            exclude_test_orders,
-        )
-    )
-    gross_yesterday_sales = await session.scalar(
-        select(func.coalesce(func.sum(Order.total_amount), 0)).where(
-            Order.created_at >= yesterday_start,
-            Order.created_at < today_start,
-            Order.status.in_(sales_statuses),
-            exclude_test_orders,
-        )
-    )
-    refunds_today = await session.scalar(
-        select(func.coalesce(func.sum(OrderRefund.amount), 0))
-        .select_from(OrderRefund)
-        .join(Order, OrderRefund.order_id == Order.id)
-        .where(
-            Order.created_at >= today_start,
-            Order.created_at < now,
-            Order.status.in_(sales_statuses),
-            exclude_test_orders,
-        )
-    )
-    refunds_yesterday = await session.scalar(
-        select(func.coalesce(func.sum(OrderRefund.amount), 0))
-        .select_from(OrderRefund)
-        .join(Order, OrderRefund.order_id == Order.id)
-        .where(
-            Order.created_at >= yesterday_start,
-            Order.created_at < today_start,
-            Order.status.in_(sales_statuses),
-            exclude_test_orders,
-        )
-    )
-    missing_refunds_today = await session.scalar(
-        select(func.coalesce(func.sum(Order.total_amount), 0))
-        .select_from(Order)
-        .outerjoin(OrderRefund, OrderRefund.order_id == Order.id)
-        .where(
-            Order.created_at >= today_start,
-            Order.created_at < now,
-            Order.status == OrderStatus.refunded,
-            OrderRefund.id.is_(None),
-            exclude_test_orders,
-        )
-    )
-    missing_refunds_yesterday = await session.scalar(
-        select(func.coalesce(func.sum(Order.total_amount), 0))
-        .select_from(Order)
-        .outerjoin(OrderRefund, OrderRefund.order_id == Order.id)
-        .where(
-            Order.created_at >= yesterday_start,
-            Order.created_at < today_start,
-            Order.status == OrderStatus.refunded,
-            OrderRefund.id.is_(None),
-            exclude_test_orders,
-        )
-    )
-    net_today_sales = (
-        (gross_today_sales or 0) - (refunds_today or 0) - (missing_refunds_today or 0)
-    )
-    net_yesterday_sales = (
-        (gross_yesterday_sales or 0)
-        - (refunds_yesterday or 0)
-        - (missing_refunds_yesterday or 0)
-    )
-    today_refunds = await session.scalar(
-        select(func.count())
-        .select_from(Order)
-        .where(
-            Order.status == OrderStatus.refunded,
-            Order.updated_at >= today_start,
-            Order.updated_at < now,
-            exclude_test_orders,
-        )
-    )
-    yesterday_refunds = await session.scalar(
-        select(func.count())
-        .select_from(Order)
-        .where(
-            Order.status == OrderStatus.refunded,
-            Order.updated_at >= yesterday_start,
-            Order.updated_at < today_start,
-            exclude_test_orders,
-        )
-    )
+    totals = await sales_rollups.window_totals(
+        session,
+        {
+            "30d": (now - timedelta(days=30), now),
+            "range": (start, end),
+            "today": (today_start, now),
+            "yesterday": (yesterday_start, today_start),
+        },
+        now=now,
+    )
+    sales_30d = totals["30d"].sales
+    gross_sales_30d = totals["30d"].gross_sales
+    net_sales_30d = totals["30d"].net_sales
+    orders_30d = totals["30d"].orders
+    sales_range = totals["range"].sales
+    gross_sales_range = totals["range"].gross_sales
+    net_sales_range = totals["range"].net_sales
+    orders_range = totals["range"].orders
+    today_orders = totals["today"].orders
+    yesterday_orders = totals["yesterday"].orders
+    today_sales = totals["today"].sales
+    yesterday_sales = totals["yesterday"].sales
+    gross_today_sales = totals["today"].gross_sales
+    gross_yesterday_sales = totals["yesterday"].gross_sales
+    net_today_sales = totals["today"].net_sales
+    net_yesterday_sales = totals["yesterday"].net_sales
 
     payment_window_end = now
     payment_window_start = now - timedelta(hours=24)
     payment_prev_start = payment_window_start - timedelta(hours=24)
-    failed_payments = await session.scalar(
-        select(func.count())
-        .select_from(Order)
-        .where(
-            Order.status == OrderStatus.pending_payment,
-            Order.created_at >= payment_window_start,
-            Order.created_at < payment_window_end,
-            exclude_test_orders,
-        )
-    )
-    failed_payments_prev = await session.scalar(
-        select(func.count())
-        .select_from(Order)
-        .where(
-            Order.status == OrderStatus.pending_payment,
-            Order.created_at >= payment_prev_start,
-            Order.created_at < payment_window_start,
-            exclude_test_orders,
-        )
-    )
-
     refund_window_end = now
     refund_window_start = now - timedelta(days=7)
     refund_prev_start = refund_window_start - timedelta(days=7)
-    refund_requests = await session.scalar(
-        select(func.count())
-        .select_from(ReturnRequest)
-        .join(Order, ReturnRequest.order_id == Order.id)
-        .where(
-            ReturnRequest.status == ReturnRequestStatus.requested,
-            ReturnRequest.created_at >= refund_window_start,
-            ReturnRequest.created_at < refund_window_end,
-            exclude_test_orders,
-        )
-    )
-    refund_requests_prev = await session.scalar(
-        select(func.count())
-        .select_from(ReturnRequest)
-        .join(Order, ReturnRequest.order_id == Order.id)
-        .where(
-            ReturnRequest.status == ReturnRequestStatus.requested,
-            ReturnRequest.created_at >= refund_prev_start,
-            ReturnRequest.created_at < refund_window_start,
-            exclude_test_orders,
-        )
-    )
-    refund_window_orders = await session.scalar(
-        select(func.count())
-        .select_from(Order)
-        .where(
-            Order.created_at >= refund_window_start,
-            Order.created_at < refund_window_end,
-            exclude_test_orders,
-        )
-    )
-    refund_window_orders_prev = await session.scalar(
-        select(func.count())
-        .select_from(Order)
-        .where(
-            Order.created_at >= refund_prev_start,
-            Order.created_at < refund_window_start,
-            exclude_test_orders,
-        )
-    )
 
-    stockouts = await session.scalar(
-        select(func.count())
-        .select_from(Product)
-        .where(
-            Product.stock_quantity <= 0,
-            Product.is_deleted.is_(False),
-            Product.is_active.is_(True),
+    def _count_where(*conditions: Any) -> Any:
+        return func.sum(case((and_(*conditions), 1), else_=0))
+
+    is_refunded = Order.status == OrderStatus.refunded
+    is_pending_payment = Order.status == OrderStatus.pending_payment
+    order_counts = (
+        await session.execute(
+            select(
+                _count_where(
+                    is_refunded,
+                    Order.updated_at >= today_start,
+                    Order.updated_at < now,
+                ),
+                _count_where(
+                    is_refunded,
+                    Order.updated_at >= yesterday_start,
+                    Order.updated_at < today_start,
+                ),
+                _count_where(
+                    is_pending_payment,
+                    Order.created_at >= payment_window_start,
+                    Order.created_at < payment_window_end,
+                ),
+                _count_where(
+                    is_pending_payment,
+                    Order.created_at >= payment_prev_start,
+                    Order.created_at < payment_window_start,
+                ),
+                _count_where(
+                    Order.created_at >= refund_window_start,
+                    Order.created_at < refund_window_end,
+                ),
+                _count_where(
+                    Order.created_at >= refund_prev_start,
+                    Order.created_at < refund_window_start,
+                ),
+            ).where(
+                exclude_test_orders,
+                or_(
+                    and_(Order.created_at >= refund_prev_start, Order.created_at < now),
+                    and_(
+                        is_refunded,
+                        Order.updated_at >= yesterday_start,
+                        Order.updated_at < now,
+                    ),
+                ),
+            )
         )
-    )
+    ).one()
+    (
+        today_refunds,
+        yesterday_refunds,
+        failed_payments,
+        failed_payments_prev,
+        refund_window_orders,
+        refund_window_orders_prev,
+    ) = order_counts
+
+    is_requested = ReturnRequest.status == ReturnRequestStatus.requested
+    refund_requests, refund_requests_prev = (
+        await session.execute(
+            select(
+                _count_where(
+                    ReturnRequest.created_at >= refund_window_start,
+                    ReturnRequest.created_at < refund_window_end,
+                ),
+                _count_where(
+                    ReturnRequest.created_at >= refund_prev_start,
+                    ReturnRequest.created_at < refund_window_start,
+                ),
+            )
+            .select_from(ReturnRequest)
+            .join(Order, ReturnRequest.order_id == Order.id)
+            .where(
+                is_requested,
+                ReturnRequest.created_at >= refund_prev_start,
+                ReturnRequest.created_at < refund_window_end,
+                exclude_test_orders,
+            )
+        )
+    ).one()
 
     def _delta_pct(today_value: float, yesterday_value: float) -> float | None:
         if yesterday_value == 0:
@@ -875,24 +687,11 @@ async def admin_funnel_metrics(
         end = now
         effective_range_days = range_days
 
-    window_filters = [
-        AnalyticsEvent.created_at >= start,
-        AnalyticsEvent.created_at < end,
-    ]
-
-    async def _distinct_sessions(event: str) -> int:
-        value = await session.scalar(
-            select(func.count(func.distinct(AnalyticsEvent.session_id))).where(
-                *window_filters,
-                AnalyticsEvent.event == event,
-            )
-        )
-        return int(value or 0)
-
-    sessions_count = await _distinct_sessions("session_start")
-    carts_count = await _distinct_sessions("view_cart")
-    checkouts_count = await _distinct_sessions("checkout_start")
-    orders_count = await _distinct_sessions("checkout_success")
+    counts = await analytics_rollups.funnel_counts(session, start=start, end=end)
+    sessions_count = counts["session_start"]
+    carts_count = counts["view_cart"]
+    checkouts_count = counts["checkout_start"]
+    orders_count = counts["checkout_success"]
 
     def _rate(numer: int, denom: int) -> float | None:
         if denom <= 0:
@@ -1855,28 +1654,21 @@ async def admin_channel_attribution(
         )
     )
 
-    checkout_rows = await session.execute(
-        select(AnalyticsEvent.session_id, AnalyticsEvent.order_id)
-        .select_from(AnalyticsEvent)
-        .where(
-            AnalyticsEvent.event == "checkout_success",
-            AnalyticsEvent.created_at >= start,
-            AnalyticsEvent.created_at < end,
-            AnalyticsEvent.order_id.is_not(None),
-        )
-        .order_by(AnalyticsEvent.created_at.asc())
+    channels = await analytics_rollups.attributed_sales(
+        session,
+        start=start,
+        end=end,
+        order_filters=(
+            Order.created_at >= start,
+            Order.created_at < end,
+            Order.status.in_(sales_statuses),
+            exclude_test_orders,
+        ),
     )
-    order_to_session: dict[UUID, str] = {}
-    session_ids: set[str] = set()
-    for session_id, order_id in checkout_rows.all():
-        if not session_id or not order_id:
-            continue
-        if order_id in order_to_session:
-            continue
-        order_to_session[order_id] = str(session_id)
-        session_ids.add(str(session_id))
+    tracked_orders = sum(orders for orders, _ in channels.values())
+    tracked_sales = sum(gross for _, gross in channels.values())
 
-    if not order_to_session:
+    if not channels:
         return {
             "range_days": int(effective_range_days),
             "range_from": start.date().isoformat(),
@@ -1889,76 +1681,15 @@ async def admin_channel_attribution(
             "channels": [],
         }
 
-    order_ids = list(order_to_session.keys())
-    order_rows = await session.execute(
-        select(Order.id, Order.total_amount)
-        .select_from(Order)
-        .where(
-            Order.id.in_(order_ids),
-            Order.created_at >= start,
-            Order.created_at < end,
-            Order.status.in_(sales_statuses),
-            exclude_test_orders,
-        )
-    )
-    order_amounts = {row[0]: float(row[1] or 0) for row in order_rows.all()}
-
-    session_start_rows = await session.execute(
-        select(
-            AnalyticsEvent.session_id, AnalyticsEvent.payload, AnalyticsEvent.created_at
-        )
-        .select_from(AnalyticsEvent)
-        .where(
-            AnalyticsEvent.event == "session_start",
-            AnalyticsEvent.session_id.in_(session_ids),
-        )
-        .order_by(AnalyticsEvent.created_at.asc())
-    )
-    session_payload: dict[str, dict | None] = {}
-    for session_id, payload, _created_at in session_start_rows.all():
-        key = str(session_id)
-        if key in session_payload:
-            continue
-        session_payload[key] = payload if isinstance(payload, dict) else None
-
-    def _normalize(value: object) -> str:
-        if not isinstance(value, str):
-            return ""
-        return value.strip()
-
-    def _extract_channel(payload: dict | None) -> tuple[str, str | None, str | None]:
-        src = _normalize((payload or {}).get("utm_source")).lower()
-        med = _normalize((payload or {}).get("utm_medium")).lower() or None
-        camp = _normalize((payload or {}).get("utm_campaign")) or None
-        if not src:
-            return ("direct", None, None)
-        return (src, med, camp)
-
-    channels: dict[tuple[str, str | None, str | None], dict[str, float]] = {}
-    tracked_orders = 0
-    tracked_sales = 0.0
-    for order_id, session_id in order_to_session.items():
-        amount = order_amounts.get(order_id)
-        if amount is None:
-            continue
-        tracked_orders += 1
-        tracked_sales += float(amount)
-        payload = session_payload.get(session_id)
-        src, med, camp = _extract_channel(payload)
-        key = (src, med, camp)
-        entry = channels.setdefault(key, {"orders": 0.0, "gross_sales": 0.0})
-        entry["orders"] += 1.0
-        entry["gross_sales"] += float(amount)
-
     channel_rows: list[dict] = []
-    for (src, med, camp), entry in channels.items():
+    for (src, med, camp), (orders, gross) in channels.items():
         channel_rows.append(
             {
                 "source": src,
                 "medium": med,
                 "campaign": camp,
-                "orders": int(entry.get("orders", 0) or 0),
-                "gross_sales": float(entry.get("gross_sales", 0) or 0),
+                "orders": int(orders or 0),
+                "gross_sales": float(gross or 0),
             }
         )
     channel_rows.sort(
@@ -3619,53 +3350,48 @@ async def admin_audit_export_csv(
         .order_by(getattr(audit.c, "created_at").desc())
         .limit(5000)
     )  # type: ignore[attr-defined]
-    rows = (await session.execute(q)).mappings().all()
 
-    buf = io.StringIO()
-    writer = csv.writer(buf)
-    writer.writerow(
-        [
-            "created_at",
-            "entity",
-            "action",
-            "actor_email",
-            "subject_email",
-            "ref_key",
-            "ref_id",
-            "actor_user_id",
-            "subject_user_id",
-            "data",
-        ]
-    )
-    for row in rows:
-        created_at = row.get("created_at")
-        actor_email = str(row.get("actor_email") or "")
-        subject_email = str(row.get("subject_email") or "")
-        data_raw = str(row.get("data") or "")
+    async def _rows():
+        async for row in csv_stream.stream_rows(session, q):
+            values = row._mapping
+            created_at = values.get("created_at")
+            actor_email = str(values.get("actor_email") or "")
+            subject_email = str(values.get("subject_email") or "")
+            data_raw = str(values.get("data") or "")
 
-        if redact:
-            actor_email = _audit_mask_email(actor_email)
-            subject_email = _audit_mask_email(subject_email)
-            data_raw = _audit_redact_text(data_raw)
+            if redact:
+                actor_email = _audit_mask_email(actor_email)
+                subject_email = _audit_mask_email(subject_email)
+                data_raw = _audit_redact_text(data_raw)
 
-        writer.writerow(
-            [
+            yield [
                 created_at.isoformat() if isinstance(created_at, datetime) else "",
-                _audit_csv_cell(str(row.get("entity") or "")),
-                _audit_csv_cell(str(row.get("action") or "")),
+                _audit_csv_cell(str(values.get("entity") or "")),
+                _audit_csv_cell(str(values.get("action") or "")),
                 _audit_csv_cell(actor_email),
                 _audit_csv_cell(subject_email),
-                _audit_csv_cell(str(row.get("ref_key") or "")),
-                _audit_csv_cell(str(row.get("ref_id") or "")),
-                _audit_csv_cell(str(row.get("actor_user_id") or "")),
-                _audit_csv_cell(str(row.get("subject_user_id") or "")),
+                _audit_csv_cell(str(values.get("ref_key") or "")),
+                _audit_csv_cell(str(values.get("ref_id") or "")),
+                _audit_csv_cell(str(values.get("actor_user_id") or "")),
+                _audit_csv_cell(str(values.get("subject_user_id") or "")),
                 _audit_csv_cell(data_raw),
             ]
-        )
 
+    header = [
+        "created_at",
+        "entity",
+        "action",
+        "actor_email",
+        "subject_email",
+        "ref_key",
+        "ref_id",
+        "actor_user_id",
+        "subject_user_id",
+        "data",
+    ]
     filename = f"audit-{(entity or 'all').strip().lower()}-{datetime.now(timezone.utc).date().isoformat()}.csv"
-    return Response(
-        content=buf.getvalue(),
+    return StreamingResponse(
+        csv_stream.iter_csv(header, _rows()),
         media_type="text/csv",
         headers={
             "Content-Disposition": f'attachment; filename="{filename}"',
@@ -4301,7 +4027,9 @@ async def admin_gdpr_execute_deletion(
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(require_admin),
 ) -> None:
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -4415,7 +4143,9 @@ async def update_user_role(
             detail="Only owner/admin can change user roles",
         )
 
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -4817,7 +4547,9 @@ async def override_email_verification(
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(require_admin),
 ) -> AdminUserProfileUser:
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -4946,7 +4678,9 @@ async def transfer_owner(
             status_code=status.HTTP_400_BAD_REQUEST, detail='Type "TRANSFER" to confirm'
         )
 
-    if not security.verify_password(payload.password, current_owner.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_owner.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -5021,23 +4755,9 @@ async def low_stock_products(
     session: AsyncSession = Depends(get_session),
     _: User = Depends(require_admin_section("inventory")),
 ) -> list[dict]:
-    threshold_expr = func.coalesce(
-        Product.low_stock_threshold,
-        Category.low_stock_threshold,
-        DEFAULT_LOW_STOCK_DASHBOARD_THRESHOLD,
+    rows = await stock_levels.low_stock_products(
+        session, default_threshold=DEFAULT_LOW_STOCK_DASHBOARD_THRESHOLD, limit=20
     )
-    stmt = (
-        select(Product, threshold_expr.label("threshold"))
-        .join(Category, Product.category_id == Category.id)
-        .where(
-            Product.stock_quantity < threshold_expr,
-            Product.is_deleted.is_(False),
-            Product.is_active.is_(True),
-        )
-        .order_by(Product.stock_quantity.asc())
-        .limit(20)
-    )
-    rows = (await session.execute(stmt)).all()
     return [
         {
             "id": str(p.id),
@@ -5094,7 +4814,18 @@ async def export_stock_adjustments(
         )
 
     stmt = (
-        select(StockAdjustment, ProductVariant, User)
+        select(
+            StockAdjustment.created_at,
+            StockAdjustment.variant_id,
+            ProductVariant.name.label("variant_name"),
+            StockAdjustment.reason,
+            StockAdjustment.delta,
+            StockAdjustment.before_quantity,
+            StockAdjustment.after_quantity,
+            StockAdjustment.note,
+            User.email.label("actor_email"),
+            StockAdjustment.actor_user_id,
+        )
         .select_from(StockAdjustment)
         .outerjoin(ProductVariant, ProductVariant.id == StockAdjustment.variant_id)
         .outerjoin(User, User.id == StockAdjustment.actor_user_id)
@@ -5106,55 +4837,46 @@ async def export_stock_adjustments(
         stmt = stmt.where(func.date(StockAdjustment.created_at) >= from_date)
     if to_date is not None:
         stmt = stmt.where(func.date(StockAdjustment.created_at) <= to_date)
+    stmt = stmt.order_by(StockAdjustment.created_at.desc()).limit(limit)
+    product_slug, product_name, product_sku = product.slug, product.name, product.sku
 
-    rows = (
-        await session.execute(
-            stmt.order_by(StockAdjustment.created_at.desc()).limit(limit)
-        )
-    ).all()
-
-    buf = io.StringIO()
-    writer = csv.writer(buf)
-    writer.writerow(
-        [
-            "created_at",
-            "product_slug",
-            "product_name",
-            "sku",
-            "variant_id",
-            "variant_name",
-            "reason",
-            "delta",
-            "before_quantity",
-            "after_quantity",
-            "note",
-            "actor_email",
-            "actor_user_id",
-        ]
-    )
-    for adjustment, variant, actor in rows:
-        created_at = getattr(adjustment, "created_at", None)
-        writer.writerow(
-            [
+    async def _rows():
+        async for row in csv_stream.stream_rows(session, stmt):
+            created_at = row.created_at
+            yield [
                 created_at.isoformat() if isinstance(created_at, datetime) else "",
-                product.slug,
-                product.name,
-                product.sku,
-                str(adjustment.variant_id) if adjustment.variant_id else "",
-                getattr(variant, "name", "") or "",
-                adjustment.reason.value,
-                int(adjustment.delta),
-                int(adjustment.before_quantity),
-                int(adjustment.after_quantity),
-                (adjustment.note or ""),
-                getattr(actor, "email", "") or "",
-                str(adjustment.actor_user_id) if adjustment.actor_user_id else "",
+                product_slug,
+                product_name,
+                product_sku,
+                str(row.variant_id) if row.variant_id else "",
+                row.variant_name or "",
+                row.reason.value,
+                int(row.delta),
+                int(row.before_quantity),
+                int(row.after_quantity),
+                (row.note or ""),
+                row.actor_email or "",
+                str(row.actor_user_id) if row.actor_user_id else "",
             ]
-        )
 
-    filename = f"stock-adjustments-{product.slug}-{datetime.now(timezone.utc).date().isoformat()}.csv"
-    return Response(
-        content=buf.getvalue(),
+    header = [
+        "created_at",
+        "product_slug",
+        "product_name",
+        "sku",
+        "variant_id",
+        "variant_name",
+        "reason",
+        "delta",
+        "before_quantity",
+        "after_quantity",
+        "note",
+        "actor_email",
+        "actor_user_id",
+    ]
+    filename = f"stock-adjustments-{product_slug}-{datetime.now(timezone.utc).date().isoformat()}.csv"
+    return StreamingResponse(
+        csv_stream.iter_csv(header, _rows()),
         media_type="text/csv",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
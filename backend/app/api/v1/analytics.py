@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import logging
 import re
-from uuid import UUID
+from datetime import datetime, timezone
+from typing import Any
+from uuid import UUID, uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,10 +13,12 @@ from app.core.config import settings
 from app.core.dependencies import get_current_user_optional
 from app.db.session import get_session
 from app.core.rate_limit import per_identifier_limiter
+from app.services import analytics_ingest
 from app.services import analytics_tokens
-from app.models.analytics_event import AnalyticsEvent
 from app.models.user import User
 from app.schemas.analytics import (
+    AnalyticsEventBatchCreate,
+    AnalyticsEventBatchIngestResponse,
     AnalyticsEventCreate,
     AnalyticsEventIngestResponse,
     AnalyticsTokenRequest,
@@ -95,27 +99,26 @@ async def mint_analytics_token(
     return AnalyticsTokenResponse(token=token, expires_in=max(ttl_seconds, 60))
 
 
-@router.post("/events", response_model=AnalyticsEventIngestResponse)
-async def ingest_analytics_event(
-    payload: AnalyticsEventCreate,
-    request: Request,
-    session: AsyncSession = Depends(get_session),
-    user: User | None = Depends(get_current_user_optional),
-    _: None = Depends(analytics_rate_limit),
-) -> AnalyticsEventIngestResponse:
-    event = _normalize_event(payload.event)
+def _require_event(value: str) -> str:
+    event = _normalize_event(value)
     if not _EVENT_RE.match(event) or event not in _ALLOWED_EVENTS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Unsupported analytics event",
         )
+    return event
 
-    session_id = _normalize_session_id(payload.session_id)
+
+def _require_session_id(value: str) -> str:
+    session_id = _normalize_session_id(value)
     if not session_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Missing session_id"
         )
+    return session_id
+
 
+def _check_token(request: Request, session_id: str) -> None:
     raw_token = (request.headers.get("x-analytics-token") or "").strip()
     if bool(getattr(settings, "analytics_require_token", False)):
         if not raw_token:
@@ -133,6 +136,10 @@ async def ingest_analytics_event(
                 headers={"X-Error-Code": "analytics_token_invalid"},
             )
 
+
+def _event_row(
+    payload: AnalyticsEventCreate, *, event: str, session_id: str, user: User | None
+) -> dict[str, Any]:
     order_id: UUID | None = payload.order_id
     if not order_id and isinstance(payload.payload, dict):
         raw_order_id = payload.payload.get("order_id")
@@ -142,21 +149,74 @@ async def ingest_analytics_event(
             except ValueError:
                 order_id = None
 
-    record = AnalyticsEvent(
-        session_id=session_id,
-        event=event,
-        path=(payload.path or "").strip()[:500] or None,
-        payload=_sanitize_payload(payload.payload),
-        user_id=getattr(user, "id", None),
-        order_id=order_id,
-    )
-    session.add(record)
-    await session.commit()
+    return {
+        "id": uuid4(),
+        "session_id": session_id,
+        "event": event,
+        "path": (payload.path or "").strip()[:500] or None,
+        "payload": _sanitize_payload(payload.payload),
+        "user_id": getattr(user, "id", None),
+        "order_id": order_id,
+        "created_at": datetime.now(timezone.utc),
+    }
 
+
+async def _store(session: AsyncSession, rows: list[dict[str, Any]]) -> int:
+    """Buffer the events when the flush task runs; otherwise insert them now."""
+    await analytics_ingest.drop_unknown_orders(session, rows)
+    if analytics_ingest.enabled():
+        return await analytics_ingest.enqueue(rows)
+    await analytics_ingest.insert_rows(session, rows)
+    return len(rows)
+
+
+async def _drain_body(request: Request) -> None:
     # Best-effort: browsers may disconnect early.
     try:
         await request.body()
     except Exception as exc:
         logger.debug("analytics_event_request_body_read_failed", exc_info=exc)
 
+
+@router.post("/events", response_model=AnalyticsEventIngestResponse)
+async def ingest_analytics_event(
+    payload: AnalyticsEventCreate,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    user: User | None = Depends(get_current_user_optional),
+    _: None = Depends(analytics_rate_limit),
+) -> AnalyticsEventIngestResponse:
+    event = _require_event(payload.event)
+    session_id = _require_session_id(payload.session_id)
+    _check_token(request, session_id)
+
+    await _store(
+        session, [_event_row(payload, event=event, session_id=session_id, user=user)]
+    )
+    await _drain_body(request)
     return AnalyticsEventIngestResponse(received=True)
+
+
+@router.post("/events/batch", response_model=AnalyticsEventBatchIngestResponse)
+async def ingest_analytics_events_batch(
+    payload: AnalyticsEventBatchCreate,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    user: User | None = Depends(get_current_user_optional),
+    _: None = Depends(analytics_rate_limit),
+) -> AnalyticsEventBatchIngestResponse:
+    rows: list[dict[str, Any]] = []
+    checked_sessions: set[str] = set()
+    for item in payload.events:
+        event = _require_event(item.event)
+        session_id = _require_session_id(item.session_id)
+        if session_id not in checked_sessions:
+            _check_token(request, session_id)
+            checked_sessions.add(session_id)
+        rows.append(_event_row(item, event=event, session_id=session_id, user=user))
+
+    accepted = await _store(session, rows)
+    await _drain_body(request)
+    return AnalyticsEventBatchIngestResponse(
+        received=True, accepted=accepted, dropped=len(rows) - accepted
+    )
@@ -1028,7 +1028,9 @@ async def passkey_register_options(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> PasskeyRegistrationOptionsResponse:
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -1117,7 +1119,9 @@ async def passkey_delete(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> None:
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -1412,7 +1416,7 @@ async def step_up(
             detail="Password authentication is not available for this account",
         )
 
-    if not security.verify_password(payload.password, hashed_password):
+    if not await security.verify_password_async(payload.password, hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -1441,14 +1445,16 @@ async def change_password(
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ) -> dict:
-    if not security.verify_password(
+    if not await security.verify_password_async(
         payload.current_password, current_user.hashed_password
     ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect",
         )
-    current_user.hashed_password = security.hash_password(payload.new_password)
+    current_user.hashed_password = await security.hash_password_async(
+        payload.new_password
+    )
     current_user.password_reset_required = False
     session.add(current_user)
     await session.commit()
@@ -1530,7 +1536,9 @@ async def two_factor_setup(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> TwoFactorSetupResponse:
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -1580,7 +1588,9 @@ async def two_factor_disable(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> TwoFactorStatusResponse:
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -1618,7 +1628,9 @@ async def two_factor_regenerate_codes(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> TwoFactorEnableResponse:
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -1762,7 +1774,9 @@ async def update_username(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> UserResponse:
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -1783,7 +1797,9 @@ async def update_email(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> UserResponse:
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -1919,7 +1935,9 @@ async def make_secondary_email_primary(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> UserResponse:
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -1947,7 +1965,9 @@ async def delete_secondary_email(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> None:
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -2137,7 +2157,9 @@ async def request_account_deletion(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail='Type "DELETE" to confirm'
         )
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -2308,7 +2330,9 @@ async def revoke_other_sessions(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> RefreshSessionsRevokeResponse:
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -2903,7 +2927,9 @@ async def google_link(
     _: None = Depends(google_rate_limit),
 ) -> UserResponse:
     _validate_google_state(payload.state, "google_link", str(current_user.id))
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
@@ -2956,7 +2982,9 @@ async def google_unlink(
     session: AsyncSession = Depends(get_session),
     _: None = Depends(google_rate_limit),
 ) -> UserResponse:
-    if not security.verify_password(payload.password, current_user.hashed_password):
+    if not await security.verify_password_async(
+        payload.password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password"
         )
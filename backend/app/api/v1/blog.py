@@ -4,9 +4,11 @@ import time
 import uuid
 from datetime import datetime, timedelta, timezone
 from email.utils import format_datetime
+from functools import partial
 from typing import Literal
 from xml.etree import ElementTree
 
+import anyio.to_thread
 import sqlalchemy as sa
 from fastapi import (
     APIRouter,
@@ -18,6 +20,7 @@ from fastapi import (
     Response,
     status,
 )
+from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -53,6 +56,7 @@ from app.schemas.blog import (
 )
 from app.schemas.catalog import PaginationMeta
 from app.services import blog as blog_service
+from app.services import blog_og
 from app.services import captcha as captcha_service
 from app.services import content as content_service
 from app.services import email as email_service
@@ -474,7 +478,7 @@ async def blog_post_og_image(
             status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
         )
 
-    etag = f'W/"blog-og-{slug}-v{block.version}-{lang or "base"}"'
+    etag = blog_og.og_etag(slug, block.version, lang)
     cache_control = "public, max-age=3600"
     if_none_match = request.headers.get("if-none-match")
     if if_none_match and if_none_match != "*":
@@ -492,12 +496,9 @@ async def blog_post_og_image(
                     headers={"ETag": etag, "Cache-Control": cache_control},
                 )
 
-    data = blog_service.to_read(block, lang=lang)
-    png = og_images.render_blog_post_og(
-        title=str(data.get("title") or ""), subtitle=data.get("summary") or None
-    )
-    return Response(
-        content=png,
+    path = await blog_og.get_post_image(block, lang=lang)
+    return FileResponse(
+        path,
         media_type="image/png",
         headers={"ETag": etag, "Cache-Control": cache_control},
     )
@@ -521,9 +522,9 @@ async def blog_post_og_preview_image(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
         )
-    data = blog_service.to_read(block, lang=lang)
-    png = og_images.render_blog_post_og(
-        title=str(data.get("title") or ""), subtitle=data.get("summary") or None
+    title, subtitle = blog_service.og_text(block, lang=lang)
+    png = await anyio.to_thread.run_sync(
+        partial(og_images.render_blog_post_og, title=title, subtitle=subtitle)
     )
     return Response(
         content=png,
@@ -1,4 +1,6 @@
 import json
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
 from functools import partial
 from uuid import UUID
 
@@ -12,10 +14,11 @@ from fastapi import (
     Path,
     Query,
     Request,
+    Response,
     UploadFile,
     status,
 )
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -77,8 +80,11 @@ from app.schemas.catalog import (
 from app.schemas.catalog_admin import AdminDeletedProductImage, AdminProductAuditEntry
 from app.services import audit_chain as audit_chain_service
 from app.services import catalog as catalog_service
+from app.services import catalog_cache
+from app.services import product_feed
 from app.services import storage
 from app.services import step_up as step_up_service
+from app.services import stock_levels
 
 router = APIRouter(prefix="/catalog", tags=["catalog"])
 
@@ -121,6 +127,46 @@ async def list_categories(
     return categories
 
 
+async def _count_products_cached(
+    session: AsyncSession,
+    *,
+    category_slug: str | None,
+    on_sale: bool | None,
+    is_featured: bool | None,
+    search: str | None,
+    min_price: float | None,
+    max_price: float | None,
+    tags: list[str] | None,
+    include_unpublished: bool,
+) -> int:
+    """Total for cursor pages, counted once per filter set and catalog generation."""
+    filters = dict(
+        category_slug=category_slug,
+        on_sale=on_sale,
+        is_featured=is_featured,
+        search=search,
+        min_price=min_price,
+        max_price=max_price,
+        tags=tags,
+    )
+    key: str | None = None
+    if not include_unpublished and catalog_cache.is_enabled():
+        key = await catalog_cache.count_cache_key(
+            catalog_cache.listing_digest(
+                **filters, sort=None, limit=0, offset=0, lang=None
+            )
+        )
+        cached = await catalog_cache.get_listing(key)
+        if cached is not None:
+            return int(cached["total"])
+    total = await catalog_service.count_products_with_filters(
+        session, **filters, include_unpublished=include_unpublished
+    )
+    if key is not None:
+        await catalog_cache.set_listing(key, {"total": total})
+    return total
+
+
 @router.get("/products", response_model=ProductListResponse)
 async def list_products(
     session: AsyncSession = Depends(get_session),
@@ -134,10 +180,20 @@ async def list_products(
     tags: list[str] | None = Query(default=None),
     sort: str | None = Query(
         default=None,
-        description="recommended|newest|price_asc|price_desc|name_asc|name_desc",
+        description=(
+            "recommended|newest|price_asc|price_desc|name_asc|name_desc|relevance"
+        ),
     ),
     page: int = Query(default=1, ge=1),
     limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = Query(
+        default=None,
+        max_length=512,
+        description=(
+            "Keyset pagination: pass an empty value for the first page, then "
+            "meta.next_cursor. Ignores page."
+        ),
+    ),
     lang: str | None = Query(default=None, pattern="^(en|ro)$"),
     current_user: User | None = Depends(get_current_user_optional),
 ) -> ProductListResponse:
@@ -152,9 +208,28 @@ async def list_products(
     }
     include_unpublished = bool(include_unpublished and is_staff)
 
-    await catalog_service.auto_publish_due_sales(session)
-    await catalog_service.apply_due_product_schedules(session)
     offset = (page - 1) * limit
+    cache_key: str | None = None
+    if not include_unpublished and catalog_cache.is_enabled():
+        cache_key = await catalog_cache.listing_cache_key(
+            catalog_cache.listing_digest(
+                category_slug=category_slug,
+                on_sale=on_sale,
+                is_featured=is_featured,
+                search=search,
+                min_price=min_price,
+                max_price=max_price,
+                tags=tags,
+                sort=sort,
+                limit=limit,
+                offset=offset,
+                lang=lang,
+                cursor=cursor,
+            )
+        )
+        cached = await catalog_cache.get_listing(cache_key)
+        if cached is not None:
+            return ProductListResponse.model_validate(cached)
     min_bound, max_bound, currency = await catalog_service.get_product_price_bounds(
         session,
         category_slug=category_slug,
@@ -164,21 +239,50 @@ async def list_products(
         tags=tags,
         include_unpublished=include_unpublished,
     )
-    items, total_items = await catalog_service.list_products_with_filters(
-        session,
-        category_slug,
-        on_sale,
-        is_featured,
-        search,
-        min_price,
-        max_price,
-        tags,
-        sort,
-        limit,
-        offset,
-        lang=lang,
-        include_unpublished=include_unpublished,
-    )
+    next_cursor: str | None = None
+    if cursor is not None:
+        items, next_cursor = await catalog_service.list_products_after_cursor(
+            session,
+            category_slug,
+            on_sale,
+            is_featured,
+            search,
+            min_price,
+            max_price,
+            tags,
+            sort,
+            limit,
+            cursor or None,
+            lang=lang,
+            include_unpublished=include_unpublished,
+        )
+        total_items = await _count_products_cached(
+            session,
+            category_slug=category_slug,
+            on_sale=on_sale,
+            is_featured=is_featured,
+            search=search,
+            min_price=min_price,
+            max_price=max_price,
+            tags=tags,
+            include_unpublished=include_unpublished,
+        )
+    else:
+        items, total_items = await catalog_service.list_products_with_filters(
+            session,
+            category_slug,
+            on_sale,
+            is_featured,
+            search,
+            min_price,
+            max_price,
+            tags,
+            sort,
+            limit,
+            offset,
+            lang=lang,
+            include_unpublished=include_unpublished,
+        )
     payload_items = []
     for item in items:
         model = ProductRead.model_validate(item)
@@ -186,18 +290,22 @@ async def list_products(
             model.sale_price = None
         payload_items.append(model)
     total_pages = max(1, (total_items + limit - 1) // limit) if total_items else 1
-    return ProductListResponse(
+    response = ProductListResponse(
         items=payload_items,
         meta=PaginationMeta(
             total_items=total_items,
             total_pages=total_pages,
             page=page,
             limit=limit,
+            next_cursor=next_cursor,
         ),
         bounds=ProductPriceBounds(
             min_price=min_bound, max_price=max_bound, currency=currency
         ),
     )
+    if cache_key is not None:
+        await catalog_cache.set_listing(cache_key, response.model_dump(mode="json"))
+    return response
 
 
 @router.get("/products/price-bounds", response_model=ProductPriceBounds)
@@ -222,8 +330,6 @@ async def get_product_price_bounds(
     }
     include_unpublished = bool(include_unpublished and is_staff)
 
-    await catalog_service.auto_publish_due_sales(session)
-    await catalog_service.apply_due_product_schedules(session)
     min_price, max_price, currency = await catalog_service.get_product_price_bounds(
         session,
         category_slug=category_slug,
@@ -238,22 +344,88 @@ async def get_product_price_bounds(
     )
 
 
+_FEED_CACHE_CONTROL = "public, max-age=300"
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison (RFC 9110): the ``W/`` prefix is ignored."""
+    if header.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == wanted
+        for candidate in header.split(",")
+        if candidate.strip()
+    )
+
+
+def _not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return last_modified <= since
+
+
+def _accepts_gzip(request: Request) -> bool:
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() not in {"gzip", "*"}:
+            continue
+        quality = params.strip().removeprefix("q=").strip() or "1"
+        try:
+            return float(quality) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def _feed_response(
+    request: Request, feed: product_feed.FeedFile, *, filename: str | None = None
+) -> Response:
+    headers = {
+        "ETag": feed.etag,
+        "Last-Modified": format_datetime(feed.last_modified, usegmt=True),
+        "Cache-Control": _FEED_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, feed.etag, feed.last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    path = feed.path
+    if _accepts_gzip(request):
+        path = feed.gzip_path
+        headers["Content-Encoding"] = "gzip"
+    return FileResponse(path, media_type=feed.media_type, headers=headers)
+
+
 @router.get("/products/feed", response_model=list[ProductFeedItem])
-async def product_feed(
+async def product_feed_json(
+    request: Request,
     session: AsyncSession = Depends(get_session),
     lang: str | None = Query(default=None, pattern="^(en|ro)$"),
-) -> list[ProductFeedItem]:
-    return await catalog_service.get_product_feed(session, lang=lang)
+) -> Response:
+    feed = await product_feed.get_feed_file(session, lang=lang, fmt="json")
+    return _feed_response(request, feed)
 
 
-@router.get("/products/feed.csv", response_class=StreamingResponse)
+@router.get("/products/feed.csv", response_class=FileResponse)
 async def product_feed_csv(
+    request: Request,
     session: AsyncSession = Depends(get_session),
     lang: str | None = Query(default=None, pattern="^(en|ro)$"),
-):
-    content = await catalog_service.get_product_feed_csv(session, lang=lang)
-    headers = {"Content-Disposition": 'attachment; filename="product_feed.csv"'}
-    return StreamingResponse(iter([content]), media_type="text/csv", headers=headers)
+) -> Response:
+    feed = await product_feed.get_feed_file(session, lang=lang, fmt="csv")
+    return _feed_response(request, feed, filename="product_feed.csv")
 
 
 # Admin endpoints
@@ -407,6 +579,7 @@ async def delete_category(
         )
     await session.delete(category)
     await session.commit()
+    await catalog_cache.bump_generation()
     if source:
         await audit_chain_service.add_admin_audit_log(
             session,
@@ -447,10 +620,13 @@ async def export_categories_csv(
     admin: User = Depends(require_admin_section("products")),
 ):
     step_up_service.require_step_up(request, admin)
-    content = await catalog_service.export_categories_csv(session, template=template)
     filename = "categories_template.csv" if template else "categories.csv"
     headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
-    return StreamingResponse(iter([content]), media_type="text/csv", headers=headers)
+    return StreamingResponse(
+        catalog_service.iter_categories_csv(session, template=template),
+        media_type="text/csv",
+        headers=headers,
+    )
 
 
 @router.post("/categories/import", response_model=ImportResult)
@@ -519,6 +695,7 @@ async def upload_category_image(
     setattr(category, field, path)
     session.add(category)
     await session.commit()
+    await catalog_cache.bump_generation()
     await session.refresh(category)
     if source:
         await audit_chain_service.add_admin_audit_log(
@@ -665,9 +842,21 @@ async def merge_category(
         .values(category_id=target.id, updated_at=func.now())
     )
     moved_products = int(getattr(result, "rowcount", 0) or 0)
+    if moved_products:
+        # The bulk UPDATE skips the flush hooks; moved products may inherit
+        # the target category's low-stock threshold.
+        await stock_levels.refresh_products(
+            session,
+            (
+                await session.scalars(
+                    select(Product.id).where(Product.category_id == target.id)
+                )
+            ).all(),
+        )
 
     await session.delete(source)
     await session.commit()
+    await catalog_cache.bump_generation()
     result_model = CategoryMergeResult(
         source_slug=source.slug, target_slug=target.slug, moved_products=moved_products
     )
@@ -954,8 +1143,6 @@ async def list_featured_collections(
     session: AsyncSession = Depends(get_session),
     lang: str | None = Query(default=None, pattern="^(en|ro)$"),
 ) -> list[FeaturedCollectionRead]:
-    await catalog_service.auto_publish_due_sales(session)
-    await catalog_service.apply_due_product_schedules(session)
     collections = await catalog_service.list_featured_collections(session, lang=lang)
     payload: list[FeaturedCollectionRead] = []
     for collection in collections:
@@ -1046,14 +1233,14 @@ async def duplicate_product(
 async def recently_viewed_products(
     session: AsyncSession = Depends(get_session),
     session_id: str | None = Query(
-        default=None, description="Client session identifier for guests"
+        default=None,
+        max_length=120,
+        description="Client session identifier for guests",
     ),
     limit: int = Query(default=5, ge=1, le=20),
     lang: str | None = Query(default=None, pattern="^(en|ro)$"),
     current_user=Depends(get_current_user_optional),
 ) -> list[Product]:
-    await catalog_service.auto_publish_due_sales(session)
-    await catalog_service.apply_due_product_schedules(session)
     products = await catalog_service.get_recently_viewed(
         session,
         getattr(current_user, "id", None) if current_user else None,
@@ -1079,9 +1266,12 @@ async def export_products_csv(
     admin: User = Depends(require_admin_section("products")),
 ):
     step_up_service.require_step_up(request, admin)
-    content = await catalog_service.export_products_csv(session)
     headers = {"Content-Disposition": 'attachment; filename="products.csv"'}
-    return StreamingResponse(iter([content]), media_type="text/csv", headers=headers)
+    return StreamingResponse(
+        catalog_service.iter_products_csv(session),
+        media_type="text/csv",
+        headers=headers,
+    )
 
 
 @router.post("/products/import", response_model=ImportResult)
@@ -1114,13 +1304,12 @@ async def get_product(
     session: AsyncSession = Depends(get_session),
     session_id: str | None = Query(
         default=None,
+        max_length=120,
         description="Client session identifier for recently viewed tracking",
     ),
     lang: str | None = Query(default=None, pattern="^(en|ro)$"),
     current_user=Depends(get_current_user_optional),
 ) -> ProductRead:
-    await catalog_service.auto_publish_due_sales(session)
-    await catalog_service.apply_due_product_schedules(session)
     image_loader = selectinload(Product.images)
     if lang:
         image_loader = image_loader.selectinload(ProductImage.translations)
@@ -1587,8 +1776,6 @@ async def related_products(
     session: AsyncSession = Depends(get_session),
     current_user=Depends(get_current_user_optional),
 ) -> list[Product]:
-    await catalog_service.auto_publish_due_sales(session)
-    await catalog_service.apply_due_product_schedules(session)
     product = await catalog_service.get_product_by_slug(
         session,
         slug,
@@ -1636,8 +1823,6 @@ async def upsell_products(
     session: AsyncSession = Depends(get_session),
     current_user=Depends(get_current_user_optional),
 ) -> list[Product]:
-    await catalog_service.auto_publish_due_sales(session)
-    await catalog_service.apply_due_product_schedules(session)
     product = await catalog_service.get_product_by_slug(
         session,
         slug,
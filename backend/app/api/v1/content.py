@@ -107,6 +107,7 @@ from app.schemas.media import (
 )
 from app.services import step_up as step_up_service
 from app.schemas.social import SocialThumbnailRequest, SocialThumbnailResponse
+from app.services import blog_og
 from app.services import content as content_service
 from app.services import media_dam
 from app.services import sitemap as sitemap_service
@@ -907,10 +908,14 @@ async def admin_get_content(
 async def admin_update_content(
     key: str,
     payload: ContentBlockUpdate,
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_session),
     admin: User = Depends(require_admin_section("content")),
 ) -> ContentBlockRead:
     block = await content_service.upsert_block(session, key, payload, actor_id=admin.id)
+    pending_og = await blog_og.pending_post_images(session, block)
+    if pending_og:
+        background_tasks.add_task(blog_og.render_images, pending_og)
     return ContentBlockRead.model_validate(block)
 
 
@@ -941,6 +946,7 @@ async def admin_delete_content(
 async def admin_create_content(
     key: str,
     payload: ContentBlockCreate,
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_session),
     admin: User = Depends(require_admin_section("content")),
 ) -> ContentBlockRead:
@@ -951,6 +957,9 @@ async def admin_create_content(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Content key exists"
         )
     block = await content_service.upsert_block(session, key, payload, actor_id=admin.id)
+    pending_og = await blog_og.pending_post_images(session, block)
+    if pending_og:
+        background_tasks.add_task(blog_og.render_images, pending_og)
     return ContentBlockRead.model_validate(block)
 
 
@@ -1426,6 +1435,8 @@ async def admin_list_media_assets(
     page: int = Query(default=1, ge=1),
     limit: int = Query(default=24, ge=1, le=200),
     sort: str = Query(default="newest"),
+    cursor: str | None = Query(default=None, max_length=512),
+    include_total: bool = Query(default=True),
     session: AsyncSession = Depends(get_session),
     _: User = Depends(require_admin_section("content")),
 ) -> MediaAssetListResponse:
@@ -1460,6 +1471,8 @@ async def admin_list_media_assets(
                 page=page,
                 limit=limit,
                 sort=sort,
+                cursor=cursor,
+                include_total=include_total,
             ),
         )
     except ValueError as exc:
@@ -1762,7 +1775,7 @@ async def admin_media_asset_variants(
         session,
         asset_id=asset_id,
         job_type=MediaJobType.variant,
-        payload={"profile": payload.profile},
+        payload={"profile": payload.profile, "profiles": payload.profiles},
         created_by_user_id=admin.id,
     )
     await session.commit()
@@ -207,10 +207,13 @@ async def admin_shipping_simulate(
 @router.get("/admin/webhooks", response_model=list[WebhookEventRead])
 async def admin_list_webhooks(
     limit: int = 50,
+    dead_letter: bool = False,
     session: AsyncSession = Depends(get_session),
     _: User = Depends(require_admin_section("ops")),
 ) -> list[WebhookEventRead]:
-    return await ops_service.list_recent_webhooks(session, limit=limit)
+    return await ops_service.list_recent_webhooks(
+        session, limit=limit, dead_letter=dead_letter
+    )
 
 
 @router.get("/admin/webhooks/stats", response_model=FailureCount)
@@ -1,4 +1,3 @@
-import csv
 import io
 import mimetypes
 import secrets
@@ -7,7 +6,7 @@ from datetime import date, datetime, time, timedelta, timezone
 from decimal import Decimal, ROUND_HALF_UP
 from functools import partial
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any
 from urllib.parse import quote_plus
 from uuid import UUID
 
@@ -27,7 +26,7 @@ from fastapi import (
 )
 from fastapi.responses import StreamingResponse, FileResponse
 from sqlalchemy import func
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
@@ -46,7 +45,10 @@ from app.models.address import Address
 from app.models.cart import Cart
 from app.models.email_event import EmailDeliveryEvent
 from app.models.order import Order, OrderItem, OrderStatus, OrderEvent
-from app.models.order_document_export import OrderDocumentExportKind
+from app.models.order_document_export import (
+    OrderDocumentExportKind,
+    OrderDocumentExportStatus,
+)
 from app.models.user import User
 from app.schemas.cart import CartRead
 from app.schemas.cart import Totals
@@ -69,9 +71,10 @@ from app.services import checkout_settings as checkout_settings_service
 from app.services import auth as auth_service
 from app.services import private_storage
 from app.services import receipts as receipt_service
-from app.services import packing_slips as packing_slips_service
 from app.services import pick_lists as pick_lists_service
 from app.services import order_document_exports as order_exports_service
+from app.services import order_csv_export
+from app.services import document_render
 from app.schemas.checkout import (
     CheckoutRequest,
     GuestCheckoutRequest,
@@ -98,6 +101,7 @@ from app.services import address as address_service
 from app.api.v1 import cart as cart_api
 from app.models.legal import LegalConsentContext
 from app.schemas.order_admin import (
+    AdminCursorPaginationMeta,
     AdminOrderEmailEventRead,
     AdminOrderIdsRequest,
     AdminOrderListItem,
@@ -109,6 +113,7 @@ from app.schemas.order_admin import (
 from app.schemas.order_admin_address import AdminOrderAddressesUpdate
 from app.schemas.order_admin_note import OrderAdminNoteCreate
 from app.schemas.order_exports_admin import (
+    AdminOrderCsvExportJobResponse,
     AdminOrderDocumentExportListResponse,
     AdminOrderDocumentExportRead,
 )
@@ -1688,6 +1693,17 @@ async def admin_search_orders(
     to_dt: datetime | None = Query(default=None, alias="to"),
     page: int = Query(default=1, ge=1),
     limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = Query(
+        default=None,
+        max_length=512,
+        description=(
+            "Keyset pagination: pass an empty value for the first page, then "
+            "meta.next_cursor. Ignores page."
+        ),
+    ),
+    include_total: bool = Query(
+        default=False, description="Count matching orders in cursor mode."
+    ),
     include_pii: bool = Query(default=False),
     include_test: bool = Query(default=True),
     session: AsyncSession = Depends(get_session),
@@ -1755,8 +1771,7 @@ async def admin_search_orders(
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid fraud filter"
             )
-    rows, total_items = await order_service.admin_search_orders(
-        session,
+    search_filters = dict(
         q=q,
         user_id=user_id,
         status=parsed_status,
@@ -1767,10 +1782,26 @@ async def admin_search_orders(
         fraud=parsed_fraud,
         from_dt=from_dt,
         to_dt=to_dt,
-        page=page,
-        limit=limit,
         include_test=include_test,
     )
+    total_items: int | None
+    next_cursor: str | None = None
+    if cursor is not None:
+        (
+            rows,
+            total_items,
+            next_cursor,
+        ) = await order_service.admin_search_orders_after_cursor(
+            session,
+            **search_filters,
+            cursor=cursor or None,
+            limit=limit,
+            include_total=include_total,
+        )
+    else:
+        rows, total_items = await order_service.admin_search_orders(
+            session, **search_filters, page=page, limit=limit
+        )
     now = datetime.now(timezone.utc)
     accept_hours = max(1, int(getattr(settings, "order_sla_accept_hours", 24) or 24))
     ship_hours = max(1, int(getattr(settings, "order_sla_ship_hours", 48) or 48))
@@ -1824,10 +1855,26 @@ async def admin_search_orders(
                 fraud_severity=fraud_severity,
             )
         )
-    total_pages = max(1, (int(total_items) + limit - 1) // limit)
-    meta = AdminPaginationMeta(
-        total_items=int(total_items), total_pages=total_pages, page=page, limit=limit
-    )
+    meta: AdminPaginationMeta | AdminCursorPaginationMeta
+    if cursor is not None:
+        meta = AdminCursorPaginationMeta(
+            total_items=total_items,
+            total_pages=(
+                max(1, (total_items + limit - 1) // limit)
+                if total_items is not None
+                else None
+            ),
+            limit=limit,
+            next_cursor=next_cursor,
+        )
+    else:
+        total = int(total_items or 0)
+        meta = AdminPaginationMeta(
+            total_items=total,
+            total_pages=max(1, (total + limit - 1) // limit),
+            page=page,
+            limit=limit,
+        )
     return AdminOrderListResponse(items=items, meta=meta)
 
 
@@ -1866,101 +1913,90 @@ async def admin_rename_order_tag(
     return OrderTagRenameResponse(**result)
 
 
+def _order_export_filters(
+    from_date: date | None, to_date: date | None, statuses: list[OrderStatus] | None
+) -> order_csv_export.OrderExportFilters:
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    return order_csv_export.OrderExportFilters(
+        from_dt=(
+            datetime.combine(from_date, time.min, tzinfo=timezone.utc)
+            if from_date
+            else None
+        ),
+        to_dt=(
+            datetime.combine(to_date, time.max, tzinfo=timezone.utc)
+            if to_date
+            else None
+        ),
+        statuses=tuple(dict.fromkeys(statuses or ())),
+    )
+
+
 @router.get("/admin/export")
 async def admin_export_orders(
     request: Request,
     columns: list[str] | None = Query(default=None),
     include_pii: bool = Query(default=False),
+    from_date: date | None = Query(default=None, alias="from"),
+    to_date: date | None = Query(default=None, alias="to"),
+    status_filter: list[OrderStatus] | None = Query(default=None, alias="status"),
     session: AsyncSession = Depends(get_session),
     admin: User = Depends(require_admin_section("orders")),
 ):
     step_up_service.require_step_up(request, admin)
     if include_pii:
         pii_service.require_pii_reveal(admin, request=request)
-    orders = await order_service.list_orders(session)
-    allowed: dict[str, Callable[[Order], Any]] = {
-        "id": lambda o: str(o.id),
-        "reference_code": lambda o: o.reference_code or "",
-        "status": lambda o: getattr(o.status, "value", str(o.status)),
-        "total_amount": lambda o: str(o.total_amount),
-        "tax_amount": lambda o: str(o.tax_amount),
-        "fee_amount": lambda o: str(getattr(o, "fee_amount", 0) or 0),
-        "shipping_amount": lambda o: str(o.shipping_amount),
-        "currency": lambda o: o.currency or "",
-        "user_id": lambda o: str(o.user_id) if o.user_id else "",
-        "customer_email": lambda o: getattr(o, "customer_email", "") or "",
-        "customer_name": lambda o: getattr(o, "customer_name", "") or "",
-        "payment_method": lambda o: getattr(o, "payment_method", "") or "",
-        "promo_code": lambda o: getattr(o, "promo_code", "") or "",
-        "courier": lambda o: getattr(o, "courier", "") or "",
-        "delivery_type": lambda o: getattr(o, "delivery_type", "") or "",
-        "tracking_number": lambda o: getattr(o, "tracking_number", "") or "",
-        "tracking_url": lambda o: getattr(o, "tracking_url", "") or "",
-        "invoice_company": lambda o: getattr(o, "invoice_company", "") or "",
-        "invoice_vat_id": lambda o: getattr(o, "invoice_vat_id", "") or "",
-        "shipping_method": lambda o: (
-            getattr(getattr(o, "shipping_method", None), "name", "") or ""
-        ),
-        "locker_name": lambda o: getattr(o, "locker_name", "") or "",
-        "locker_address": lambda o: getattr(o, "locker_address", "") or "",
-        "created_at": lambda o: (
-            o.created_at.isoformat() if getattr(o, "created_at", None) else ""
-        ),
-        "updated_at": lambda o: (
-            o.updated_at.isoformat() if getattr(o, "updated_at", None) else ""
-        ),
-    }
-    if not include_pii:
-        allowed["customer_email"] = lambda o: (
-            pii_service.mask_email(getattr(o, "customer_email", "") or "") or ""
-        )
-        allowed["customer_name"] = lambda o: (
-            pii_service.mask_text(getattr(o, "customer_name", "") or "", keep=1) or ""
-        )
-        allowed["invoice_company"] = lambda o: (
-            pii_service.mask_text(getattr(o, "invoice_company", "") or "", keep=1) or ""
-        )
-        allowed["invoice_vat_id"] = lambda o: (
-            pii_service.mask_text(getattr(o, "invoice_vat_id", "") or "", keep=2) or ""
-        )
-        allowed["locker_address"] = lambda o: (
-            "***" if (getattr(o, "locker_address", "") or "").strip() else ""
-        )
-    default_columns = [
-        "id",
-        "reference_code",
-        "status",
-        "total_amount",
-        "currency",
-        "user_id",
-        "created_at",
-    ]
-    if not columns:
-        selected_columns = default_columns
-    else:
-        requested: list[str] = []
-        for raw in columns:
-            for part in str(raw).split(","):
-                cleaned = part.strip()
-                if cleaned:
-                    requested.append(cleaned)
-        invalid = [c for c in requested if c not in allowed]
-        if invalid:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid export columns: {', '.join(sorted(set(invalid)))}. Allowed: {', '.join(sorted(allowed.keys()))}",
-            )
-        selected_columns = requested
-
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(selected_columns)
-    for order in orders:
-        writer.writerow([allowed[col](order) for col in selected_columns])
-    buffer.seek(0)
+    selected_columns = order_csv_export.parse_columns(columns)
+    filters = _order_export_filters(from_date, to_date, status_filter)
     headers = {"Content-Disposition": "attachment; filename=orders.csv"}
     return StreamingResponse(
-        iter([buffer.getvalue()]), media_type="text/csv", headers=headers
+        order_csv_export.iter_csv(
+            session, selected_columns, filters, include_pii=include_pii
+        ),
+        media_type="text/csv",
+        headers=headers,
+    )
+
+
+@router.post(
+    "/admin/export/jobs",
+    response_model=AdminOrderCsvExportJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def admin_queue_order_export(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    columns: list[str] | None = Query(default=None),
+    include_pii: bool = Query(default=False),
+    from_date: date | None = Query(default=None, alias="from"),
+    to_date: date | None = Query(default=None, alias="to"),
+    status_filter: list[OrderStatus] | None = Query(default=None, alias="status"),
+    session: AsyncSession = Depends(get_session),
+    admin: User = Depends(require_admin_section("orders")),
+) -> AdminOrderCsvExportJobResponse:
+    step_up_service.require_step_up(request, admin)
+    if include_pii:
+        pii_service.require_pii_reveal(admin, request=request)
+    selected_columns = order_csv_export.parse_columns(columns)
+    filters = _order_export_filters(from_date, to_date, status_filter)
+    engine = session.bind
+    if not isinstance(engine, AsyncEngine):
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Database engine unavailable",
+        )
+    export = await order_csv_export.queue_export(session, created_by_user_id=admin.id)
+    background_tasks.add_task(
+        order_csv_export.run_export_job,
+        engine,
+        export_id=export.id,
+        columns=selected_columns,
+        filters=filters,
+        include_pii=include_pii,
+    )
+    return AdminOrderCsvExportJobResponse(
+        export_id=export.id, status=export.status.value
     )
 
 
@@ -1991,6 +2027,8 @@ async def admin_list_document_exports(
                 order_id=getattr(export, "order_id", None),
                 order_reference=ref,
                 order_count=order_count,
+                status=export.status.value,
+                error_message=export.error_message,
             )
         )
     total_pages = max(1, (int(total_items) + int(limit) - 1) // int(limit))
@@ -2023,6 +2061,13 @@ async def admin_download_document_export(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Export expired"
         )
+    if export.status != OrderDocumentExportStatus.succeeded:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Export failed"
+            if export.status == OrderDocumentExportStatus.failed
+            else "Export not ready",
+        )
     path = private_storage.resolve_private_path(export.file_path)
     if not path.exists():
         raise HTTPException(
@@ -3730,9 +3775,7 @@ async def admin_packing_slip(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Order not found"
         )
-    pdf = await anyio.to_thread.run_sync(
-        partial(packing_slips_service.render_packing_slip_pdf, order)
-    )
+    pdf = await document_render.render_packing_slip(order)
     ref = getattr(order, "reference_code", None) or str(order.id)
     await order_exports_service.create_pdf_export(
         session,
@@ -3785,9 +3828,7 @@ async def admin_batch_packing_slips(
 
     order_by_id = {o.id: o for o in orders}
     ordered = [order_by_id[order_id] for order_id in ids if order_id in order_by_id]
-    pdf = await anyio.to_thread.run_sync(
-        partial(packing_slips_service.render_batch_packing_slips_pdf, ordered)
-    )
+    pdf = await document_render.render_packing_slips(ordered)
     await order_exports_service.create_pdf_export(
         session,
         kind=OrderDocumentExportKind.packing_slips_batch,
@@ -3890,7 +3931,7 @@ async def admin_batch_pick_list_pdf(
     order_by_id = {o.id: o for o in orders}
     ordered = [order_by_id[order_id] for order_id in ids if order_id in order_by_id]
     rows = pick_lists_service.build_pick_list_rows(ordered)
-    pdf = pick_lists_service.render_pick_list_pdf(rows, orders=ordered)
+    pdf = await document_render.render_pick_list(rows, orders=ordered)
     headers = {
         "Content-Disposition": 'attachment; filename="pick-list.pdf"',
         "Cache-Control": "no-store",
@@ -4013,9 +4054,7 @@ async def admin_download_receipt_pdf(
         )
     ref = getattr(order, "reference_code", None) or str(order.id)
     filename = f"receipt-{ref}.pdf"
-    pdf = await anyio.to_thread.run_sync(
-        partial(receipt_service.render_order_receipt_pdf, order, order.items)
-    )
+    pdf = await document_render.render_receipt(order, order.items)
     await order_exports_service.create_pdf_export(
         session,
         kind=OrderDocumentExportKind.receipt,
@@ -4177,7 +4216,7 @@ async def download_receipt(
     ref = order.reference_code or str(order.id)
     filename = f"receipt-{ref}.pdf"
     headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
-    pdf = receipt_service.render_order_receipt_pdf(order, order.items)
+    pdf = await document_render.render_receipt(order, order.items)
     return StreamingResponse(
         io.BytesIO(pdf), media_type="application/pdf", headers=headers
     )
@@ -4267,13 +4306,8 @@ async def download_receipt_by_token(
     ref = order.reference_code or str(order.id)
     filename = f"receipt-{ref}.pdf"
     headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
-    pdf = await anyio.to_thread.run_sync(
-        partial(
-            receipt_service.render_order_receipt_pdf,
-            order,
-            order.items,
-            redacted=not allow_full,
-        )
+    pdf = await document_render.render_receipt(
+        order, order.items, redacted=not allow_full
     )
     return StreamingResponse(
         io.BytesIO(pdf), media_type="application/pdf", headers=headers
@@ -28,6 +28,7 @@ from app.models.order import Order, OrderItem, OrderStatus, OrderEvent
 from app.models.webhook import PayPalWebhookEvent, StripeWebhookEvent
 from app.services import payments
 from app.services import webhook_handlers
+from app.services import webhook_queue
 from app.services import netopia as netopia_service
 from app.services import paypal as paypal_service
 from app.services import auth as auth_service
@@ -162,6 +163,10 @@ async def stripe_webhook(
     session: AsyncSession = Depends(get_session),
 ) -> dict:
     payload = await request.body()
+    if webhook_queue.enabled():
+        queued = await payments.queue_webhook_event(session, payload, stripe_signature)
+        return {"received": True, "type": queued.get("type")}
+
     event, record = await payments.handle_webhook_event(
         session, payload, stripe_signature
     )
@@ -242,6 +247,16 @@ async def paypal_webhook(
         ),
     }
 
+    if webhook_queue.enabled():
+        await webhook_queue.ingest(
+            session,
+            provider="paypal",
+            event_id=event_id,
+            event_type=event_type,
+            payload=payload_summary,
+        )
+        return {"received": True, "type": event.get("event_type")}
+
     record = PayPalWebhookEvent(
         paypal_event_id=event_id,
         event_type=event_type,
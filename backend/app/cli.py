@@ -12,6 +12,8 @@ from sqlalchemy import func, select
 from app.db.session import SessionLocal
 from app.core import security
 from app import seeds as app_seeds
+from app.services import analytics_rollups
+from app.services import blog_og
 from app.models.user import (
     User,
     UserDisplayNameHistory,
@@ -738,6 +740,18 @@ async def import_data(input_path: Path) -> None:
     print("Import completed")
 
 
+async def rerender_blog_og(*, force: bool = True) -> None:
+    async with SessionLocal() as session:
+        rendered = await blog_og.rerender_all_posts(session, force=force)
+    print(f"Blog OG images rendered: {rendered}")
+
+
+async def backfill_analytics_rollups(*, since: date | None = None) -> None:
+    async with SessionLocal() as session:
+        folded = await analytics_rollups.backfill(session, since=since)
+    print(f"Analytics rollups backfilled: {folded} session events")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Data portability utilities")
     sub = parser.add_subparsers(dest="command")
@@ -766,6 +780,24 @@ def main():
         action="store_true",
         help="Mark the owner email as verified (useful when SMTP is disabled in local dev)",
     )
+    og = sub.add_parser(
+        "rerender-blog-og",
+        help="Re-render stored Open Graph images for all published blog posts",
+    )
+    og.add_argument(
+        "--missing-only",
+        action="store_true",
+        help="Only render images that are not stored yet",
+    )
+    rollups = sub.add_parser(
+        "backfill-analytics-rollups",
+        help="Fold existing analytics events into the dashboard rollups",
+    )
+    rollups.add_argument(
+        "--since",
+        type=date.fromisoformat,
+        help="First UTC day to fold in (YYYY-MM-DD; default: the first event)",
+    )
     seed_data = sub.add_parser("seed-data", help="Seed bootstrap catalog/content data")
     seed_data.add_argument(
         "--profile", default="default", help="Seed profile (e.g. default, adrianaart)"
@@ -797,6 +829,10 @@ def main():
                 verify_email=bool(args.verify_email),
             )
         )
+    elif args.command == "rerender-blog-og":
+        asyncio.run(rerender_blog_og(force=not args.missing_only))
+    elif args.command == "backfill-analytics-rollups":
+        asyncio.run(backfill_analytics_rollups(since=args.since))
     elif args.command == "seed-data":
 
         async def _seed_data() -> None:
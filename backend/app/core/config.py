@@ -69,6 +69,13 @@ class Settings(BaseSettings):
     paypal_client_id_live: str | None = None
     paypal_client_secret_live: str | None = None
     paypal_webhook_id_live: str | None = None
+    # Stripe/PayPal webhooks are stored and acknowledged, then processed by a leader-elected worker.
+    webhook_queue_enabled: bool = False
+    webhook_queue_batch_size: int = 50
+    webhook_queue_poll_seconds: float = 2.0
+    webhook_queue_max_attempts: int = 8
+    webhook_queue_retry_base_seconds: int = 30
+    webhook_queue_concurrency: int = 4
     netopia_enabled: bool = False
     # One of: sandbox | live
     netopia_env: str = "sandbox"
@@ -89,6 +96,10 @@ class Settings(BaseSettings):
     netopia_jwt_alg: str = "RS512"
     netopia_ipn_max_age_seconds: int = 60 * 60 * 24
     jwt_algorithm: str = "HS256"
+    # bcrypt cost for new hashes; stored hashes with another cost are rehashed on login.
+    password_bcrypt_rounds: int = 12
+    # Threads dedicated to password hashing (keeps bcrypt off the event loop).
+    password_hash_workers: int = 4
     access_token_exp_minutes: int = 30
     admin_impersonation_exp_minutes: int = 10
     refresh_token_exp_days: int = 7
@@ -110,6 +121,10 @@ class Settings(BaseSettings):
     gdpr_export_sla_days: int = 30
     gdpr_deletion_sla_days: int = 30
     order_export_retention_days: int = 30
+    # Processes rendering order PDFs (packing slips, pick lists, receipts); 0 renders in a thread.
+    document_render_workers: int = 2
+    # Cached receipt PDFs unused for this many days are removed; 0 keeps them.
+    receipt_cache_ttl_days: int = 30
     audit_retention_days_product: int = 0
     audit_retention_days_content: int = 0
     audit_retention_days_security: int = 0
@@ -133,6 +148,9 @@ class Settings(BaseSettings):
     enforce_decimal_prices: bool = True
     coupon_reservation_ttl_minutes: int = 60 * 24
     cart_reservation_window_minutes: int = 60 * 2
+    stock_levels_reconcile_enabled: bool = True
+    stock_levels_reconcile_interval_seconds: int = 60
+    stock_levels_full_reconcile_seconds: int = 60 * 60
     first_order_reward_coupon_validity_days: int = 30
 
     media_root: str = "uploads"
@@ -147,8 +165,22 @@ class Settings(BaseSettings):
     media_dam_processing_stale_seconds: int = 600
     media_dam_retry_max_attempts: int = 5
     media_dam_retry_sweep_seconds: int = 10
+    # Worker pool: concurrent job consumers per worker process (1 = sequential), a process
+    # pool for Pillow renders (0 = thread pool) and per-job-type caps within the consumers.
+    media_dam_worker_concurrency: int = 1
+    media_dam_worker_cpu_processes: int = 0
+    media_dam_worker_job_type_limits: dict[str, int] = {
+        "variant": 4,
+        "edit": 2,
+        "duplicate_scan": 1,
+        "usage_reconcile": 1,
+    }
+    media_dam_worker_drain_seconds: int = 60
+    # Encodings written for every variant profile; AVIF is skipped when Pillow lacks it.
+    media_dam_variant_formats: list[str] = ["jpeg", "webp", "avif"]
     media_usage_reconcile_enabled: bool = True
     media_usage_reconcile_interval_seconds: int = 60 * 60 * 24
+    # Rows per streamed batch / bulk write when reconciling usage edges library-wide.
     media_usage_reconcile_batch_size: int = 200
     # Admin uploads (product images, CMS assets, shipping labels) are allowed to be much larger
     # than customer uploads, but should still have a ceiling to avoid accidental disk exhaustion.
@@ -164,6 +196,12 @@ class Settings(BaseSettings):
 
     # Optional Redis (recommended for multi-replica deployments; used for shared rate limiting/caches)
     redis_url: str | None = None
+    # Storefront product listing cache (Redis when configured, otherwise per-process). 0 disables.
+    catalog_listing_cache_ttl_seconds: int = 60
+    # Materialized merchant feed: rebuilt on catalog writes and sale boundaries, and at least this often.
+    product_feed_max_age_seconds: int = 3600
+    # Per-process snapshot of checkout settings, tax rates and FX rates; edits invalidate it. 0 disables.
+    config_cache_ttl_seconds: int = 60
 
     smtp_host: str = "localhost"
     smtp_port: int = 1025
@@ -176,6 +214,16 @@ class Settings(BaseSettings):
     list_unsubscribe_mailto: str | None = None
     email_rate_limit_per_minute: int = 60
     email_rate_limit_per_recipient_per_minute: int = 10
+    # Idle authenticated SMTP connections kept for reuse, and how long/how much each is reused.
+    smtp_pool_size: int = 2
+    smtp_max_messages_per_connection: int = 100
+    smtp_idle_timeout_seconds: int = 60
+    # Outbound queue: send_email stores the message and a per-process worker delivers it.
+    email_queue_enabled: bool = False
+    email_queue_batch_size: int = 50
+    email_queue_poll_seconds: float = 2.0
+    email_queue_max_attempts: int = 6
+    email_queue_retry_base_seconds: int = 30
     auth_rate_limit_register: int = 10
     auth_rate_limit_login: int = 20
     auth_rate_limit_refresh: int = 60
@@ -231,6 +279,14 @@ class Settings(BaseSettings):
     analytics_rate_limit_events: int = 120
     analytics_require_token: bool = False
     analytics_token_ttl_seconds: int = 60 * 60 * 24
+    analytics_buffer_enabled: bool = True
+    analytics_buffer_max_events: int = 10_000
+    analytics_flush_batch_size: int = 200
+    analytics_flush_interval_seconds: float = 2.0
+    analytics_rollup_enabled: bool = True
+    analytics_rollup_interval_seconds: int = 300
+    analytics_rollup_settle_seconds: int = 120
+    analytics_rollup_resettle_days: int = 1
 
     # FX rates (used for display-only approximations; checkout remains in RON)
     fx_rates_url: str = "https://www.bnr.ro/nbrfxrates.xml"
@@ -242,6 +298,11 @@ class Settings(BaseSettings):
     admin_reports_scheduler_enabled: bool = True
     admin_reports_poll_interval_seconds: int = 60
 
+    # Admin dashboard daily sales rollups (written by a leader-only worker)
+    sales_rollup_enabled: bool = True
+    sales_rollup_interval_seconds: int = 300
+    sales_rollup_resettle_days: int = 3
+
     # Locker lookup (Sameday/FANbox)
     # In production you should configure official courier credentials.
     # For local development, Overpass (OpenStreetMap) can be used as a best-effort fallback.
@@ -274,6 +335,12 @@ class Settings(BaseSettings):
     order_pending_payment_expiry_minutes: int = 60 * 2
     order_pending_payment_expiry_poll_interval_seconds: int = 60 * 10
     order_pending_payment_expiry_batch_limit: int = 200
+    # Scheduled publish/unpublish and sale windows are applied by a leader-elected worker.
+    product_schedule_scheduler_enabled: bool = True
+    product_schedule_refresh_seconds: int = 60 * 5
+    # Recently viewed products are buffered (Redis or in-process) and saved in batches.
+    recently_viewed_flush_seconds: float = 5.0
+    recently_viewed_ttl_seconds: int = 60 * 60 * 24 * 7
 
     @field_validator("db_pool_size", "db_max_overflow", mode="before")
     @classmethod
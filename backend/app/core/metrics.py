@@ -3,6 +3,9 @@ from threading import Lock
 from typing import Dict, Counter as CounterType
 
 _metrics: CounterType[str] = Counter()
+_gauges: Dict[str, int] = {}
+# key -> [count, total milliseconds, max milliseconds]
+_timings: Dict[str, list[float]] = {}
 _lock = Lock()
 
 
@@ -31,11 +34,40 @@ def record_payment_failure() -> None:
     _inc("payment_failures")
 
 
+def record_analytics_events(outcome: str, count: int = 1) -> None:
+    """Count analytics events by ingestion outcome (accepted/dropped/flushed)."""
+    if count <= 0:
+        return
+    with _lock:
+        _metrics[f"analytics_events_{outcome}"] += int(count)
+
+
+def set_gauge(key: str, value: int) -> None:
+    with _lock:
+        _gauges[key] = int(value)
+
+
+def record_timing(key: str, seconds: float) -> None:
+    ms = max(0.0, float(seconds)) * 1000.0
+    with _lock:
+        timing = _timings.setdefault(key, [0, 0.0, 0.0])
+        timing[0] += 1
+        timing[1] += ms
+        timing[2] = max(timing[2], ms)
+
+
 def snapshot() -> Dict[str, int]:
     with _lock:
-        return dict(_metrics)
+        timings: Dict[str, int] = {}
+        for key, (count, total_ms, max_ms) in _timings.items():
+            timings[f"{key}_count"] = int(count)
+            timings[f"{key}_ms_total"] = int(round(total_ms))
+            timings[f"{key}_ms_max"] = int(round(max_ms))
+        return {**_metrics, **_gauges, **timings}
 
 
 def reset() -> None:
     with _lock:
         _metrics.clear()
+        _gauges.clear()
+        _timings.clear()
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import inspect
 import json
 import logging
-from typing import Any, TYPE_CHECKING
+from collections.abc import Awaitable
+from typing import Any, TYPE_CHECKING, TypeVar, cast
 
 from app.core.config import settings
 
@@ -11,6 +13,8 @@ logger = logging.getLogger(__name__)
 if TYPE_CHECKING:
     from redis.asyncio import Redis as RedisClient
 
+T = TypeVar("T")
+
 _client: "RedisClient | None" = None
 
 
@@ -36,6 +40,31 @@ def get_redis() -> "RedisClient | None":
     return _client
 
 
+def create_redis_client() -> "RedisClient | None":
+    """A new client with its own connection pool, for blocking commands.
+
+    A blocking call (BLPOP) that is cancelled mid-flight leaves its reply unread
+    on the connection; run such calls here and close this client afterwards
+    instead of returning the connection to the shared pool.
+    """
+    url = (getattr(settings, "redis_url", None) or "").strip()
+    if not url:
+        return None
+    redis_class = _resolve_redis_class()
+    if redis_class is None:
+        return None
+    return redis_class.from_url(
+        url, encoding="utf-8", decode_responses=True, max_connections=1
+    )
+
+
+async def await_redis(result: Awaitable[T] | T) -> T:
+    """Await a command result; redis-py types list commands as sync-or-async."""
+    if inspect.isawaitable(result):
+        return await cast(Awaitable[T], result)
+    return cast(T, result)
+
+
 async def close_redis() -> None:
     global _client
     client = _client
@@ -1,15 +1,34 @@
+import asyncio
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Optional
+from typing import Any, Optional, TypeVar
 
 import bcrypt
 import jwt
 from jwt.exceptions import PyJWTError
 
+from app.core import metrics
 from app.core.config import settings
 
+T = TypeVar("T")
+
+# bcrypt releases the GIL, so a small dedicated thread pool keeps hashing off the
+# event loop without competing with the default executor used for file/DB work.
+_hash_executor: ThreadPoolExecutor | None = None
+_hash_lock = threading.Lock()
+_hash_pending = 0
+_hash_pending_peak = 0
+
+
+def _bcrypt_rounds() -> int:
+    return min(16, max(4, int(getattr(settings, "password_bcrypt_rounds", 12) or 12)))
+
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    salt = bcrypt.gensalt(rounds=_bcrypt_rounds())
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
 
 
 def verify_password(password: str, hashed_password: str) -> bool:
@@ -19,6 +38,62 @@ def verify_password(password: str, hashed_password: str) -> bool:
         return False
 
 
+def password_needs_rehash(hashed_password: str | None) -> bool:
+    """True when a bcrypt hash was made with a cost other than the configured one."""
+    parts = str(hashed_password or "").split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return False
+    return int(parts[2]) != _bcrypt_rounds()
+
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    with _hash_lock:
+        if _hash_executor is None:
+            workers = max(1, int(getattr(settings, "password_hash_workers", 4) or 4))
+            _hash_executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="password-hash"
+            )
+        return _hash_executor
+
+
+def _track_pending(delta: int) -> None:
+    global _hash_pending, _hash_pending_peak
+    with _hash_lock:
+        _hash_pending += delta
+        _hash_pending_peak = max(_hash_pending_peak, _hash_pending)
+        workers = _hash_executor._max_workers if _hash_executor is not None else 1
+        pending, peak = _hash_pending, _hash_pending_peak
+    metrics.set_gauge("password_hash_in_flight", min(pending, workers))
+    metrics.set_gauge("password_hash_queue_depth", max(0, pending - workers))
+    metrics.set_gauge("password_hash_pending_peak", peak)
+
+
+async def _run_hash_work(func: Callable[..., T], *args: Any) -> T:
+    executor = _get_hash_executor()
+    _track_pending(1)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    finally:
+        _track_pending(-1)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hash_work(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    return await _run_hash_work(verify_password, password, hashed_password)
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_executor
+    with _hash_lock:
+        executor, _hash_executor = _hash_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
 def _create_token(
     subject: str, token_type: str, expires_delta: timedelta, jti: str | None = None
 ) -> str:
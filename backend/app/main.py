@@ -22,6 +22,16 @@ from app.middleware import (
     SecurityHeadersMiddleware,
 )
 from app.schemas.error import ErrorResponse
+from app.services import document_render
+from app.services import email_outbox
+from app.services import webhook_queue
+from app.services import product_schedules
+from app.services import recently_viewed
+from app.services import analytics_ingest
+from app.services import analytics_rollups
+from app.services import sales_rollups
+from app.services import stock_levels
+from app.services import email_templates
 from app.services import fx_refresh
 from app.services import admin_report_scheduler
 from app.services import account_deletion_scheduler
@@ -30,7 +40,7 @@ from app.services import order_expiration_scheduler
 from app.services import sameday_easybox_sync_scheduler
 from app.services.theme_service import seed_default_theme_on_startup
 from app.core.startup_checks import validate_production_settings
-from app.core import redis_client
+from app.core import redis_client, security
 
 
 def get_application() -> FastAPI:
@@ -52,17 +62,36 @@ def get_application() -> FastAPI:
         admin_report_scheduler.start(app)
         account_deletion_scheduler.start(app)
         order_expiration_scheduler.start(app)
+        product_schedules.start(app)
         media_usage_reconcile_scheduler.start(app)
         sameday_easybox_sync_scheduler.start(app)
+        email_outbox.start(app)
+        webhook_queue.start(app)
+        recently_viewed.start(app)
+        analytics_ingest.start(app)
+        analytics_rollups.start(app)
+        sales_rollups.start(app)
+        stock_levels.start(app)
+        email_templates.preload()
         await seed_default_theme_on_startup()
         yield
         await fx_refresh.stop(app)
         await admin_report_scheduler.stop(app)
         await account_deletion_scheduler.stop(app)
         await order_expiration_scheduler.stop(app)
+        await product_schedules.stop(app)
         await media_usage_reconcile_scheduler.stop(app)
         await sameday_easybox_sync_scheduler.stop(app)
+        await email_outbox.stop(app)
+        await webhook_queue.stop(app)
+        await recently_viewed.stop(app)
+        await analytics_ingest.stop(app)
+        await analytics_rollups.stop(app)
+        await sales_rollups.stop(app)
+        await stock_levels.stop(app)
         await redis_client.close_redis()
+        security.shutdown_hash_pool()
+        document_render.shutdown_pool()
 
     app = FastAPI(
         title=settings.app_name,
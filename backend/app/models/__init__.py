@@ -12,6 +12,7 @@ from app.models.passkeys import UserPasskey  # noqa: F401
 from app.models.audit import AuditChainState  # noqa: F401
 from app.models.catalog import (
     Category,
+    CategoryClosure,
     Product,
     ProductImage,
     ProductVariant,
@@ -57,8 +58,14 @@ from app.models.order import (  # noqa: F401
 from app.models.order_document_export import (
     OrderDocumentExport,
     OrderDocumentExportKind,
+    OrderDocumentExportStatus,
 )  # noqa: F401
 from app.models.analytics_event import AnalyticsEvent  # noqa: F401
+from app.models.analytics_rollup import (  # noqa: F401
+    AnalyticsDailySessions,
+    AnalyticsOrderAttribution,
+    AnalyticsRollupState,
+)
 from app.models.content import (  # noqa: F401
     ContentBlock,
     ContentBlockVersion,
@@ -108,6 +115,7 @@ from app.models.taxes import TaxGroup, TaxRate  # noqa: F401
 from app.models.notification import UserNotification  # noqa: F401
 from app.models.email_failure import EmailDeliveryFailure  # noqa: F401
 from app.models.email_event import EmailDeliveryEvent  # noqa: F401
+from app.models.email_outbox import EmailOutboxMessage  # noqa: F401
 from app.models.legal import LegalConsent, LegalConsentContext  # noqa: F401
 from app.models.newsletter import NewsletterSubscriber  # noqa: F401
 from app.models.user_export import UserDataExportJob, UserDataExportStatus  # noqa: F401
@@ -126,7 +134,10 @@ from app.models.ops import MaintenanceBanner  # noqa: F401
 from app.models.admin_dashboard_settings import (
     AdminDashboardAlertThresholds,
 )  # noqa: F401
+from app.models.sales_rollup import SalesDailyRollup  # noqa: F401
+from app.models.stock_level import StockLevel  # noqa: F401
 from app.models.shipping_locker import (  # noqa: F401
+    ShippingLockerCity,
     ShippingLockerMirror,
     ShippingLockerProvider,
     ShippingLockerSyncRun,
@@ -145,6 +156,7 @@ __all__ = [
     "UserPasskey",
     "AuditChainState",
     "Category",
+    "CategoryClosure",
     "Product",
     "ProductImage",
     "ProductVariant",
@@ -184,6 +196,7 @@ __all__ = [
     "OrderTag",
     "OrderDocumentExport",
     "OrderDocumentExportKind",
+    "OrderDocumentExportStatus",
     "AnalyticsEvent",
     "ContentBlock",
     "ContentBlockVersion",
@@ -242,6 +255,9 @@ __all__ = [
     "ReturnRequestStatus",
     "MaintenanceBanner",
     "AdminDashboardAlertThresholds",
+    "SalesDailyRollup",
+    "StockLevel",
+    "ShippingLockerCity",
     "ShippingLockerMirror",
     "ShippingLockerProvider",
     "ShippingLockerSyncRun",
@@ -9,6 +9,7 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     JSON,
     Numeric,
@@ -17,6 +18,7 @@ from sqlalchemy import (
     Text,
     UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -81,6 +83,29 @@ class Category(Base):
     )
 
 
+class CategoryClosure(Base):
+    """Materialized (ancestor, descendant, depth) pairs of the category tree.
+
+    Every category has a depth-0 row pointing at itself. Rows are rebuilt by
+    ``app.services.category_tree`` whenever the hierarchy changes.
+    """
+
+    __tablename__ = "category_closure"
+
+    ancestor_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("categories.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    descendant_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("categories.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+    depth: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
 class ProductStatus(str, enum.Enum):
     draft = "draft"
     published = "published"
@@ -131,6 +156,17 @@ featured_collection_products = Table(
 
 class Product(Base):
     __tablename__ = "products"
+    # Keyset pagination orderings (see app.services.catalog._product_keyset).
+    __table_args__ = (
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index(
+            "ix_products_sort_order_created_at_id",
+            "sort_order",
+            text("created_at DESC"),
+            text("id DESC"),
+        ),
+        Index("ix_products_name_id", "name", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -151,6 +187,13 @@ class Product(Base):
     name: Mapped[str] = mapped_column(String(160), nullable=False)
     short_description: Mapped[str | None] = mapped_column(String(280), nullable=True)
     long_description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Maintained by app.services.product_search; GIN-indexed on PostgreSQL.
+    search_name: Mapped[str] = mapped_column(
+        String(160), nullable=False, default="", server_default=""
+    )
+    search_document: Mapped[str] = mapped_column(
+        Text, nullable=False, default="", server_default=""
+    )
     base_price: Mapped[Decimal] = mapped_column(
         Numeric(10, 2), nullable=False, default=0
     )
@@ -158,10 +201,10 @@ class Product(Base):
     sale_value: Mapped[Decimal | None] = mapped_column(Numeric(10, 2), nullable=True)
     sale_price: Mapped[Decimal | None] = mapped_column(Numeric(10, 2), nullable=True)
     sale_start_at: Mapped[datetime | None] = mapped_column(
-        DateTime(timezone=True), nullable=True
+        DateTime(timezone=True), nullable=True, index=True
     )
     sale_end_at: Mapped[datetime | None] = mapped_column(
-        DateTime(timezone=True), nullable=True
+        DateTime(timezone=True), nullable=True, index=True
     )
     sale_auto_publish: Mapped[bool] = mapped_column(
         Boolean, nullable=False, default=False, server_default="false"
@@ -429,6 +472,9 @@ class ProductTranslation(Base):
     long_description: Mapped[str | None] = mapped_column(Text, nullable=True)
     meta_title: Mapped[str | None] = mapped_column(String(180), nullable=True)
     meta_description: Mapped[str | None] = mapped_column(String(300), nullable=True)
+    search_document: Mapped[str] = mapped_column(
+        Text, nullable=False, default="", server_default=""
+    )
 
     product: Mapped[Product] = relationship("Product", back_populates="translations")
 
@@ -712,6 +758,25 @@ class ProductSlugHistory(Base):
 
 class RecentlyViewedProduct(Base):
     __tablename__ = "recently_viewed_products"
+    __table_args__ = (
+        # Conflict targets for the batched upserts in services.recently_viewed.
+        Index(
+            "uq_recently_viewed_user_product",
+            "user_id",
+            "product_id",
+            unique=True,
+            postgresql_where=text("user_id IS NOT NULL"),
+            sqlite_where=text("user_id IS NOT NULL"),
+        ),
+        Index(
+            "uq_recently_viewed_session_product",
+            "session_id",
+            "product_id",
+            unique=True,
+            postgresql_where=text("session_id IS NOT NULL"),
+            sqlite_where=text("session_id IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
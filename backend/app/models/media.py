@@ -10,6 +10,7 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -60,6 +61,7 @@ class MediaJobStatus(str, enum.Enum):
 
 class MediaAsset(Base):
     __tablename__ = "media_assets"
+    __table_args__ = (Index("ix_media_assets_created_at_id", "created_at", "id"),)
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -245,7 +247,12 @@ class MediaAssetTag(Base):
 class MediaVariant(Base):
     __tablename__ = "media_variants"
     __table_args__ = (
-        UniqueConstraint("asset_id", "profile", name="uq_media_variant_asset_profile"),
+        UniqueConstraint(
+            "asset_id",
+            "profile",
+            "format",
+            name="uq_media_variant_asset_profile_format",
+        ),
     )
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -18,6 +18,14 @@ class OrderDocumentExportKind(str, enum.Enum):
     packing_slips_batch = "packing_slips_batch"
     shipping_label = "shipping_label"
     receipt = "receipt"
+    orders_csv = "orders_csv"
+
+
+class OrderDocumentExportStatus(str, enum.Enum):
+    pending = "pending"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
 
 
 class OrderDocumentExport(Base):
@@ -43,6 +51,13 @@ class OrderDocumentExport(Base):
         nullable=True,
         index=True,
     )
+    status: Mapped[OrderDocumentExportStatus] = mapped_column(
+        Enum(OrderDocumentExportStatus, native_enum=False),
+        nullable=False,
+        default=OrderDocumentExportStatus.succeeded,
+        server_default=OrderDocumentExportStatus.succeeded.value,
+    )
+    error_message: Mapped[str | None] = mapped_column(String(1000), nullable=True)
     order_ids: Mapped[list[str] | None] = mapped_column(JSON, nullable=True)
     file_path: Mapped[str] = mapped_column(String(500), nullable=False)
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
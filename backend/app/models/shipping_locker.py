@@ -9,6 +9,7 @@ from sqlalchemy import (
     DateTime,
     Enum,
     Float,
+    Index,
     Integer,
     String,
     Text,
@@ -76,6 +77,44 @@ class ShippingLockerMirror(Base):
     )
 
 
+class ShippingLockerCity(Base):
+    """Per-city locker aggregate, rebuilt after each mirror sync (typeahead source)."""
+
+    __tablename__ = "shipping_locker_cities"
+    __table_args__ = (
+        UniqueConstraint(
+            "provider", "city_key", name="uq_shipping_locker_cities_provider_city"
+        ),
+        # Prefix (LIKE 'q%') lookups; text_pattern_ops keeps it usable under any collation.
+        Index(
+            "ix_shipping_locker_cities_city_key_prefix",
+            "city_key",
+            postgresql_ops={"city_key": "text_pattern_ops"},
+        ),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    provider: Mapped[ShippingLockerProvider] = mapped_column(
+        Enum(ShippingLockerProvider),
+        nullable=False,
+        default=ShippingLockerProvider.sameday,
+    )
+    city_key: Mapped[str] = mapped_column(String(120), nullable=False)
+    city: Mapped[str] = mapped_column(String(120), nullable=False)
+    county: Mapped[str | None] = mapped_column(String(120), nullable=True)
+    lat: Mapped[float] = mapped_column(Float, nullable=False)
+    lng: Mapped[float] = mapped_column(Float, nullable=False)
+    locker_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+
 class ShippingLockerSyncRun(Base):
     __tablename__ = "shipping_locker_sync_runs"
 
@@ -0,0 +1,45 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class StockLevel(Base):
+    """Availability counters for a product (``variant_id`` NULL) or a variant.
+
+    ``item_id`` is the variant id for variant rows and the product id
+    otherwise. Rows are kept current by ``app.services.stock_levels``.
+    """
+
+    __tablename__ = "stock_levels"
+
+    item_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    product_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("products.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    variant_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("product_variants.id", ondelete="CASCADE"),
+        nullable=True,
+    )
+    on_hand: Mapped[int] = mapped_column(Integer, nullable=False, default=0, index=True)
+    reserved_in_carts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    reserved_in_orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    available: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, index=True
+    )
+    # Product override, else the category's; NULL when neither is set.
+    threshold: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
@@ -32,6 +32,17 @@ class StripeWebhookEvent(Base):
     )
     last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
     payload: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Set while the event waits in the processing queue (webhook_queue).
+    next_attempt_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, index=True
+    )
+    dead_lettered_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    # Serializes queued events of the same order (webhook_queue.order_key).
+    order_key: Mapped[str | None] = mapped_column(
+        String(255), nullable=True, index=True
+    )
 
 
 class PayPalWebhookEvent(Base):
@@ -58,3 +69,14 @@ class PayPalWebhookEvent(Base):
     )
     last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
     payload: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Set while the event waits in the processing queue (webhook_queue).
+    next_attempt_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, index=True
+    )
+    dead_lettered_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    # Serializes queued events of the same order (webhook_queue.order_key).
+    order_key: Mapped[str | None] = mapped_column(
+        String(255), nullable=True, index=True
+    )
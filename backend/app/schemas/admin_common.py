@@ -6,3 +6,11 @@ class AdminPaginationMeta(BaseModel):
     total_pages: int
     page: int
     limit: int
+
+
+class AdminCursorPaginationMeta(BaseModel):
+    # Totals are only counted when the caller asks for them (include_total).
+    total_items: int | None = None
+    total_pages: int | None = None
+    limit: int
+    next_cursor: str | None = None
@@ -19,6 +19,16 @@ class AnalyticsEventIngestResponse(BaseModel):
     received: bool = True
 
 
+class AnalyticsEventBatchCreate(BaseModel):
+    events: list[AnalyticsEventCreate] = Field(min_length=1, max_length=50)
+
+
+class AnalyticsEventBatchIngestResponse(BaseModel):
+    received: bool = True
+    accepted: int = 0
+    dropped: int = 0
+
+
 class AnalyticsTokenRequest(BaseModel):
     session_id: str = Field(min_length=1, max_length=100)
 
@@ -337,6 +337,7 @@ class PaginationMeta(BaseModel):
     total_pages: int
     page: int
     limit: int
+    next_cursor: str | None = None
 
 
 class ProductCreate(ProductFields):
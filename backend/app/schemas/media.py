@@ -23,6 +23,8 @@ MediaRetryPolicyJobTypeLiteral = MediaJobTypeLiteral
 MediaRetryPolicyPresetKeyLiteral = Literal[
     "factory_default", "last_change", "known_good"
 ]
+# Keys of media_dam.PROFILE_DIMENSIONS.
+MediaVariantProfileLiteral = Literal["thumb-320", "web-640", "web-1280", "social-1200"]
 
 
 class MediaAssetI18nRead(BaseModel):
@@ -84,7 +86,7 @@ class MediaAssetRead(BaseModel):
 
 class MediaAssetListResponse(BaseModel):
     items: list[MediaAssetRead]
-    meta: dict[str, int]
+    meta: dict[str, int | str | None]
 
 
 class MediaAssetUpdateI18nItem(BaseModel):
@@ -125,6 +127,10 @@ class MediaRejectRequest(BaseModel):
 
 class MediaVariantRequest(BaseModel):
     profile: str = Field(default="web-1280", min_length=1, max_length=64)
+    # Several profiles are rendered from a single decode; overrides ``profile``.
+    profiles: list[MediaVariantProfileLiteral] = Field(
+        default_factory=list, max_length=16
+    )
 
 
 class MediaEditRequest(BaseModel):
@@ -98,7 +98,7 @@ class ShippingSimulationResult(BaseModel):
 
 
 WebhookProvider = Literal["stripe", "paypal"]
-WebhookStatus = Literal["received", "processed", "failed"]
+WebhookStatus = Literal["received", "processed", "failed", "dead_letter"]
 EmailEventStatus = Literal["sent", "failed"]
 
 
@@ -111,6 +111,8 @@ class WebhookEventRead(BaseModel):
     last_attempt_at: datetime
     processed_at: datetime | None = None
     last_error: str | None = None
+    next_attempt_at: datetime | None = None
+    dead_lettered_at: datetime | None = None
     status: WebhookStatus
 
 
@@ -7,7 +7,7 @@ from uuid import UUID
 from pydantic import BaseModel, ConfigDict, Field
 
 from app.models.order import OrderStatus
-from app.schemas.admin_common import AdminPaginationMeta
+from app.schemas.admin_common import AdminCursorPaginationMeta, AdminPaginationMeta
 from app.schemas.address import AddressRead
 from app.schemas.order_fraud import AdminOrderFraudSignal
 from app.schemas.order import OrderRead
@@ -37,7 +37,7 @@ class AdminOrderListItem(BaseModel):
 
 class AdminOrderListResponse(BaseModel):
     items: list[AdminOrderListItem]
-    meta: AdminPaginationMeta
+    meta: AdminPaginationMeta | AdminCursorPaginationMeta
 
 
 class AdminOrderRead(OrderRead):
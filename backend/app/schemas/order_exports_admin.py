@@ -20,8 +20,15 @@ class AdminOrderDocumentExportRead(BaseModel):
     order_id: UUID | None = None
     order_reference: str | None = None
     order_count: int = 0
+    status: str = "succeeded"
+    error_message: str | None = None
 
 
 class AdminOrderDocumentExportListResponse(BaseModel):
     items: list[AdminOrderDocumentExportRead]
     meta: AdminPaginationMeta
+
+
+class AdminOrderCsvExportJobResponse(BaseModel):
+    export_id: UUID
+    status: str = "pending"
@@ -10,12 +10,13 @@ from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.models.catalog import Category, Product
+from app.models.catalog import Product
 from app.models.content import ContentBlock
 from app.models.order import Order, OrderItem, OrderRefund, OrderStatus, OrderTag
 from app.services import auth as auth_service
 from app.services import content as content_service
 from app.services import email as email_service
+from app.services import stock_levels
 
 logger = logging.getLogger(__name__)
 
@@ -461,23 +462,9 @@ async def _low_stock(
     *,
     limit: int,
 ) -> list[dict]:
-    threshold_expr = func.coalesce(
-        Product.low_stock_threshold,
-        Category.low_stock_threshold,
-        DEFAULT_LOW_STOCK_THRESHOLD,
+    rows = await stock_levels.low_stock_products(
+        session, default_threshold=DEFAULT_LOW_STOCK_THRESHOLD, limit=limit
     )
-    stmt = (
-        select(Product, threshold_expr.label("threshold"))
-        .join(Category, Product.category_id == Category.id)
-        .where(
-            Product.stock_quantity < threshold_expr,
-            Product.is_deleted.is_(False),
-            Product.is_active.is_(True),
-        )
-        .order_by(Product.stock_quantity.asc())
-        .limit(limit)
-    )
-    rows = (await session.execute(stmt)).all()
     items: list[dict] = []
     for product, threshold in rows:
         threshold_int = int(threshold or DEFAULT_LOW_STOCK_THRESHOLD)
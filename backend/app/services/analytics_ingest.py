@@ -0,0 +1,279 @@
+"""Buffered ingestion of storefront analytics events.
+
+Accepted events are appended to a buffer instead of being committed one
+request at a time: a Redis list when configured (shared by all instances),
+otherwise a per-process deque. A background task on every instance drains it
+with multi-row INSERTs, once ``analytics_flush_batch_size`` events are waiting
+or every ``analytics_flush_interval_seconds``. Telemetry therefore uses a
+database connection a few times per second at most, not once per page view.
+
+When the buffer holds ``analytics_buffer_max_events`` the extra events are
+dropped rather than slowing the request down. Client-supplied order ids are
+checked before buffering (``drop_unknown_orders``). A batch that still fails
+on a constraint is retried one event at a time and the failing events are
+dropped, so one bad event never holds back the buffer. Accepted, dropped and
+flushed events are counted in ``app.core.metrics``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from collections import deque
+from contextlib import suppress
+from datetime import datetime
+from typing import Any, Final
+
+from fastapi import FastAPI
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.redis_client import await_redis, get_redis, json_dumps, json_loads
+from app.db.session import SessionLocal
+from app.models.analytics_event import AnalyticsEvent
+from app.models.order import Order
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY: Final[str] = "analytics:events:buffer"
+_DRAIN_SECONDS: Final[float] = 10.0
+
+_local_buffer: deque[dict[str, Any]] = deque()
+_wakeup: asyncio.Event | None = None
+
+
+def _batch_size() -> int:
+    return max(1, int(getattr(settings, "analytics_flush_batch_size", 200) or 200))
+
+
+def _max_events() -> int:
+    return max(
+        1, int(getattr(settings, "analytics_buffer_max_events", 10_000) or 10_000)
+    )
+
+
+def enabled() -> bool:
+    """Buffer only while this process runs the flush task."""
+    return _wakeup is not None
+
+
+def _encode(row: dict[str, Any]) -> str:
+    return json_dumps(
+        {
+            **row,
+            "id": str(row["id"]),
+            "user_id": str(row["user_id"]) if row.get("user_id") else None,
+            "order_id": str(row["order_id"]) if row.get("order_id") else None,
+            "created_at": row["created_at"].isoformat(),
+        }
+    )
+
+
+def _decode(raw: str) -> dict[str, Any]:
+    data = json_loads(raw)
+    return {
+        **data,
+        "id": uuid.UUID(data["id"]),
+        "user_id": uuid.UUID(data["user_id"]) if data.get("user_id") else None,
+        "order_id": uuid.UUID(data["order_id"]) if data.get("order_id") else None,
+        "created_at": datetime.fromisoformat(data["created_at"]),
+    }
+
+
+async def drop_unknown_orders(
+    session: AsyncSession, rows: list[dict[str, Any]]
+) -> None:
+    """Clear order ids (taken from the client payload) that match no order."""
+    order_ids = {row["order_id"] for row in rows if row.get("order_id")}
+    if not order_ids:
+        return
+    known = set(
+        (await session.execute(select(Order.id).where(Order.id.in_(order_ids))))
+        .scalars()
+        .all()
+    )
+    for row in rows:
+        if row.get("order_id") and row["order_id"] not in known:
+            row["order_id"] = None
+
+
+async def insert_rows(session: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    """Write events with one multi-row INSERT and commit."""
+    if not rows:
+        return
+    await session.execute(insert(AnalyticsEvent).values(rows))
+    await session.commit()
+
+
+async def enqueue(rows: list[dict[str, Any]]) -> int:
+    """Buffer events for the next flush; returns how many were accepted."""
+    if not rows:
+        return 0
+    rows = [{"id": row.get("id") or uuid.uuid4(), **row} for row in rows]
+    capacity = _max_events()
+    accepted = 0
+    depth = 0
+    client = get_redis()
+    if client is not None:
+        try:
+            free = capacity - int(await await_redis(client.llen(BUFFER_KEY)))
+            accepted = max(0, min(len(rows), free))
+            if accepted:
+                depth = int(
+                    await await_redis(
+                        client.rpush(
+                            BUFFER_KEY, *(_encode(row) for row in rows[:accepted])
+                        )
+                    )
+                )
+        except Exception as exc:
+            logger.warning("analytics_buffer_push_failed", extra={"error": str(exc)})
+            client = None
+    if client is None:
+        accepted = max(0, min(len(rows), capacity - len(_local_buffer)))
+        _local_buffer.extend(rows[:accepted])
+        depth = len(_local_buffer)
+
+    dropped = len(rows) - accepted
+    metrics.record_analytics_events("accepted", accepted)
+    if dropped:
+        metrics.record_analytics_events("dropped", dropped)
+        logger.warning("analytics_buffer_full", extra={"dropped": dropped})
+    if depth >= _batch_size() and _wakeup is not None:
+        _wakeup.set()
+    return accepted
+
+
+async def _take(limit: int) -> tuple[list[dict[str, Any]], bool]:
+    client = get_redis()
+    if client is not None:
+        try:
+            raw = await await_redis(client.lpop(BUFFER_KEY, limit))
+            return [_decode(item) for item in raw or []], True
+        except Exception as exc:
+            logger.warning("analytics_buffer_pop_failed", extra={"error": str(exc)})
+    rows = [_local_buffer.popleft() for _ in range(min(limit, len(_local_buffer)))]
+    return rows, False
+
+
+async def _give_back(rows: list[dict[str, Any]], from_redis: bool) -> None:
+    if from_redis:
+        client = get_redis()
+        if client is not None:
+            with suppress(Exception):
+                await await_redis(
+                    client.lpush(BUFFER_KEY, *(_encode(row) for row in reversed(rows)))
+                )
+                return
+    room = max(0, _max_events() - len(_local_buffer))
+    _local_buffer.extendleft(reversed(rows[:room]))
+    if len(rows) > room:
+        metrics.record_analytics_events("dropped", len(rows) - room)
+
+
+async def _insert_each(rows: list[dict[str, Any]], from_redis: bool) -> int:
+    """Write events one at a time, dropping those the database rejects."""
+    written = 0
+    async with SessionLocal() as session:
+        for index, row in enumerate(rows):
+            try:
+                await insert_rows(session, [row])
+            except (DataError, IntegrityError) as exc:
+                await session.rollback()
+                metrics.record_analytics_events("dropped", 1)
+                logger.warning(
+                    "analytics_event_dropped",
+                    extra={"event": row.get("event"), "error": str(exc)},
+                )
+                continue
+            except Exception:
+                await session.rollback()
+                await _give_back(rows[index:], from_redis)
+                raise
+            written += 1
+    return written
+
+
+async def flush() -> int:
+    """Drain one batch into the database; returns how many events were written."""
+    rows, from_redis = await _take(_batch_size())
+    if not rows:
+        return 0
+    try:
+        async with SessionLocal() as session:
+            await insert_rows(session, rows)
+        written = len(rows)
+    except (DataError, IntegrityError):
+        # Retrying the batch as a whole would fail again on the same event.
+        written = await _insert_each(rows, from_redis)
+    except Exception:
+        await _give_back(rows, from_redis)
+        raise
+    metrics.record_analytics_events("flushed", written)
+    return written
+
+
+async def _loop(stop: asyncio.Event) -> None:
+    interval = max(
+        0.1, float(getattr(settings, "analytics_flush_interval_seconds", 2.0) or 2.0)
+    )
+    batch = _batch_size()
+    while not stop.is_set():
+        if _wakeup is not None:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(_wakeup.wait(), timeout=interval)
+            _wakeup.clear()
+        try:
+            while await flush() >= batch:
+                pass
+        except asyncio.CancelledError:
+            break
+        except Exception as exc:
+            logger.warning("analytics_flush_failed", extra={"error": str(exc)})
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+    # Write what this process still holds before shutting down.
+    with suppress(Exception):
+        while _local_buffer and await flush():
+            pass
+
+
+def start(app: FastAPI) -> None:
+    global _wakeup
+    if not bool(getattr(settings, "analytics_buffer_enabled", True)):
+        return
+    if getattr(app.state, "analytics_ingest_task", None) is not None:
+        return
+
+    _wakeup = asyncio.Event()
+    stop = asyncio.Event()
+    app.state.analytics_ingest_stop = stop
+    app.state.analytics_ingest_task = asyncio.create_task(_loop(stop))
+
+
+async def stop(app: FastAPI) -> None:
+    global _wakeup
+    stop_event = getattr(app.state, "analytics_ingest_stop", None)
+    task = getattr(app.state, "analytics_ingest_task", None)
+    if stop_event:
+        stop_event.set()
+    if _wakeup is not None:
+        _wakeup.set()
+    if task:
+        await asyncio.wait({task}, timeout=_DRAIN_SECONDS)
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    if getattr(app.state, "analytics_ingest_stop", None) is not None:
+        delattr(app.state, "analytics_ingest_stop")
+    if getattr(app.state, "analytics_ingest_task", None) is not None:
+        delattr(app.state, "analytics_ingest_task")
+    _wakeup = None
+
+
+def _reset_for_tests() -> None:
+    _local_buffer.clear()
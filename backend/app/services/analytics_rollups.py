@@ -0,0 +1,533 @@
+"""Incremental rollups behind the funnel and channel-attribution dashboards.
+
+The dashboards used to scan ``analytics_events`` for the whole requested range
+(``COUNT(DISTINCT session_id)`` per funnel step, every ``checkout_success``
+and ``session_start`` payload for attribution). A leader-elected job now folds
+new events into:
+
+* ``analytics_daily_sessions``: one HyperLogLog sketch per day and funnel
+  event. Sketches merge across days, so a 365-day funnel reads at most
+  365 * 4 small rows. Counts are estimates (about 1.6% standard error, exact
+  in practice for small counts).
+* ``analytics_order_attributions``: the channel of each tracked order, so
+  attribution is a grouped join against ``orders``. Order status and test
+  tags are still read live, because they change after checkout.
+
+``analytics_rollup_state`` records the event time range the rollups cover.
+Queries use the rollups for whole days inside that range and scan raw events
+only for the partial days at the edges. Each run stops
+``analytics_rollup_settle_seconds`` short of now and re-reads the last
+``analytics_rollup_resettle_days`` closed days, so buffered events that
+arrive late still reach their day's sketch; re-adding a session to a sketch
+is a no-op. Older data is folded in with
+``python -m app.cli backfill-analytics-rollups``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import math
+import uuid
+from collections.abc import Iterable, Sequence
+from contextlib import suppress
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Final
+
+from fastapi import FastAPI
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.analytics_event import AnalyticsEvent
+from app.models.analytics_rollup import (
+    AnalyticsDailySessions,
+    AnalyticsOrderAttribution,
+    AnalyticsRollupState,
+)
+from app.models.order import Order
+from app.services import leader_lock
+
+logger = logging.getLogger(__name__)
+
+FUNNEL_EVENTS: Final[tuple[str, ...]] = (
+    "session_start",
+    "view_cart",
+    "checkout_start",
+    "checkout_success",
+)
+_STATE_NAME: Final[str] = "analytics"
+_ID_CHUNK: Final[int] = 500
+
+# HyperLogLog with 2**12 one-byte registers (4 KiB per sketch).
+_P: Final[int] = 12
+_M: Final[int] = 1 << _P
+_ALPHA: Final[float] = 0.7213 / (1 + 1.079 / _M)
+
+Channel = tuple[str, str | None, str | None]
+
+
+def empty_sketch() -> bytearray:
+    return bytearray(_M)
+
+
+def sketch_add(registers: bytearray, value: str) -> None:
+    digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+    hashed = int.from_bytes(digest, "big")
+    index = hashed >> (64 - _P)
+    rest = hashed & ((1 << (64 - _P)) - 1)
+    rank = (64 - _P) - rest.bit_length() + 1
+    if rank > registers[index]:
+        registers[index] = rank
+
+
+def sketch_merge(registers: bytearray, other: bytes) -> None:
+    registers[:] = bytes(map(max, registers, other))
+
+
+def sketch_count(registers: bytes) -> int:
+    zeros = registers.count(0)
+    if zeros == _M:
+        return 0
+    raw = _ALPHA * _M * _M / sum(2.0**-rank for rank in registers)
+    if raw <= 2.5 * _M and zeros:
+        # Linear counting is far more accurate for small cardinalities.
+        return int(round(_M * math.log(_M / zeros)))
+    return int(round(raw))
+
+
+def _settle() -> timedelta:
+    return timedelta(
+        seconds=max(0, int(getattr(settings, "analytics_rollup_settle_seconds", 120)))
+    )
+
+
+def _resettle_days() -> int:
+    return max(1, int(getattr(settings, "analytics_rollup_resettle_days", 1) or 1))
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def _chunks(values: Sequence[Any]) -> Iterable[Sequence[Any]]:
+    for idx in range(0, len(values), _ID_CHUNK):
+        yield values[idx : idx + _ID_CHUNK]
+
+
+def channel_from_payload(payload: dict | None) -> Channel:
+    def _text(value: object) -> str:
+        return value.strip() if isinstance(value, str) else ""
+
+    src = _text((payload or {}).get("utm_source")).lower()
+    med = _text((payload or {}).get("utm_medium")).lower() or None
+    camp = _text((payload or {}).get("utm_campaign")) or None
+    if not src:
+        return ("direct", None, None)
+    return (src, med, camp)
+
+
+async def _coverage(session: AsyncSession) -> tuple[datetime, datetime] | None:
+    state = await session.get(AnalyticsRollupState, _STATE_NAME)
+    if state is None:
+        return None
+    return _aware(state.covered_from), _aware(state.covered_to)
+
+
+def _covered_days(
+    start: datetime, end: datetime, coverage: tuple[datetime, datetime] | None
+) -> tuple[date, date] | None:
+    """First and last whole day of [start, end) that the rollups cover."""
+    if coverage is None:
+        return None
+    lo = max(start, coverage[0])
+    hi = min(end, coverage[1])
+    first = lo.date() if lo == _day_start(lo.date()) else lo.date() + timedelta(days=1)
+    last = hi.date() - timedelta(days=1)
+    if first > last:
+        return None
+    return first, last
+
+
+# --- Folding events in -------------------------------------------------------
+
+
+async def _fold_sessions(
+    session: AsyncSession, day: date, since: datetime, until: datetime
+) -> int:
+    rows = await session.execute(
+        select(AnalyticsEvent.event, AnalyticsEvent.session_id)
+        .where(
+            AnalyticsEvent.created_at >= since,
+            AnalyticsEvent.created_at < until,
+            AnalyticsEvent.event.in_(FUNNEL_EVENTS),
+        )
+        .distinct()
+    )
+    by_event: dict[str, list[str]] = {}
+    for event, session_id in rows.all():
+        if session_id:
+            by_event.setdefault(str(event), []).append(str(session_id))
+    for event, session_ids in by_event.items():
+        row = await session.get(AnalyticsDailySessions, (day, event))
+        registers = bytearray(row.registers) if row is not None else empty_sketch()
+        for session_id in session_ids:
+            sketch_add(registers, session_id)
+        if row is None:
+            session.add(
+                AnalyticsDailySessions(day=day, event=event, registers=bytes(registers))
+            )
+        else:
+            row.registers = bytes(registers)
+    return sum(len(ids) for ids in by_event.values())
+
+
+async def _first_session_payloads(
+    session: AsyncSession, session_ids: Sequence[str]
+) -> dict[str, dict | None]:
+    payloads: dict[str, dict | None] = {}
+    for chunk in _chunks(session_ids):
+        rows = await session.execute(
+            select(
+                AnalyticsEvent.session_id,
+                AnalyticsEvent.payload,
+                AnalyticsEvent.created_at,
+            )
+            .where(
+                AnalyticsEvent.event == "session_start",
+                AnalyticsEvent.session_id.in_(chunk),
+            )
+            .order_by(AnalyticsEvent.created_at.asc())
+        )
+        for session_id, payload, _created_at in rows.all():
+            payloads.setdefault(
+                str(session_id), payload if isinstance(payload, dict) else None
+            )
+    return payloads
+
+
+def _checkout_success(since: datetime, until: datetime) -> list[Any]:
+    return [
+        AnalyticsEvent.event == "checkout_success",
+        AnalyticsEvent.created_at >= since,
+        AnalyticsEvent.created_at < until,
+        AnalyticsEvent.order_id.is_not(None),
+    ]
+
+
+async def _checkout_orders(
+    session: AsyncSession, since: datetime, until: datetime
+) -> dict[uuid.UUID, str]:
+    """Session of the first ``checkout_success`` event per order in [since, until)."""
+    rows = await session.execute(
+        select(AnalyticsEvent.session_id, AnalyticsEvent.order_id)
+        .where(*_checkout_success(since, until))
+        .order_by(AnalyticsEvent.created_at.asc())
+    )
+    orders: dict[uuid.UUID, str] = {}
+    for session_id, order_id in rows.all():
+        if order_id and session_id and order_id not in orders:
+            orders[order_id] = str(session_id)
+    return orders
+
+
+async def _fold_attribution(
+    session: AsyncSession, since: datetime, until: datetime
+) -> int:
+    rows = await session.execute(
+        select(
+            AnalyticsEvent.order_id,
+            AnalyticsEvent.session_id,
+            AnalyticsEvent.created_at,
+        )
+        .where(*_checkout_success(since, until))
+        .order_by(AnalyticsEvent.created_at.asc())
+    )
+    orders: dict[uuid.UUID, tuple[str, datetime]] = {}
+    for order_id, session_id, created_at in rows.all():
+        if order_id and session_id and order_id not in orders:
+            orders[order_id] = (str(session_id), _aware(created_at))
+    for chunk in _chunks(list(orders)):
+        known = await session.scalars(
+            select(AnalyticsOrderAttribution.order_id).where(
+                AnalyticsOrderAttribution.order_id.in_(chunk)
+            )
+        )
+        for order_id in known:
+            orders.pop(order_id, None)
+    if not orders:
+        return 0
+    payloads = await _first_session_payloads(
+        session, sorted({session_id for session_id, _ in orders.values()})
+    )
+    for order_id, (session_id, attributed_at) in orders.items():
+        src, med, camp = channel_from_payload(payloads.get(session_id))
+        session.add(
+            AnalyticsOrderAttribution(
+                order_id=order_id,
+                session_id=session_id,
+                source=src[:120],
+                medium=med[:120] if med else None,
+                campaign=camp[:200] if camp else None,
+                attributed_at=attributed_at,
+            )
+        )
+    return len(orders)
+
+
+async def roll_up(session: AsyncSession, *, since: datetime, until: datetime) -> int:
+    """Fold the events of [since, until) in, one committed day at a time."""
+    folded = 0
+    cursor = since
+    while cursor < until:
+        day_end = min(_day_start(cursor.date() + timedelta(days=1)), until)
+        folded += await _fold_sessions(session, cursor.date(), cursor, day_end)
+        await _fold_attribution(session, cursor, day_end)
+        await session.commit()
+        cursor = day_end
+    return folded
+
+
+async def _extend_coverage(
+    session: AsyncSession, *, covered_from: datetime, covered_to: datetime
+) -> None:
+    state = await session.get(AnalyticsRollupState, _STATE_NAME)
+    if state is None:
+        session.add(
+            AnalyticsRollupState(
+                name=_STATE_NAME, covered_from=covered_from, covered_to=covered_to
+            )
+        )
+    else:
+        state.covered_from = min(_aware(state.covered_from), covered_from)
+        state.covered_to = max(_aware(state.covered_to), covered_to)
+    await session.commit()
+
+
+async def run_once(session: AsyncSession, *, now: datetime | None = None) -> int:
+    """Fold in what arrived since the last run; returns folded session/event pairs."""
+    until = (now or datetime.now(timezone.utc)) - _settle()
+    coverage = await _coverage(session)
+    if coverage is None:
+        # Start at a day boundary so the first day's sketch is complete.
+        covered_from = since = _day_start(until.date())
+    else:
+        covered_from = coverage[0]
+        resettle_from = _day_start(until.date() - timedelta(days=_resettle_days()))
+        since = max(coverage[0], min(coverage[1] - _settle(), resettle_from))
+    if until <= since:
+        return 0
+    folded = await roll_up(session, since=since, until=until)
+    await _extend_coverage(session, covered_from=covered_from, covered_to=until)
+    return folded
+
+
+async def backfill(
+    session: AsyncSession, *, since: date | None = None, now: datetime | None = None
+) -> int:
+    """Fold every event from ``since`` (default: the first one) up to now."""
+    if since is None:
+        first = await session.scalar(select(func.min(AnalyticsEvent.created_at)))
+        if first is None:
+            return 0
+        since = _aware(first).date()
+    start = _day_start(since)
+    until = (now or datetime.now(timezone.utc)) - _settle()
+    if until <= start:
+        return 0
+    folded = await roll_up(session, since=start, until=until)
+    await _extend_coverage(session, covered_from=start, covered_to=until)
+    return folded
+
+
+# --- Dashboard queries -------------------------------------------------------
+
+
+async def _raw_distinct_sessions(
+    session: AsyncSession, start: datetime, end: datetime
+) -> dict[str, int]:
+    counts: dict[str, int] = {}
+    for event in FUNNEL_EVENTS:
+        value = await session.scalar(
+            select(func.count(func.distinct(AnalyticsEvent.session_id))).where(
+                AnalyticsEvent.created_at >= start,
+                AnalyticsEvent.created_at < end,
+                AnalyticsEvent.event == event,
+            )
+        )
+        counts[event] = int(value or 0)
+    return counts
+
+
+async def funnel_counts(
+    session: AsyncSession, *, start: datetime, end: datetime
+) -> dict[str, int]:
+    """Distinct sessions per funnel event in [start, end)."""
+    days = _covered_days(start, end, await _coverage(session))
+    if days is None:
+        return await _raw_distinct_sessions(session, start, end)
+
+    first, last = days
+    sketches = {event: empty_sketch() for event in FUNNEL_EVENTS}
+    rows = await session.execute(
+        select(AnalyticsDailySessions.event, AnalyticsDailySessions.registers).where(
+            AnalyticsDailySessions.day >= first,
+            AnalyticsDailySessions.day <= last,
+            AnalyticsDailySessions.event.in_(FUNNEL_EVENTS),
+        )
+    )
+    for event, registers in rows.all():
+        sketch_merge(sketches[str(event)], registers)
+
+    edges = ((start, _day_start(first)), (_day_start(last + timedelta(days=1)), end))
+    for lo, hi in edges:
+        if lo >= hi:
+            continue
+        raw = await session.execute(
+            select(AnalyticsEvent.event, AnalyticsEvent.session_id)
+            .where(
+                AnalyticsEvent.created_at >= lo,
+                AnalyticsEvent.created_at < hi,
+                AnalyticsEvent.event.in_(FUNNEL_EVENTS),
+            )
+            .distinct()
+        )
+        for event, session_id in raw.all():
+            if session_id:
+                sketch_add(sketches[str(event)], str(session_id))
+    return {event: sketch_count(registers) for event, registers in sketches.items()}
+
+
+async def attributed_sales(
+    session: AsyncSession,
+    *,
+    start: datetime,
+    end: datetime,
+    order_filters: Sequence[Any],
+) -> dict[Channel, tuple[int, float]]:
+    """Orders and gross sales per channel for orders checked out in [start, end).
+
+    ``order_filters`` restrict the ``orders`` rows that count (status, test
+    tags, creation window).
+    """
+    channels: dict[Channel, tuple[int, float]] = {}
+
+    def _add(key: Channel, orders: int, gross: float) -> None:
+        prev_orders, prev_gross = channels.get(key, (0, 0.0))
+        channels[key] = (prev_orders + orders, prev_gross + gross)
+
+    coverage = await _coverage(session)
+    edges = [(start, end)]
+    if coverage is not None and max(start, coverage[0]) < min(end, coverage[1]):
+        lo, hi = max(start, coverage[0]), min(end, coverage[1])
+        edges = [(start, lo), (hi, end)]
+        attr = AnalyticsOrderAttribution
+        rows = await session.execute(
+            select(
+                attr.source,
+                attr.medium,
+                attr.campaign,
+                func.count(),
+                func.coalesce(func.sum(Order.total_amount), 0),
+            )
+            .select_from(attr)
+            .join(Order, Order.id == attr.order_id)
+            .where(attr.attributed_at >= lo, attr.attributed_at < hi, *order_filters)
+            .group_by(attr.source, attr.medium, attr.campaign)
+        )
+        for src, med, camp, orders, gross in rows.all():
+            _add((str(src), med, camp), int(orders or 0), float(gross or 0))
+
+    for lo, hi in edges:
+        if lo >= hi:
+            continue
+        orders = await _checkout_orders(session, lo, hi)
+        if coverage is not None:
+            # Orders already attributed inside the window count only once.
+            for chunk in _chunks(list(orders)):
+                known = await session.scalars(
+                    select(AnalyticsOrderAttribution.order_id).where(
+                        AnalyticsOrderAttribution.order_id.in_(chunk),
+                        AnalyticsOrderAttribution.attributed_at >= start,
+                        AnalyticsOrderAttribution.attributed_at < end,
+                    )
+                )
+                for order_id in known:
+                    orders.pop(order_id, None)
+        if not orders:
+            continue
+        amounts: dict[uuid.UUID, float] = {}
+        for chunk in _chunks(list(orders)):
+            rows = await session.execute(
+                select(Order.id, Order.total_amount).where(
+                    Order.id.in_(chunk), *order_filters
+                )
+            )
+            amounts.update({row[0]: float(row[1] or 0) for row in rows.all()})
+        payloads = await _first_session_payloads(session, sorted(set(orders.values())))
+        for order_id, session_id in orders.items():
+            amount = amounts.get(order_id)
+            if amount is not None:
+                _add(channel_from_payload(payloads.get(session_id)), 1, amount)
+    return channels
+
+
+# --- Worker ------------------------------------------------------------------
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "analytics_rollup_enabled", True))
+
+
+async def _loop(stop: asyncio.Event) -> None:
+    interval = max(
+        30, int(getattr(settings, "analytics_rollup_interval_seconds", 300) or 300)
+    )
+    while not stop.is_set():
+        try:
+            async with SessionLocal() as session:
+                folded = await run_once(session)
+            if folded:
+                logger.info("analytics_rollup_folded", extra={"count": int(folded)})
+        except asyncio.CancelledError:
+            break
+        except Exception as exc:
+            logger.warning("analytics_rollup_failed", extra={"error": str(exc)})
+
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+
+
+def start(app: FastAPI) -> None:
+    if not enabled():
+        return
+    if getattr(app.state, "analytics_rollup_task", None) is not None:
+        return
+
+    stop = asyncio.Event()
+    task = asyncio.create_task(
+        leader_lock.run_as_leader(name="analytics_rollup", stop=stop, work=_loop)
+    )
+    app.state.analytics_rollup_stop = stop
+    app.state.analytics_rollup_task = task
+
+
+async def stop(app: FastAPI) -> None:
+    stop_event = getattr(app.state, "analytics_rollup_stop", None)
+    task = getattr(app.state, "analytics_rollup_task", None)
+    if stop_event:
+        stop_event.set()
+    if task:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    if getattr(app.state, "analytics_rollup_stop", None) is not None:
+        delattr(app.state, "analytics_rollup_stop")
+    if getattr(app.state, "analytics_rollup_task", None) is not None:
+        delattr(app.state, "analytics_rollup_task")
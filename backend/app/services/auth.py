@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime, timedelta, timezone, date
 import secrets
 import uuid
@@ -279,7 +280,7 @@ async def create_user(session: AsyncSession, user_in: UserCreate) -> User:
     db_user = User(
         email=normalized_email,
         username=username,
-        hashed_password=security.hash_password(user_in.password),
+        hashed_password=await security.hash_password_async(user_in.password),
         name=display_name,
         name_tag=name_tag,
         first_name=(user_in.first_name or "").strip() or None,
@@ -316,7 +317,9 @@ async def authenticate_user(
         user = await get_user_by_login_email(session, identifier)
     else:
         user = await get_user_by_username(session, identifier)
-    if not user or not security.verify_password(password, user.hashed_password):
+    if not user or not await security.verify_password_async(
+        password, user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
         )
@@ -347,6 +350,11 @@ async def authenticate_user(
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Password reset required"
         )
+    if security.password_needs_rehash(user.hashed_password):
+        # Transparent cost upgrade: only possible while the plaintext is at hand.
+        user.hashed_password = await security.hash_password_async(password)
+        session.add(user)
+        await session.commit()
     return user
 
 
@@ -423,7 +431,7 @@ async def complete_google_registration(
     if preferred_language:
         user.preferred_language = preferred_language
 
-    user.hashed_password = security.hash_password(password)
+    user.hashed_password = await security.hash_password_async(password)
     session.add(user)
     await session.commit()
     await session.refresh(user)
@@ -572,7 +580,7 @@ async def create_google_user(
     display_name = display_name[:255]
     name_tag = await _allocate_name_tag(session, display_name)
 
-    password_placeholder = security.hash_password(secrets.token_urlsafe(16))
+    password_placeholder = await security.hash_password_async(secrets.token_urlsafe(16))
     user = User(
         email=email,
         username=username,
@@ -975,7 +983,7 @@ async def confirm_reset_token(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
-    user.hashed_password = security.hash_password(new_password)
+    user.hashed_password = await security.hash_password_async(new_password)
     user.password_reset_required = False
     reset.used = True
     await _revoke_other_reset_tokens(session, user.id)
@@ -1117,16 +1125,21 @@ def _format_recovery_code(raw: str) -> str:
     return "-".join(clean[i : i + 4] for i in range(0, len(clean), 4))
 
 
-def _generate_recovery_codes(*, count: int) -> tuple[list[str], list[str]]:
+async def _generate_recovery_codes(*, count: int) -> tuple[list[str], list[str]]:
     count = max(1, int(count))
     codes: set[str] = set()
     while len(codes) < count:
         raw = "".join(secrets.choice(_RECOVERY_ALPHABET) for _ in range(12))
         codes.add(raw)
     formatted = [_format_recovery_code(code) for code in sorted(codes)]
-    hashed = [
-        security.hash_password(_normalize_recovery_code(code)) for code in formatted
-    ]
+    hashed = list(
+        await asyncio.gather(
+            *(
+                security.hash_password_async(_normalize_recovery_code(code))
+                for code in formatted
+            )
+        )
+    )
     return formatted, hashed
 
 
@@ -1174,7 +1187,7 @@ async def enable_two_factor(session: AsyncSession, user: User, code: str) -> lis
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid two-factor code"
         )
-    formatted, hashed = _generate_recovery_codes(
+    formatted, hashed = await _generate_recovery_codes(
         count=int(settings.two_factor_recovery_codes_count or 10)
     )
     user.two_factor_enabled = True
@@ -1201,7 +1214,7 @@ async def regenerate_recovery_codes(session: AsyncSession, user: User) -> list[s
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Two-factor is not enabled"
         )
-    formatted, hashed = _generate_recovery_codes(
+    formatted, hashed = await _generate_recovery_codes(
         count=int(settings.two_factor_recovery_codes_count or 10)
     )
     user.two_factor_recovery_codes = hashed
@@ -1221,7 +1234,7 @@ async def verify_two_factor_code(session: AsyncSession, user: User, code: str) -
         return False
     hashes = list(getattr(user, "two_factor_recovery_codes", None) or [])
     for idx, hashed in enumerate(hashes):
-        if security.verify_password(candidate, hashed):
+        if await security.verify_password_async(candidate, hashed):
             hashes.pop(idx)
             user.two_factor_recovery_codes = hashes or None
             session.add(user)
@@ -190,6 +190,24 @@ def _meta_summary(
     return None
 
 
+def og_text(block: ContentBlock, *, lang: str | None) -> tuple[str, str | None]:
+    """Title and summary shown on the post's Open Graph card."""
+    title = block.title
+    if lang:
+        match = next(
+            (t for t in getattr(block, "translations", None) or [] if t.lang == lang),
+            None,
+        )
+        if match:
+            title = match.title
+    summary = _meta_summary(
+        getattr(block, "meta", None) or {},
+        lang=lang,
+        base_lang=getattr(block, "lang", None),
+    )
+    return str(title or ""), summary
+
+
 def _normalize_blog_sort(raw: str | None) -> str:
     value = (raw or "").strip().lower()
     return value if value in _BLOG_SORT_VALUES else "newest"
@@ -0,0 +1,194 @@
+"""Persisted Open Graph images for blog posts.
+
+Rendering an OG card (Pillow text layout + PNG encoding) takes long enough that
+it must not run on the event loop, and crawlers that ignore ETags would
+otherwise trigger it on every hit. Images are rendered in a worker thread once
+per (slug, language, content version) and kept under private media storage;
+later requests are served straight from disk. Older versions of the same
+slug/language are removed when a new one is written.
+
+Images are rendered in the background after a post is saved as published and
+otherwise on the first request. ``rerender_all_posts`` (``python -m app.cli rerender-blog-og``)
+re-renders every published post after a theme or template change.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Final
+
+import anyio.to_thread
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.models.content import ContentBlock, ContentStatus
+from app.services import blog as blog_service
+from app.services import og_images, private_storage
+
+logger = logging.getLogger(__name__)
+
+OG_LANGS: Final[tuple[str | None, ...]] = (None, "en", "ro")
+_OG_SUBDIR: Final[str] = "og/blog"
+
+
+def og_etag(slug: str, version: int, lang: str | None) -> str:
+    return f'W/"blog-og-{slug}-v{version}-{lang or "base"}"'
+
+
+def _og_dir() -> Path:
+    path = private_storage.ensure_private_root() / _OG_SUBDIR
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _prefix(slug: str, lang: str | None) -> str:
+    return f"{slug}.{lang or 'base'}."
+
+
+def image_path(slug: str, version: int, lang: str | None) -> Path:
+    return _og_dir() / f"{_prefix(slug, lang)}v{int(version or 0)}.png"
+
+
+def _store(path: Path, data: bytes, prefix: str) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    for stale in path.parent.glob(f"{prefix}v*.png"):
+        if stale != path:
+            try:
+                stale.unlink()
+            except OSError:
+                continue
+
+
+@dataclass(frozen=True)
+class PendingImage:
+    path: Path
+    prefix: str
+    title: str
+    subtitle: str | None
+
+
+def _pending_image(block: ContentBlock, lang: str | None) -> PendingImage:
+    slug = block.key.removeprefix(blog_service.BLOG_KEY_PREFIX)
+    title, subtitle = blog_service.og_text(block, lang=lang)
+    return PendingImage(
+        path=image_path(slug, block.version, lang),
+        prefix=_prefix(slug, lang),
+        title=title,
+        subtitle=subtitle,
+    )
+
+
+async def _render(image: PendingImage) -> None:
+    png = await anyio.to_thread.run_sync(
+        partial(og_images.render_blog_post_og, title=image.title, subtitle=image.subtitle)
+    )
+    await anyio.to_thread.run_sync(_store, image.path, png, image.prefix)
+
+
+async def get_post_image(
+    block: ContentBlock, *, lang: str | None, force: bool = False
+) -> Path:
+    """Path of the stored OG image for ``block`` in ``lang``, rendering it if needed.
+
+    ``block`` must already carry the ``lang`` translation (``get_published_post``)
+    or have its translations loaded.
+    """
+    slug = block.key.removeprefix(blog_service.BLOG_KEY_PREFIX)
+    path = image_path(slug, block.version, lang)
+    if path.exists() and not force:
+        return path
+    await _render(_pending_image(block, lang))
+    return path
+
+
+def _published_posts_stmt():
+    now = datetime.now(timezone.utc)
+    return (
+        select(ContentBlock)
+        .options(selectinload(ContentBlock.translations))
+        .where(
+            ContentBlock.key.startswith(blog_service.BLOG_KEY_PREFIX),
+            ContentBlock.status == ContentStatus.published,
+            or_(ContentBlock.published_at.is_(None), ContentBlock.published_at <= now),
+            or_(
+                ContentBlock.published_until.is_(None),
+                ContentBlock.published_until > now,
+            ),
+        )
+    )
+
+
+async def pending_post_images(
+    session: AsyncSession, block: ContentBlock, *, force: bool = False
+) -> list[PendingImage]:
+    """Images a saved blog post still needs, if it is live; never raises.
+
+    Only reads the database, so the endpoints can hand the result to
+    ``render_images`` as a background task once the response is sent.
+    """
+    if not (block.key or "").startswith(blog_service.BLOG_KEY_PREFIX):
+        return []
+    if block.status != ContentStatus.published:
+        return []
+    try:
+        live = await session.scalar(
+            _published_posts_stmt().where(ContentBlock.id == block.id)
+        )
+        if live is None:
+            return []
+        await session.refresh(live, attribute_names=["translations"])
+        images = [_pending_image(live, lang) for lang in OG_LANGS]
+    except Exception as exc:
+        logger.warning(
+            "blog_og_prerender_failed", extra={"key": block.key, "error": str(exc)}
+        )
+        return []
+    return [image for image in images if force or not image.path.exists()]
+
+
+async def render_images(images: list[PendingImage]) -> int:
+    """Render and store ``images``; returns how many were written, never raises."""
+    rendered = 0
+    for image in images:
+        try:
+            await _render(image)
+        except Exception as exc:
+            logger.warning(
+                "blog_og_prerender_failed",
+                extra={"path": image.path.name, "error": str(exc)},
+            )
+            continue
+        rendered += 1
+    return rendered
+
+
+async def prerender_post(
+    session: AsyncSession, block: ContentBlock, *, force: bool = False
+) -> int:
+    """Render the missing images of a saved blog post if it is live; never raises."""
+    images = await pending_post_images(session, block, force=force)
+    return await render_images(images)
+
+
+async def rerender_all_posts(session: AsyncSession, *, force: bool = True) -> int:
+    """Render the OG images of every published post; returns images written."""
+    rendered = 0
+    posts = (await session.execute(_published_posts_stmt())).scalars().all()
+    for post in posts:
+        slug = post.key.removeprefix(blog_service.BLOG_KEY_PREFIX)
+        for lang in OG_LANGS:
+            if not force and image_path(slug, post.version, lang).exists():
+                continue
+            await get_post_image(post, lang=lang, force=True)
+            rendered += 1
+    return rendered
+
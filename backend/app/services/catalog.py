@@ -6,13 +6,14 @@ import json
 import logging
 import secrets
 import string
-import unicodedata
 import uuid
+from collections.abc import AsyncIterator
+from typing import Any
 
 from fastapi import HTTPException, status
-from sqlalchemy import and_, delete, func, select, update, or_, case, false
+from sqlalchemy import and_, delete, func, select, or_, case, false
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload, with_loader_criteria
+from sqlalchemy.orm import aliased, selectinload, with_loader_criteria
 
 from app.models.catalog import (
     BackInStockRequest,
@@ -35,6 +36,7 @@ from app.models.catalog import (
     ProductSlugHistory,
     RecentlyViewedProduct,
     FeaturedCollection,
+    product_tags,
 )
 from app.models.cart import CartItem
 from app.models.order import OrderItem
@@ -65,23 +67,22 @@ from app.services.storage import get_media_image_stats, regenerate_media_thumbna
 from app.services import email as email_service
 from app.services import auth as auth_service
 from app.services import audit_chain as audit_chain_service
+from app.services import catalog_cache
+from app.services import category_tree
+from app.services import csv_stream
+from app.services import email_outbox
 from app.services import notifications as notifications_service
 from app.services import pricing
+from app.services import product_schedules
+from app.services import keyset
+from app.services import product_search
+from app.services import recently_viewed
+from app.services import stock_levels  # noqa: F401  (availability refresh hooks)
 from app.core.config import settings
 from app.models.user import User
 
 logger = logging.getLogger(__name__)
 
-_SEARCH_CHAR_MAP: tuple[tuple[str, str], ...] = (
-    ("ă", "a"),
-    ("â", "a"),
-    ("î", "i"),
-    ("ș", "s"),
-    ("ş", "s"),
-    ("ț", "t"),
-    ("ţ", "t"),
-)
-
 
 async def get_category_by_slug(session: AsyncSession, slug: str) -> Category | None:
     result = await session.execute(select(Category).where(Category.slug == slug))
@@ -91,37 +92,28 @@ async def get_category_by_slug(session: AsyncSession, slug: str) -> Category | N
 async def _get_category_descendant_ids(
     session: AsyncSession, root_id: uuid.UUID
 ) -> list[uuid.UUID]:
-    resolved: list[uuid.UUID] = []
-    seen: set[uuid.UUID] = set()
-    frontier = [root_id]
-    while frontier:
-        next_frontier: list[uuid.UUID] = []
-        for current in frontier:
-            if (
-                current in seen
-            ):  # pragma: no cover -- next_frontier only adds not-yet-seen ids, so a frontier never holds a duplicate
-                continue
-            seen.add(current)
-            resolved.append(current)
-        child_rows = (
-            await session.execute(
-                select(Category.id).where(Category.parent_id.in_(frontier))
-            )
-        ).scalars()
-        for child_id in child_rows:
-            if child_id not in seen:
-                next_frontier.append(child_id)
-        frontier = next_frontier
-    return resolved
+    snapshot = await category_tree.get_snapshot(session)
+    return snapshot.descendant_ids(root_id)
 
 
 async def _get_category_and_descendant_ids_by_slug(
     session: AsyncSession, slug: str
 ) -> list[uuid.UUID]:
-    category = await get_category_by_slug(session, slug)
-    if not category:
+    snapshot = await category_tree.get_snapshot(session)
+    category_id = snapshot.id_by_slug.get(slug)
+    if category_id is None:
         return []
-    return await _get_category_descendant_ids(session, category.id)
+    return snapshot.descendant_ids(category_id)
+
+
+async def _get_listing_category_ids(
+    session: AsyncSession, slug: str, *, include_unpublished: bool
+) -> list[uuid.UUID]:
+    category_ids = await _get_category_and_descendant_ids_by_slug(session, slug)
+    if not category_ids or include_unpublished:
+        return category_ids
+    snapshot = await category_tree.get_snapshot(session)
+    return [cat_id for cat_id in category_ids if cat_id in snapshot.visible_ids]
 
 
 async def _validate_category_parent_assignment(
@@ -134,29 +126,25 @@ async def _validate_category_parent_assignment(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Category cannot be its own parent",
         )
-    result = await session.execute(select(Category.id, Category.parent_id))
-    parent_by_id: dict[uuid.UUID, uuid.UUID | None] = {
-        cat_id: parent for cat_id, parent in result.all()
-    }
-    if parent_id not in parent_by_id:
+    chain = await category_tree.get_ancestor_chain(session, parent_id)
+    if not chain:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Parent category not found"
         )
-    current: uuid.UUID | None = parent_id
-    seen: set[uuid.UUID] = set()
-    while current is not None:
-        if current == category_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Category parent would create a cycle",
-            )
-        if current in seen:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid category hierarchy",
-            )
-        seen.add(current)
-        current = parent_by_id.get(current)
+    ancestor_ids = {ancestor_id for ancestor_id, _parent in chain}
+    if category_id in ancestor_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Category parent would create a cycle",
+        )
+    # The closure stops where a stored hierarchy loops back on itself, so a chain
+    # whose top still points into the chain is corrupted.
+    _top_id, top_parent_id = chain[-1]
+    if top_parent_id is not None and top_parent_id in ancestor_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid category hierarchy",
+        )
 
 
 def apply_category_translation(category: Category, lang: str | None) -> None:
@@ -232,6 +220,7 @@ async def upsert_category_translation(
         existing.description = payload.description
         session.add(existing)
         await session.commit()
+        await catalog_cache.bump_generation()
         await session.refresh(existing)
         return existing
 
@@ -243,6 +232,7 @@ async def upsert_category_translation(
     )
     session.add(created)
     await session.commit()
+    await catalog_cache.bump_generation()
     await session.refresh(created)
     return created
 
@@ -263,6 +253,7 @@ async def delete_category_translation(
         )
     await session.delete(existing)
     await session.commit()
+    await catalog_cache.bump_generation()
 
 
 async def list_product_translations(
@@ -302,6 +293,7 @@ async def upsert_product_translation(
         existing.meta_description = payload.meta_description
         session.add(existing)
         await session.commit()
+        await catalog_cache.bump_generation()
         await session.refresh(existing)
         return existing
 
@@ -316,6 +308,7 @@ async def upsert_product_translation(
     )
     session.add(created)
     await session.commit()
+    await catalog_cache.bump_generation()
     await session.refresh(created)
     return created
 
@@ -335,6 +328,7 @@ async def delete_product_translation(
         )
     await session.delete(existing)
     await session.commit()
+    await catalog_cache.bump_generation()
 
 
 async def list_product_image_translations(
@@ -378,6 +372,7 @@ async def upsert_product_image_translation(
         existing.caption = caption
         session.add(existing)
         await session.commit()
+        await catalog_cache.bump_generation()
         await session.refresh(existing)
         await _log_product_action(
             session,
@@ -397,6 +392,7 @@ async def upsert_product_image_translation(
     )
     session.add(created)
     await session.commit()
+    await catalog_cache.bump_generation()
     await session.refresh(created)
     await _log_product_action(
         session,
@@ -433,6 +429,7 @@ async def delete_product_image_translation(
         )
     await session.delete(existing)
     await session.commit()
+    await catalog_cache.bump_generation()
     await _log_product_action(
         session,
         image.product_id,
@@ -685,74 +682,21 @@ def _sale_active_clause(now: datetime):
     return and_(Product.sale_price.is_not(None), start_ok, end_ok)
 
 
-async def auto_publish_due_sales(
-    session: AsyncSession, *, now: datetime | None = None
-) -> int:
-    """Publish draft products once their scheduled sale begins (best-effort, request-driven)."""
-    now_dt = now or datetime.now(timezone.utc)
-    clause = and_(
-        Product.is_deleted.is_(False),
-        Product.is_active.is_(True),
-        Product.status == ProductStatus.draft,
-        Product.sale_auto_publish.is_(True),
-        Product.sale_price.is_not(None),
-        Product.sale_start_at.is_not(None),
-        Product.sale_start_at <= now_dt,
-        or_(Product.sale_end_at.is_(None), Product.sale_end_at > now_dt),
-    )
-    res = await session.execute(
-        update(Product)
-        .where(clause)
-        .values(
-            status=ProductStatus.published,
-            publish_at=func.coalesce(Product.publish_at, now_dt),
-        )
-    )
-    updated = int(getattr(res, "rowcount", 0) or 0)
-    if updated:
-        await session.commit()
-    return updated
-
-
-async def apply_due_product_schedules(
-    session: AsyncSession, *, now: datetime | None = None
-) -> int:
-    """Apply scheduled publish/unpublish timestamps (best-effort, request-driven)."""
-    now_dt = now or datetime.now(timezone.utc)
-    updated = 0
+_SCHEDULE_FIELDS = frozenset(
+    {
+        "sale_start_at",
+        "sale_end_at",
+        "sale_auto_publish",
+        "publish_scheduled_for",
+        "unpublish_scheduled_for",
+    }
+)
 
-    publish_clause = and_(
-        Product.is_deleted.is_(False),
-        Product.publish_scheduled_for.is_not(None),
-        Product.publish_scheduled_for <= now_dt,
-    )
-    res = await session.execute(
-        update(Product)
-        .where(publish_clause)
-        .values(
-            status=ProductStatus.published,
-            publish_at=func.coalesce(Product.publish_at, now_dt),
-            publish_scheduled_for=None,
-        )
-    )
-    updated += int(getattr(res, "rowcount", 0) or 0)
 
-    unpublish_clause = and_(
-        Product.is_deleted.is_(False),
-        Product.status == ProductStatus.published,
-        Product.unpublish_scheduled_for.is_not(None),
-        Product.unpublish_scheduled_for <= now_dt,
-    )
-    res = await session.execute(
-        update(Product)
-        .where(unpublish_clause)
-        .values(status=ProductStatus.archived, unpublish_scheduled_for=None)
-    )
-    updated += int(getattr(res, "rowcount", 0) or 0)
-
-    if updated:
-        await session.commit()
-    return updated
+async def _after_schedule_write(session: AsyncSession) -> None:
+    """Apply schedules set in the past right away and wake the schedule engine."""
+    await product_schedules.apply_due_transitions(session)
+    await product_schedules.notify()
 
 
 def _compute_sale_price(
@@ -877,6 +821,7 @@ async def create_category(session: AsyncSession, payload: CategoryCreate) -> Cat
     )
     session.add(category)
     await session.commit()
+    await catalog_cache.bump_generation()
     await session.refresh(category)
     return category
 
@@ -910,6 +855,7 @@ async def update_category(
         setattr(category, field, value)
     session.add(category)
     await session.commit()
+    await catalog_cache.bump_generation()
     await session.refresh(category)
     return category
 
@@ -935,6 +881,7 @@ async def reorder_categories(
         return []
     session.add_all(updated)
     await session.commit()
+    await catalog_cache.bump_generation()
     return [CategoryRead.model_validate(cat) for cat in updated]
 
 
@@ -1004,6 +951,9 @@ async def create_product(
     session.add(product)
     if commit:
         await session.commit()
+        await catalog_cache.bump_generation()
+        if product.sale_start_at is not None or product.sale_end_at is not None:
+            await _after_schedule_write(session)
         await session.refresh(product)
         await _log_product_action(
             session, product.id, "create", user_id, {"slug": product.slug}
@@ -1195,6 +1145,9 @@ async def update_product(
     session.add(product)
     if commit:
         await session.commit()
+        await catalog_cache.bump_generation()
+        if _SCHEDULE_FIELDS.intersection(data):
+            await _after_schedule_write(session)
         await session.refresh(product)
         if was_out_of_stock and not is_now_out_of_stock:
             await fulfill_back_in_stock_requests(session, product=product)
@@ -1365,6 +1318,7 @@ async def update_product_variants(
             )
 
     await session.commit()
+    await catalog_cache.bump_generation()
     await session.refresh(product, attribute_names=["variants"])
     await _log_product_action(
         session,
@@ -1387,6 +1341,7 @@ async def add_product_image(
     image = ProductImage(product=product, **payload.model_dump())
     session.add(image)
     await session.commit()
+    await catalog_cache.bump_generation()
     await session.refresh(image)
     return image
 
@@ -1403,6 +1358,7 @@ async def add_product_image_from_path(
     )
     session.add(image)
     await session.commit()
+    await catalog_cache.bump_generation()
     await session.refresh(image)
     return image
 
@@ -1423,6 +1379,7 @@ async def delete_product_image(
     image.deleted_by = user_id
     session.add(image)
     await session.commit()
+    await catalog_cache.bump_generation()
     await _log_product_action(
         session,
         product.id,
@@ -1475,6 +1432,7 @@ async def restore_product_image(
     image.deleted_by = None
     session.add(image)
     await session.commit()
+    await catalog_cache.bump_generation()
     await _log_product_action(
         session,
         product.id,
@@ -1500,6 +1458,7 @@ async def update_product_image_sort(
     image.sort_order = sort_order
     session.add(image)
     await session.commit()
+    await catalog_cache.bump_generation()
     await session.refresh(product, attribute_names=["images"])
     await _log_product_action(
         session,
@@ -1530,6 +1489,7 @@ async def soft_delete_product(
         delete(ProductSlugHistory).where(ProductSlugHistory.product_id == product.id)
     )
     await session.commit()
+    await catalog_cache.bump_generation()
     await _log_product_action(
         session,
         product.id,
@@ -1570,6 +1530,7 @@ async def restore_soft_deleted_product(
         delete(ProductSlugHistory).where(ProductSlugHistory.product_id == product.id)
     )
     await session.commit()
+    await catalog_cache.bump_generation()
     await _log_product_action(
         session, product.id, "restore", user_id, {"slug": product.slug}
     )
@@ -1632,6 +1593,7 @@ async def bulk_update_products(
 
     updated: list[Product] = []
     restocked: set[uuid.UUID] = set()
+    schedules_touched = False
     for item in updates:
         product = products.get(item.product_id)
         if not product:
@@ -1757,7 +1719,12 @@ async def bulk_update_products(
             restocked.add(product.id)
         session.add(product)
         updated.append(product)
+        if _SCHEDULE_FIELDS.intersection(data):
+            schedules_touched = True
     await session.commit()
+    await catalog_cache.bump_generation()
+    if schedules_touched:
+        await _after_schedule_write(session)
     for product in updated:
         await session.refresh(product)
         if product.id in restocked:
@@ -1865,6 +1832,7 @@ async def apply_stock_adjustment(
     )
     session.add(adjustment)
     await session.commit()
+    await catalog_cache.bump_generation()
     await session.refresh(adjustment)
 
     if payload.variant_id is None:
@@ -1983,81 +1951,108 @@ async def update_featured_collection(
     return collection
 
 
-async def get_product_feed(
-    session: AsyncSession, lang: str | None = None
-) -> list[ProductFeedItem]:
-    result = await session.execute(
-        select(Product)
-        .options(
-            selectinload(Product.tags),
-            (
-                selectinload(Product.translations)
-                if lang
-                else selectinload(Product.category)
-            ),
-            (
-                selectinload(Product.category).selectinload(Category.translations)
-                if lang
-                else selectinload(Product.category)
-            ),
+async def _product_tag_slugs(
+    session: AsyncSession, product_ids: list[uuid.UUID]
+) -> dict[uuid.UUID, list[str]]:
+    rows = await session.execute(
+        select(product_tags.c.product_id, Tag.slug)
+        .join(Tag, Tag.id == product_tags.c.tag_id)
+        .where(product_tags.c.product_id.in_(product_ids))
+        .order_by(Tag.slug)
+    )
+    slugs: dict[uuid.UUID, list[str]] = {}
+    for product_id, slug in rows:
+        slugs.setdefault(product_id, []).append(slug)
+    return slugs
+
+
+async def iter_product_feed_items(
+    session: AsyncSession, lang: str | None = None, *, now: datetime | None = None
+) -> AsyncIterator[ProductFeedItem]:
+    """Stream the public feed, newest first, with sale prices evaluated at ``now``."""
+    translation = aliased(ProductTranslation)
+    stmt = (
+        select(
+            Product.id,
+            Product.slug,
+            Product.name,
+            Product.short_description,
+            Product.long_description,
+            Product.base_price,
+            Product.sale_price,
+            Product.sale_start_at,
+            Product.sale_end_at,
+            Product.currency,
+            Category.slug.label("category_slug"),
+            translation.name.label("tr_name"),
+            translation.short_description.label("tr_short_description"),
+            translation.long_description.label("tr_long_description"),
+        )
+        .outerjoin(Category, Category.id == Product.category_id)
+        .outerjoin(
+            translation,
+            and_(translation.product_id == Product.id, translation.lang == lang),
         )
         .where(
             Product.is_deleted.is_(False),
             Product.is_active.is_(True),
             Product.status == ProductStatus.published,
         )
-        .order_by(Product.created_at.desc())
-    )
-    products = result.scalars().unique().all()
-    feed: list[ProductFeedItem] = []
-    for p in products:
-        apply_product_translation(p, lang)
-        effective_price = (
-            p.sale_price
-            if is_sale_active(p) and p.sale_price is not None
-            else p.base_price
-        )
-        feed.append(
-            ProductFeedItem(
-                slug=p.slug,
-                name=p.name,
-                price=float(effective_price),
-                currency=p.currency,
-                description=p.short_description or p.long_description,
-                category_slug=p.category.slug if p.category else None,
-                tags=[tag.slug for tag in p.tags],
+        .order_by(Product.created_at.desc(), Product.id.desc())
+    )
+    now_dt = now or datetime.now(timezone.utc)
+    async for partition in csv_stream.stream_partitions(session, stmt):
+        tags = await _product_tag_slugs(session, [row.id for row in partition])
+        for row in partition:
+            if row.tr_name is not None:
+                name = row.tr_name
+                description = row.tr_short_description or row.tr_long_description
+            else:
+                name = row.name
+                description = row.short_description or row.long_description
+            price = (
+                row.sale_price
+                if is_sale_active(row, now=now_dt)  # type: ignore[arg-type]
+                else row.base_price
+            )
+            yield ProductFeedItem(
+                slug=row.slug,
+                name=name,
+                price=float(price),
+                currency=row.currency,
+                description=description,
+                category_slug=row.category_slug,
+                tags=tags.get(row.id, []),
             )
-        )
-    return feed
 
 
-async def get_product_feed_csv(session: AsyncSession, lang: str | None = None) -> str:
-    feed = await get_product_feed(session, lang=lang)
-    buf = io.StringIO()
-    fieldnames = [
-        "slug",
-        "name",
-        "price",
-        "currency",
-        "description",
-        "category_slug",
-        "tags",
-    ]
-    writer = csv.DictWriter(buf, fieldnames=fieldnames)
-    writer.writeheader()
-    for item in feed:
-        writer.writerow(
-            {
-                "slug": item.slug,
-                "name": item.name,
-                "price": item.price,
-                "currency": item.currency,
-                "description": item.description or "",
-                "category_slug": item.category_slug or "",
-                "tags": ",".join(item.tags),
-            }
-        )
-    return buf.getvalue()
+async def get_product_feed(
+    session: AsyncSession, lang: str | None = None
+) -> list[ProductFeedItem]:
+    return [item async for item in iter_product_feed_items(session, lang=lang)]
+
+
+PRODUCT_FEED_CSV_HEADER = (
+    "slug",
+    "name",
+    "price",
+    "currency",
+    "description",
+    "category_slug",
+    "tags",
+)
+
+
+def product_feed_csv_row(item: ProductFeedItem) -> tuple[Any, ...]:
+    return (
+        item.slug,
+        item.name,
+        item.price,
+        item.currency,
+        item.description or "",
+        item.category_slug or "",
+        ",".join(item.tags),
+    )
 
 
 def slugify(value: str) -> str:
@@ -2065,20 +2060,7 @@ def slugify(value: str) -> str:
     return "-".join(filter(None, cleaned.split("-")))
 
 
-def _normalize_search_text(value: str | None) -> str:
-    raw = (value or "").strip()
-    if not raw:
-        return ""
-    normalized = unicodedata.normalize("NFKD", raw)
-    without_marks = "".join(ch for ch in normalized if not unicodedata.combining(ch))
-    return without_marks.lower()
-
-
-def _normalized_search_expr(column):
-    expr = func.lower(func.coalesce(column, ""))
-    for source, target in _SEARCH_CHAR_MAP:
-        expr = func.replace(expr, source, target)
-    return expr
+_normalize_search_text = product_search.normalize_search_text
 
 
 async def get_product_price_bounds(
@@ -2105,22 +2087,9 @@ async def get_product_price_bounds(
         )
 
     if category_slug:
-        category_ids = await _get_category_and_descendant_ids_by_slug(
-            session, category_slug
-        )
-        if category_ids and not include_unpublished:
-            visible_ids = (
-                (
-                    await session.execute(
-                        select(Category.id).where(
-                            Category.id.in_(category_ids), Category.is_visible.is_(True)
-                        )
-                    )
-                )
-                .scalars()
-                .all()
-            )
-            category_ids = list(visible_ids)
+        category_ids = await _get_listing_category_ids(
+            session, category_slug, include_unpublished=include_unpublished
+        )
         if category_ids:
             query = query.where(Product.category_id.in_(category_ids))
         else:
@@ -2131,14 +2100,9 @@ async def get_product_price_bounds(
         query = query.where(Product.is_featured == is_featured)
     normalized_search = _normalize_search_text(search)
     if normalized_search:
-        like = f"%{normalized_search}%"
-        query = query.where(
-            _normalized_search_expr(Product.name).like(like)
-            | _normalized_search_expr(Product.short_description).like(like)
-            | _normalized_search_expr(Product.long_description).like(like)
-        )
+        query = query.where(product_search.search_clause(normalized_search))
     if tags:
-        query = query.join(Product.tags).where(Tag.slug.in_(tags))
+        query = query.where(Product.tags.any(Tag.slug.in_(tags)))
 
     row = (await session.execute(query)).one()
     min_price, max_price, currency_count, currency = row
@@ -2148,8 +2112,9 @@ async def get_product_price_bounds(
     return min_value, max_value, currency_value
 
 
-async def list_products_with_filters(
+async def _product_listing_query(
     session: AsyncSession,
+    *,
     category_slug: str | None,
     on_sale: bool | None,
     is_featured: bool | None,
@@ -2157,12 +2122,13 @@ async def list_products_with_filters(
     min_price: float | None,
     max_price: float | None,
     tags: list[str] | None,
-    sort: str | None,
-    limit: int,
-    offset: int,
-    lang: str | None = None,
-    include_unpublished: bool = False,
+    lang: str | None,
+    include_unpublished: bool,
 ):
+    """Build the filtered storefront listing query shared by both pagers.
+
+    Returns ``(query, effective_price, normalized_search)``.
+    """
     now_dt = datetime.now(timezone.utc)
     sale_active = _sale_active_clause(now_dt)
     effective_price = case((sale_active, Product.sale_price), else_=Product.base_price)
@@ -2189,22 +2155,9 @@ async def list_products_with_filters(
             Product.is_active.is_(True), Product.status == ProductStatus.published
         )
     if category_slug:
-        category_ids = await _get_category_and_descendant_ids_by_slug(
-            session, category_slug
-        )
-        if category_ids and not include_unpublished:
-            visible_ids = (
-                (
-                    await session.execute(
-                        select(Category.id).where(
-                            Category.id.in_(category_ids), Category.is_visible.is_(True)
-                        )
-                    )
-                )
-                .scalars()
-                .all()
-            )
-            category_ids = list(visible_ids)
+        category_ids = await _get_listing_category_ids(
+            session, category_slug, include_unpublished=include_unpublished
+        )
         if category_ids:
             base_query = base_query.where(Product.category_id.in_(category_ids))
         else:
@@ -2215,18 +2168,74 @@ async def list_products_with_filters(
         base_query = base_query.where(Product.is_featured == is_featured)
     normalized_search = _normalize_search_text(search)
     if normalized_search:
-        like = f"%{normalized_search}%"
-        base_query = base_query.where(
-            _normalized_search_expr(Product.name).like(like)
-            | _normalized_search_expr(Product.short_description).like(like)
-            | _normalized_search_expr(Product.long_description).like(like)
-        )
+        base_query = base_query.where(product_search.search_clause(normalized_search))
     if min_price is not None:
         base_query = base_query.where(effective_price >= min_price)
     if max_price is not None:
         base_query = base_query.where(effective_price <= max_price)
     if tags:
-        base_query = base_query.join(Product.tags).where(Tag.slug.in_(tags))
+        # EXISTS rather than a join: a join repeats a product once per matching
+        # tag, which shortens LIMITed pages.
+        base_query = base_query.where(Product.tags.any(Tag.slug.in_(tags)))
+    return base_query, effective_price, normalized_search
+
+
+async def count_products_with_filters(
+    session: AsyncSession,
+    category_slug: str | None,
+    on_sale: bool | None,
+    is_featured: bool | None,
+    search: str | None,
+    min_price: float | None,
+    max_price: float | None,
+    tags: list[str] | None,
+    include_unpublished: bool = False,
+) -> int:
+    base_query, _price, _search = await _product_listing_query(
+        session,
+        category_slug=category_slug,
+        on_sale=on_sale,
+        is_featured=is_featured,
+        search=search,
+        min_price=min_price,
+        max_price=max_price,
+        tags=tags,
+        lang=None,
+        include_unpublished=include_unpublished,
+    )
+    total_query = base_query.with_only_columns(
+        func.count(func.distinct(Product.id))
+    ).order_by(None)
+    return int((await session.execute(total_query)).scalar_one() or 0)
+
+
+async def list_products_with_filters(
+    session: AsyncSession,
+    category_slug: str | None,
+    on_sale: bool | None,
+    is_featured: bool | None,
+    search: str | None,
+    min_price: float | None,
+    max_price: float | None,
+    tags: list[str] | None,
+    sort: str | None,
+    limit: int,
+    offset: int,
+    lang: str | None = None,
+    include_unpublished: bool = False,
+):
+    base_query, effective_price, normalized_search = await _product_listing_query(
+        session,
+        category_slug=category_slug,
+        on_sale=on_sale,
+        is_featured=is_featured,
+        search=search,
+        min_price=min_price,
+        max_price=max_price,
+        tags=tags,
+        lang=lang,
+        include_unpublished=include_unpublished,
+    )
 
     total_query = base_query.with_only_columns(
         func.count(func.distinct(Product.id))
@@ -2234,7 +2243,14 @@ async def list_products_with_filters(
     total_result = await session.execute(total_query)
     total_items = total_result.scalar_one()
 
-    if sort == "recommended":
+    if sort == "relevance" and normalized_search:
+        dialect = session.get_bind().dialect.name
+        base_query = base_query.order_by(
+            product_search.relevance_score(normalized_search, dialect=dialect).desc(),
+            Product.sort_order.asc(),
+            Product.created_at.desc(),
+        )
+    elif sort in {"recommended", "relevance"}:
         base_query = base_query.order_by(
             Product.sort_order.asc(), Product.created_at.desc()
         )
@@ -2257,6 +2273,88 @@ async def list_products_with_filters(
     return items, total_items
 
 
+def _product_keyset(sort: str | None, effective_price) -> list[keyset.KeysetColumn]:
+    created = keyset.KeysetColumn(Product.created_at, "datetime", descending=True)
+    if sort in {"recommended", "relevance"}:
+        return [
+            keyset.KeysetColumn(Product.sort_order, "int"),
+            created,
+            keyset.KeysetColumn(Product.id, "uuid", descending=True),
+        ]
+    if sort in {"price_asc", "price_desc"}:
+        descending = sort == "price_desc"
+        return [
+            keyset.KeysetColumn(effective_price, "decimal", descending=descending),
+            keyset.KeysetColumn(Product.id, "uuid", descending=descending),
+        ]
+    if sort in {"name_asc", "name_desc"}:
+        descending = sort == "name_desc"
+        return [
+            keyset.KeysetColumn(Product.name, "str", descending=descending),
+            keyset.KeysetColumn(Product.id, "uuid", descending=descending),
+        ]
+    return [created, keyset.KeysetColumn(Product.id, "uuid", descending=True)]
+
+
+async def list_products_after_cursor(
+    session: AsyncSession,
+    category_slug: str | None,
+    on_sale: bool | None,
+    is_featured: bool | None,
+    search: str | None,
+    min_price: float | None,
+    max_price: float | None,
+    tags: list[str] | None,
+    sort: str | None,
+    limit: int,
+    cursor: str | None,
+    lang: str | None = None,
+    include_unpublished: bool = False,
+) -> tuple[list[Product], str | None]:
+    """Keyset-paginated listing; returns the page and the next cursor (if any).
+
+    ``cursor=None`` starts at the first page. Relevance ordering is score based
+    and cannot be resumed from a cursor, so it is rejected when searching.
+    """
+    base_query, effective_price, normalized_search = await _product_listing_query(
+        session,
+        category_slug=category_slug,
+        on_sale=on_sale,
+        is_featured=is_featured,
+        search=search,
+        min_price=min_price,
+        max_price=max_price,
+        tags=tags,
+        lang=lang,
+        include_unpublished=include_unpublished,
+    )
+    if sort == "relevance" and normalized_search:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor pagination is not supported for relevance sorting",
+        )
+    sort_name = sort or "newest"
+    columns = _product_keyset(sort, effective_price)
+    if cursor:
+        values = keyset.decode_cursor(cursor, sort=sort_name, columns=columns)
+        base_query = base_query.where(keyset.after_clause(columns, values))
+    query = (
+        base_query.add_columns(*(column.expr for column in columns))
+        .order_by(*keyset.order_by(columns))
+        .limit(limit + 1)
+    )
+    rows = (await session.execute(query)).unique().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = keyset.encode_cursor(sort_name, list(rows[-1][1:]))
+    items = [row[0] for row in rows]
+    if lang:
+        for item in items:
+            apply_product_translation(item, lang)
+    return items, next_cursor
+
+
 async def _get_or_create_tags(session: AsyncSession, names: list[str]) -> list[Tag]:
     slugs = [slugify(name) for name in names]
     result = await session.execute(select(Tag).where(Tag.slug.in_(slugs)))
@@ -2366,6 +2464,7 @@ async def duplicate_product(
     ]
     session.add(clone)
     await session.commit()
+    await catalog_cache.bump_generation()
     await session.refresh(clone)
     payload = {"from_product_id": str(product.id), "from_slug": product.slug}
     if source:
@@ -2432,6 +2531,7 @@ async def recompute_product_rating(
     product.rating_count = count
     session.add(product)
     await session.commit()
+    await catalog_cache.bump_generation()
     await session.refresh(product)
 
 
@@ -2618,46 +2718,8 @@ async def record_recently_viewed(
     session_id: str | None,
     limit: int = 10,
 ) -> None:
-    if not user_id and not session_id:
-        return
-    query = select(RecentlyViewedProduct).where(
-        RecentlyViewedProduct.product_id == product.id
-    )
-    if user_id:
-        query = query.where(RecentlyViewedProduct.user_id == user_id)
-    else:
-        query = query.where(RecentlyViewedProduct.session_id == session_id)
-    existing = await session.execute(query)
-    view = existing.scalar_one_or_none()
-    now = datetime.now(timezone.utc)
-    if view:
-        view.viewed_at = now
-    else:
-        view = RecentlyViewedProduct(
-            product_id=product.id,
-            user_id=user_id,
-            session_id=session_id,
-            viewed_at=now,
-        )
-        session.add(view)
-    await session.commit()
-
-    # enforce cap
-    cleanup_query = (
-        select(RecentlyViewedProduct)
-        .where(
-            (RecentlyViewedProduct.user_id == user_id)
-            if user_id
-            else (RecentlyViewedProduct.session_id == session_id)
-        )
-        .order_by(RecentlyViewedProduct.viewed_at.desc())
-    )
-    result = await session.execute(cleanup_query)
-    all_views = result.scalars().all()
-    for extra in all_views[limit:]:
-        await session.delete(extra)
-    if len(all_views) > limit:
-        await session.commit()
+    """Record a view in the write-behind store; the table is updated in batches."""
+    await recently_viewed.record(user_id, session_id, product.id, limit=limit)
 
 
 async def get_recently_viewed(
@@ -2668,124 +2730,158 @@ async def get_recently_viewed(
 ):
     if not user_id and not session_id:
         return []
-    query = (
-        select(RecentlyViewedProduct)
+    viewed_at: dict[uuid.UUID, datetime] = dict(
+        await recently_viewed.recent(user_id, session_id, limit=limit)
+    )
+    if len(viewed_at) < limit:
+        # Older history (or views from before a restart) lives in the table.
+        stored = select(
+            RecentlyViewedProduct.product_id, RecentlyViewedProduct.viewed_at
+        )
+        if user_id:
+            stored = stored.where(RecentlyViewedProduct.user_id == user_id)
+        else:
+            stored = stored.where(RecentlyViewedProduct.session_id == session_id)
+        stored = stored.order_by(RecentlyViewedProduct.viewed_at.desc()).limit(limit)
+        for product_id, seen_at in (await session.execute(stored)).all():
+            seen_at = seen_at if seen_at.tzinfo else seen_at.replace(tzinfo=timezone.utc)
+            if product_id not in viewed_at or viewed_at[product_id] < seen_at:
+                viewed_at[product_id] = seen_at
+    if not viewed_at:
+        return []
+    result = await session.execute(
+        select(Product)
         .options(
-            selectinload(RecentlyViewedProduct.product).selectinload(Product.images),
+            selectinload(Product.images),
             with_loader_criteria(
                 ProductImage, ProductImage.is_deleted.is_(False), include_aliases=True
             ),
         )
         .where(
-            RecentlyViewedProduct.product.has(
-                and_(
-                    Product.is_deleted.is_(False),
-                    Product.is_active.is_(True),
-                    Product.status == ProductStatus.published,
-                )
-            )
+            Product.id.in_(list(viewed_at)),
+            Product.is_deleted.is_(False),
+            Product.is_active.is_(True),
+            Product.status == ProductStatus.published,
         )
     )
-    if user_id:
-        query = query.where(RecentlyViewedProduct.user_id == user_id)
-    else:
-        query = query.where(RecentlyViewedProduct.session_id == session_id)
-    query = query.order_by(RecentlyViewedProduct.viewed_at.desc()).limit(limit)
-    result = await session.execute(query)
-    return [rv.product for rv in result.scalars()]
+    products = list(result.scalars())
+    products.sort(key=lambda product: viewed_at[product.id], reverse=True)
+    return products[:limit]
+
+
+_PRODUCTS_CSV_HEADER = (
+    "slug",
+    "name",
+    "category_slug",
+    "base_price",
+    "currency",
+    "stock_quantity",
+    "status",
+    "is_featured",
+    "is_active",
+    "short_description",
+    "long_description",
+    "tags",
+)
 
 
-async def export_products_csv(session: AsyncSession) -> str:
-    products_result = await session.execute(
-        select(Product)
-        .options(selectinload(Product.category), selectinload(Product.tags))
+async def _products_csv_rows(session: AsyncSession):
+    stmt = (
+        select(
+            Product.id,
+            Product.slug,
+            Product.name,
+            Category.slug.label("category_slug"),
+            Product.base_price,
+            Product.currency,
+            Product.stock_quantity,
+            Product.status,
+            Product.is_featured,
+            Product.is_active,
+            Product.short_description,
+            Product.long_description,
+        )
+        .outerjoin(Category, Category.id == Product.category_id)
         .where(Product.is_deleted.is_(False))
-        .order_by(Product.created_at.desc())
-    )
-    products = products_result.scalars().unique().all()
-    buf = io.StringIO()
-    fieldnames = [
-        "slug",
-        "name",
-        "category_slug",
-        "base_price",
-        "currency",
-        "stock_quantity",
-        "status",
-        "is_featured",
-        "is_active",
-        "short_description",
-        "long_description",
-        "tags",
-    ]
-    writer = csv.DictWriter(buf, fieldnames=fieldnames)
-    writer.writeheader()
-    for p in products:
-        writer.writerow(
-            {
-                "slug": p.slug,
-                "name": p.name,
-                "category_slug": p.category.slug if p.category else "",
-                "base_price": float(p.base_price),
-                "currency": p.currency,
-                "stock_quantity": p.stock_quantity,
-                "status": p.status.value,
-                "is_featured": p.is_featured,
-                "is_active": p.is_active,
-                "short_description": p.short_description or "",
-                "long_description": p.long_description or "",
-                "tags": ",".join(tag.slug for tag in p.tags),
-            }
-        )
-    return buf.getvalue()
+        .order_by(Product.created_at.desc(), Product.id.desc())
+    )
+    async for partition in csv_stream.stream_partitions(session, stmt):
+        tags = await _product_tag_slugs(session, [row.id for row in partition])
+        for row in partition:
+            yield (
+                row.slug,
+                row.name,
+                row.category_slug or "",
+                float(row.base_price),
+                row.currency,
+                row.stock_quantity,
+                row.status.value,
+                row.is_featured,
+                row.is_active,
+                row.short_description or "",
+                row.long_description or "",
+                ",".join(tags.get(row.id, [])),
+            )
 
 
-async def export_categories_csv(session: AsyncSession, template: bool = False) -> str:
-    buf = io.StringIO()
-    fieldnames = [
-        "slug",
-        "name",
-        "parent_slug",
-        "sort_order",
-        "is_visible",
-        "description",
-        "name_ro",
-        "description_ro",
-        "name_en",
-        "description_en",
-    ]
-    writer = csv.DictWriter(buf, fieldnames=fieldnames)
-    writer.writeheader()
-    if template:
-        return buf.getvalue()
+def iter_products_csv(session: AsyncSession):
+    return csv_stream.iter_csv(_PRODUCTS_CSV_HEADER, _products_csv_rows(session))
 
-    result = await session.execute(
-        select(Category)
-        .options(selectinload(Category.translations))
+
+_CATEGORIES_CSV_HEADER = (
+    "slug",
+    "name",
+    "parent_slug",
+    "sort_order",
+    "is_visible",
+    "description",
+    "name_ro",
+    "description_ro",
+    "name_en",
+    "description_en",
+)
+
+
+async def _categories_csv_rows(session: AsyncSession):
+    parent = aliased(Category)
+    ro = aliased(CategoryTranslation)
+    en = aliased(CategoryTranslation)
+    stmt = (
+        select(
+            Category.slug,
+            Category.name,
+            parent.slug.label("parent_slug"),
+            Category.sort_order,
+            Category.is_visible,
+            Category.description,
+            ro.name.label("name_ro"),
+            ro.description.label("description_ro"),
+            en.name.label("name_en"),
+            en.description.label("description_en"),
+        )
+        .outerjoin(parent, parent.id == Category.parent_id)
+        .outerjoin(ro, and_(ro.category_id == Category.id, ro.lang == "ro"))
+        .outerjoin(en, and_(en.category_id == Category.id, en.lang == "en"))
         .order_by(Category.sort_order.asc(), Category.slug.asc())
     )
-    categories = result.scalars().unique().all()
-    id_to_slug = {c.id: c.slug for c in categories}
-
-    for c in categories:
-        translations = {t.lang: t for t in (c.translations or [])}
-        ro = translations.get("ro")
-        en = translations.get("en")
-        writer.writerow(
-            {
-                "slug": c.slug,
-                "name": c.name,
-                "parent_slug": id_to_slug.get(c.parent_id, "") if c.parent_id else "",
-                "sort_order": c.sort_order,
-                "is_visible": "true" if c.is_visible else "false",
-                "description": c.description or "",
-                "name_ro": ro.name if ro else "",
-                "description_ro": ro.description or "" if ro and ro.description else "",
-                "name_en": en.name if en else "",
-                "description_en": en.description or "" if en and en.description else "",
-            }
+    async for row in csv_stream.stream_rows(session, stmt):
+        yield (
+            row.slug,
+            row.name,
+            row.parent_slug or "",
+            row.sort_order,
+            "true" if row.is_visible else "false",
+            row.description or "",
+            row.name_ro or "",
+            row.description_ro or "",
+            row.name_en or "",
+            row.description_en or "",
         )
-    return buf.getvalue()
+
+
+def iter_categories_csv(session: AsyncSession, template: bool = False):
+    rows = None if template else _categories_csv_rows(session)
+    return csv_stream.iter_csv(_CATEGORIES_CSV_HEADER, rows)
 
 
 async def import_products_csv(
@@ -2886,6 +2982,7 @@ async def import_products_csv(
     else:
         if not dry_run:
             await session.commit()
+            await catalog_cache.bump_generation()
     return {"created": created, "updated": updated, "errors": errors}
 
 
@@ -3123,6 +3220,7 @@ async def import_categories_csv(
                 )
 
     await session.commit()
+    await catalog_cache.bump_generation()
     return {"created": created, "updated": updated, "errors": errors}
 
 
@@ -3136,9 +3234,10 @@ async def _record_slug_history(
 
 async def notify_back_in_stock(emails: list[str], product_name: str) -> int:
     sent = 0
-    for email in emails:
-        if await email_service.send_back_in_stock(email, product_name):
-            sent += 1
+    async with email_outbox.collect():
+        for email in emails:
+            if await email_service.send_back_in_stock(email, product_name):
+                sent += 1
     return sent
 
 
@@ -3307,12 +3406,13 @@ async def fulfill_back_in_stock_requests(
     await session.commit()
 
     sent = 0
-    for req, email in rows:
-        if not email:
-            continue
-        if await email_service.send_back_in_stock(email, product.name):
-            req.notified_at = datetime.now(timezone.utc)
-            sent += 1
+    async with email_outbox.collect():
+        for req, email in rows:
+            if not email:
+                continue
+            if await email_service.send_back_in_stock(email, product.name):
+                req.notified_at = datetime.now(timezone.utc)
+                sent += 1
     if sent:
         session.add_all([req for req, _ in rows])
         await session.commit()
@@ -0,0 +1,185 @@
+"""Read-through cache for storefront product listings.
+
+Entries are stored under a key derived from the normalized listing filters and
+the current catalog *generation*. Catalog writes bump the generation, so older
+entries are never read again and simply expire. Redis is used when configured
+(shared across workers); otherwise, or when Redis is unreachable, a small
+per-process LRU is used instead.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Final
+
+from app.core.config import settings
+from app.core.redis_client import get_redis, json_dumps, json_loads
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY: Final[str] = "catalog:generation"
+_LISTING_KEY_PREFIX: Final[str] = "catalog:products"
+_COUNT_KEY_PREFIX: Final[str] = "catalog:product-count"
+_LOCAL_MAX_ENTRIES: Final[int] = 512
+_KNOWN_SORTS: Final[frozenset[str]] = frozenset(
+    {
+        "recommended",
+        "newest",
+        "price_asc",
+        "price_desc",
+        "name_asc",
+        "name_desc",
+        "relevance",
+    }
+)
+
+
+@dataclass(frozen=True)
+class _LocalEntry:
+    expires_at: float
+    payload: dict[str, Any]
+
+
+_local_generation = 0
+_local_entries: OrderedDict[str, _LocalEntry] = OrderedDict()
+
+
+def _ttl_seconds() -> int:
+    return max(0, int(getattr(settings, "catalog_listing_cache_ttl_seconds", 0) or 0))
+
+
+def is_enabled() -> bool:
+    return _ttl_seconds() > 0
+
+
+def _normalize_price(value: float | None) -> str | None:
+    if value is None:
+        return None
+    return f"{float(value):.2f}"
+
+
+def listing_digest(
+    *,
+    category_slug: str | None,
+    on_sale: bool | None,
+    is_featured: bool | None,
+    search: str | None,
+    min_price: float | None,
+    max_price: float | None,
+    tags: list[str] | None,
+    sort: str | None,
+    limit: int,
+    offset: int,
+    lang: str | None,
+    cursor: str | None = None,
+) -> str:
+    """Hash the listing filters so equivalent requests share one cache entry."""
+    normalized_sort = sort if sort in _KNOWN_SORTS else "newest"
+    normalized = (
+        (category_slug or "").strip() or None,
+        on_sale,
+        is_featured,
+        (search or "").strip().lower() or None,
+        _normalize_price(min_price),
+        _normalize_price(max_price),
+        sorted({(tag or "").strip() for tag in tags or [] if (tag or "").strip()}),
+        normalized_sort,
+        int(limit),
+        int(offset),
+        lang or None,
+        cursor,
+    )
+    return hashlib.sha256(json_dumps(normalized).encode("utf-8")).hexdigest()
+
+
+async def get_generation() -> int:
+    client = get_redis()
+    if client is not None:
+        try:
+            raw = await client.get(GENERATION_KEY)
+            return int(raw or 0)
+        except Exception as exc:
+            logger.warning("catalog_cache_generation_failed", extra={"error": str(exc)})
+    return _local_generation
+
+
+async def bump_generation() -> None:
+    """Invalidate every cached listing after a catalog write."""
+    global _local_generation
+    _local_generation += 1
+    _local_entries.clear()
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        await client.incr(GENERATION_KEY)
+    except Exception as exc:
+        logger.warning("catalog_cache_bump_failed", extra={"error": str(exc)})
+
+
+async def listing_cache_key(digest: str) -> str:
+    generation = await get_generation()
+    return f"{_LISTING_KEY_PREFIX}:{generation}:{digest}"
+
+
+async def count_cache_key(digest: str) -> str:
+    """Key for the total of a filter set, shared by every page/cursor of it."""
+    generation = await get_generation()
+    return f"{_COUNT_KEY_PREFIX}:{generation}:{digest}"
+
+
+def _local_get(key: str) -> dict[str, Any] | None:
+    entry = _local_entries.get(key)
+    if entry is None:
+        return None
+    if entry.expires_at <= time.monotonic():
+        _local_entries.pop(key, None)
+        return None
+    _local_entries.move_to_end(key)
+    return entry.payload
+
+
+def _local_set(key: str, payload: dict[str, Any], ttl: int) -> None:
+    _local_entries[key] = _LocalEntry(
+        expires_at=time.monotonic() + ttl, payload=payload
+    )
+    _local_entries.move_to_end(key)
+    while len(_local_entries) > _LOCAL_MAX_ENTRIES:
+        _local_entries.popitem(last=False)
+
+
+async def get_listing(key: str) -> dict[str, Any] | None:
+    if not is_enabled():
+        return None
+    client = get_redis()
+    if client is not None:
+        try:
+            raw = await client.get(key)
+            return json_loads(raw) if raw else None
+        except Exception as exc:
+            logger.warning("catalog_cache_read_failed", extra={"error": str(exc)})
+    return _local_get(key)
+
+
+async def set_listing(key: str, payload: dict[str, Any]) -> None:
+    ttl = _ttl_seconds()
+    if ttl <= 0:
+        return
+    client = get_redis()
+    if client is not None:
+        try:
+            await client.set(key, json_dumps(payload), ex=ttl)
+            return
+        except Exception as exc:
+            logger.warning("catalog_cache_write_failed", extra={"error": str(exc)})
+    _local_set(key, payload, ttl)
+
+
+def _reset_for_tests() -> None:
+    global _local_generation
+    _local_generation = 0
+    _local_entries.clear()
@@ -0,0 +1,328 @@
+"""Category hierarchy: closure table maintenance and an in-memory tree snapshot.
+
+``category_closure`` holds one row per (ancestor, descendant) pair, including a
+depth-0 row for every category. It is updated inside the same flush whenever a
+category is added, removed or re-parented, so it always matches
+``categories.parent_id`` regardless of which code path wrote the change (API,
+CSV import, merge, seeds or the CLI). Only the rows of the affected subtree are
+touched; inserts skip pairs that already exist so concurrent writers moving
+overlapping subtrees do not collide on the primary key. A change that would
+close a cycle falls back to a full rebuild, serialized with a transaction-level
+advisory lock on Postgres.
+
+Storefront reads use a per-process ``CategoryTreeSnapshot`` so descendant and
+visibility lookups are dict hits. The snapshot is reloaded when the catalog
+generation changes, after a local commit that touched the hierarchy, or after
+``_SNAPSHOT_MAX_AGE_SECONDS`` (covers multi-worker setups without Redis).
+"""
+
+from __future__ import annotations
+
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Final
+
+from sqlalchemy import (
+    Select,
+    TextClause,
+    bindparam,
+    delete,
+    event,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.catalog import Category, CategoryClosure
+from app.services import catalog_cache
+
+_SNAPSHOT_MAX_AGE_SECONDS: Final[float] = 60.0
+_TREE_CHANGED_KEY: Final[str] = "category_tree_changed"
+_ORPHANS_KEY: Final[str] = "category_tree_orphans"
+_REBUILD_LOCK_ID: Final[int] = 0x63617465  # "cate"
+
+# Recursive CTE shared with the 0160 migration backfill. The depth guard and the
+# ancestor check keep a corrupted (cyclic) hierarchy from recursing forever.
+_REBUILD_CLOSURE_SQL: Final[str] = """
+INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+WITH RECURSIVE tree(ancestor_id, descendant_id, depth) AS (
+    SELECT id, id, 0 FROM categories
+    UNION
+    SELECT tree.ancestor_id, categories.id, tree.depth + 1
+    FROM tree JOIN categories ON categories.parent_id = tree.descendant_id
+    WHERE tree.depth < 64 AND categories.id <> tree.ancestor_id
+)
+SELECT ancestor_id, descendant_id, MIN(depth)
+FROM tree
+GROUP BY ancestor_id, descendant_id
+"""
+
+
+@dataclass(frozen=True)
+class CategoryTreeSnapshot:
+    generation: int
+    loaded_at: float
+    id_by_slug: dict[str, uuid.UUID]
+    visible_ids: frozenset[uuid.UUID]
+    descendants_by_id: dict[uuid.UUID, tuple[uuid.UUID, ...]]
+
+    def descendant_ids(self, root_id: uuid.UUID) -> list[uuid.UUID]:
+        """Return ``root_id`` followed by its descendants, shallowest first."""
+        return list(self.descendants_by_id.get(root_id, (root_id,)))
+
+
+_snapshot: CategoryTreeSnapshot | None = None
+
+
+def invalidate_snapshot() -> None:
+    global _snapshot
+    _snapshot = None
+
+
+async def _load_snapshot(
+    session: AsyncSession, *, generation: int
+) -> CategoryTreeSnapshot:
+    category_rows = (
+        await session.execute(select(Category.id, Category.slug, Category.is_visible))
+    ).all()
+    closure_rows = (
+        await session.execute(
+            select(CategoryClosure.ancestor_id, CategoryClosure.descendant_id).order_by(
+                CategoryClosure.ancestor_id, CategoryClosure.depth
+            )
+        )
+    ).all()
+    descendants: defaultdict[uuid.UUID, list[uuid.UUID]] = defaultdict(list)
+    for ancestor_id, descendant_id in closure_rows:
+        descendants[ancestor_id].append(descendant_id)
+    return CategoryTreeSnapshot(
+        generation=generation,
+        loaded_at=time.monotonic(),
+        id_by_slug={slug: cat_id for cat_id, slug, _visible in category_rows},
+        visible_ids=frozenset(
+            cat_id for cat_id, _slug, visible in category_rows if visible
+        ),
+        descendants_by_id={key: tuple(value) for key, value in descendants.items()},
+    )
+
+
+async def get_snapshot(session: AsyncSession) -> CategoryTreeSnapshot:
+    global _snapshot
+    generation = await catalog_cache.get_generation()
+    current = _snapshot
+    if (
+        current is not None
+        and current.generation == generation
+        and time.monotonic() - current.loaded_at < _SNAPSHOT_MAX_AGE_SECONDS
+    ):
+        return current
+    current = await _load_snapshot(session, generation=generation)
+    _snapshot = current
+    return current
+
+
+async def get_ancestor_chain(
+    session: AsyncSession, category_id: uuid.UUID
+) -> list[tuple[uuid.UUID, uuid.UUID | None]]:
+    """Return ``(ancestor_id, ancestor_parent_id)`` pairs, nearest first.
+
+    Reads the closure table through ``session`` so pending (flushed) changes in
+    the caller's transaction are visible. An empty list means the category does
+    not exist.
+    """
+    rows = (
+        await session.execute(
+            select(CategoryClosure.ancestor_id, Category.parent_id)
+            .join(Category, Category.id == CategoryClosure.ancestor_id)
+            .where(CategoryClosure.descendant_id == category_id)
+            .order_by(CategoryClosure.depth)
+        )
+    ).all()
+    return [(ancestor_id, parent_id) for ancestor_id, parent_id in rows]
+
+
+# ``WHERE true`` keeps SQLite from parsing ``ON CONFLICT`` as a join constraint.
+_LINK_SUBTREE_SQL: Final[str] = """
+INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+SELECT sup.ancestor_id, sub.descendant_id, sup.depth + sub.depth + 1
+FROM category_closure sup, category_closure sub
+WHERE sup.descendant_id = :parent_id AND sub.ancestor_id = :node_id
+ON CONFLICT DO NOTHING
+"""
+_INSERT_SELF_SQL: Final[str] = """
+INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+SELECT :node_id, :node_id, 0 WHERE true
+ON CONFLICT DO NOTHING
+"""
+
+
+def _closure_sql(sql: str, *names: str) -> TextClause:
+    id_type = CategoryClosure.__table__.c.ancestor_id.type
+    return text(sql).bindparams(*(bindparam(name, type_=id_type) for name in names))
+
+
+_LINK_SUBTREE: Final[TextClause] = _closure_sql(
+    _LINK_SUBTREE_SQL, "parent_id", "node_id"
+)
+_INSERT_SELF: Final[TextClause] = _closure_sql(_INSERT_SELF_SQL, "node_id")
+
+
+def rebuild_closure(connection) -> None:
+    """Recompute ``category_closure`` from ``categories.parent_id``."""
+    if connection.dialect.name == "postgresql":
+        connection.execute(
+            text("SELECT pg_advisory_xact_lock(:id)"), {"id": _REBUILD_LOCK_ID}
+        )
+    connection.execute(delete(CategoryClosure))
+    connection.execute(text(_REBUILD_CLOSURE_SQL))
+
+
+def _subtree(node_id: uuid.UUID) -> Select[tuple[uuid.UUID]]:
+    return select(CategoryClosure.descendant_id).where(
+        CategoryClosure.ancestor_id == node_id
+    )
+
+
+def _detach_subtree(connection, node_id: uuid.UUID) -> None:
+    """Drop the links between ``node_id``'s subtree and its former ancestors."""
+    ancestors = select(CategoryClosure.ancestor_id).where(
+        CategoryClosure.descendant_id == node_id, CategoryClosure.depth > 0
+    )
+    connection.execute(
+        delete(CategoryClosure).where(
+            CategoryClosure.descendant_id.in_(_subtree(node_id)),
+            CategoryClosure.ancestor_id.in_(ancestors),
+        )
+    )
+
+
+def _link_subtree(connection, node_id: uuid.UUID, parent_id: uuid.UUID | None) -> bool:
+    """Attach ``node_id``'s subtree under ``parent_id``; False on a cycle."""
+    if parent_id is None:
+        return True
+    in_subtree = connection.execute(
+        select(CategoryClosure.depth).where(
+            CategoryClosure.ancestor_id == node_id,
+            CategoryClosure.descendant_id == parent_id,
+        )
+    ).first()
+    if in_subtree is not None:
+        return False
+    connection.execute(_LINK_SUBTREE, {"parent_id": parent_id, "node_id": node_id})
+    return True
+
+
+def _apply_changes(
+    connection,
+    *,
+    added: list[Category],
+    moved: list[Category],
+    removed: list[uuid.UUID],
+    orphans: list[uuid.UUID],
+) -> bool:
+    """Update the closure rows of the touched subtrees; False on a cycle."""
+    # Children of a deleted category become roots (``parent_id`` SET NULL).
+    for node_id in orphans:
+        if node_id not in removed:
+            _detach_subtree(connection, node_id)
+    for node_id in removed:
+        connection.execute(
+            delete(CategoryClosure).where(
+                (CategoryClosure.ancestor_id == node_id)
+                | (CategoryClosure.descendant_id == node_id)
+            )
+        )
+    for node in moved:
+        _detach_subtree(connection, node.id)
+    # Parents first, so a child added in the same flush finds its ancestors.
+    pending = {node.id: node for node in added}
+    linked: set[uuid.UUID] = set()
+
+    def _add(node: Category) -> bool:
+        if node.id in linked:
+            return True
+        linked.add(node.id)
+        parent = pending.get(node.parent_id) if node.parent_id else None
+        if parent is not None and not _add(parent):
+            return False
+        connection.execute(_INSERT_SELF, {"node_id": node.id})
+        return _link_subtree(connection, node.id, node.parent_id)
+
+    for node in added:
+        if not _add(node):
+            return False
+    for node in moved:
+        if not _link_subtree(connection, node.id, node.parent_id):
+            return False
+    return True
+
+
+def _changed_categories(session: Session, attrs: tuple[str, ...]) -> bool:
+    for obj in session.dirty:
+        if not isinstance(obj, Category):
+            continue
+        state = inspect(obj).attrs
+        if any(state[attr].history.has_changes() for attr in attrs):
+            return True
+    return False
+
+
+def _moved_categories(session: Session) -> list[Category]:
+    return [
+        obj
+        for obj in session.dirty
+        if isinstance(obj, Category)
+        and inspect(obj).attrs.parent_id.history.has_changes()
+    ]
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_orphans_before_flush(session: Session, _flush_context, _instances) -> None:
+    removed = [obj.id for obj in session.deleted if isinstance(obj, Category)]
+    if not removed:
+        return
+    # The FK cascade drops the deleted rows' closure entries during the flush,
+    # so their direct children are looked up beforehand.
+    children = session.connection().execute(
+        select(CategoryClosure.descendant_id).where(
+            CategoryClosure.ancestor_id.in_(removed), CategoryClosure.depth == 1
+        )
+    )
+    session.info.setdefault(_ORPHANS_KEY, []).extend(children.scalars())
+
+
+@event.listens_for(Session, "after_flush")
+def _update_closure_after_flush(session: Session, _flush_context) -> None:
+    added = [obj for obj in session.new if isinstance(obj, Category)]
+    removed = [obj.id for obj in session.deleted if isinstance(obj, Category)]
+    moved = _moved_categories(session)
+    orphans = session.info.pop(_ORPHANS_KEY, [])
+    if added or removed or moved:
+        connection = session.connection()
+        if not _apply_changes(
+            connection, added=added, moved=moved, removed=removed, orphans=orphans
+        ):
+            rebuild_closure(connection)
+        session.info[_TREE_CHANGED_KEY] = True
+    elif _changed_categories(session, ("slug", "is_visible")):
+        session.info[_TREE_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    if session.info.pop(_TREE_CHANGED_KEY, False):
+        invalidate_snapshot()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_TREE_CHANGED_KEY, None)
+    session.info.pop(_ORPHANS_KEY, None)
+
+
+def _reset_for_tests() -> None:
+    invalidate_snapshot()
@@ -6,6 +6,7 @@ from typing import Literal, cast
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.services import config_cache
 from app.services import content as content_service
 
 
@@ -104,6 +105,12 @@ def _parse_int(value: object | None, *, fallback: int) -> int:
 
 
 async def get_checkout_settings(session: AsyncSession) -> CheckoutSettings:
+    return await config_cache.get_or_load(
+        session, "checkout_settings", lambda: _load_checkout_settings(session)
+    )
+
+
+async def _load_checkout_settings(session: AsyncSession) -> CheckoutSettings:
     block = await content_service.get_published_by_key_following_redirects(
         session, "site.checkout"
     )
@@ -0,0 +1,220 @@
+"""Shared cache for checkout settings, tax rates and FX rates.
+
+A checkout or cart quote used to read the ``site.checkout`` block, the default
+tax group and the FX rows several times per request. Values are now looked up
+through two layers:
+
+* a memo in ``session.info`` for the current transaction, so each value is
+  loaded at most once per request. It is dropped whenever the session's
+  transaction ends, so long-lived sessions (workers, scripts) see later
+  changes after their next commit or rollback;
+* a per-process snapshot stamped with a *version*. Committing a change to
+  one of the watched tables (checkout settings block, content redirects, tax
+  groups/rates, FX rows) bumps the version, locally and in Redis under
+  ``config:version`` for other workers. Entries also expire after
+  ``config_cache_ttl_seconds``, which covers scheduled publish windows and
+  deployments without Redis.
+
+Writes are detected with session events rather than explicit calls, so admin
+endpoints, imports and scripts all invalidate alike. A session with pending
+watched changes bypasses the snapshot until it commits or rolls back, so
+uncommitted values never leak to other requests.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, Final, TypeVar
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import ORMExecuteState, Session, SessionTransaction
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.models.content import ContentBlock, ContentRedirect
+from app.models.fx import FxRate
+from app.models.taxes import TaxGroup, TaxRate
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+VERSION_KEY: Final[str] = "config:version"
+CHECKOUT_BLOCK_KEY: Final[str] = "site.checkout"
+_MEMO_KEY: Final[str] = "config_cache"
+_DIRTY_KEY: Final[str] = "config_cache_dirty"
+_VERSION_MEMO: Final[str] = "__version__"
+_WATCHED: Final[tuple[type, ...]] = (
+    ContentBlock,
+    ContentRedirect,
+    TaxGroup,
+    TaxRate,
+    FxRate,
+)
+
+
+@dataclass(frozen=True)
+class _Entry:
+    version: tuple[int, int]
+    expires_at: float
+    value: Any
+
+
+_local_version = 0
+_entries: dict[str, _Entry] = {}
+_pending: set[asyncio.Task[None]] = set()
+
+
+def _ttl_seconds() -> int:
+    return max(0, int(getattr(settings, "config_cache_ttl_seconds", 60) or 0))
+
+
+def _memo(session: object) -> dict[str, Any] | None:
+    info = getattr(session, "info", None)
+    if not isinstance(info, dict):
+        return None
+    return info.setdefault(_MEMO_KEY, {})
+
+
+async def _remote_version() -> int:
+    client = get_redis()
+    if client is None:
+        return 0
+    try:
+        return int(await client.get(VERSION_KEY) or 0)
+    except Exception as exc:
+        logger.warning("config_cache_version_failed", extra={"error": str(exc)})
+        return 0
+
+
+async def _version(memo: dict[str, Any]) -> tuple[int, int]:
+    version = memo.get(_VERSION_MEMO)
+    if version is None:
+        version = (await _remote_version(), _local_version)
+        memo[_VERSION_MEMO] = version
+    return version
+
+
+async def get_or_load(
+    session: object, name: str, loader: Callable[[], Awaitable[T]]
+) -> T:
+    """Return the cached value ``name``, calling ``loader`` on a miss."""
+    memo = _memo(session)
+    if memo is None:
+        return await loader()
+    if name in memo:
+        return memo[name]
+
+    info = getattr(session, "info")
+    shared = _ttl_seconds() > 0 and not info.get(_DIRTY_KEY)
+    version = await _version(memo) if shared else None
+    if shared:
+        entry = _entries.get(name)
+        if (
+            entry is not None
+            and entry.version == version
+            and entry.expires_at > time.monotonic()
+        ):
+            memo[name] = entry.value
+            return entry.value
+
+    value = await loader()
+    memo[name] = value
+    # Skip the snapshot when the load raced with an invalidation.
+    if (
+        version is not None
+        and not info.get(_DIRTY_KEY)
+        and version[1] == _local_version
+    ):
+        _entries[name] = _Entry(
+            version=version,
+            expires_at=time.monotonic() + _ttl_seconds(),
+            value=value,
+        )
+    return value
+
+
+def _bump_local() -> None:
+    global _local_version
+    _local_version += 1
+    _entries.clear()
+
+
+async def _publish() -> None:
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        await client.incr(VERSION_KEY)
+    except Exception as exc:
+        logger.warning("config_cache_bump_failed", extra={"error": str(exc)})
+
+
+def _schedule_publish() -> None:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if get_redis() is None:
+        return
+    task = loop.create_task(_publish())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def _is_watched(obj: object) -> bool:
+    if isinstance(obj, ContentBlock):
+        # Unloaded keys count as a match rather than triggering a lazy load.
+        return inspect(obj).dict.get("key", CHECKOUT_BLOCK_KEY) == CHECKOUT_BLOCK_KEY
+    return isinstance(obj, _WATCHED)
+
+
+def _mark_dirty(session: Session) -> None:
+    session.info[_DIRTY_KEY] = True
+    session.info.pop(_MEMO_KEY, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context: object) -> None:
+    for collection in (session.new, session.dirty, session.deleted):
+        if any(_is_watched(obj) for obj in collection):
+            _mark_dirty(session)
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_execute(state: ORMExecuteState) -> None:
+    if state.is_select:
+        return
+    mapper = state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, _WATCHED):
+        _mark_dirty(state.session)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    if not session.info.pop(_DIRTY_KEY, False):
+        return
+    _bump_local()
+    _schedule_publish()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session: Session, previous_transaction: object) -> None:
+    session.info.pop(_DIRTY_KEY, None)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _after_transaction_end(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_MEMO_KEY, None)
+
+
+def _reset_for_tests() -> None:
+    global _local_version
+    _local_version = 0
+    _entries.clear()
@@ -9,7 +9,7 @@ import string
 from uuid import UUID
 
 from fastapi import HTTPException, status
-from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy import and_, case, delete, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -595,18 +595,113 @@ class CouponEligibility:
     customer_remaining: int | None
 
 
-async def evaluate_coupon_for_cart(
-    session: AsyncSession,
+@dataclass(frozen=True)
+class _CouponUsage:
+    redeemed: int = 0
+    reserved: int = 0
+    user_redeemed: int = 0
+    user_reserved: int = 0
+    assigned: bool = False
+
+
+async def _load_coupon_usage(
+    session: AsyncSession, *, coupons: list[Coupon], user_id: UUID, now: datetime
+) -> dict[UUID, _CouponUsage]:
+    """Redemption/reservation counters and assignments for ``coupons`` in grouped queries."""
+    capped_ids = [c.id for c in coupons if c.global_max_redemptions is not None]
+    counted_ids = [
+        c.id
+        for c in coupons
+        if c.global_max_redemptions is not None
+        or c.per_customer_max_redemptions is not None
+    ]
+    assigned_only_ids = [
+        c.id for c in coupons if c.visibility == CouponVisibility.assigned
+    ]
+
+    redemptions: dict[UUID, tuple[int, int]] = {}
+    reservations: dict[UUID, tuple[int, int]] = {}
+    if capped_ids:
+        await session.execute(
+            delete(CouponReservation).where(
+                CouponReservation.coupon_id.in_(capped_ids),
+                CouponReservation.expires_at < now,
+            )
+        )
+    if counted_ids:
+        rows = await session.execute(
+            select(
+                CouponRedemption.coupon_id,
+                func.count(),
+                func.sum(case((CouponRedemption.user_id == user_id, 1), else_=0)),
+            )
+            .where(
+                CouponRedemption.coupon_id.in_(counted_ids),
+                CouponRedemption.voided_at.is_(None),
+            )
+            .group_by(CouponRedemption.coupon_id)
+        )
+        redemptions = {
+            coupon_id: (int(total or 0), int(own or 0))
+            for coupon_id, total, own in rows.all()
+        }
+        rows = await session.execute(
+            select(
+                CouponReservation.coupon_id,
+                func.count(),
+                func.sum(case((CouponReservation.user_id == user_id, 1), else_=0)),
+            )
+            .where(
+                CouponReservation.coupon_id.in_(counted_ids),
+                CouponReservation.expires_at >= now,
+            )
+            .group_by(CouponReservation.coupon_id)
+        )
+        reservations = {
+            coupon_id: (int(total or 0), int(own or 0))
+            for coupon_id, total, own in rows.all()
+        }
+    assigned: set[UUID] = set()
+    if assigned_only_ids:
+        assigned = set(
+            (
+                await session.execute(
+                    select(CouponAssignment.coupon_id).where(
+                        CouponAssignment.coupon_id.in_(assigned_only_ids),
+                        CouponAssignment.user_id == user_id,
+                        CouponAssignment.revoked_at.is_(None),
+                    )
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+    usage: dict[UUID, _CouponUsage] = {}
+    for coupon in coupons:
+        redeemed, user_redeemed = redemptions.get(coupon.id, (0, 0))
+        reserved, user_reserved = reservations.get(coupon.id, (0, 0))
+        usage[coupon.id] = _CouponUsage(
+            redeemed=redeemed,
+            reserved=reserved,
+            user_redeemed=user_redeemed,
+            user_reserved=user_reserved,
+            assigned=coupon.id in assigned,
+        )
+    return usage
+
+
+def _eligibility(
     *,
-    user_id: UUID,
     coupon: Coupon,
+    usage: _CouponUsage,
+    has_delivered_orders: bool,
     cart: Cart,
     checkout: CheckoutSettings,
     shipping_method_rate_flat: Decimal | None,
     shipping_method_rate_per_kg: Decimal | None,
-    user_has_delivered_orders: bool | None = None,
+    now: datetime,
 ) -> CouponEligibility:
-    now = _now()
     promotion = coupon.promotion
     reasons: list[str] = []
     reasons.extend(_promotion_reasons(promotion, now))
@@ -636,12 +731,8 @@ async def evaluate_coupon_for_cart(
         if subtotal < min_required:
             reasons.append("min_subtotal_not_met")
 
-    if getattr(promotion, "first_order_only", False):
-        has_delivered = user_has_delivered_orders
-        if has_delivered is None:
-            has_delivered = await _user_has_delivered_orders(session, user_id=user_id)
-        if has_delivered:
-            reasons.append("first_order_only")
+    if getattr(promotion, "first_order_only", False) and has_delivered_orders:
+        reasons.append("first_order_only")
 
     savings = compute_coupon_savings(
         promotion=promotion,
@@ -658,52 +749,24 @@ async def evaluate_coupon_for_cart(
         reasons.append("shipping_already_free")
 
     # Eligibility requires assignment if coupon is assigned.
-    if coupon.visibility == CouponVisibility.assigned:
-        assignment = (
-            (
-                await session.execute(
-                    select(CouponAssignment).where(
-                        CouponAssignment.coupon_id == coupon.id,
-                        CouponAssignment.user_id == user_id,
-                        CouponAssignment.revoked_at.is_(None),
-                    )
-                )
-            )
-            .scalars()
-            .first()
-        )
-        if not assignment:
-            reasons.append("not_assigned")
+    if coupon.visibility == CouponVisibility.assigned and not usage.assigned:
+        reasons.append("not_assigned")
 
     # Global and per-customer caps.
     global_remaining: int | None = None
     customer_remaining: int | None = None
 
     if coupon.global_max_redemptions is not None:
-        await session.execute(
-            delete(CouponReservation).where(
-                CouponReservation.coupon_id == coupon.id,
-                CouponReservation.expires_at < now,
-            )
+        remaining = int(coupon.global_max_redemptions) - (
+            usage.redeemed + usage.reserved
         )
-        redeemed = await _count_redemptions(session, coupon_id=coupon.id)
-        reserved = await _count_active_reservations(
-            session, coupon_id=coupon.id, now=now
-        )
-        remaining = int(coupon.global_max_redemptions) - (redeemed + reserved)
         global_remaining = max(0, remaining)
         if global_remaining <= 0:
             reasons.append("sold_out")
 
     if coupon.per_customer_max_redemptions is not None:
-        redeemed_u = await _count_user_redemptions(
-            session, coupon_id=coupon.id, user_id=user_id
-        )
-        reserved_u = await _count_user_active_reservations(
-            session, coupon_id=coupon.id, user_id=user_id, now=now
-        )
         remaining_u = int(coupon.per_customer_max_redemptions) - (
-            redeemed_u + reserved_u
+            usage.user_redeemed + usage.user_reserved
         )
         customer_remaining = max(0, remaining_u)
         if customer_remaining <= 0:
@@ -732,6 +795,70 @@ async def evaluate_coupon_for_cart(
     )
 
 
+async def evaluate_coupons_for_cart(
+    session: AsyncSession,
+    *,
+    user_id: UUID,
+    coupons: list[Coupon],
+    cart: Cart,
+    checkout: CheckoutSettings,
+    shipping_method_rate_flat: Decimal | None,
+    shipping_method_rate_per_kg: Decimal | None,
+    user_has_delivered_orders: bool | None = None,
+) -> list[CouponEligibility]:
+    """Evaluate several coupons against one cart.
+
+    Counters for the whole set come from a few grouped queries instead of
+    four per coupon; eligibility is then computed in memory.
+    """
+    if not coupons:
+        return []
+    now = _now()
+    has_delivered = user_has_delivered_orders
+    if has_delivered is None and any(
+        getattr(coupon.promotion, "first_order_only", False) for coupon in coupons
+    ):
+        has_delivered = await _user_has_delivered_orders(session, user_id=user_id)
+    usage = await _load_coupon_usage(session, coupons=coupons, user_id=user_id, now=now)
+    return [
+        _eligibility(
+            coupon=coupon,
+            usage=usage[coupon.id],
+            has_delivered_orders=bool(has_delivered),
+            cart=cart,
+            checkout=checkout,
+            shipping_method_rate_flat=shipping_method_rate_flat,
+            shipping_method_rate_per_kg=shipping_method_rate_per_kg,
+            now=now,
+        )
+        for coupon in coupons
+    ]
+
+
+async def evaluate_coupon_for_cart(
+    session: AsyncSession,
+    *,
+    user_id: UUID,
+    coupon: Coupon,
+    cart: Cart,
+    checkout: CheckoutSettings,
+    shipping_method_rate_flat: Decimal | None,
+    shipping_method_rate_per_kg: Decimal | None,
+    user_has_delivered_orders: bool | None = None,
+) -> CouponEligibility:
+    results = await evaluate_coupons_for_cart(
+        session,
+        user_id=user_id,
+        coupons=[coupon],
+        cart=cart,
+        checkout=checkout,
+        shipping_method_rate_flat=shipping_method_rate_flat,
+        shipping_method_rate_per_kg=shipping_method_rate_per_kg,
+        user_has_delivered_orders=user_has_delivered_orders,
+    )
+    return results[0]
+
+
 async def evaluate_coupons_for_user_cart(
     session: AsyncSession,
     *,
@@ -742,27 +869,15 @@ async def evaluate_coupons_for_user_cart(
     shipping_method_rate_per_kg: Decimal | None,
 ) -> list[CouponEligibility]:
     coupons = await get_user_visible_coupons(session, user_id=user.id)
-    delivered_flag: bool | None = None
-    if any(
-        getattr(getattr(coupon, "promotion", None), "first_order_only", False)
-        for coupon in coupons
-    ):
-        delivered_flag = await _user_has_delivered_orders(session, user_id=user.id)
-    results: list[CouponEligibility] = []
-    for coupon in coupons:
-        results.append(
-            await evaluate_coupon_for_cart(
-                session,
-                user_id=user.id,
-                coupon=coupon,
-                cart=cart,
-                checkout=checkout,
-                shipping_method_rate_flat=shipping_method_rate_flat,
-                shipping_method_rate_per_kg=shipping_method_rate_per_kg,
-                user_has_delivered_orders=delivered_flag,
-            )
-        )
-    return results
+    return await evaluate_coupons_for_cart(
+        session,
+        user_id=user.id,
+        coupons=coupons,
+        cart=cart,
+        checkout=checkout,
+        shipping_method_rate_flat=shipping_method_rate_flat,
+        shipping_method_rate_per_kg=shipping_method_rate_per_kg,
+    )
 
 
 async def reserve_coupon_for_order(
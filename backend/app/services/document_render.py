@@ -0,0 +1,312 @@
+"""PDF rendering for order documents (packing slips, pick lists, receipts).
+
+ReportLab layout is CPU bound and holds the GIL, so rendering in a thread still
+stalls every other request on the worker. Documents are rendered in a small
+process pool (``document_render_workers``; 0 renders in a thread instead). Each
+pool process registers the fonts and builds the paragraph styles once, in its
+initializer, and reuses them for every document.
+
+ORM objects are not sent across the process boundary as is: ``snapshot``
+copies the loaded columns and relationships into plain namespaces, which the
+renderers read through the same ``getattr`` calls. If the pool is unavailable
+or broken, or a payload cannot be pickled, the document is rendered in a
+thread; errors raised by a renderer itself propagate.
+
+Batch packing slips are split into one run of orders per pool process, rendered
+in parallel and merged into a single PDF with pypdf.
+
+Receipts are additionally cached on disk by content hash (the rendered
+``ReceiptRead`` plus locale), so downloading the same receipt again, or
+attaching it to an email, does not render it twice. Entries unused for
+``receipt_cache_ttl_days`` are pruned, at most once an hour per process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections.abc import Callable, Sequence
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Final, TypeVar
+
+import anyio.to_thread
+from pypdf import PdfReader, PdfWriter
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.exc import NoInspectionAvailable
+
+from app.core.config import settings
+from app.services import packing_slips, pick_lists, private_storage
+from app.services import receipts as receipt_service
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Bump when the receipt layout changes so cached PDFs are re-rendered.
+RECEIPT_LAYOUT_VERSION: Final[int] = 1
+_RECEIPT_CACHE_SUBDIR: Final[str] = "receipts/cache"
+_CACHE_PRUNE_INTERVAL_SECONDS: Final[float] = 3600.0
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_last_cache_prune: float | None = None
+
+
+def _warm_worker() -> None:
+    # Runs once in every pool process.
+    packing_slips._register_reportlab_fonts()
+    packing_slips._paragraph_styles()
+    pick_lists._paragraph_styles()
+    receipt_service._register_reportlab_fonts()
+    receipt_service._paragraph_styles()
+
+
+def _workers() -> int:
+    return max(0, int(getattr(settings, "document_render_workers", 0) or 0))
+
+
+def _get_pool() -> ProcessPoolExecutor | None:
+    global _pool
+    workers = _workers()
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                # The web process runs threads and an event loop; never fork it.
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _call_pickled(payload: bytes) -> Any:
+    return pickle.loads(payload)()
+
+
+async def _render(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    call = partial(func, *args, **kwargs)
+    pool = _get_pool()
+    if pool is not None:
+        try:
+            # Pickled here so that an unpicklable payload (e.g. a patched
+            # renderer) is told apart from an error raised by the renderer.
+            payload = pickle.dumps(call)
+            future = pool.submit(_call_pickled, payload)
+        except (pickle.PicklingError, TypeError, AttributeError, RuntimeError) as exc:
+            # RuntimeError: the pool was shut down under us.
+            logger.warning(
+                "document_render_pool_unavailable",
+                extra={"renderer": getattr(func, "__name__", ""), "error": str(exc)},
+            )
+        else:
+            try:
+                return await asyncio.wrap_future(future)
+            except BrokenExecutor as exc:
+                logger.warning(
+                    "document_render_pool_failed",
+                    extra={
+                        "renderer": getattr(func, "__name__", ""),
+                        "error": str(exc),
+                    },
+                )
+                shutdown_pool()
+    return await anyio.to_thread.run_sync(call)
+
+
+def merge_pdfs(parts: Sequence[bytes], *, title: str | None = None) -> bytes:
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(PdfReader(io.BytesIO(part)))
+    if title:
+        writer.add_metadata({"/Title": title})
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def _split(items: Sequence[T], parts: int) -> list[list[T]]:
+    size = -(-len(items) // max(1, parts))
+    return [list(items[i : i + size]) for i in range(0, len(items), size)]
+
+
+def snapshot(obj: Any, *, _memo: dict[int, Any] | None = None) -> Any:
+    """Picklable copy of an ORM object's loaded state; other values pass through."""
+    if obj is None:
+        return None
+    memo = {} if _memo is None else _memo
+    if id(obj) in memo:
+        return memo[id(obj)]
+    try:
+        state = sa_inspect(obj)
+    except NoInspectionAvailable:
+        return obj
+    mapper = getattr(state, "mapper", None)
+    if mapper is None:
+        return obj
+    copy = SimpleNamespace()
+    memo[id(obj)] = copy
+    loaded = state.dict
+    for attr in mapper.column_attrs:
+        if attr.key in loaded:
+            setattr(copy, attr.key, loaded[attr.key])
+    for rel in mapper.relationships:
+        if rel.key not in loaded:
+            continue
+        value = loaded[rel.key]
+        if rel.uselist:
+            value = [snapshot(item, _memo=memo) for item in value or ()]
+        else:
+            value = snapshot(value, _memo=memo)
+        setattr(copy, rel.key, value)
+    return copy
+
+
+async def render_packing_slips(
+    orders: Sequence[object], *, title: str | None = None
+) -> bytes:
+    memo: dict[int, Any] = {}
+    copies = [snapshot(order, _memo=memo) for order in orders]
+    chunks = _split(copies, _workers()) if _get_pool() is not None else [copies]
+    if len(chunks) <= 1:
+        return await _render(
+            packing_slips.render_batch_packing_slips_pdf, copies, title=title
+        )
+    parts = await asyncio.gather(
+        *(
+            _render(packing_slips.render_batch_packing_slips_pdf, chunk, title=title)
+            for chunk in chunks
+        )
+    )
+    return await _render(merge_pdfs, parts, title=title)
+
+
+async def render_packing_slip(order: object) -> bytes:
+    return await _render(packing_slips.render_packing_slip_pdf, snapshot(order))
+
+
+async def render_pick_list(
+    rows: Sequence[pick_lists.PickListRow], *, orders: Sequence[object]
+) -> bytes:
+    memo: dict[int, Any] = {}
+    return await _render(
+        pick_lists.render_pick_list_pdf,
+        list(rows),
+        orders=[snapshot(order, _memo=memo) for order in orders],
+    )
+
+
+def _receipt_cache_dir() -> Path:
+    path = private_storage.ensure_private_root() / _RECEIPT_CACHE_SUBDIR
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _read_cached(path: Path) -> bytes | None:
+    try:
+        data = path.read_bytes()
+        # The TTL counts from the last use, not from the render.
+        os.utime(path)
+    except OSError:
+        return None
+    return data
+
+
+def _store_cached(path: Path, data: bytes, prefix: str) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    for stale in path.parent.glob(f"{prefix}*.pdf"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+
+def _prune_cache(directory: Path, max_age_seconds: float) -> int:
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for entry in directory.iterdir():
+        try:
+            if entry.stat().st_mtime < cutoff:
+                entry.unlink()
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+async def _maybe_prune_cache(directory: Path) -> None:
+    global _last_cache_prune
+    days = int(getattr(settings, "receipt_cache_ttl_days", 0) or 0)
+    if days <= 0:
+        return
+    now = time.monotonic()
+    if (
+        _last_cache_prune is not None
+        and now - _last_cache_prune < _CACHE_PRUNE_INTERVAL_SECONDS
+    ):
+        return
+    _last_cache_prune = now
+    await anyio.to_thread.run_sync(_prune_cache, directory, days * 86400.0)
+
+
+async def render_receipt(
+    order: Any, items: Sequence | None = None, *, redacted: bool = False
+) -> bytes:
+    """Receipt PDF for ``order``, served from the content-hash cache when unchanged."""
+    items = list(items) if items else list(getattr(order, "items", []) or [])
+    try:
+        receipt = receipt_service.build_order_receipt(order, items, redacted=redacted)
+        locale = receipt_service._order_locale(order)
+    except Exception:
+        # Let the renderer's own fallback deal with malformed orders.
+        return await _render(
+            receipt_service.render_order_receipt_pdf,
+            snapshot(order),
+            [snapshot(item) for item in items],
+            redacted=redacted,
+        )
+
+    digest = hashlib.sha256(
+        f"{RECEIPT_LAYOUT_VERSION}:{locale}:{receipt.model_dump_json()}".encode()
+    ).hexdigest()[:32]
+    prefix = f"{receipt.order_id}.{'redacted' if redacted else 'full'}."
+    path = _receipt_cache_dir() / f"{prefix}{digest}.pdf"
+    cached = await anyio.to_thread.run_sync(_read_cached, path)
+    if cached is not None:
+        return cached
+
+    try:
+        pdf = await _render(receipt_service.render_receipt_pdf, receipt, locale=locale)
+    except Exception:
+        # Same resilience as render_order_receipt_pdf; the raster PDF is not cached.
+        return await anyio.to_thread.run_sync(
+            partial(
+                receipt_service.render_order_receipt_pdf_raster,
+                order,
+                items,
+                redacted=redacted,
+            )
+        )
+    await anyio.to_thread.run_sync(_store_cached, path, pdf, prefix)
+    await _maybe_prune_cache(path.parent)
+    return pdf
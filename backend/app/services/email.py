@@ -1,39 +1,28 @@
+import hashlib
 import logging
-import smtplib
 import html as _html
+from contextlib import suppress
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from email.message import EmailMessage
-from pathlib import Path
 from typing import Sequence
 from urllib.parse import urlencode
 
 import anyio.to_thread
 
-try:
-    import jinja2
-except ImportError:  # pragma: no cover
-    jinja2 = None  # type: ignore[assignment]
-
 from app.core.config import settings
+from app.core.redis_client import get_redis
 from app.core.security import create_receipt_token
 from app.db.session import SessionLocal
 from app.models.email_failure import EmailDeliveryFailure
 from app.models.email_event import EmailDeliveryEvent
 from app.services import receipts as receipt_service
-from app.services import newsletter_tokens
+from app.services import email_outbox, email_templates, newsletter_tokens, smtp_pool
 
 logger = logging.getLogger(__name__)
 
-TEMPLATE_PATH = Path(__file__).parent.parent / "templates" / "emails"
-env = None
-if (
-    jinja2 is not None
-):  # pragma: no branch -- jinja2 is a required dependency; the None arc is import-guard-only
-    env = jinja2.Environment(
-        loader=jinja2.FileSystemLoader(TEMPLATE_PATH),
-        autoescape=jinja2.select_autoescape(["html", "xml"]),
-    )
+TEMPLATE_PATH = email_templates.TEMPLATE_PATH
+env = email_templates.env
 _rate_global: list[float] = []
 _rate_per_recipient: dict[str, list[float]] = {}
 
@@ -113,11 +102,15 @@ async def send_email(
     attachments: Sequence[EmailAttachment] | None = None,
     headers: dict[str, str] | None = None,
 ) -> bool:
+    """Send (or, with the outbox enabled, queue) one message.
+
+    Returns ``True`` once the message was handed to the SMTP server or stored
+    in the outbox, ``False`` when email is disabled, rate limited or failed.
+    """
     if not settings.smtp_enabled:
         return False
     now = __import__("time").time()
-    _prune(now)
-    if not _allow_send(now, to_email):
+    if not await _reserve_send(now, to_email):
         logger.warning("email_rate_limited")
         return False
     msg = _build_message(
@@ -128,26 +121,23 @@ async def send_email(
         attachments=attachments,
         headers=headers,
     )
+    if email_outbox.enabled():
+        try:
+            await email_outbox.enqueue(msg)
+            return True
+        except Exception as exc:
+            # Never drop the message because the outbox is unavailable.
+            logger.warning("email_enqueue_failed", extra={"error": str(exc)})
     try:
-
-        def _send() -> None:
-            with smtplib.SMTP(
-                settings.smtp_host, settings.smtp_port, timeout=10
-            ) as smtp:
-                if settings.smtp_use_tls:
-                    smtp.starttls()
-                if settings.smtp_username and settings.smtp_password:
-                    smtp.login(settings.smtp_username, settings.smtp_password)
-                smtp.send_message(msg)
-
-        await anyio.to_thread.run_sync(_send)
-        _record_send(now, to_email)
+        await anyio.to_thread.run_sync(smtp_pool.send_message, msg)
         await _record_email_event(
             to_email=to_email, subject=subject, status="sent", error_message=None
         )
         return True
     except Exception as exc:
         logger.warning("Email send failed: %s", exc)
+        # Nothing reached the server; don't count it against the limits.
+        await _release_send(now, to_email)
         await _record_email_event(
             to_email=to_email, subject=subject, status="failed", error_message=str(exc)
         )
@@ -274,32 +264,8 @@ def render_bilingual_template(
     if env is None:
         body = f"Email template engine is not available (template={template_name})."
         return body, _html_pre(body)
-
-    body_ro_text = env.get_template(template_name).render(**{**context, "lang": "ro"})
-    body_ro_html = env.get_template(
-        template_name.replace(".txt.j2", ".html.j2")
-    ).render(**{**context, "lang": "ro"})
-    body_en_text = env.get_template(template_name).render(**{**context, "lang": "en"})
-    body_en_html = env.get_template(
-        template_name.replace(".txt.j2", ".html.j2")
-    ).render(**{**context, "lang": "en"})
-
-    text_body, html_body = _bilingual_sections(
-        text_ro=body_ro_text,
-        text_en=body_en_text,
-        html_ro=body_ro_html,
-        html_en=body_en_html,
-        preferred_language=preferred_language,
-    )
-
-    base_text = env.get_template("base.txt.j2")
-    base_html = env.get_template("base.html.j2")
-    unsubscribe_url = context.get("unsubscribe_url")
-    if not isinstance(unsubscribe_url, str) or not unsubscribe_url.strip():
-        unsubscribe_url = None
-    return (
-        base_text.render(body=text_body, unsubscribe_url=unsubscribe_url),
-        base_html.render(body=html_body or "", unsubscribe_url=unsubscribe_url),
+    return email_templates.render_bilingual(
+        template_name, context, languages=_lang_order(preferred_language)
     )
 
 
@@ -1778,13 +1744,7 @@ def render_template(template_name: str, context: dict) -> tuple[str, str]:
     if env is None:
         body = f"Email template engine is not available (template={template_name})."
         return body, _html_pre(body)
-    base_text = env.get_template("base.txt.j2")
-    base_html = env.get_template("base.html.j2")
-    body_text = env.get_template(template_name).render(**context)
-    body_html = env.get_template(template_name.replace(".txt.j2", ".html.j2")).render(
-        **context
-    )
-    return base_text.render(body=body_text), base_html.render(body=body_html)
+    return email_templates.render(template_name, context)
 
 
 async def preview_email(template_name: str, context: dict) -> dict[str, str]:
@@ -1965,3 +1925,72 @@ def _allow_send(now: float, recipient: str) -> bool:
 def _record_send(now: float, recipient: str) -> None:
     _rate_global.append(now)
     _rate_per_recipient.setdefault(recipient, []).append(now)
+
+
+def _rate_limits(now: float, recipient: str) -> tuple[tuple[str, int], ...]:
+    window = int(now) // 60
+    # Recipients are hashed so addresses never end up in Redis keys.
+    recipient_key = hashlib.sha256(recipient.strip().lower().encode()).hexdigest()[:24]
+    return (
+        (f"email_rate:global:{window}", settings.email_rate_limit_per_minute),
+        (
+            f"email_rate:rcpt:{recipient_key}:{window}",
+            settings.email_rate_limit_per_recipient_per_minute,
+        ),
+    )
+
+
+async def _reserve_send_redis(now: float, recipient: str) -> bool | None:
+    """Count the send against the shared per-minute limits; ``None`` without Redis."""
+    client = get_redis()
+    if client is None:
+        return None
+    limits = _rate_limits(now, recipient)
+    try:
+        allowed = True
+        for key, limit in limits:
+            if not limit:
+                continue
+            count = await client.incr(key)
+            if int(count) == 1:
+                await client.expire(key, 120)
+            if int(count) > int(limit):
+                allowed = False
+        return allowed
+    except Exception as exc:
+        logger.warning("email_rate_limit_redis_failed", extra={"error": str(exc)})
+        return None
+
+
+async def _reserve_send(now: float, recipient: str) -> bool:
+    """Check and record one send: shared across processes via Redis when configured."""
+    allowed = await _reserve_send_redis(now, recipient)
+    if allowed is not None:
+        return allowed
+    _prune(now)
+    if not _allow_send(now, recipient):
+        return False
+    _record_send(now, recipient)
+    return True
+
+
+async def _release_send(now: float, recipient: str) -> None:
+    """Give back a send reserved by ``_reserve_send`` that never went out."""
+    client = get_redis()
+    if client is not None:
+        try:
+            for key, limit in _rate_limits(now, recipient):
+                if limit:
+                    await client.decr(key)
+            return
+        except Exception as exc:
+            logger.warning("email_rate_limit_redis_failed", extra={"error": str(exc)})
+            return
+    with suppress(ValueError):
+        _rate_global.remove(now)
+    sends = _rate_per_recipient.get(recipient)
+    if sends:
+        with suppress(ValueError):
+            sends.remove(now)
+        if not sends:
+            _rate_per_recipient.pop(recipient, None)
@@ -0,0 +1,226 @@
+"""Durable outbound email queue.
+
+With ``email_queue_enabled`` set, ``email.send_email`` stores the finished
+message in ``email_outbox`` and returns immediately. The request handler only
+pays for one INSERT instead of an SMTP session. Every API process runs a
+worker (``start``/``stop``). It claims due rows with ``FOR UPDATE SKIP
+LOCKED`` and leases them for ``_LEASE_SECONDS``, so a crashed worker's rows
+are retried later. Each claimed batch is delivered over pooled connections
+(``smtp_pool``).
+
+Failed deliveries are retried with exponential backoff until
+``email_queue_max_attempts``. After that the row is kept with status
+``failed`` and a delivery failure is recorded. Workers poll every
+``email_queue_poll_seconds``, and are woken earlier through
+``queue_worker.Wakeup`` (a Redis list for any process, or an in-process event).
+
+Fan-outs wrap their sends in ``collect()`` so all their messages are inserted
+in one transaction.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from email import message_from_bytes, policy as email_policy
+from email.message import EmailMessage
+from typing import Final
+
+import anyio.to_thread
+from fastapi import FastAPI
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.email_event import EmailDeliveryEvent
+from app.models.email_failure import EmailDeliveryFailure
+from app.models.email_outbox import EmailOutboxMessage
+from app.services import queue_worker, smtp_pool
+
+logger = logging.getLogger(__name__)
+
+WAKEUP_KEY: Final[str] = "email:outbox:wakeup"
+_LEASE_SECONDS: Final[int] = 300
+_DRAIN_SECONDS: Final[float] = 10.0
+
+_wakeup = queue_worker.Wakeup(WAKEUP_KEY, name="email_outbox")
+_buffer: ContextVar[list[EmailOutboxMessage] | None] = ContextVar(
+    "email_outbox_buffer", default=None
+)
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "email_queue_enabled", False))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def enqueue(msg: EmailMessage) -> None:
+    row = EmailOutboxMessage(
+        to_email=str(msg["To"] or "")[:255],
+        subject=str(msg["Subject"] or "")[:255],
+        message=msg.as_bytes(),
+        status="queued",
+        attempts=0,
+        next_attempt_at=_now(),
+    )
+    buffered = _buffer.get()
+    if buffered is not None:
+        buffered.append(row)
+        return
+    await _insert([row])
+
+
+@asynccontextmanager
+async def collect() -> AsyncIterator[None]:
+    """Buffer ``enqueue`` calls and insert them together on exit."""
+    if _buffer.get() is not None:
+        yield
+        return
+    rows: list[EmailOutboxMessage] = []
+    token = _buffer.set(rows)
+    try:
+        yield
+    finally:
+        _buffer.reset(token)
+        if rows:
+            try:
+                await _insert(rows)
+            except Exception as exc:
+                logger.warning("email_enqueue_failed", extra={"error": str(exc)})
+                await _deliver_inline(rows)
+
+
+async def _insert(rows: list[EmailOutboxMessage]) -> None:
+    async with SessionLocal() as session:
+        session.add_all(rows)
+        await session.commit()
+    await _notify()
+
+
+async def _deliver_inline(rows: list[EmailOutboxMessage]) -> None:
+    messages = [_parse(row) for row in rows]
+    results = await anyio.to_thread.run_sync(smtp_pool.send_messages, messages)
+    failed = sum(1 for error in results if error is not None)
+    if failed:
+        logger.warning(
+            "email_outbox_delivery_failed",
+            extra={"failed": failed, "batch": len(rows)},
+        )
+
+
+def _parse(row: EmailOutboxMessage) -> EmailMessage:
+    return message_from_bytes(row.message, policy=email_policy.default)  # type: ignore[return-value]
+
+
+async def _notify() -> None:
+    await _wakeup.notify()
+
+
+def _backoff(attempts: int) -> timedelta:
+    return queue_worker.backoff(
+        attempts,
+        base_seconds=int(getattr(settings, "email_queue_retry_base_seconds", 30) or 30),
+    )
+
+
+async def process_batch() -> int:
+    """Claim due messages and deliver them; returns how many were attempted."""
+    limit = max(1, int(getattr(settings, "email_queue_batch_size", 50) or 50))
+    max_attempts = max(1, int(getattr(settings, "email_queue_max_attempts", 6) or 6))
+    now = _now()
+    async with SessionLocal() as session:
+        rows = list(
+            (
+                await session.execute(
+                    select(EmailOutboxMessage)
+                    .where(
+                        EmailOutboxMessage.status == "queued",
+                        EmailOutboxMessage.next_attempt_at <= now,
+                    )
+                    .order_by(EmailOutboxMessage.next_attempt_at)
+                    .limit(limit)
+                    .with_for_update(skip_locked=True)
+                )
+            )
+            .scalars()
+            .all()
+        )
+        if not rows:
+            return 0
+        for row in rows:
+            row.attempts = int(row.attempts or 0) + 1
+            row.next_attempt_at = now + timedelta(seconds=_LEASE_SECONDS)
+        await session.commit()
+
+        messages = [_parse(row) for row in rows]
+        results = await anyio.to_thread.run_sync(smtp_pool.send_messages, messages)
+
+        retry_at = _now()
+        for row, error in zip(rows, results):
+            if error is None:
+                session.add(
+                    EmailDeliveryEvent(
+                        to_email=row.to_email, subject=row.subject, status="sent"
+                    )
+                )
+                await session.delete(row)
+                continue
+            row.last_error = str(error)[:5000]
+            if row.attempts < max_attempts:
+                row.next_attempt_at = retry_at + _backoff(row.attempts)
+                continue
+            row.status = "failed"
+            session.add(
+                EmailDeliveryEvent(
+                    to_email=row.to_email,
+                    subject=row.subject,
+                    status="failed",
+                    error_message=row.last_error,
+                )
+            )
+            session.add(
+                EmailDeliveryFailure(
+                    to_email=row.to_email,
+                    subject=row.subject,
+                    error_message=row.last_error,
+                )
+            )
+        await session.commit()
+    failed = sum(1 for error in results if error is not None)
+    if failed:
+        logger.warning(
+            "email_outbox_delivery_failed",
+            extra={"failed": failed, "batch": len(rows)},
+        )
+    return len(rows)
+
+
+async def _loop(stop: asyncio.Event) -> None:
+    poll = max(0.5, float(getattr(settings, "email_queue_poll_seconds", 2.0) or 2.0))
+    await queue_worker.run_batches(
+        stop,
+        name="email_outbox",
+        process_batch=process_batch,
+        wakeup=_wakeup,
+        poll_seconds=poll,
+    )
+
+
+def start(app: FastAPI) -> None:
+    if not enabled() or not settings.smtp_enabled:
+        return
+    queue_worker.start(app, "email_outbox", _loop, wakeup=_wakeup)
+
+
+async def stop(app: FastAPI) -> None:
+    await queue_worker.stop(
+        app, "email_outbox", wakeup=_wakeup, drain_seconds=_DRAIN_SECONDS
+    )
+    smtp_pool.shutdown()
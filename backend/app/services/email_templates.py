@@ -0,0 +1,103 @@
+"""Compiled email templates.
+
+All templates under ``templates/emails`` are compiled once (``preload`` runs at
+startup) and kept in an unbounded template cache. Outside local development
+``auto_reload`` is off, so rendering never stats the template files.
+
+A message renders in one pass per format. The ``layouts/*`` templates extend
+``base.*.j2`` and include the body template, once for a single language or
+once per language for bilingual messages. Previously the body and the base
+were rendered separately, and bilingual bodies once per language.
+
+Each render is timed into ``app.core.metrics`` under
+``email_template:<name>`` (``_count``, ``_ms_total``, ``_ms_max``).
+"""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Any, Final
+
+try:
+    import jinja2
+except ImportError:  # pragma: no cover
+    jinja2 = None  # type: ignore[assignment]
+
+from app.core import metrics
+from app.core.config import settings
+
+TEMPLATE_PATH: Final[Path] = Path(__file__).parent.parent / "templates" / "emails"
+LANGUAGE_LABELS: Final[dict[str, str]] = {"ro": "Română", "en": "English"}
+
+
+def _auto_reload() -> bool:
+    environment = str(getattr(settings, "environment", "") or "").strip().lower()
+    return environment in {"local", "development", "dev"}
+
+
+env = None
+if jinja2 is not None:  # pragma: no branch -- jinja2 is a required dependency
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATE_PATH),
+        autoescape=jinja2.select_autoescape(["html", "xml"]),
+        auto_reload=_auto_reload(),
+        cache_size=-1,
+    )
+
+
+def preload() -> int:
+    """Compile every email template; returns how many were loaded."""
+    if env is None:
+        return 0
+    names = env.list_templates(extensions=["j2"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def html_name(template_name: str) -> str:
+    return template_name.replace(".txt.j2", ".html.j2")
+
+
+def _render(
+    template_name: str, layout: str, context: dict[str, Any]
+) -> tuple[str, str]:
+    assert env is not None
+    started = time.perf_counter()
+    context = {
+        **context,
+        "email_body_template": template_name,
+        "email_html_template": html_name(template_name),
+    }
+    text = env.get_template(f"layouts/{layout}.txt.j2").render(context)
+    html = env.get_template(f"layouts/{layout}.html.j2").render(context)
+    metrics.record_timing(
+        f"email_template:{template_name}", time.perf_counter() - started
+    )
+    return text, html
+
+
+def render(template_name: str, context: dict[str, Any]) -> tuple[str, str]:
+    """Text and HTML bodies of a single-language template inside the base layout."""
+    # The base only shows the unsubscribe footer for bilingual messages.
+    return _render(template_name, "single", {**context, "unsubscribe_url": None})
+
+
+def render_bilingual(
+    template_name: str, context: dict[str, Any], *, languages: tuple[str, str]
+) -> tuple[str, str]:
+    """Text and HTML bodies with one section per language, in ``languages`` order."""
+    unsubscribe_url = context.get("unsubscribe_url")
+    if not isinstance(unsubscribe_url, str) or not unsubscribe_url.strip():
+        unsubscribe_url = None
+    return _render(
+        template_name,
+        "bilingual",
+        {
+            **context,
+            "unsubscribe_url": unsubscribe_url,
+            "email_languages": languages,
+            "email_labels": LANGUAGE_LABELS,
+        },
+    )
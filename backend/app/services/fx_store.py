@@ -14,7 +14,7 @@ from sqlalchemy.future import select
 
 from app.models.fx import FxOverrideAuditLog, FxRate
 from app.schemas.fx import FxAdminStatus, FxOverrideUpsert, FxRatesRead
-from app.services import fx_rates
+from app.services import config_cache, fx_rates
 
 logger = logging.getLogger(__name__)
 
@@ -142,14 +142,22 @@ async def _log_override_audit(
     await session.commit()
 
 
-async def get_effective_rates(session: AsyncSession) -> FxRatesRead:
+async def _load_stored_rates(session: AsyncSession) -> FxRatesRead | None:
     override = await _get_row(session, is_override=True)
     if override:
         return _row_to_read(override)
-
     last_known = await _get_row(session, is_override=False)
     if last_known:
         return _row_to_read(last_known)
+    return None
+
+
+async def get_effective_rates(session: AsyncSession) -> FxRatesRead:
+    stored = await config_cache.get_or_load(
+        session, "fx_rates", lambda: _load_stored_rates(session)
+    )
+    if stored is not None:
+        return stored
 
     try:
         live = await fx_rates.get_fx_rates()
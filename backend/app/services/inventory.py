@@ -1,19 +1,17 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from typing import Any
 from uuid import UUID
 
 from fastapi import HTTPException, status
-from sqlalchemy import case, func, select
+from sqlalchemy import and_, case, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from app.core.config import settings
 from app.models.cart import Cart, CartItem
-from app.models.catalog import Category, Product, ProductVariant, RestockNote
+from app.models.catalog import Product, ProductVariant, RestockNote
 from app.models.order import Order, OrderItem, OrderStatus
+from app.models.stock_level import StockLevel
 from app.models.user import User
 from app.schemas.admin_common import AdminPaginationMeta
 from app.schemas.inventory import (
@@ -22,81 +20,13 @@ from app.schemas.inventory import (
     RestockNoteRead,
     RestockNoteUpsert,
 )
+from app.services import stock_levels
 
 
-DEFAULT_CART_RESERVATION_WINDOW_MINUTES = 120
-
-
-@dataclass(frozen=True)
-class _ReservedKey:
-    product_id: UUID
-    variant_id: UUID | None
-
-
-def _cart_reservation_cutoff(now: datetime) -> datetime:
-    minutes = (
-        getattr(
-            settings,
-            "cart_reservation_window_minutes",
-            DEFAULT_CART_RESERVATION_WINDOW_MINUTES,
-        )
-        or DEFAULT_CART_RESERVATION_WINDOW_MINUTES
-    )
-    minutes_int = int(minutes)
-    if minutes_int <= 0:
-        minutes_int = DEFAULT_CART_RESERVATION_WINDOW_MINUTES
-    return now - timedelta(minutes=minutes_int)
-
-
-async def _reserved_in_active_carts(
-    session: AsyncSession, cutoff: datetime
-) -> dict[_ReservedKey, int]:
-    stmt = (
-        select(
-            CartItem.product_id,
-            CartItem.variant_id,
-            func.coalesce(func.sum(CartItem.quantity), 0).label("qty"),
-        )
-        .select_from(CartItem)
-        .join(Cart, Cart.id == CartItem.cart_id)
-        .where(Cart.updated_at >= cutoff)
-        .group_by(CartItem.product_id, CartItem.variant_id)
-    )
-    rows = (await session.execute(stmt)).all()
-    return {
-        _ReservedKey(product_id=row[0], variant_id=row[1]): int(row[2] or 0)
-        for row in rows
-    }
-
-
-async def _reserved_in_open_orders(session: AsyncSession) -> dict[_ReservedKey, int]:
-    open_statuses = {
-        OrderStatus.pending_payment,
-        OrderStatus.pending_acceptance,
-    }
-    reserved_expr = case(
-        (
-            OrderItem.quantity > OrderItem.shipped_quantity,
-            OrderItem.quantity - OrderItem.shipped_quantity,
-        ),
-        else_=0,
-    )
-    stmt = (
-        select(
-            OrderItem.product_id,
-            OrderItem.variant_id,
-            func.coalesce(func.sum(reserved_expr), 0).label("qty"),
-        )
-        .select_from(OrderItem)
-        .join(Order, Order.id == OrderItem.order_id)
-        .where(Order.status.in_(open_statuses))
-        .group_by(OrderItem.product_id, OrderItem.variant_id)
-    )
-    rows = (await session.execute(stmt)).all()
-    return {
-        _ReservedKey(product_id=row[0], variant_id=row[1]): int(row[2] or 0)
-        for row in rows
-    }
+DEFAULT_CART_RESERVATION_WINDOW_MINUTES = (
+    stock_levels.DEFAULT_CART_RESERVATION_WINDOW_MINUTES
+)
+_cart_reservation_cutoff = stock_levels.cart_reservation_cutoff
 
 
 async def list_cart_reservations(
@@ -290,147 +220,87 @@ async def upsert_restock_note(
     return RestockNoteRead.model_validate(existing)
 
 
+def _note_present(note: RestockNote | None) -> bool:
+    return bool(
+        note
+        and (
+            (note.note or "").strip()
+            or (note.supplier or "").strip()
+            or (note.desired_quantity is not None)
+        )
+    )
+
+
 async def list_restock_list(
     session: AsyncSession,
     *,
     include_variants: bool = True,
     default_threshold: int = 5,
 ) -> list[RestockListItem]:
-    now = datetime.now(timezone.utc)
-    cutoff = _cart_reservation_cutoff(now)
-
-    reserved_carts = await _reserved_in_active_carts(session, cutoff)
-    reserved_orders = await _reserved_in_open_orders(session)
-
     notes = (await session.execute(select(RestockNote))).scalars().all()
     notes_by_key = {n.target_key: n for n in notes}
-
-    products = (
-        (
-            await session.execute(
-                select(Product)
-                .options(selectinload(Product.variants), selectinload(Product.category))
-                .where(Product.is_deleted.is_(False), Product.is_active.is_(True))
-            )
+    noted_items = [
+        n.variant_id if n.variant_id is not None else n.product_id
+        for n in notes
+        if _note_present(n)
+    ]
+
+    threshold_expr = func.coalesce(
+        func.nullif(StockLevel.threshold, 0), default_threshold
+    )
+    ceiling = await stock_levels.threshold_ceiling(session, default_threshold)
+    is_low = and_(StockLevel.available < ceiling, StockLevel.available < threshold_expr)
+    stmt = (
+        select(StockLevel, Product, ProductVariant.name, threshold_expr)
+        .join(Product, Product.id == StockLevel.product_id)
+        .outerjoin(ProductVariant, ProductVariant.id == StockLevel.variant_id)
+        .where(
+            Product.is_deleted.is_(False),
+            Product.is_active.is_(True),
+            or_(is_low, StockLevel.item_id.in_(noted_items)) if noted_items else is_low,
         )
-        .scalars()
-        .all()
     )
+    if not include_variants:
+        stmt = stmt.where(StockLevel.variant_id.is_(None))
 
     rows: list[RestockListItem] = []
-    for product in products:
-        category: Category = product.category
-        threshold = int(
-            (
-                product.low_stock_threshold
-                if product.low_stock_threshold is not None
-                else category.low_stock_threshold
-            )
-            or default_threshold
-        )
-        product_key = _ReservedKey(product_id=product.id, variant_id=None)
-        carts_qty = int(reserved_carts.get(product_key, 0))
-        orders_qty = int(reserved_orders.get(product_key, 0))
-        available = int(product.stock_quantity) - carts_qty - orders_qty
-
-        note_record = notes_by_key.get(_note_key(product.id, None))
-        note_present = bool(
-            note_record
-            and (
-                (note_record.note or "").strip()
-                or (note_record.supplier or "").strip()
-                or (note_record.desired_quantity is not None)
-            )
-        )
-        is_low = available < threshold
-        if is_low or note_present:
-            is_critical = bool(available <= 0 or available < max(1, threshold // 2))
-            rows.append(
-                RestockListItem(
-                    kind="product",
-                    product_id=product.id,
-                    variant_id=None,
-                    sku=product.sku,
-                    product_slug=product.slug,
-                    product_name=product.name,
-                    variant_name=None,
-                    stock_quantity=int(product.stock_quantity),
-                    reserved_in_carts=carts_qty,
-                    reserved_in_orders=orders_qty,
-                    available_quantity=available,
-                    threshold=threshold,
-                    is_critical=is_critical,
-                    restock_at=product.restock_at,
-                    supplier=(
-                        getattr(note_record, "supplier", None) if note_record else None
-                    ),
-                    desired_quantity=(
-                        getattr(note_record, "desired_quantity", None)
-                        if note_record
-                        else None
-                    ),
-                    note=getattr(note_record, "note", None) if note_record else None,
-                    note_updated_at=(
-                        getattr(note_record, "updated_at", None)
-                        if note_record
-                        else None
-                    ),
-                )
-            )
-
-        if not include_variants:
+    for level, product, variant_name, threshold in (await session.execute(stmt)).all():
+        threshold = int(threshold)
+        available = int(level.available)
+        note_record = notes_by_key.get(_note_key(product.id, level.variant_id))
+        if not (available < threshold or _note_present(note_record)):
             continue
-        for variant in product.variants:
-            variant_key = _ReservedKey(product_id=product.id, variant_id=variant.id)
-            carts_qty = int(reserved_carts.get(variant_key, 0))
-            orders_qty = int(reserved_orders.get(variant_key, 0))
-            available = int(variant.stock_quantity) - carts_qty - orders_qty
-
-            note_record = notes_by_key.get(_note_key(product.id, variant.id))
-            note_present = bool(
-                note_record
-                and (
-                    (note_record.note or "").strip()
-                    or (note_record.supplier or "").strip()
-                    or (note_record.desired_quantity is not None)
-                )
-            )
-            is_low = available < threshold
-            if not (is_low or note_present):
-                continue
-            is_critical = bool(available <= 0 or available < max(1, threshold // 2))
-            rows.append(
-                RestockListItem(
-                    kind="variant",
-                    product_id=product.id,
-                    variant_id=variant.id,
-                    sku=product.sku,
-                    product_slug=product.slug,
-                    product_name=product.name,
-                    variant_name=variant.name,
-                    stock_quantity=int(variant.stock_quantity),
-                    reserved_in_carts=carts_qty,
-                    reserved_in_orders=orders_qty,
-                    available_quantity=available,
-                    threshold=threshold,
-                    is_critical=is_critical,
-                    restock_at=product.restock_at,
-                    supplier=(
-                        getattr(note_record, "supplier", None) if note_record else None
-                    ),
-                    desired_quantity=(
-                        getattr(note_record, "desired_quantity", None)
-                        if note_record
-                        else None
-                    ),
-                    note=getattr(note_record, "note", None) if note_record else None,
-                    note_updated_at=(
-                        getattr(note_record, "updated_at", None)
-                        if note_record
-                        else None
-                    ),
-                )
+        is_critical = bool(available <= 0 or available < max(1, threshold // 2))
+        rows.append(
+            RestockListItem(
+                kind="variant" if level.variant_id is not None else "product",
+                product_id=product.id,
+                variant_id=level.variant_id,
+                sku=product.sku,
+                product_slug=product.slug,
+                product_name=product.name,
+                variant_name=variant_name,
+                stock_quantity=int(level.on_hand),
+                reserved_in_carts=int(level.reserved_in_carts),
+                reserved_in_orders=int(level.reserved_in_orders),
+                available_quantity=available,
+                threshold=threshold,
+                is_critical=is_critical,
+                restock_at=product.restock_at,
+                supplier=(
+                    getattr(note_record, "supplier", None) if note_record else None
+                ),
+                desired_quantity=(
+                    getattr(note_record, "desired_quantity", None)
+                    if note_record
+                    else None
+                ),
+                note=getattr(note_record, "note", None) if note_record else None,
+                note_updated_at=(
+                    getattr(note_record, "updated_at", None) if note_record else None
+                ),
             )
+        )
 
     rows.sort(
         key=lambda r: (
@@ -0,0 +1,126 @@
+"""Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort name and the sort-key
+values of the last row of the previous page. The next page continues strictly
+after that row, so deep pages cost the same as the first one (given an index
+matching the sort) instead of scanning and discarding ``OFFSET`` rows.
+
+Every keyset ordering ends with the primary key, which makes it total: rows
+sharing the leading sort values are still visited exactly once.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Literal, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, tuple_
+from sqlalchemy.orm import QueryableAttribute
+from sqlalchemy.sql import ColumnElement
+
+KeyKind = Literal["datetime", "decimal", "uuid", "str", "int"]
+
+_DECODERS: dict[str, Callable[[str], Any]] = {
+    "datetime": datetime.fromisoformat,
+    "decimal": Decimal,
+    "uuid": uuid.UUID,
+    "str": str,
+    "int": int,
+}
+
+
+@dataclass(frozen=True)
+class KeysetColumn:
+    expr: ColumnElement[Any] | QueryableAttribute[Any]
+    kind: KeyKind
+    descending: bool = False
+
+    def order_by(self) -> ColumnElement[Any]:
+        return self.expr.desc() if self.descending else self.expr.asc()
+
+
+def invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor"
+    )
+
+
+def _encode_value(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    payload = json.dumps(
+        {"s": sort, "k": [_encode_value(value) for value in values]},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, *, sort: str, columns: Sequence[KeysetColumn]
+) -> list[Any]:
+    """Return the typed key values, or raise 400 for a foreign/garbled cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        raw_values = payload["k"]
+        if payload.get("s") != sort or len(raw_values) != len(columns):
+            raise invalid_cursor()
+        return [
+            _DECODERS[column.kind](raw)
+            for column, raw in zip(columns, raw_values, strict=True)
+        ]
+    except HTTPException:
+        raise
+    except (
+        binascii.Error,
+        InvalidOperation,
+        KeyError,
+        TypeError,
+        UnicodeError,
+        ValueError,
+    ):
+        raise invalid_cursor() from None
+
+
+def after_clause(
+    columns: Sequence[KeysetColumn], values: Sequence[Any]
+) -> ColumnElement[bool]:
+    """Rows strictly after ``values`` in the ``columns`` ordering.
+
+    When every column sorts the same way this is a row-value comparison,
+    ``(a, b) > (x, y)``, which PostgreSQL turns into a single range scan of a
+    matching composite index. Mixed ASC/DESC orderings have no row-value form,
+    so they expand to ``(a > x) OR (a = x AND b > y) OR ...`` and are ANDed
+    with the bound ``a >= x`` to keep the planner on an index range over the
+    leading column instead of a full scan.
+    """
+    if len({column.descending for column in columns}) == 1:
+        row = tuple_(*(column.expr for column in columns))
+        bound = tuple(values)
+        return row < bound if columns[0].descending else row > bound
+    branches: list[ColumnElement[bool]] = []
+    for idx, column in enumerate(columns):
+        equal_prefix = [
+            prev.expr == value for prev, value in zip(columns[:idx], values[:idx])
+        ]
+        value = values[idx]
+        step = column.expr < value if column.descending else column.expr > value
+        branches.append(and_(*equal_prefix, step))
+    lead = columns[0]
+    lead_bound = lead.expr <= values[0] if lead.descending else lead.expr >= values[0]
+    return and_(lead_bound, or_(*branches))
+
+
+def order_by(columns: Sequence[KeysetColumn]) -> list[ColumnElement[Any]]:
+    return [column.order_by() for column in columns]
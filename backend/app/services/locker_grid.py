@@ -0,0 +1,158 @@
+"""In-process spatial grid over the active Sameday locker mirror.
+
+Checkout locker pickers ask for "the nearest N lockers around a point" on every
+map move. Instead of a bounding box query per request, the active mirror rows
+are bucketed into ``CELL_DEGREES`` x ``CELL_DEGREES`` cells once per process;
+a lookup only visits the cells overlapping the search radius and computes the
+distance for the lockers inside them.
+
+The grid is rebuilt right after a successful ``sync_now`` and, for other
+workers (or rows written outside a sync), whenever the mirror fingerprint
+(active row count + latest ``updated_at``) changes. The fingerprint is checked
+at most every ``_CHECK_INTERVAL_SECONDS``. An empty grid is never kept, so the
+first lookup after the mirror is populated always sees the data.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import time
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Final, NamedTuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.shipping_locker import ShippingLockerMirror, ShippingLockerProvider
+
+CELL_DEGREES: Final[float] = 0.1
+_CHECK_INTERVAL_SECONDS: Final[float] = 30.0
+_EARTH_RADIUS_KM: Final[float] = 6371.0
+
+Fingerprint = tuple[int, datetime | None]
+
+
+class GridLocker(NamedTuple):
+    lat: float
+    lng: float
+    external_id: str
+    name: str
+    address: str | None
+    city: str | None
+
+
+@dataclass(frozen=True)
+class LockerGrid:
+    fingerprint: Fingerprint
+    checked_at: float
+    cells: dict[tuple[int, int], tuple[GridLocker, ...]]
+    size: int
+
+    def nearest(
+        self, *, lat: float, lng: float, radius_km: float, limit: int
+    ) -> list[tuple[float, GridLocker]]:
+        """Up to ``limit`` lockers within ``radius_km``, closest first."""
+        lat_delta = radius_km / 111.0
+        lng_delta = radius_km / (111.0 * max(0.1, abs(math.cos(math.radians(lat)))))
+        lat_lo, lat_hi = _cell(lat - lat_delta), _cell(lat + lat_delta)
+        lng_lo, lng_hi = _cell(lng - lng_delta), _cell(lng + lng_delta)
+        lat_rad = math.radians(lat)
+        cos_lat = math.cos(lat_rad)
+        hits: list[tuple[float, str, GridLocker]] = []
+        for lat_cell in range(lat_lo, lat_hi + 1):
+            for lng_cell in range(lng_lo, lng_hi + 1):
+                for locker in self.cells.get((lat_cell, lng_cell), ()):
+                    distance = _haversine_km(lat_rad, cos_lat, lng, locker)
+                    if distance <= radius_km:
+                        hits.append((distance, locker.name.lower(), locker))
+        best = heapq.nsmallest(limit, hits, key=lambda hit: (hit[0], hit[1]))
+        return [(distance, locker) for distance, _, locker in best]
+
+
+_grid: LockerGrid | None = None
+
+
+def _cell(value: float) -> int:
+    return math.floor(value / CELL_DEGREES)
+
+
+def _haversine_km(
+    lat_rad: float, cos_lat: float, lng: float, locker: GridLocker
+) -> float:
+    other_lat = math.radians(locker.lat)
+    a = (
+        math.sin((other_lat - lat_rad) / 2) ** 2
+        + cos_lat
+        * math.cos(other_lat)
+        * math.sin(math.radians(locker.lng - lng) / 2) ** 2
+    )
+    return 2 * _EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def _active_filter():
+    return (
+        ShippingLockerMirror.provider == ShippingLockerProvider.sameday,
+        ShippingLockerMirror.is_active.is_(True),
+    )
+
+
+async def _fingerprint(session: AsyncSession) -> Fingerprint:
+    count, latest = (
+        await session.execute(
+            select(func.count(), func.max(ShippingLockerMirror.updated_at)).where(
+                *_active_filter()
+            )
+        )
+    ).one()
+    return int(count or 0), latest
+
+
+async def rebuild(session: AsyncSession) -> LockerGrid:
+    """Load the active mirror into a fresh grid and make it current."""
+    global _grid
+    fingerprint = await _fingerprint(session)
+    rows = (
+        await session.execute(
+            select(
+                ShippingLockerMirror.lat,
+                ShippingLockerMirror.lng,
+                ShippingLockerMirror.external_id,
+                ShippingLockerMirror.name,
+                ShippingLockerMirror.address,
+                ShippingLockerMirror.city,
+            ).where(*_active_filter())
+        )
+    ).all()
+    buckets: dict[tuple[int, int], list[GridLocker]] = defaultdict(list)
+    for lat, lng, external_id, name, address, city in rows:
+        locker = GridLocker(float(lat), float(lng), external_id, name, address, city)
+        buckets[(_cell(locker.lat), _cell(locker.lng))].append(locker)
+    grid = LockerGrid(
+        fingerprint=fingerprint,
+        checked_at=time.monotonic(),
+        cells={key: tuple(items) for key, items in buckets.items()},
+        size=len(rows),
+    )
+    _grid = grid if grid.size else None
+    return grid
+
+
+async def get_grid(session: AsyncSession) -> LockerGrid:
+    """Current grid, revalidated against the mirror at most every check interval."""
+    global _grid
+    grid = _grid
+    now = time.monotonic()
+    if grid is not None and now - grid.checked_at < _CHECK_INTERVAL_SECONDS:
+        return grid
+    if grid is not None and await _fingerprint(session) == grid.fingerprint:
+        _grid = replace(grid, checked_at=now)
+        return _grid
+    return await rebuild(session)
+
+
+def _reset_for_tests() -> None:
+    global _grid
+    _grid = None
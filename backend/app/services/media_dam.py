@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import hmac
 import inspect
@@ -9,7 +10,8 @@ import mimetypes
 import random
 import re
 import shutil
-from collections.abc import Awaitable, Iterable
+from collections.abc import Awaitable, Callable, Iterable
+from concurrent.futures import Executor
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
@@ -17,7 +19,7 @@ from typing import Any, Literal, TypeVar, cast
 from uuid import UUID, uuid4
 
 import anyio.to_thread
-from PIL import Image
+from PIL import Image, features
 from sqlalchemy import String, and_, delete, func, or_, select
 from sqlalchemy.exc import MissingGreenlet
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -76,6 +78,8 @@ from app.schemas.media import (
     MediaVariantRead,
 )
 from app.services import content as content_service
+from app.services import keyset
+from app.services import media_usage
 from app.services import private_storage
 from app.services import storage
 
@@ -155,9 +159,32 @@ PROFILE_DIMENSIONS: dict[str, tuple[int, int]] = {
     "web-1280": (1280, 1280),
     "social-1200": (1200, 1200),
 }
+# Variant output format -> (file extension, Pillow save options).
+VARIANT_ENCODERS: dict[str, tuple[str, dict[str, Any]]] = {
+    "jpeg": ("jpg", {"format": "JPEG", "optimize": True, "quality": 86}),
+    "webp": ("webp", {"format": "WEBP", "quality": 80, "method": 4}),
+    "avif": ("avif", {"format": "AVIF", "quality": 60, "speed": 6}),
+}
 
 T = TypeVar("T")
 
+# Pillow work runs here when set (the media worker's process pool); otherwise on
+# the anyio thread pool.
+_image_executor: Executor | None = None
+
+
+def set_image_executor(executor: Executor | None) -> None:
+    global _image_executor
+    _image_executor = executor
+
+
+async def _run_image_work(func: Callable[..., T], *args: Any) -> T:
+    """Run a CPU-bound render; ``func`` and ``args`` must be picklable."""
+    if _image_executor is None:
+        return await anyio.to_thread.run_sync(func, *args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_image_executor, func, *args)
+
 
 @dataclass(slots=True)
 class MediaListFilters:
@@ -172,6 +199,9 @@ class MediaListFilters:
     page: int = 1
     limit: int = 24
     sort: str = "newest"
+    # Keyset mode when not None ("" = first page); only for newest/oldest.
+    cursor: str | None = None
+    include_total: bool = True
 
 
 @dataclass(slots=True)
@@ -1323,7 +1353,7 @@ async def _apply_job_tag_changes(
 
 async def list_assets(
     session: AsyncSession, filters: MediaListFilters
-) -> tuple[list[MediaAsset], dict[str, int]]:
+) -> tuple[list[MediaAsset], dict[str, Any]]:
     clauses = []
     if not filters.include_trashed:
         clauses.append(MediaAsset.status != MediaAssetStatus.trashed)
@@ -1390,6 +1420,8 @@ async def list_assets(
             MediaAsset.created_at.desc(),
         ],
     }
+    if filters.cursor is not None:
+        return await _list_assets_after_cursor(session, stmt, count_stmt, filters)
     order = order_map.get(filters.sort, order_map["newest"])
     stmt = (
         stmt.order_by(*order)
@@ -1409,6 +1441,61 @@ async def list_assets(
     }
 
 
+_ASSET_KEYSETS: dict[str, tuple[keyset.KeysetColumn, ...]] = {
+    "newest": (
+        keyset.KeysetColumn(MediaAsset.created_at, "datetime", descending=True),
+        keyset.KeysetColumn(MediaAsset.id, "uuid", descending=True),
+    ),
+    "oldest": (
+        keyset.KeysetColumn(MediaAsset.created_at, "datetime"),
+        keyset.KeysetColumn(MediaAsset.id, "uuid"),
+    ),
+}
+
+
+async def _list_assets_after_cursor(
+    session: AsyncSession, stmt, count_stmt, filters: MediaListFilters
+) -> tuple[list[MediaAsset], dict[str, Any]]:
+    columns = _ASSET_KEYSETS.get(filters.sort)
+    if columns is None:
+        raise ValueError("Cursor pagination supports only newest/oldest sorting")
+    if filters.cursor:
+        values = keyset.decode_cursor(
+            filters.cursor, sort=filters.sort, columns=columns
+        )
+        stmt = stmt.where(keyset.after_clause(columns, values))
+    rows = list(
+        (
+            await session.execute(
+                stmt.order_by(*keyset.order_by(columns)).limit(filters.limit + 1)
+            )
+        )
+        .scalars()
+        .all()
+    )
+    next_cursor = None
+    if len(rows) > filters.limit:
+        rows = rows[: filters.limit]
+        next_cursor = keyset.encode_cursor(
+            filters.sort, [rows[-1].created_at, rows[-1].id]
+        )
+    total_items = total_pages = None
+    if filters.include_total:
+        total_items = int((await session.scalar(count_stmt)) or 0)
+        total_pages = (
+            max(1, (total_items + filters.limit - 1) // filters.limit)
+            if total_items
+            else 1
+        )
+    return rows, {
+        "total_items": total_items,
+        "total_pages": total_pages,
+        "page": filters.page,
+        "limit": filters.limit,
+        "next_cursor": next_cursor,
+    }
+
+
 async def list_jobs(
     session: AsyncSession, filters: MediaJobListFilters
 ) -> tuple[list[MediaJob], dict[str, int]]:
@@ -1610,6 +1697,8 @@ async def get_telemetry(session: AsyncSession) -> MediaTelemetryResponse:
     )
     oldest_queued_age_seconds: int | None = None
     if oldest_queued_at:
+        if oldest_queued_at.tzinfo is None and now.tzinfo is not None:
+            oldest_queued_at = oldest_queued_at.replace(tzinfo=timezone.utc)
         oldest_queued_age_seconds = max(
             0, int((now - oldest_queued_at).total_seconds())
         )
@@ -1702,7 +1791,9 @@ def asset_to_read(asset: MediaAsset) -> MediaAssetRead:
             )
         )
     variants: list[MediaVariantRead] = []
-    for variant_row in sorted(asset.variants or [], key=lambda x: x.profile):
+    for variant_row in sorted(
+        asset.variants or [], key=lambda x: (x.profile, x.format != "jpeg", x.format)
+    ):
         variants.append(
             MediaVariantRead(
                 id=variant_row.id,
@@ -2181,6 +2272,7 @@ async def process_job_inline(session: AsyncSession, job: MediaJob) -> MediaJob:
     if not int(job.max_attempts or 0):
         job.max_attempts = int(retry_policy.max_attempts)
 
+    follow_up: MediaJob | None = None
     job.status = MediaJobStatus.processing
     job.triage_state = (
         "retrying"
@@ -2200,7 +2292,7 @@ async def process_job_inline(session: AsyncSession, job: MediaJob) -> MediaJob:
     )
     try:
         if job.job_type == MediaJobType.ingest:
-            await _process_ingest_job(session, job)
+            follow_up = await _process_ingest_job(session, job)
         elif job.job_type == MediaJobType.variant:
             await _process_variant_job(session, job)
         elif job.job_type == MediaJobType.edit:
@@ -2287,6 +2379,8 @@ async def process_job_inline(session: AsyncSession, job: MediaJob) -> MediaJob:
     session.add(job)
     await session.commit()
     await session.refresh(job)
+    if follow_up is not None:
+        await _maybe_queue_job(follow_up.id)
     return job
 
 
@@ -2297,14 +2391,15 @@ def _job_payload(job: MediaJob) -> dict[str, Any]:
         return {}
 
 
-async def _process_ingest_job(session: AsyncSession, job: MediaJob) -> None:
+async def _process_ingest_job(session: AsyncSession, job: MediaJob) -> MediaJob | None:
+    """Record the file's metadata; returns the variant job queued for images."""
     if not job.asset_id:
-        return
+        return None
     asset = await session.scalar(
         select(MediaAsset).where(MediaAsset.id == job.asset_id)
     )
     if asset is None:
-        return
+        return None
     path = _asset_file_path(asset)
     if not path.exists():
         raise FileNotFoundError(f"Missing media file for {asset.public_url}")
@@ -2320,11 +2415,138 @@ async def _process_ingest_job(session: AsyncSession, job: MediaJob) -> None:
         asset.width = width
         asset.height = height
     session.add(asset)
+    if asset.asset_type != MediaAssetType.image:
+        return None
+    # One job renders every profile from a single decode of the source.
+    return await enqueue_job(
+        session,
+        asset_id=asset.id,
+        job_type=MediaJobType.variant,
+        payload={"profiles": list(PROFILE_DIMENSIONS)},
+        created_by_user_id=job.created_by_user_id,
+    )
+
+
+def _fit_within(size: tuple[int, int], box: tuple[int, int]) -> tuple[int, int]:
+    """``Image.thumbnail`` sizing: keep the aspect ratio, never upscale."""
+    width, height = size
+    if width <= box[0] and height <= box[1]:
+        return size
+    scale = min(box[0] / width, box[1] / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _variant_formats() -> list[str]:
+    configured = getattr(settings, "media_dam_variant_formats", None) or ["jpeg"]
+    formats = [fmt for fmt in configured if fmt in VARIANT_ENCODERS]
+    if "avif" in formats and not features.check("avif"):
+        formats.remove("avif")
+    if "jpeg" not in formats:
+        formats.insert(0, "jpeg")
+    return formats
+
+
+def _render_variant_files(
+    src_path: Path,
+    dest_dir: Path,
+    profiles: list[tuple[str, tuple[int, int]]],
+    formats: list[str],
+) -> list[dict[str, Any]]:
+    """Decode the source once and write every profile in every format.
+
+    JPEG sources are decoded at the smallest DCT scale that still covers the
+    largest profile (``draft``). Profiles are rendered largest first, each from
+    the smallest already-rendered image that still covers it, instead of from
+    the full-size original.
+    """
+    outputs: list[dict[str, Any]] = []
+    with Image.open(src_path) as img:
+        targets = {name: _fit_within(img.size, box) for name, box in profiles}
+        largest = max(targets.values(), key=lambda size: size[0] * size[1])
+        img.draft("RGB", largest)
+        base = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    targets = {name: _fit_within(base.size, box) for name, box in profiles}
+    rendered: list[Image.Image] = [base]
+    for name, size in sorted(
+        targets.items(), key=lambda item: item[1][0] * item[1][1], reverse=True
+    ):
+        source = min(
+            (im for im in rendered if im.width >= size[0] and im.height >= size[1]),
+            key=lambda im: im.width * im.height,
+        )
+        out = (
+            source
+            if source.size == size
+            else source.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        )
+        rendered.append(out)
+        for fmt in formats:
+            extension, options = VARIANT_ENCODERS[fmt]
+            dest = dest_dir / f"{name}.{extension}"
+            image = out.convert("RGB") if fmt == "jpeg" else out
+            image.save(dest, **options)
+            outputs.append(
+                {
+                    "profile": name,
+                    "format": fmt,
+                    "filename": dest.name,
+                    "width": out.width,
+                    "height": out.height,
+                    "size_bytes": dest.stat().st_size,
+                }
+            )
+    return outputs
+
+
+def _render_edit_file(
+    src_path: Path,
+    dest_path: Path,
+    rotate_cw: int,
+    crop_aspect: tuple[Any, Any],
+    max_size: tuple[Any, Any],
+) -> tuple[int, int]:
+    crop_w, crop_h = crop_aspect
+    max_w, max_h = max_size
+    with Image.open(src_path) as img:
+        out = img.convert("RGB")
+        if rotate_cw in (90, 180, 270):
+            out = out.rotate(-rotate_cw, expand=True)
+        if crop_w and crop_h:
+            iw, ih = out.size
+            target_ratio = float(crop_w) / float(crop_h)
+            current_ratio = float(iw) / float(ih) if ih else target_ratio
+            if current_ratio > target_ratio:
+                new_w = int(ih * target_ratio)
+                left = max(0, (iw - new_w) // 2)
+                out = out.crop((left, 0, left + new_w, ih))
+            elif current_ratio < target_ratio:
+                new_h = int(iw / target_ratio)
+                top = max(0, (ih - new_h) // 2)
+                out = out.crop((0, top, iw, top + new_h))
+        if max_w or max_h:
+            out.thumbnail((int(max_w or 12000), int(max_h or 12000)))
+        out.save(dest_path, format="JPEG", optimize=True, quality=88)
+        return out.size
+
+
+def _variant_profiles(payload: dict[str, Any]) -> list[tuple[str, tuple[int, int]]]:
+    requested = payload.get("profiles")
+    if isinstance(requested, list) and requested:
+        names = [str(name) for name in requested]
+    else:
+        names = [str(payload.get("profile") or "web-1280")]
+    unique = dict.fromkeys(name for name in names if name)
+    # ``profiles`` only holds known names; a single custom ``profile`` keeps
+    # its name but uses the default size.
+    return [
+        (name, PROFILE_DIMENSIONS.get(name, PROFILE_DIMENSIONS["web-1280"]))
+        for name in unique
+    ]
 
 
 async def _process_variant_job(session: AsyncSession, job: MediaJob) -> None:
     payload = _job_payload(job)
-    profile = str(payload.get("profile") or "web-1280")
+    profiles = _variant_profiles(payload)
     if not job.asset_id:
         return
     asset = await session.scalar(
@@ -2335,38 +2557,41 @@ async def _process_variant_job(session: AsyncSession, job: MediaJob) -> None:
     src_path = _asset_file_path(asset)
     if not src_path.exists():
         raise FileNotFoundError(f"Missing media file for {asset.public_url}")
-    dimensions = PROFILE_DIMENSIONS.get(profile, PROFILE_DIMENSIONS["web-1280"])
-    variant_key = f"variants/{asset.id}/{profile}.jpg"
-    variant_path = _storage_path_for_key(
-        variant_key, public_root=_is_publicly_servable(asset)
-    )
-    variant_path.parent.mkdir(parents=True, exist_ok=True)
+    key_prefix = f"variants/{asset.id}"
+    dest_dir = _storage_path_for_key(
+        f"{key_prefix}/_", public_root=_is_publicly_servable(asset)
+    ).parent
+    dest_dir.mkdir(parents=True, exist_ok=True)
 
-    def _render_variant() -> tuple[int, int]:
-        with Image.open(src_path) as img:
-            out = img.convert("RGB")
-            out.thumbnail(dimensions)
-            out.save(variant_path, format="JPEG", optimize=True, quality=86)
-            return out.size
-
-    width, height = await anyio.to_thread.run_sync(_render_variant)
-    row = await session.scalar(
-        select(MediaVariant).where(
-            MediaVariant.asset_id == asset.id, MediaVariant.profile == profile
-        )
+    outputs = await _run_image_work(
+        _render_variant_files, src_path, dest_dir, profiles, _variant_formats()
     )
-    if row is None:
-        row = MediaVariant(
-            asset_id=asset.id,
-            profile=profile,
-            format="jpeg",
-            storage_key=variant_key,
-            public_url=_public_url_from_storage_key(variant_key),
-        )
-    row.width = int(width)
-    row.height = int(height)
-    row.size_bytes = int(variant_path.stat().st_size) if variant_path.exists() else None
-    session.add(row)
+    existing = {
+        (row.profile, row.format): row
+        for row in (
+            await session.execute(
+                select(MediaVariant).where(
+                    MediaVariant.asset_id == asset.id,
+                    MediaVariant.profile.in_([name for name, _ in profiles]),
+                )
+            )
+        ).scalars()
+    }
+    for output in outputs:
+        variant_key = f"{key_prefix}/{output['filename']}"
+        row = existing.get((output["profile"], output["format"]))
+        if row is None:
+            row = MediaVariant(
+                asset_id=asset.id,
+                profile=output["profile"],
+                format=output["format"],
+            )
+        row.storage_key = variant_key
+        row.public_url = _public_url_from_storage_key(variant_key)
+        row.width = int(output["width"])
+        row.height = int(output["height"])
+        row.size_bytes = int(output["size_bytes"])
+        session.add(row)
 
 
 async def _process_edit_job(session: AsyncSession, job: MediaJob) -> None:
@@ -2393,29 +2618,14 @@ async def _process_edit_job(session: AsyncSession, job: MediaJob) -> None:
     )
     edited_path.parent.mkdir(parents=True, exist_ok=True)
 
-    def _render_edit() -> tuple[int, int]:
-        with Image.open(src_path) as img:
-            out = img.convert("RGB")
-            if rotate_cw in (90, 180, 270):
-                out = out.rotate(-rotate_cw, expand=True)
-            if crop_w and crop_h:
-                iw, ih = out.size
-                target_ratio = float(crop_w) / float(crop_h)
-                current_ratio = float(iw) / float(ih) if ih else target_ratio
-                if current_ratio > target_ratio:
-                    new_w = int(ih * target_ratio)
-                    left = max(0, (iw - new_w) // 2)
-                    out = out.crop((left, 0, left + new_w, ih))
-                elif current_ratio < target_ratio:
-                    new_h = int(iw / target_ratio)
-                    top = max(0, (ih - new_h) // 2)
-                    out = out.crop((0, top, iw, top + new_h))
-            if max_w or max_h:
-                out.thumbnail((int(max_w or 12000), int(max_h or 12000)))
-            out.save(edited_path, format="JPEG", optimize=True, quality=88)
-            return out.size
-
-    width, height = await anyio.to_thread.run_sync(_render_edit)
+    width, height = await _run_image_work(
+        _render_edit_file,
+        src_path,
+        edited_path,
+        rotate_cw,
+        (crop_w, crop_h),
+        (max_w, max_h),
+    )
     row = MediaVariant(
         asset_id=asset.id,
         profile=f"edit-{job.id}",
@@ -2482,30 +2692,35 @@ async def _process_duplicate_scan_job(session: AsyncSession, job: MediaJob) -> N
 
 
 async def _process_usage_reconcile_job(session: AsyncSession, job: MediaJob) -> None:
+    # One streaming pass over content for the whole library (or the job's asset);
+    # ``limit`` is the streaming/bulk-write batch size.
     payload = _job_payload(job)
-    limit = int(
+    batch_size = int(
         payload.get("limit")
         or int(getattr(settings, "media_usage_reconcile_batch_size", 200) or 200)
     )
-    limit = max(1, min(limit, 5000))
+    batch_size = max(1, min(batch_size, 5000))
 
-    stmt = (
-        select(MediaAsset)
-        .options(
-            selectinload(MediaAsset.tags).selectinload(MediaAssetTag.tag),
-            selectinload(MediaAsset.i18n),
-            selectinload(MediaAsset.variants),
-        )
-        .order_by(MediaAsset.updated_at.desc(), MediaAsset.id.desc())
-        .limit(limit)
-    )
-    rows = (await session.execute(stmt)).scalars().all()
-    total = len(rows) or 1
-    for idx, asset in enumerate(rows, start=1):
-        await rebuild_usage_edges(session, asset, commit=False)
-        job.progress_pct = int(min(99, round((idx / total) * 100)))
+    async def _progress(pct: int) -> None:
+        job.progress_pct = pct
         session.add(job)
         await session.flush()
+
+    result = await media_usage.reconcile_usage_edges(
+        session,
+        asset_ids=[job.asset_id] if job.asset_id else None,
+        batch_size=batch_size,
+        progress=_progress,
+    )
+    logger.info(
+        "media_usage_reconciled",
+        extra={
+            "assets": result.assets,
+            "edges": result.edges,
+            "inserted": result.inserted,
+            "deleted": result.deleted,
+        },
+    )
     job.progress_pct = 100
     session.add(job)
 
@@ -2725,9 +2940,11 @@ def resolve_asset_preview_path(
     asset: MediaAsset, *, variant_profile: str | None = None
 ) -> Path:
     if variant_profile:
-        variant = next(
+        # Prefer the JPEG rendition; WebP/AVIF siblings share the profile name.
+        variant = min(
             (row for row in (asset.variants or []) if row.profile == variant_profile),
-            None,
+            key=lambda row: getattr(row, "format", None) not in (None, "jpeg"),
+            default=None,
         )
         if variant is None:
             raise ValueError("Variant not found")
@@ -0,0 +1,268 @@
+"""Set-based reconciliation of media usage edges.
+
+``media_dam.rebuild_usage_edges`` answers "where is this asset used?" for one
+asset with a handful of queries, two of them ``ILIKE '%url%'`` scans over every
+content body. Repeating that per asset makes a library-wide reconcile
+O(assets x content). Here the work is inverted: content blocks, their
+translations, content images and product images are each streamed once, every
+``/media/...`` reference is extracted and matched against an in-memory index of
+asset URLs, and the resulting edge set is diffed against ``media_usage_edges``
+with bulk deletes, one ``last_seen_at`` update and a bulk insert. The cost is
+O(content + assets + edges).
+
+Text references are matched the way the per-asset scan matches them: case
+insensitively, ignoring query strings and fragments.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from collections.abc import Awaitable, Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from uuid import UUID
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.catalog import Product, ProductImage
+from app.models.content import ContentBlock, ContentBlockTranslation, ContentImage
+from app.models.media import MediaAsset, MediaUsageEdge
+from app.services import csv_stream
+
+# (asset_id, source_type, source_key, source_id, field_path, lang)
+EdgeKey = tuple[UUID, str, str, str | None, str, str | None]
+
+DEFAULT_BATCH_SIZE = 500
+_MEDIA_REF_RE = re.compile(r"/media/[^\s\"'<>()\[\]{}\\|^`]+", re.IGNORECASE)
+_TRAILING_PUNCTUATION = ".,;:!?"
+
+
+@dataclass
+class UsageReconcileResult:
+    assets: int = 0
+    edges: int = 0
+    inserted: int = 0
+    deleted: int = 0
+    sources: dict[str, int] = field(default_factory=dict)
+
+
+def extract_media_refs(text: str | None) -> set[str]:
+    """Normalized ``/media/...`` paths mentioned anywhere in ``text``."""
+    if not text:
+        return set()
+    refs: set[str] = set()
+    for match in _MEDIA_REF_RE.finditer(text):
+        ref = re.split(r"[?#]", match.group(0), maxsplit=1)[0]
+        refs.add(ref.rstrip(_TRAILING_PUNCTUATION).lower())
+    return refs
+
+
+def _meta_text(meta: object) -> str:
+    if not meta:
+        return ""
+    try:
+        return json.dumps(meta, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return str(meta)
+
+
+class _AssetIndex:
+    def __init__(self, rows: Iterable[tuple[UUID, str | None]]) -> None:
+        self.exact: dict[str, list[UUID]] = {}
+        self.folded: dict[str, list[UUID]] = {}
+        for asset_id, url in rows:
+            if not url:
+                continue
+            self.exact.setdefault(url, []).append(asset_id)
+            folded = url.split("?", 1)[0].lower()
+            self.folded.setdefault(folded, []).append(asset_id)
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self.exact.values())
+
+    def in_text(self, *texts: str | None) -> set[UUID]:
+        found: set[UUID] = set()
+        for text in texts:
+            for ref in extract_media_refs(text):
+                found.update(self.folded.get(ref, ()))
+        return found
+
+
+async def _collect_edges(
+    session: AsyncSession, index: _AssetIndex, *, batch_size: int
+) -> set[EdgeKey]:
+    edges: set[EdgeKey] = set()
+
+    blocks = select(
+        ContentBlock.key, ContentBlock.body_markdown, ContentBlock.meta
+    ).order_by(ContentBlock.id)
+    async for key, body, meta in csv_stream.stream_rows(
+        session, blocks, batch_size=batch_size
+    ):
+        for asset_id in index.in_text(body, _meta_text(meta)):
+            edges.add((asset_id, "content_block", key, None, "auto_scan", None))
+            if key == "site.social":
+                edges.add((asset_id, "site_social", key, None, "site.social", None))
+
+    translations = (
+        select(
+            ContentBlock.key,
+            ContentBlockTranslation.lang,
+            ContentBlockTranslation.body_markdown,
+        )
+        .join(ContentBlock, ContentBlock.id == ContentBlockTranslation.content_block_id)
+        .order_by(ContentBlockTranslation.id)
+    )
+    async for key, lang, body in csv_stream.stream_rows(
+        session, translations, batch_size=batch_size
+    ):
+        for asset_id in index.in_text(body):
+            edges.add((asset_id, "content_block", key, None, "auto_scan", None))
+            edges.add(
+                (
+                    asset_id,
+                    "content_translation",
+                    key,
+                    None,
+                    "translations.body_markdown",
+                    str(lang or ""),
+                )
+            )
+
+    content_images = (
+        select(ContentImage.id, ContentBlock.key, ContentImage.url)
+        .join(ContentBlock, ContentBlock.id == ContentImage.content_block_id)
+        .order_by(ContentImage.id)
+    )
+    async for image_id, key, url in csv_stream.stream_rows(
+        session, content_images, batch_size=batch_size
+    ):
+        for asset_id in index.exact.get(url, ()):
+            edges.add(
+                (
+                    asset_id,
+                    "content_image",
+                    key,
+                    str(image_id),
+                    "content_images.url",
+                    None,
+                )
+            )
+
+    product_images = (
+        select(ProductImage.id, Product.slug, ProductImage.url)
+        .join(Product, Product.id == ProductImage.product_id)
+        .where(ProductImage.is_deleted.is_(False))
+        .order_by(ProductImage.id)
+    )
+    async for image_id, slug, url in csv_stream.stream_rows(
+        session, product_images, batch_size=batch_size
+    ):
+        for asset_id in index.exact.get(url, ()):
+            edges.add(
+                (
+                    asset_id,
+                    "product_image",
+                    slug,
+                    str(image_id),
+                    "product_images.url",
+                    None,
+                )
+            )
+    return edges
+
+
+def _chunks(values: Sequence, size: int) -> Iterable[Sequence]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+async def reconcile_usage_edges(
+    session: AsyncSession,
+    *,
+    asset_ids: Sequence[UUID] | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Callable[[int], Awaitable[None]] | None = None,
+) -> UsageReconcileResult:
+    """Rebuild usage edges for ``asset_ids`` (default: every asset) in bulk.
+
+    Flushes but does not commit. ``progress`` receives a 0-99 percentage after
+    each pass.
+    """
+    batch_size = max(1, int(batch_size))
+
+    async def _report(pct: int) -> None:
+        if progress is not None:
+            await progress(pct)
+
+    asset_stmt = select(MediaAsset.id, MediaAsset.public_url)
+    edge_stmt = select(
+        MediaUsageEdge.id,
+        MediaUsageEdge.asset_id,
+        MediaUsageEdge.source_type,
+        MediaUsageEdge.source_key,
+        MediaUsageEdge.source_id,
+        MediaUsageEdge.field_path,
+        MediaUsageEdge.lang,
+    )
+    if asset_ids is not None:
+        scope = list(dict.fromkeys(asset_ids))
+        asset_stmt = asset_stmt.where(MediaAsset.id.in_(scope))
+        edge_stmt = edge_stmt.where(MediaUsageEdge.asset_id.in_(scope))
+    index = _AssetIndex((await session.execute(asset_stmt)).tuples().all())
+    result = UsageReconcileResult(assets=len(index))
+    if asset_ids is not None and not scope:
+        return result
+
+    desired = await _collect_edges(session, index, batch_size=batch_size)
+    await _report(60)
+
+    stale: list[UUID] = []
+    kept: set[EdgeKey] = set()
+    async for edge_id, *key in csv_stream.stream_rows(
+        session, edge_stmt, batch_size=batch_size
+    ):
+        edge_key: EdgeKey = tuple(key)  # type: ignore[assignment]
+        if edge_key in desired and edge_key not in kept:
+            kept.add(edge_key)
+        else:
+            stale.append(edge_id)
+    await _report(80)
+
+    for chunk in _chunks(stale, batch_size):
+        await session.execute(
+            delete(MediaUsageEdge).where(MediaUsageEdge.id.in_(chunk))
+        )
+    now = datetime.now(timezone.utc)
+    touch = update(MediaUsageEdge).values(last_seen_at=now)
+    if asset_ids is None:
+        await session.execute(touch)
+    else:
+        for chunk in _chunks(scope, batch_size):
+            await session.execute(touch.where(MediaUsageEdge.asset_id.in_(chunk)))
+    new_rows = [
+        {
+            "asset_id": asset_id,
+            "source_type": source_type,
+            "source_key": source_key,
+            "source_id": source_id,
+            "field_path": field_path,
+            "lang": lang,
+            "last_seen_at": now,
+        }
+        for asset_id, source_type, source_key, source_id, field_path, lang in (
+            desired - kept
+        )
+    ]
+    for chunk in _chunks(new_rows, batch_size):
+        await session.execute(insert(MediaUsageEdge), list(chunk))
+    await session.flush()
+
+    result.edges = len(desired)
+    result.inserted = len(new_rows)
+    result.deleted = len(stale)
+    for edge in desired:
+        result.sources[edge[1]] = result.sources.get(edge[1], 0) + 1
+    return result
@@ -25,6 +25,7 @@ from app.schemas.ops import (
     ShippingSimulationResult,
     WebhookEventDetail,
     WebhookEventRead,
+    WebhookProvider,
     WebhookStatus,
 )
 from app.services import checkout_settings as checkout_settings_service
@@ -35,6 +36,7 @@ from app.services import paypal as paypal_service
 from app.services import pricing
 from app.services.payment_provider import payments_provider
 from app.services import webhook_handlers
+from app.services import webhook_queue
 
 
 async def list_maintenance_banners(session: AsyncSession) -> list[MaintenanceBanner]:
@@ -205,8 +207,13 @@ async def simulate_shipping_rates(
 
 
 def _webhook_status(
-    *, processed_at: datetime | None, last_error: str | None
+    *,
+    processed_at: datetime | None,
+    last_error: str | None,
+    dead_lettered_at: datetime | None = None,
 ) -> WebhookStatus:
+    if dead_lettered_at is not None and processed_at is None:
+        return "dead_letter"
     if last_error and last_error.strip():
         return "failed"
     if processed_at is not None:
@@ -214,68 +221,62 @@ def _webhook_status(
     return "received"
 
 
+def _webhook_read(
+    provider: WebhookProvider, row: StripeWebhookEvent | PayPalWebhookEvent
+) -> WebhookEventRead:
+    return WebhookEventRead(
+        provider=provider,
+        event_id=(
+            row.stripe_event_id  # type: ignore[union-attr]
+            if provider == "stripe"
+            else row.paypal_event_id  # type: ignore[union-attr]
+        ),
+        event_type=row.event_type,
+        created_at=row.created_at,
+        attempts=int(getattr(row, "attempts", 0) or 0),
+        last_attempt_at=row.last_attempt_at,
+        processed_at=getattr(row, "processed_at", None),
+        last_error=getattr(row, "last_error", None),
+        next_attempt_at=getattr(row, "next_attempt_at", None),
+        dead_lettered_at=getattr(row, "dead_lettered_at", None),
+        status=_webhook_status(
+            processed_at=getattr(row, "processed_at", None),
+            last_error=getattr(row, "last_error", None),
+            dead_lettered_at=getattr(row, "dead_lettered_at", None),
+        ),
+    )
+
+
 async def list_recent_webhooks(
-    session: AsyncSession, *, limit: int = 50
+    session: AsyncSession, *, limit: int = 50, dead_letter: bool = False
 ) -> list[WebhookEventRead]:
     limit_clean = max(1, min(int(limit or 0), 200))
-    stripe_rows = (
-        (
-            await session.execute(
-                select(StripeWebhookEvent)
-                .order_by(StripeWebhookEvent.last_attempt_at.desc())
-                .limit(limit_clean)
-            )
-        )
-        .scalars()
-        .all()
+    stripe_stmt = (
+        select(StripeWebhookEvent)
+        .order_by(StripeWebhookEvent.last_attempt_at.desc())
+        .limit(limit_clean)
     )
-    paypal_rows = (
-        (
-            await session.execute(
-                select(PayPalWebhookEvent)
-                .order_by(PayPalWebhookEvent.last_attempt_at.desc())
-                .limit(limit_clean)
-            )
-        )
-        .scalars()
-        .all()
+    paypal_stmt = (
+        select(PayPalWebhookEvent)
+        .order_by(PayPalWebhookEvent.last_attempt_at.desc())
+        .limit(limit_clean)
     )
-
-    items: list[WebhookEventRead] = []
-    for stripe_row in stripe_rows:
-        items.append(
-            WebhookEventRead(
-                provider="stripe",
-                event_id=stripe_row.stripe_event_id,
-                event_type=stripe_row.event_type,
-                created_at=stripe_row.created_at,
-                attempts=int(getattr(stripe_row, "attempts", 0) or 0),
-                last_attempt_at=stripe_row.last_attempt_at,
-                processed_at=getattr(stripe_row, "processed_at", None),
-                last_error=getattr(stripe_row, "last_error", None),
-                status=_webhook_status(
-                    processed_at=getattr(stripe_row, "processed_at", None),
-                    last_error=getattr(stripe_row, "last_error", None),
-                ),
-            )
+    if dead_letter:
+        stripe_stmt = stripe_stmt.where(
+            StripeWebhookEvent.dead_lettered_at.is_not(None),
+            StripeWebhookEvent.processed_at.is_(None),
         )
-    for paypal_row in paypal_rows:
-        items.append(
-            WebhookEventRead(
-                provider="paypal",
-                event_id=paypal_row.paypal_event_id,
-                event_type=paypal_row.event_type,
-                created_at=paypal_row.created_at,
-                attempts=int(getattr(paypal_row, "attempts", 0) or 0),
-                last_attempt_at=paypal_row.last_attempt_at,
-                processed_at=getattr(paypal_row, "processed_at", None),
-                last_error=getattr(paypal_row, "last_error", None),
-                status=_webhook_status(
-                    processed_at=getattr(paypal_row, "processed_at", None),
-                    last_error=getattr(paypal_row, "last_error", None),
-                ),
-            )
+        paypal_stmt = paypal_stmt.where(
+            PayPalWebhookEvent.dead_lettered_at.is_not(None),
+            PayPalWebhookEvent.processed_at.is_(None),
         )
+    stripe_rows = (await session.execute(stripe_stmt)).scalars().all()
+    paypal_rows = (await session.execute(paypal_stmt)).scalars().all()
+
+    items: list[WebhookEventRead] = [
+        _webhook_read("stripe", stripe_row) for stripe_row in stripe_rows
+    ]
+    items.extend(_webhook_read("paypal", paypal_row) for paypal_row in paypal_rows)
 
     items.sort(key=lambda item: item.last_attempt_at, reverse=True)
     return items[:limit_clean]
@@ -312,18 +313,7 @@ async def get_webhook_detail(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Webhook not found"
             )
         return WebhookEventDetail(
-            provider="stripe",
-            event_id=stripe_row.stripe_event_id,
-            event_type=stripe_row.event_type,
-            created_at=stripe_row.created_at,
-            attempts=int(getattr(stripe_row, "attempts", 0) or 0),
-            last_attempt_at=stripe_row.last_attempt_at,
-            processed_at=getattr(stripe_row, "processed_at", None),
-            last_error=getattr(stripe_row, "last_error", None),
-            status=_webhook_status(
-                processed_at=getattr(stripe_row, "processed_at", None),
-                last_error=getattr(stripe_row, "last_error", None),
-            ),
+            **_webhook_read("stripe", stripe_row).model_dump(),
             payload=getattr(stripe_row, "payload", None),
         )
 
@@ -343,18 +333,7 @@ async def get_webhook_detail(
             status_code=status.HTTP_404_NOT_FOUND, detail="Webhook not found"
         )
     return WebhookEventDetail(
-        provider="paypal",
-        event_id=paypal_row.paypal_event_id,
-        event_type=paypal_row.event_type,
-        created_at=paypal_row.created_at,
-        attempts=int(getattr(paypal_row, "attempts", 0) or 0),
-        last_attempt_at=paypal_row.last_attempt_at,
-        processed_at=getattr(paypal_row, "processed_at", None),
-        last_error=getattr(paypal_row, "last_error", None),
-        status=_webhook_status(
-            processed_at=getattr(paypal_row, "processed_at", None),
-            last_error=getattr(paypal_row, "last_error", None),
-        ),
+        **_webhook_read("paypal", paypal_row).model_dump(),
         payload=getattr(paypal_row, "payload", None),
     )
 
@@ -564,6 +543,10 @@ async def retry_webhook(
                 detail="Webhook payload not stored",
             )
 
+        if webhook_queue.enabled():
+            requeued = await webhook_queue.requeue(session, stripe_row)
+            return _webhook_read("stripe", requeued)
+
         stripe_row.attempts = int(getattr(stripe_row, "attempts", 0) or 0) + 1
         stripe_row.last_attempt_at = now
         session.add(stripe_row)
@@ -579,20 +562,7 @@ async def retry_webhook(
                 updated.last_error = None
                 session.add(updated)
                 await session.commit()
-                return WebhookEventRead(
-                    provider="stripe",
-                    event_id=updated.stripe_event_id,
-                    event_type=updated.event_type,
-                    created_at=updated.created_at,
-                    attempts=int(getattr(updated, "attempts", 0) or 0),
-                    last_attempt_at=updated.last_attempt_at,
-                    processed_at=getattr(updated, "processed_at", None),
-                    last_error=getattr(updated, "last_error", None),
-                    status=_webhook_status(
-                        processed_at=getattr(updated, "processed_at", None),
-                        last_error=getattr(updated, "last_error", None),
-                    ),
-                )
+                return _webhook_read("stripe", updated)
         except HTTPException as exc:
             await session.rollback()
             updated = await session.get(StripeWebhookEvent, stripe_row.id)
@@ -646,6 +616,10 @@ async def retry_webhook(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Webhook payload not stored"
         )
 
+    if webhook_queue.enabled():
+        paypal_requeued = await webhook_queue.requeue(session, paypal_row)
+        return _webhook_read("paypal", paypal_requeued)
+
     paypal_row.attempts = int(getattr(paypal_row, "attempts", 0) or 0) + 1
     paypal_row.last_attempt_at = now
     session.add(paypal_row)
@@ -659,20 +633,7 @@ async def retry_webhook(
             paypal_updated.last_error = None
             session.add(paypal_updated)
             await session.commit()
-            return WebhookEventRead(
-                provider="paypal",
-                event_id=paypal_updated.paypal_event_id,
-                event_type=paypal_updated.event_type,
-                created_at=paypal_updated.created_at,
-                attempts=int(getattr(paypal_updated, "attempts", 0) or 0),
-                last_attempt_at=paypal_updated.last_attempt_at,
-                processed_at=getattr(paypal_updated, "processed_at", None),
-                last_error=getattr(paypal_updated, "last_error", None),
-                status=_webhook_status(
-                    processed_at=getattr(paypal_updated, "processed_at", None),
-                    last_error=getattr(paypal_updated, "last_error", None),
-                ),
-            )
+            return _webhook_read("paypal", paypal_updated)
     except HTTPException as exc:
         await session.rollback()
         paypal_updated = await session.get(PayPalWebhookEvent, paypal_row.id)
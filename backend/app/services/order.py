@@ -41,7 +41,10 @@ from app.services import taxes as taxes_service
 from app.services.taxes import TaxableProductLine
 from app.services import payments
 from app.services import paypal
+from app.services import keyset
 from app.services import promo_usage
+from app.services import sales_rollups  # noqa: F401  (rollup invalidation hooks)
+from app.services import stock_levels  # noqa: F401  (availability refresh hooks)
 
 logger = logging.getLogger(__name__)
 
@@ -759,42 +762,31 @@ async def list_orders(
     return list(result.scalars().unique())
 
 
-async def admin_search_orders(
-    session: AsyncSession,
-    *,
-    q: str | None = None,
-    user_id: UUID | None = None,
-    status: OrderStatus | None = None,
-    statuses: list[OrderStatus] | None = None,
-    pending_any: bool = False,
-    tag: str | None = None,
-    sla: str | None = None,
-    fraud: str | None = None,
-    include_test: bool = True,
-    from_dt=None,
-    to_dt=None,
-    page: int = 1,
-    limit: int = 20,
-) -> tuple[
-    list[
-        tuple[
-            Order, str | None, str | None, str | None, datetime | None, bool, str | None
-        ]
-    ],
-    int,
-]:
-    """Paginated order search for the admin UI.
+AdminOrderSearchRow = tuple[
+    Order, str | None, str | None, str | None, datetime | None, bool, str | None
+]
 
-    Returns rows of (Order, customer_email, customer_username, sla_kind, sla_started_at, fraud_flagged, fraud_severity) plus total_items.
-    """
+
+def _admin_order_search_statements(
+    *,
+    q: str | None,
+    user_id: UUID | None,
+    status: OrderStatus | None,
+    statuses: list[OrderStatus] | None,
+    pending_any: bool,
+    tag: str | None,
+    sla: str | None,
+    fraud: str | None,
+    include_test: bool,
+    from_dt,
+    to_dt,
+):
+    """Build the (unordered, unpaginated) row and count statements."""
     from app.models.user import User
     from app.core.config import settings
 
     cleaned_q = (q or "").strip()
     tag_clean = _normalize_order_tag(tag) if tag is not None else None
-    page = max(1, int(page or 1))
-    limit = max(1, min(100, int(limit or 20)))
-    offset = (page - 1) * limit
 
     sla_clean = (sla or "").strip().lower() or None
     fraud_clean = (fraud or "").strip().lower() or None
@@ -990,7 +982,6 @@ async def admin_search_orders(
     )
     if filters:
         count_stmt = count_stmt.where(*filters)
-    total_items = int((await session.execute(count_stmt)).scalar_one() or 0)
 
     stmt = (
         select(
@@ -1013,20 +1004,14 @@ async def admin_search_orders(
             user_velocity_subq.c.user_id == Order.user_id,
             isouter=True,
         )
-        .order_by(Order.created_at.desc())
-        .offset(offset)
-        .limit(limit)
     )
     if filters:
         stmt = stmt.where(*filters)
+    return stmt, count_stmt
 
-    result = await session.execute(stmt)
-    raw_rows = result.all()
-    rows: list[
-        tuple[
-            Order, str | None, str | None, str | None, datetime | None, bool, str | None
-        ]
-    ] = [
+
+def _admin_order_rows(raw_rows) -> list[AdminOrderSearchRow]:
+    return [
         (
             order,
             email,
@@ -1046,7 +1031,111 @@ async def admin_search_orders(
             fraud_severity,
         ) in raw_rows
     ]
-    return rows, total_items
+
+
+async def admin_search_orders(
+    session: AsyncSession,
+    *,
+    q: str | None = None,
+    user_id: UUID | None = None,
+    status: OrderStatus | None = None,
+    statuses: list[OrderStatus] | None = None,
+    pending_any: bool = False,
+    tag: str | None = None,
+    sla: str | None = None,
+    fraud: str | None = None,
+    include_test: bool = True,
+    from_dt=None,
+    to_dt=None,
+    page: int = 1,
+    limit: int = 20,
+) -> tuple[list[AdminOrderSearchRow], int]:
+    """Paginated order search for the admin UI.
+
+    Returns rows of (Order, customer_email, customer_username, sla_kind, sla_started_at, fraud_flagged, fraud_severity) plus total_items.
+    """
+    page = max(1, int(page or 1))
+    limit = max(1, min(100, int(limit or 20)))
+    offset = (page - 1) * limit
+    stmt, count_stmt = _admin_order_search_statements(
+        q=q,
+        user_id=user_id,
+        status=status,
+        statuses=statuses,
+        pending_any=pending_any,
+        tag=tag,
+        sla=sla,
+        fraud=fraud,
+        include_test=include_test,
+        from_dt=from_dt,
+        to_dt=to_dt,
+    )
+    total_items = int((await session.execute(count_stmt)).scalar_one() or 0)
+    result = await session.execute(
+        stmt.order_by(Order.created_at.desc()).offset(offset).limit(limit)
+    )
+    return _admin_order_rows(result.all()), total_items
+
+
+_ORDER_KEYSET = (
+    keyset.KeysetColumn(Order.created_at, "datetime", descending=True),
+    keyset.KeysetColumn(Order.id, "uuid", descending=True),
+)
+
+
+async def admin_search_orders_after_cursor(
+    session: AsyncSession,
+    *,
+    q: str | None = None,
+    user_id: UUID | None = None,
+    status: OrderStatus | None = None,
+    statuses: list[OrderStatus] | None = None,
+    pending_any: bool = False,
+    tag: str | None = None,
+    sla: str | None = None,
+    fraud: str | None = None,
+    include_test: bool = True,
+    from_dt=None,
+    to_dt=None,
+    cursor: str | None = None,
+    limit: int = 20,
+    include_total: bool = False,
+) -> tuple[list[AdminOrderSearchRow], int | None, str | None]:
+    """Keyset variant of :func:`admin_search_orders` (newest first).
+
+    Returns ``(rows, total_items, next_cursor)``; the total is only counted when
+    ``include_total`` is set.
+    """
+    limit = max(1, min(100, int(limit or 20)))
+    stmt, count_stmt = _admin_order_search_statements(
+        q=q,
+        user_id=user_id,
+        status=status,
+        statuses=statuses,
+        pending_any=pending_any,
+        tag=tag,
+        sla=sla,
+        fraud=fraud,
+        include_test=include_test,
+        from_dt=from_dt,
+        to_dt=to_dt,
+    )
+    if cursor:
+        values = keyset.decode_cursor(cursor, sort="newest", columns=_ORDER_KEYSET)
+        stmt = stmt.where(keyset.after_clause(_ORDER_KEYSET, values))
+    result = await session.execute(
+        stmt.order_by(*keyset.order_by(_ORDER_KEYSET)).limit(limit + 1)
+    )
+    rows = _admin_order_rows(result.all())
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        next_cursor = keyset.encode_cursor("newest", [last.created_at, last.id])
+    total_items = None
+    if include_total:
+        total_items = int((await session.execute(count_stmt)).scalar_one() or 0)
+    return rows, total_items, next_cursor
 
 
 async def get_order_by_id_admin(session: AsyncSession, order_id: UUID) -> Order | None:
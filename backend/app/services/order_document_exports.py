@@ -14,6 +14,7 @@ from app.models.order import Order
 from app.models.order_document_export import (
     OrderDocumentExport,
     OrderDocumentExportKind,
+    OrderDocumentExportStatus,
 )
 from app.services import private_storage
 
@@ -71,10 +72,14 @@ async def create_existing_file_export(
     mime_type: str,
     order_id: UUID | None = None,
     created_by_user_id: UUID | None = None,
+    export_id: UUID | None = None,
+    status: OrderDocumentExportStatus = OrderDocumentExportStatus.succeeded,
 ) -> OrderDocumentExport:
     now = datetime.now(timezone.utc)
     export = OrderDocumentExport(
+        id=export_id or uuid.uuid4(),
         kind=kind,
+        status=status,
         order_id=order_id,
         created_by_user_id=created_by_user_id,
         order_ids=None,
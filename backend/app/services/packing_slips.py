@@ -1,5 +1,6 @@
 import io
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Final, Sequence
 
@@ -123,9 +124,11 @@ def _addr_lines(addr) -> list[str]:
     return parts
 
 
-def render_batch_packing_slips_pdf(
-    orders: Sequence[object], *, title: str | None = None
-) -> bytes:
+@lru_cache(maxsize=1)
+def _paragraph_styles() -> tuple[
+    ParagraphStyle, ParagraphStyle, ParagraphStyle, ParagraphStyle
+]:
+    # Built once per process; the styles are never mutated by the renderers.
     font_regular, font_bold = _register_reportlab_fonts()
     styles = getSampleStyleSheet()
     base = ParagraphStyle(
@@ -160,6 +163,14 @@ def render_batch_packing_slips_pdf(
         spaceBefore=8,
         spaceAfter=4,
     )
+    return base, muted, h1, h2
+
+
+def render_batch_packing_slips_pdf(
+    orders: Sequence[object], *, title: str | None = None
+) -> bytes:
+    _, font_bold = _register_reportlab_fonts()
+    base, muted, h1, h2 = _paragraph_styles()
 
     buf = io.BytesIO()
     doc = SimpleDocTemplate(
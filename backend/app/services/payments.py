@@ -14,6 +14,7 @@ from app.models.cart import Cart
 from app.models.promo import PromoCode, StripeCouponMapping
 from app.models.webhook import StripeWebhookEvent
 from app.core import metrics
+from app.services import webhook_queue
 from app.services.payment_provider import is_mock_payments
 
 stripe = cast(Any, stripe)
@@ -361,9 +362,8 @@ def _stripe_event_payload_summary(event: Any) -> dict[str, Any]:
     return summary
 
 
-async def handle_webhook_event(
-    session: AsyncSession, payload: bytes, sig_header: str | None
-) -> tuple[dict, StripeWebhookEvent]:
+def construct_webhook_event(payload: bytes, sig_header: str | None) -> dict[str, Any]:
+    """Verify the Stripe signature and return the event."""
     secret = stripe_webhook_secret()
     if not _looks_configured(secret):
         raise HTTPException(
@@ -385,7 +385,29 @@ async def handle_webhook_event(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Missing event id"
         )
+    return event
+
+
+async def queue_webhook_event(
+    session: AsyncSession, payload: bytes, sig_header: str | None
+) -> dict[str, Any]:
+    """Verify and store an event for the webhook queue; returns the event."""
+    event = construct_webhook_event(payload, sig_header)
+    await webhook_queue.ingest(
+        session,
+        provider="stripe",
+        event_id=str(event.get("id") or "").strip(),
+        event_type=str(event.get("type") or "").strip() or None,
+        payload=_stripe_event_payload_summary(event),
+    )
+    return event
+
 
+async def handle_webhook_event(
+    session: AsyncSession, payload: bytes, sig_header: str | None
+) -> tuple[dict, StripeWebhookEvent]:
+    event = construct_webhook_event(payload, sig_header)
+    event_id = str(event.get("id") or "").strip()
     now = datetime.now(timezone.utc)
     event_type = str(event.get("type") or "").strip() or None
     payload_summary = _stripe_event_payload_summary(event)
@@ -4,6 +4,7 @@ import csv
 import io
 from dataclasses import dataclass, field
 from datetime import datetime
+from functools import lru_cache
 from typing import Any, Final, Sequence
 
 from reportlab.lib import colors
@@ -124,12 +125,8 @@ def _fmt_dt(value: datetime | None) -> str:
         return str(value)
 
 
-def render_pick_list_pdf(
-    rows: Sequence[PickListRow],
-    *,
-    orders: Sequence[object] | None = None,
-    title: str | None = None,
-) -> bytes:
+@lru_cache(maxsize=1)
+def _paragraph_styles() -> tuple[ParagraphStyle, ParagraphStyle, ParagraphStyle]:
     font_regular, font_bold = _register_reportlab_fonts()
     styles = getSampleStyleSheet()
     base = ParagraphStyle(
@@ -155,6 +152,17 @@ def render_pick_list_pdf(
         leading=20,
         spaceAfter=8,
     )
+    return base, muted, h1
+
+
+def render_pick_list_pdf(
+    rows: Sequence[PickListRow],
+    *,
+    orders: Sequence[object] | None = None,
+    title: str | None = None,
+) -> bytes:
+    _, font_bold = _register_reportlab_fonts()
+    base, muted, h1 = _paragraph_styles()
 
     buf = io.BytesIO()
     doc = SimpleDocTemplate(
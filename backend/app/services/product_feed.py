@@ -0,0 +1,318 @@
+"""Materialized merchant product feed.
+
+Marketplace crawlers poll ``/catalog/products/feed`` (JSON) and ``feed.csv``
+every few minutes. Instead of scanning the catalog per request, each language's
+feed is rendered once into files under private media storage (plus
+gzip-precompressed copies) and described by a small manifest. A snapshot stays
+valid until
+
+* the catalog generation changes (every catalog write bumps it),
+* the next sale start/end passes (prices are evaluated at build time), or
+* ``product_feed_max_age_seconds`` elapses (backstop for writes that bypass the
+  generation counter).
+
+A fresh request then costs one manifest read and a ``stat()`` (both off the
+event loop); the first request after a change rebuilds the snapshot, and
+concurrent requests for the same feed in a process wait for that one rebuild.
+Data files are content addressed, so a reader holding the previous manifest
+never sees a half-replaced file.
+
+Without Redis the generation counter is per process, so a snapshot built by
+another worker cannot be compared by generation. It is reused as long as it was
+built after this process started and after it last saw a catalog write; writes
+made in other processes are picked up by the max-age backstop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Final, Literal
+
+import anyio.to_thread
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.models.catalog import Product, ProductStatus
+from app.schemas.catalog import ProductFeedItem
+from app.services import catalog as catalog_service
+from app.services import catalog_cache, private_storage
+
+logger = logging.getLogger(__name__)
+
+FeedFormat = Literal["json", "csv"]
+
+MEDIA_TYPES: Final[dict[str, str]] = {
+    "json": "application/json",
+    "csv": "text/csv",
+}
+_FEED_SUBDIR: Final[str] = "feeds"
+# Without Redis the generation counter is per process and restarts at 0.
+_process_token = uuid.uuid4().hex[:12]
+_seen_generation: int | None = None
+# Snapshots left by processes that ran before this one are not trusted.
+_local_change_at = time.time()
+_build_locks: dict[str, asyncio.Lock] = {}
+
+
+@dataclass(frozen=True)
+class FeedFile:
+    path: Path
+    gzip_path: Path
+    etag: str
+    last_modified: datetime
+    media_type: str
+
+
+def _feed_dir() -> Path:
+    path = private_storage.ensure_private_root() / _FEED_SUBDIR
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _stem(lang: str | None) -> str:
+    return f"product-feed-{lang or 'base'}"
+
+
+def _max_age_seconds() -> int:
+    return max(0, int(getattr(settings, "product_feed_max_age_seconds", 0) or 0))
+
+
+def _note_local_generation(generation: int, now: float) -> None:
+    """Remember when this process last saw its own generation move."""
+    global _seen_generation, _local_change_at
+    if generation == _seen_generation:
+        return
+    # A non-zero first reading means writes happened before the first request.
+    if _seen_generation is not None or generation > 0:
+        _local_change_at = now
+    _seen_generation = generation
+
+
+async def _generation_token() -> str:
+    generation = await catalog_cache.get_generation()
+    if get_redis() is not None:
+        return str(generation)
+    _note_local_generation(generation, time.time())
+    return f"{_process_token}:{generation}"
+
+
+def _read_manifest(directory: Path, stem: str) -> dict[str, Any] | None:
+    try:
+        return json.loads((directory / f"{stem}.manifest.json").read_text("utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _is_fresh(manifest: dict[str, Any] | None, *, token: str, now: float) -> bool:
+    if not manifest:
+        return False
+    valid_until = manifest.get("valid_until")
+    if valid_until is not None and now >= float(valid_until):
+        return False
+    generation = str(manifest.get("generation") or "")
+    if generation == token:
+        return True
+    if ":" not in token or generation.startswith(f"{_process_token}:"):
+        return False
+    # Built by another process (no shared generation without Redis).
+    return float(manifest.get("built_at") or 0) >= _local_change_at
+
+
+def _usable_manifest(
+    directory: Path, stem: str, fmt: FeedFormat, *, token: str
+) -> dict[str, Any] | None:
+    """The current manifest when it is fresh and its ``fmt`` file exists."""
+    manifest = _read_manifest(directory, stem)
+    if manifest is None or not _is_fresh(manifest, token=token, now=time.time()):
+        return None
+    entry = (manifest.get("formats") or {}).get(fmt) or {}
+    if not entry.get("file") or not (directory / entry["file"]).exists():
+        return None
+    return manifest
+
+
+async def _next_sale_boundary(session: AsyncSession, now: datetime) -> datetime | None:
+    """Earliest future sale start/end among feed products (a price change)."""
+    upcoming_start = case(
+        (Product.sale_start_at > now, Product.sale_start_at), else_=None
+    )
+    upcoming_end = case((Product.sale_end_at > now, Product.sale_end_at), else_=None)
+    row = (
+        await session.execute(
+            select(func.min(upcoming_start), func.min(upcoming_end)).where(
+                Product.is_deleted.is_(False),
+                Product.is_active.is_(True),
+                Product.status == ProductStatus.published,
+                Product.sale_price.is_not(None),
+            )
+        )
+    ).one()
+    boundaries = [
+        value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+        for value in row
+        if value is not None
+    ]
+    return min(boundaries) if boundaries else None
+
+
+def _render(items: list[ProductFeedItem]) -> dict[str, bytes]:
+    json_body = json.dumps(
+        [item.model_dump(mode="json") for item in items],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(catalog_service.PRODUCT_FEED_CSV_HEADER)
+    writer.writerows(catalog_service.product_feed_csv_row(item) for item in items)
+    return {"json": json_body, "csv": buf.getvalue().encode("utf-8")}
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _prune(directory: Path, stem: str, keep: set[str]) -> None:
+    for path in directory.glob(f"{stem}.*"):
+        if path.name in keep or path.name.endswith(".manifest.json"):
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            continue
+
+
+def _write_snapshot(
+    directory: Path,
+    stem: str,
+    bodies: dict[str, bytes],
+    *,
+    token: str,
+    built_at: float,
+    valid_until: float | None,
+) -> dict[str, Any]:
+    previous = (_read_manifest(directory, stem) or {}).get("formats") or {}
+    formats: dict[str, dict] = {}
+    for fmt, body in bodies.items():
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        name = f"{stem}.{digest}.{fmt}"
+        if not (directory / name).exists():
+            _atomic_write(
+                directory / f"{name}.gz", gzip.compress(body, compresslevel=9, mtime=0)
+            )
+            _atomic_write(directory / name, body)
+        # Unchanged content keeps its Last-Modified across rebuilds.
+        prior = previous.get(fmt) or {}
+        modified_at = prior.get("modified_at") if prior.get("file") == name else None
+        formats[fmt] = {
+            "file": name,
+            "etag": f'W/"{stem}-{fmt}-{digest}"',
+            "modified_at": modified_at or built_at,
+        }
+    manifest = {
+        "generation": token,
+        "built_at": built_at,
+        "valid_until": valid_until,
+        "formats": formats,
+    }
+    _atomic_write(
+        directory / f"{stem}.manifest.json", json.dumps(manifest).encode("utf-8")
+    )
+    # The previous snapshot's files stay for readers still holding its manifest.
+    keep = {entry["file"] for entry in [*formats.values(), *previous.values()]}
+    _prune(directory, stem, keep | {f"{name}.gz" for name in keep})
+    return manifest
+
+
+async def _build(
+    session: AsyncSession, *, lang: str | None, token: str, directory: Path
+) -> dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    items = [
+        item
+        async for item in catalog_service.iter_product_feed_items(
+            session, lang=lang, now=now
+        )
+    ]
+    built_at = now.timestamp()
+    deadlines = []
+    boundary = await _next_sale_boundary(session, now)
+    if boundary is not None:
+        deadlines.append(boundary.timestamp())
+    if _max_age_seconds() > 0:
+        deadlines.append(built_at + _max_age_seconds())
+    bodies = await anyio.to_thread.run_sync(_render, items)
+    manifest = await anyio.to_thread.run_sync(
+        lambda: _write_snapshot(
+            directory,
+            _stem(lang),
+            bodies,
+            token=token,
+            built_at=built_at,
+            valid_until=min(deadlines) if deadlines else None,
+        )
+    )
+    logger.info(
+        "product_feed_built",
+        extra={"lang": lang or "base", "items": len(items)},
+    )
+    return manifest
+
+
+async def get_feed_file(
+    session: AsyncSession, *, lang: str | None, fmt: FeedFormat
+) -> FeedFile:
+    """Return the current snapshot for ``lang``, rebuilding it when stale."""
+    directory = await anyio.to_thread.run_sync(_feed_dir)
+    stem = _stem(lang)
+    token = await _generation_token()
+    manifest = await anyio.to_thread.run_sync(
+        lambda: _usable_manifest(directory, stem, fmt, token=token)
+    )
+    if manifest is None:
+        lock = _build_locks.setdefault(stem, asyncio.Lock())
+        async with lock:
+            # Another request may have rebuilt it while this one waited.
+            manifest = await anyio.to_thread.run_sync(
+                lambda: _usable_manifest(directory, stem, fmt, token=token)
+            )
+            if manifest is None:
+                manifest = await _build(
+                    session, lang=lang, token=token, directory=directory
+                )
+    entry = manifest["formats"][fmt]
+    path = directory / entry["file"]
+    return FeedFile(
+        path=path,
+        gzip_path=path.with_name(f"{path.name}.gz"),
+        etag=entry["etag"],
+        last_modified=datetime.fromtimestamp(
+            int(entry["modified_at"]), tz=timezone.utc
+        ),
+        media_type=MEDIA_TYPES[fmt],
+    )
+
+
+def _reset_for_tests() -> None:
+    # Snapshots on disk outlive the per-test databases; orphan them.
+    global _process_token, _seen_generation, _local_change_at
+    _process_token = uuid.uuid4().hex[:12]
+    _seen_generation = None
+    _local_change_at = time.time()
+    _build_locks.clear()
@@ -0,0 +1,216 @@
+"""Time-driven product transitions (scheduled publish/unpublish, sale windows).
+
+Storefront reads used to apply due schedules themselves, issuing the UPDATEs
+below on every anonymous GET. They are now read-only; a leader-elected worker
+applies the transitions instead. It keeps a min-heap of the upcoming
+publish/unpublish/sale-start/sale-end instants and sleeps until the earliest
+one, then applies everything that is due in one transaction and bumps the
+catalog cache generation. Sale windows change no row by themselves, but the
+listed prices do, so the generation is bumped for those boundaries as well.
+
+Admin writes that touch a schedule call ``notify`` so the leader reloads its
+heap (through Redis when several instances run). Without Redis, ``notify``
+only wakes the scheduler of its own process: a schedule saved on another
+instance is picked up at the next reload, which happens every
+``product_schedule_refresh_seconds`` as a safety net.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Final
+
+from fastapi import FastAPI
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.dml import Update
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.catalog import Product, ProductStatus
+from app.services import catalog_cache, queue_worker
+
+logger = logging.getLogger(__name__)
+
+WAKEUP_KEY: Final[str] = "catalog:schedules:wakeup"
+_HEAP_LIMIT: Final[int] = 256
+# Wake slightly after the boundary so comparisons against it are inclusive.
+_WAKE_SLACK_SECONDS: Final[float] = 0.05
+
+_wakeup = queue_worker.Wakeup(WAKEUP_KEY, name="product_schedule")
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "product_schedule_scheduler_enabled", True))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def due_sale_publish(now: datetime) -> Update:
+    """Publish drafts whose auto-publishing sale has started."""
+    return (
+        update(Product)
+        .where(
+            Product.is_deleted.is_(False),
+            Product.is_active.is_(True),
+            Product.status == ProductStatus.draft,
+            Product.sale_auto_publish.is_(True),
+            Product.sale_price.is_not(None),
+            Product.sale_start_at.is_not(None),
+            Product.sale_start_at <= now,
+            or_(Product.sale_end_at.is_(None), Product.sale_end_at > now),
+        )
+        .values(
+            status=ProductStatus.published,
+            publish_at=func.coalesce(Product.publish_at, now),
+        )
+    )
+
+
+def due_publish(now: datetime) -> Update:
+    return (
+        update(Product)
+        .where(
+            Product.is_deleted.is_(False),
+            Product.publish_scheduled_for.is_not(None),
+            Product.publish_scheduled_for <= now,
+        )
+        .values(
+            status=ProductStatus.published,
+            publish_at=func.coalesce(Product.publish_at, now),
+            publish_scheduled_for=None,
+        )
+    )
+
+
+def due_unpublish(now: datetime) -> Update:
+    return (
+        update(Product)
+        .where(
+            Product.is_deleted.is_(False),
+            Product.status == ProductStatus.published,
+            Product.unpublish_scheduled_for.is_not(None),
+            Product.unpublish_scheduled_for <= now,
+        )
+        .values(status=ProductStatus.archived, unpublish_scheduled_for=None)
+    )
+
+
+async def apply_due_transitions(
+    session: AsyncSession, *, now: datetime | None = None
+) -> int:
+    """Apply every due transition in one transaction; returns changed rows."""
+    now_dt = now or _now()
+    updated = 0
+    for stmt in (due_sale_publish(now_dt), due_publish(now_dt), due_unpublish(now_dt)):
+        res = await session.execute(stmt)
+        updated += int(getattr(res, "rowcount", 0) or 0)
+    if updated:
+        await session.commit()
+        await catalog_cache.bump_generation()
+    return updated
+
+
+async def upcoming_boundaries(
+    session: AsyncSession, *, after: datetime, limit: int = _HEAP_LIMIT
+) -> list[datetime]:
+    """Earliest future instants at which the storefront catalog changes."""
+    live = Product.is_deleted.is_(False)
+    on_sale = and_(live, Product.sale_price.is_not(None))
+    sources = (
+        (Product.publish_scheduled_for, live),
+        (Product.unpublish_scheduled_for, live),
+        (Product.sale_start_at, on_sale),
+        (Product.sale_end_at, on_sale),
+    )
+    instants: set[datetime] = set()
+    for column, clause in sources:
+        rows = await session.execute(
+            select(column)
+            .where(clause, column.is_not(None), column > after)
+            .distinct()
+            .order_by(column)
+            .limit(limit)
+        )
+        instants.update(_aware(value) for value in rows.scalars() if value is not None)
+    return sorted(instants)[:limit]
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def notify() -> None:
+    """Tell the scheduler that a product schedule changed."""
+    await _wakeup.notify()
+
+
+def _pop_due(heap: list[datetime], now: datetime) -> bool:
+    due = False
+    while heap and heap[0] <= now:
+        heapq.heappop(heap)
+        due = True
+    return due
+
+
+async def _wait(stop: asyncio.Event, timeout: float) -> bool:
+    """Sleep until the timeout, a stop or a wakeup; returns True when woken."""
+    return await _wakeup.wait(stop, timeout)
+
+
+async def _loop(stop: asyncio.Event) -> None:
+    refresh = max(
+        30, int(getattr(settings, "product_schedule_refresh_seconds", 300) or 300)
+    )
+    heap: list[datetime] = []
+    reload_at = 0.0
+    woken = False
+    while not stop.is_set():
+        now = _now()
+        try:
+            due = _pop_due(heap, now)
+            reload = woken or not heap or time.monotonic() >= reload_at
+            async with SessionLocal() as session:
+                # A full reload also catches up on anything missed while no
+                # instance was leader.
+                if due or reload:
+                    applied = await apply_due_transitions(session, now=now)
+                    if applied:
+                        logger.info(
+                            "product_schedules_applied", extra={"count": applied}
+                        )
+                    elif due:
+                        await catalog_cache.bump_generation()
+                if reload:
+                    heap = await upcoming_boundaries(session, after=now)
+                    heapq.heapify(heap)
+                    reload_at = time.monotonic() + refresh
+        except asyncio.CancelledError:
+            break
+        except Exception as exc:
+            logger.warning("product_schedule_scheduler_failed", extra={"error": str(exc)})
+            heap = []
+
+        timeout = float(refresh)
+        if heap:
+            until_next = (heap[0] - _now()).total_seconds() + _WAKE_SLACK_SECONDS
+            timeout = min(timeout, until_next)
+        woken = await _wait(stop, timeout)
+
+
+def start(app: FastAPI) -> None:
+    if not enabled():
+        return
+    queue_worker.start(
+        app, "product_schedule_scheduler", _loop, wakeup=_wakeup, leader=True
+    )
+
+
+async def stop(app: FastAPI) -> None:
+    await queue_worker.stop(app, "product_schedule_scheduler", wakeup=_wakeup)
@@ -0,0 +1,123 @@
+"""Catalog product search.
+
+Every product and product translation carries a ``search_document``: its name,
+short and long description, unaccented and lowercased. Products also keep the
+normalized name alone in ``search_name`` for ranking. Both are rebuilt in
+``before_flush`` whenever one of those fields changes, so searches compare plain
+stored columns instead of normalizing three columns per row at query time.
+
+On PostgreSQL the 0162 migration adds GIN trigram indexes serving the
+``LIKE '%term%'`` filter. The ``relevance`` sort breaks ties with a ``simple``
+full-text rank computed on the rows that already matched, so it needs no index
+of its own. SQLite (tests, local dev) runs the same filter with a table scan and
+ranks by the portable part of the score only.
+"""
+
+from __future__ import annotations
+
+import unicodedata
+from typing import Any, Final
+
+from sqlalchemy import case, event, exists, func, inspect, or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+
+from app.db.base import Base
+from app.models.catalog import Product, ProductTranslation
+
+_DOCUMENT_FIELDS: Final[tuple[str, ...]] = (
+    "name",
+    "short_description",
+    "long_description",
+)
+_LIKE_ESCAPE: Final[str] = "\\"
+TS_CONFIG: Final[str] = "simple"
+
+
+def normalize_search_text(value: str | None) -> str:
+    raw = (value or "").strip()
+    if not raw:
+        return ""
+    normalized = unicodedata.normalize("NFKD", raw)
+    without_marks = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+    return without_marks.lower()
+
+
+def build_search_document(
+    name: str | None, short_description: str | None, long_description: str | None
+) -> str:
+    """Join the searchable fields, name first (prefix matches rank higher)."""
+    parts = (
+        normalize_search_text(value)
+        for value in (name, short_description, long_description)
+    )
+    return " ".join(part for part in parts if part)
+
+
+def _escape_like(term: str) -> str:
+    return (
+        term.replace(_LIKE_ESCAPE, _LIKE_ESCAPE * 2)
+        .replace("%", f"{_LIKE_ESCAPE}%")
+        .replace("_", f"{_LIKE_ESCAPE}_")
+    )
+
+
+def search_clause(normalized_term: str) -> ColumnElement[bool]:
+    """Match the product or any of its translations containing the term."""
+    pattern = f"%{_escape_like(normalized_term)}%"
+    return or_(
+        Product.search_document.like(pattern, escape=_LIKE_ESCAPE),
+        exists(
+            select(ProductTranslation.id).where(
+                ProductTranslation.product_id == Product.id,
+                ProductTranslation.search_document.like(pattern, escape=_LIKE_ESCAPE),
+            )
+        ),
+    )
+
+
+def relevance_score(normalized_term: str, *, dialect: str) -> ColumnElement[Any]:
+    """Higher is better.
+
+    Exact name, name prefix, name word and other name matches come first, in
+    that order; description or translation-only matches score zero. On
+    PostgreSQL the full-text rank (below 1) breaks ties within a tier.
+    """
+    escaped = _escape_like(normalized_term)
+    name = Product.search_name
+    score: ColumnElement[Any] = case(
+        (name == normalized_term, 4),
+        (name.like(f"{escaped}%", escape=_LIKE_ESCAPE), 3),
+        (name.like(f"% {escaped}%", escape=_LIKE_ESCAPE), 2),
+        (name.like(f"%{escaped}%", escape=_LIKE_ESCAPE), 1),
+        else_=0,
+    )
+    if dialect == "postgresql":
+        score = score + func.ts_rank_cd(
+            func.to_tsvector(TS_CONFIG, Product.search_document),
+            func.plainto_tsquery(TS_CONFIG, normalized_term),
+        )
+    return score
+
+
+def _document_changed(obj: Base) -> bool:
+    state = inspect(obj).attrs
+    return any(state[attr].history.has_changes() for attr in _DOCUMENT_FIELDS)
+
+
+def _refresh_document(obj: Product | ProductTranslation) -> None:
+    obj.search_document = build_search_document(
+        obj.name, obj.short_description, obj.long_description
+    )
+    if isinstance(obj, Product):
+        obj.search_name = normalize_search_text(obj.name)
+
+
+@event.listens_for(Session, "before_flush")
+def _refresh_search_documents(session: Session, _flush_context, _instances) -> None:
+    for obj in session.new:
+        if isinstance(obj, (Product, ProductTranslation)):
+            _refresh_document(obj)
+    for obj in session.dirty:
+        if isinstance(obj, (Product, ProductTranslation)) and _document_changed(obj):
+            _refresh_document(obj)
@@ -0,0 +1,199 @@
+"""Shared plumbing for the polling queue workers.
+
+The email outbox, the webhook queue and the product schedule scheduler all
+run the same way: a background task that does a round of work, then sleeps
+until its poll interval elapses, it is stopped, or something ``notify``-s it.
+This module holds the parts they share: the ``Wakeup`` channel, the retry
+``backoff`` and the ``start``/``stop`` lifecycle on ``app.state``.
+
+``Wakeup.notify`` sets an in-process event and pushes to a Redis list, so the
+worker wakes early on whichever instance runs it. The worker blocks on that
+list with its own single-connection client (``create_redis_client``), never
+the shared pool. A BLPOP cancelled mid-flight (stop, or the local event
+firing first) can leave its reply unread on the connection, so that client
+is closed and the next wait opens a fresh one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Final
+
+from fastapi import FastAPI
+
+from app.core.redis_client import await_redis, create_redis_client, get_redis
+from app.services import leader_lock
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis as RedisClient
+
+logger = logging.getLogger(__name__)
+
+_MAX_BACKOFF_SECONDS: Final[int] = 3600
+# Only "there is work" matters; keep the list from growing while idle.
+_WAKEUP_LIST_LENGTH: Final[int] = 16
+
+
+def backoff(
+    attempts: int, *, base_seconds: int, max_seconds: int = _MAX_BACKOFF_SECONDS
+) -> timedelta:
+    """Exponential retry delay after ``attempts`` failed attempts."""
+    base = max(1, int(base_seconds or 1))
+    return timedelta(seconds=min(max_seconds, base * 2 ** max(0, attempts - 1)))
+
+
+class Wakeup:
+    """Wakes a worker before its next poll, in this process or through Redis."""
+
+    def __init__(self, key: str, *, name: str) -> None:
+        self.key = key
+        self.name = name
+        self._event: asyncio.Event | None = None
+        self._blocking: RedisClient | None = None
+
+    def open(self) -> None:
+        self._event = asyncio.Event()
+
+    async def close(self) -> None:
+        self._event = None
+        await self._drop_blocking()
+
+    async def notify(self) -> None:
+        if self._event is not None:
+            self._event.set()
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            await await_redis(client.rpush(self.key, "1"))
+            await await_redis(client.ltrim(self.key, -_WAKEUP_LIST_LENGTH, -1))
+        except Exception as exc:
+            logger.warning(f"{self.name}_wakeup_failed", extra={"error": str(exc)})
+
+    async def wait(self, stop: asyncio.Event, timeout: float) -> bool:
+        """Sleep until ``timeout``, ``stop`` or a wakeup; returns True when woken."""
+        timeout = max(0.0, timeout)
+        local = self._event
+        waiters: list[asyncio.Task[Any]] = [asyncio.create_task(stop.wait())]
+        if local is not None:
+            waiters.append(asyncio.create_task(local.wait()))
+        blpop: asyncio.Task[bool] | None = None
+        # BLPOP timeouts are whole seconds; shorter sleeps rely on the local event.
+        if timeout >= 1 and get_redis() is not None:
+            if self._blocking is None:
+                self._blocking = create_redis_client()
+            if self._blocking is not None:
+                blpop = asyncio.create_task(self._blpop(self._blocking, int(timeout)))
+                waiters.append(blpop)
+        try:
+            # With a BLPOP in flight the server ends the wait; the grace second
+            # keeps it from being cancelled just as it returns.
+            await asyncio.wait(
+                waiters,
+                timeout=timeout + 1 if blpop is not None else timeout,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+        if blpop is not None and blpop.cancelled():
+            await self._drop_blocking()
+        woken = local is not None and local.is_set()
+        if local is not None:
+            local.clear()
+        if blpop is not None and not blpop.cancelled() and blpop.result():
+            woken = True
+        return woken
+
+    async def _blpop(self, client: RedisClient, timeout: int) -> bool:
+        try:
+            return bool(await await_redis(client.blpop([self.key], timeout=timeout)))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning(f"{self.name}_wakeup_failed", extra={"error": str(exc)})
+            await self._drop_blocking()
+            # Sleep out the wait rather than spinning on a broken connection.
+            await asyncio.sleep(timeout)
+            return False
+
+    async def _drop_blocking(self) -> None:
+        client, self._blocking = self._blocking, None
+        if client is not None:
+            with suppress(Exception):
+                await client.aclose()
+
+
+async def run_batches(
+    stop: asyncio.Event,
+    *,
+    name: str,
+    process_batch: Callable[[], Awaitable[int]],
+    wakeup: Wakeup,
+    poll_seconds: float,
+) -> None:
+    """Call ``process_batch`` until stopped, waiting whenever it found no work."""
+    while not stop.is_set():
+        handled = 0
+        try:
+            handled = await process_batch()
+        except asyncio.CancelledError:
+            break
+        except Exception as exc:
+            logger.warning(f"{name}_worker_failed", extra={"error": str(exc)})
+        if not handled:
+            await wakeup.wait(stop, poll_seconds)
+
+
+def start(
+    app: FastAPI,
+    name: str,
+    work: Callable[[asyncio.Event], Awaitable[None]],
+    *,
+    wakeup: Wakeup | None = None,
+    leader: bool = False,
+) -> None:
+    """Run ``work`` as ``app.state.<name>_task``, on the leader only if asked."""
+    if getattr(app.state, f"{name}_task", None) is not None:
+        return
+    if wakeup is not None:
+        wakeup.open()
+    stop_event = asyncio.Event()
+    coro = (
+        leader_lock.run_as_leader(name=name, stop=stop_event, work=work)
+        if leader
+        else work(stop_event)
+    )
+    setattr(app.state, f"{name}_stop", stop_event)
+    setattr(app.state, f"{name}_task", asyncio.ensure_future(coro))
+
+
+async def stop(
+    app: FastAPI,
+    name: str,
+    *,
+    wakeup: Wakeup | None = None,
+    drain_seconds: float = 0.0,
+) -> None:
+    """Stop a worker started with ``start``, letting it finish its round first."""
+    stop_event = getattr(app.state, f"{name}_stop", None)
+    task = getattr(app.state, f"{name}_task", None)
+    if stop_event:
+        stop_event.set()
+    if task:
+        if drain_seconds > 0:
+            # Let an in-flight batch finish rather than leaving it leased.
+            await asyncio.wait({task}, timeout=drain_seconds)
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    for attr in (f"{name}_stop", f"{name}_task"):
+        if getattr(app.state, attr, None) is not None:
+            delattr(app.state, attr)
+    if wakeup is not None:
+        await wakeup.close()
@@ -3,6 +3,7 @@ from __future__ import annotations
 import io
 from datetime import datetime, timezone
 from decimal import Decimal
+from functools import lru_cache
 from pathlib import Path
 from typing import Sequence, SupportsFloat, SupportsIndex
 from xml.sax.saxutils import escape as xml_escape
@@ -253,15 +254,10 @@ def _payment_method_bilingual_label(payment_method: str) -> str:
     return value.upper()
 
 
-def _render_order_receipt_pdf_reportlab(
-    order, items: Sequence | None = None, *, redacted: bool = False
-) -> bytes:
-    """Render a bilingual (RO/EN) receipt PDF with clickable product links."""
-
-    items = list(items) if items else list(getattr(order, "items", []) or [])
-    locale = _order_locale(order)
-    receipt = build_order_receipt(order, items, redacted=redacted)
-
+@lru_cache(maxsize=1)
+def _paragraph_styles() -> tuple[
+    ParagraphStyle, ParagraphStyle, ParagraphStyle, ParagraphStyle
+]:
     font_regular, font_bold = _register_reportlab_fonts()
     styles = getSampleStyleSheet()
     base_style = ParagraphStyle(
@@ -296,6 +292,23 @@ def _render_order_receipt_pdf_reportlab(
         spaceBefore=6,
         spaceAfter=4,
     )
+    return base_style, small_muted, h1, h2
+
+
+def _render_order_receipt_pdf_reportlab(
+    order, items: Sequence | None = None, *, redacted: bool = False
+) -> bytes:
+    """Render a bilingual (RO/EN) receipt PDF with clickable product links."""
+
+    items = list(items) if items else list(getattr(order, "items", []) or [])
+    receipt = build_order_receipt(order, items, redacted=redacted)
+    return render_receipt_pdf(receipt, locale=_order_locale(order))
+
+
+def render_receipt_pdf(receipt: ReceiptRead, *, locale: str) -> bytes:
+    """Render an already built receipt (picklable input for the render pool)."""
+    font_regular, font_bold = _register_reportlab_fonts()
+    base_style, small_muted, h1, h2 = _paragraph_styles()
 
     buf = io.BytesIO()
     doc = SimpleDocTemplate(
@@ -0,0 +1,399 @@
+"""Write-behind store for recently viewed products.
+
+Product detail views used to run two transactions per request to keep the
+``recently_viewed_products`` rows current. Views are now recorded in a fast
+store only: a bounded sorted set per viewer in Redis when configured,
+otherwise a per-process LRU. Viewers with unsaved views are marked dirty, and
+a background task saves them every ``recently_viewed_flush_seconds``. Each
+flush is one batched upsert per viewer kind, plus one windowed DELETE that
+trims every flushed viewer to their cap.
+
+A viewer or product deleted after the view fails the batch on its foreign
+key. The flush then drops the rows that point at missing users or products
+and saves the rest; a batch that still violates a constraint is dropped
+rather than retried forever. Other errors put the viewers back as dirty.
+
+Reads use the fast store first and fall back to the table only when it
+holds fewer entries than requested (e.g. a viewer seen before a restart).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import suppress
+from datetime import datetime, timezone
+from typing import Any, Final
+
+from fastapi import FastAPI
+from sqlalchemy import case, delete, func, literal, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.db.session import SessionLocal
+from app.models.catalog import Product, RecentlyViewedProduct
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX: Final[str] = "recently-viewed"
+DIRTY_KEY: Final[str] = "recently-viewed:dirty"
+_LOCAL_MAX_VIEWERS: Final[int] = 10_000
+_FLUSH_BATCH: Final[int] = 500
+_DRAIN_SECONDS: Final[float] = 10.0
+
+# viewer key -> product id -> viewed timestamp, most recently used viewer last.
+_local_views: OrderedDict[str, dict[str, float]] = OrderedDict()
+# viewer key -> cap, for viewers with views not yet saved.
+_local_dirty: dict[str, int] = {}
+
+
+def viewer_key(user_id: uuid.UUID | None, session_id: str | None) -> str | None:
+    if user_id:
+        return f"u:{user_id}"
+    if session_id:
+        return f"s:{session_id}"
+    return None
+
+
+def _redis_key(key: str) -> str:
+    return f"{_KEY_PREFIX}:{key}"
+
+
+def _ttl_seconds() -> int:
+    return max(
+        60, int(getattr(settings, "recently_viewed_ttl_seconds", 0) or 60 * 60 * 24 * 7)
+    )
+
+
+def _local_record(key: str, product_id: str, viewed_at: float, limit: int) -> None:
+    views = _local_views.pop(key, {})
+    views[product_id] = viewed_at
+    if len(views) > limit:
+        newest = sorted(views.items(), key=lambda item: item[1], reverse=True)
+        views = dict(newest[:limit])
+    _local_views[key] = views
+    _local_dirty[key] = limit
+    while len(_local_views) > _LOCAL_MAX_VIEWERS:
+        oldest_key, _ = next(iter(_local_views.items()))
+        if oldest_key in _local_dirty:
+            # Never drop views that were not saved yet.
+            break
+        _local_views.popitem(last=False)
+
+
+async def record(
+    user_id: uuid.UUID | None,
+    session_id: str | None,
+    product_id: uuid.UUID,
+    *,
+    limit: int = 10,
+) -> None:
+    """Remember a product view without touching the database."""
+    key = viewer_key(user_id, session_id)
+    if key is None:
+        return
+    limit = max(1, int(limit))
+    viewed_at = time.time()
+    client = get_redis()
+    if client is not None:
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.zadd(_redis_key(key), {str(product_id): viewed_at})
+            pipe.zremrangebyrank(_redis_key(key), 0, -(limit + 1))
+            pipe.expire(_redis_key(key), _ttl_seconds())
+            # The dirty set's score carries the viewer's cap to the flush.
+            pipe.zadd(DIRTY_KEY, {key: limit})
+            await pipe.execute()
+            return
+        except Exception as exc:
+            logger.warning("recently_viewed_record_failed", extra={"error": str(exc)})
+    _local_record(key, str(product_id), viewed_at, limit)
+
+
+async def recent(
+    user_id: uuid.UUID | None, session_id: str | None, *, limit: int
+) -> list[tuple[uuid.UUID, datetime]]:
+    """Newest views from the fast store, newest first."""
+    key = viewer_key(user_id, session_id)
+    if key is None:
+        return []
+    raw: list[tuple[str, float]] | None = None
+    client = get_redis()
+    if client is not None:
+        try:
+            raw = [
+                (str(member), float(score))
+                for member, score in await client.zrevrange(
+                    _redis_key(key), 0, max(0, limit - 1), withscores=True
+                )
+            ]
+        except Exception as exc:
+            logger.warning("recently_viewed_read_failed", extra={"error": str(exc)})
+    if raw is None:
+        views = _local_views.get(key)
+        if views is not None:
+            _local_views.move_to_end(key)
+        raw = sorted((views or {}).items(), key=lambda item: item[1], reverse=True)
+    return [
+        (uuid.UUID(product_id), datetime.fromtimestamp(ts, tz=timezone.utc))
+        for product_id, ts in raw[:limit]
+    ]
+
+
+async def _take_dirty() -> list[tuple[str, int, dict[str, float]]]:
+    taken: list[tuple[str, int, dict[str, float]]] = []
+    client = get_redis()
+    if client is not None:
+        try:
+            popped = await client.zpopmin(DIRTY_KEY, _FLUSH_BATCH)
+            for key, cap in popped:
+                members = await client.zrange(_redis_key(key), 0, -1, withscores=True)
+                taken.append(
+                    (key, int(cap), {str(pid): float(ts) for pid, ts in members})
+                )
+        except Exception as exc:
+            logger.warning("recently_viewed_take_failed", extra={"error": str(exc)})
+    for key in list(_local_dirty)[:_FLUSH_BATCH]:
+        cap = _local_dirty.pop(key)
+        taken.append((key, cap, dict(_local_views.get(key) or {})))
+    return taken
+
+
+async def _restore_dirty(taken: list[tuple[str, int, dict[str, float]]]) -> None:
+    client = get_redis()
+    for key, cap, views in taken:
+        if client is not None:
+            with suppress(Exception):
+                await client.zadd(DIRTY_KEY, {key: cap})
+                continue
+        if key not in _local_views:
+            _local_views[key] = views
+        _local_dirty.setdefault(key, cap)
+
+
+def _insert_fn(session: AsyncSession) -> Any:
+    bind = session.get_bind()
+    dialect = getattr(getattr(bind, "dialect", None), "name", "")
+    if dialect == "postgresql":
+        return pg_insert
+    if dialect == "sqlite":
+        return sqlite_insert
+    return None
+
+
+async def _upsert(
+    session: AsyncSession, rows: list[dict[str, Any]], *, by_user: bool
+) -> None:
+    if not rows:
+        return
+    owner = RecentlyViewedProduct.user_id if by_user else RecentlyViewedProduct.session_id
+    insert_fn = _insert_fn(session)
+    if insert_fn is not None:
+        stmt = insert_fn(RecentlyViewedProduct).values(
+            [{"id": uuid.uuid4(), **row} for row in rows]
+        )
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[owner, RecentlyViewedProduct.product_id],
+                index_where=owner.is_not(None),
+                set_={"viewed_at": stmt.excluded.viewed_at},
+            )
+        )
+        return
+    for row in rows:  # pragma: no cover - other dialects
+        owner_value = row["user_id"] if by_user else row["session_id"]
+        existing = await session.scalar(
+            select(RecentlyViewedProduct).where(
+                owner == owner_value,
+                RecentlyViewedProduct.product_id == row["product_id"],
+            )
+        )
+        if existing is not None:
+            existing.viewed_at = row["viewed_at"]
+        else:
+            session.add(RecentlyViewedProduct(**row))
+
+
+async def _trim(
+    session: AsyncSession,
+    caps: dict[tuple[uuid.UUID | None, str | None], int],
+) -> None:
+    """Drop everything past each viewer's cap with one windowed DELETE."""
+    user_ids = [user_id for user_id, _ in caps if user_id is not None]
+    session_ids = [sid for user_id, sid in caps if user_id is None and sid]
+    if not user_ids and not session_ids:
+        return
+    rv = RecentlyViewedProduct
+    guest_session = case((rv.user_id.is_(None), rv.session_id), else_=None)
+    distinct_caps = set(caps.values())
+    cap_expr: Any
+    if len(distinct_caps) == 1:
+        cap_expr = literal(distinct_caps.pop())
+    else:
+        cap_expr = case(
+            *(
+                (
+                    rv.user_id == user_id
+                    if user_id is not None
+                    else guest_session == sid,
+                    cap,
+                )
+                for (user_id, sid), cap in caps.items()
+            ),
+            else_=None,
+        )
+    ranked = (
+        select(
+            rv.id,
+            func.row_number()
+            .over(partition_by=(rv.user_id, guest_session), order_by=rv.viewed_at.desc())
+            .label("position"),
+            cap_expr.label("cap"),
+        )
+        .where(
+            or_(
+                rv.user_id.in_(user_ids),
+                (rv.user_id.is_(None) & rv.session_id.in_(session_ids)),
+            )
+        )
+        .subquery()
+    )
+    await session.execute(
+        delete(rv).where(
+            rv.id.in_(
+                select(ranked.c.id).where(
+                    ranked.c.cap.is_not(None), ranked.c.position > ranked.c.cap
+                )
+            )
+        )
+    )
+
+
+async def _without_orphans(
+    session: AsyncSession, rows: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """Drop rows whose user or product no longer exists."""
+    product_ids = {row["product_id"] for row in rows}
+    user_ids = {row["user_id"] for row in rows if row["user_id"] is not None}
+    products = set(
+        (await session.execute(select(Product.id).where(Product.id.in_(product_ids))))
+        .scalars()
+        .all()
+    )
+    users: set[uuid.UUID] = set()
+    if user_ids:
+        users = set(
+            (await session.execute(select(User.id).where(User.id.in_(user_ids))))
+            .scalars()
+            .all()
+        )
+    return [
+        row
+        for row in rows
+        if row["product_id"] in products
+        and (row["user_id"] is None or row["user_id"] in users)
+    ]
+
+
+async def flush(session: AsyncSession) -> int:
+    """Save the pending views; returns how many viewers were flushed."""
+    taken = await _take_dirty()
+    if not taken:
+        return 0
+    user_rows: list[dict[str, Any]] = []
+    guest_rows: list[dict[str, Any]] = []
+    caps: dict[tuple[uuid.UUID | None, str | None], int] = {}
+    for key, cap, views in taken:
+        kind, _, ident = key.partition(":")
+        user_id = uuid.UUID(ident) if kind == "u" else None
+        session_id = ident if kind == "s" else None
+        caps[(user_id, session_id)] = cap
+        for product_id, ts in views.items():
+            row = {
+                "product_id": uuid.UUID(product_id),
+                "user_id": user_id,
+                "session_id": session_id,
+                "viewed_at": datetime.fromtimestamp(ts, tz=timezone.utc),
+            }
+            (user_rows if user_id is not None else guest_rows).append(row)
+    for attempt in range(2):
+        try:
+            await _upsert(session, user_rows, by_user=True)
+            await _upsert(session, guest_rows, by_user=False)
+            await _trim(session, caps)
+            await session.commit()
+            break
+        except IntegrityError as exc:
+            await session.rollback()
+            if attempt:
+                # Retrying the same rows cannot succeed; drop the batch.
+                logger.warning(
+                    "recently_viewed_flush_dropped",
+                    extra={"viewers": len(taken), "error": str(exc)},
+                )
+                break
+            user_rows = await _without_orphans(session, user_rows)
+            guest_rows = await _without_orphans(session, guest_rows)
+        except Exception:
+            await session.rollback()
+            await _restore_dirty(taken)
+            raise
+    return len(taken)
+
+
+async def _loop(stop: asyncio.Event) -> None:
+    interval = max(
+        0.5, float(getattr(settings, "recently_viewed_flush_seconds", 5.0) or 5.0)
+    )
+    while not stop.is_set():
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        try:
+            while True:
+                async with SessionLocal() as session:
+                    if await flush(session) < _FLUSH_BATCH:
+                        break
+        except asyncio.CancelledError:
+            break
+        except Exception as exc:
+            logger.warning("recently_viewed_flush_failed", extra={"error": str(exc)})
+
+
+def start(app: FastAPI) -> None:
+    # Every instance flushes its own buffer; Redis pops make shared flushes safe.
+    if getattr(app.state, "recently_viewed_task", None) is not None:
+        return
+
+    stop = asyncio.Event()
+    app.state.recently_viewed_stop = stop
+    app.state.recently_viewed_task = asyncio.create_task(_loop(stop))
+
+
+async def stop(app: FastAPI) -> None:
+    stop_event = getattr(app.state, "recently_viewed_stop", None)
+    task = getattr(app.state, "recently_viewed_task", None)
+    if stop_event:
+        stop_event.set()
+    if task:
+        # The loop flushes once more after the stop signal.
+        await asyncio.wait({task}, timeout=_DRAIN_SECONDS)
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    if getattr(app.state, "recently_viewed_stop", None) is not None:
+        delattr(app.state, "recently_viewed_stop")
+    if getattr(app.state, "recently_viewed_task", None) is not None:
+        delattr(app.state, "recently_viewed_task")
+
+
+def _reset_for_tests() -> None:
+    _local_views.clear()
+    _local_dirty.clear()
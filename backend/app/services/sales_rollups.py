@@ -0,0 +1,574 @@
+"""Sales totals for the admin dashboard, backed by per-day rollups.
+
+Closed (past) UTC days are read from ``sales_daily_rollups``. Rows are written
+only by a leader-elected worker: each run fills in days that have no row yet and
+recomputes the last ``sales_rollup_resettle_days`` closed days with an upsert, so
+orders that land or change late are picked up. Any flush that changes an order,
+refund or ``test`` tag deletes the row of that order's day, which the worker then
+fills in again however old the day is.
+
+On PostgreSQL both sides take a transaction-level advisory lock per day, so the
+worker can never upsert a total computed before a concurrent change committed.
+The flush waits for the lock (at most one worker run); the worker only tries it
+and leaves a day that is being changed to a later run, so it never waits on an
+order transaction and the two cannot deadlock.
+
+Reads never write. Closed days without a row, and the partial edges of a window
+(today, and the first partial day of a rolling window), are aggregated from
+``orders`` directly. Once the worker has caught up, a 365-day range costs about
+the same as a one-day one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from contextlib import suppress
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Final
+
+from fastapi import FastAPI
+from sqlalchemy import and_, case, delete, event, func, inspect, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement, Subquery
+
+from app.core.config import settings
+from app.db.base import Base
+from app.db.session import SessionLocal
+from app.models.order import Order, OrderRefund, OrderStatus, OrderTag
+from app.models.sales_rollup import SalesDailyRollup
+from app.services import leader_lock
+
+logger = logging.getLogger(__name__)
+
+SUCCESSFUL_STATUSES: Final[tuple[OrderStatus, ...]] = (
+    OrderStatus.paid,
+    OrderStatus.shipped,
+    OrderStatus.delivered,
+)
+SALES_STATUSES: Final[tuple[OrderStatus, ...]] = (
+    *SUCCESSFUL_STATUSES,
+    OrderStatus.refunded,
+)
+TEST_ORDER_TAG: Final[str] = "test"
+
+_WATCHED_ORDER_ATTRS: Final[tuple[str, ...]] = ("status", "total_amount", "created_at")
+_ZERO: Final[Decimal] = Decimal("0")
+_MAX_DAYS_PER_RUN: Final[int] = 92
+# Advisory lock namespace (first key) for per-day locks; the day is the second.
+_DAY_LOCK_CLASS: Final[int] = 0x73616C65  # "sale"
+_LOCK_DAY = text("SELECT pg_advisory_xact_lock(:cls, :day)")
+_TRY_LOCK_DAY = text("SELECT pg_try_advisory_xact_lock(:cls, :day)")
+
+
+def exclude_test_orders() -> ColumnElement[bool]:
+    """Filter out orders tagged ``test`` (shared by every dashboard KPI)."""
+    return Order.id.notin_(
+        select(OrderTag.order_id).where(OrderTag.tag == TEST_ORDER_TAG)
+    )
+
+
+@dataclass(frozen=True)
+class SalesTotals:
+    sales: Decimal = _ZERO
+    gross_sales: Decimal = _ZERO
+    refunds: Decimal = _ZERO
+    missing_refunds: Decimal = _ZERO
+    orders: int = 0
+    orders_by_status: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def net_sales(self) -> Decimal:
+        return self.gross_sales - self.refunds - self.missing_refunds
+
+    def __add__(self, other: SalesTotals) -> SalesTotals:
+        by_status = dict(self.orders_by_status)
+        for key, count in other.orders_by_status.items():
+            by_status[key] = by_status.get(key, 0) + count
+        return SalesTotals(
+            sales=self.sales + other.sales,
+            gross_sales=self.gross_sales + other.gross_sales,
+            refunds=self.refunds + other.refunds,
+            missing_refunds=self.missing_refunds + other.missing_refunds,
+            orders=self.orders + other.orders,
+            orders_by_status=by_status,
+        )
+
+
+def _decimal(value: Any) -> Decimal:
+    return Decimal(str(value or 0))
+
+
+def _utc_day(value: datetime) -> date:
+    if value.tzinfo is None:
+        return value.date()
+    return value.astimezone(timezone.utc).date()
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def _dialect_name(session: AsyncSession) -> str:
+    bind = session.get_bind()
+    return getattr(getattr(bind, "dialect", None), "name", "")
+
+
+def _order_rows(*filters: Any) -> Subquery:
+    """Non-test orders with their refunded total (NULL when never refunded)."""
+    refunded = (
+        select(func.sum(OrderRefund.amount))
+        .where(OrderRefund.order_id == Order.id)
+        .correlate(Order)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            Order.created_at,
+            Order.status,
+            Order.total_amount,
+            refunded.label("refunded"),
+        )
+        .where(exclude_test_orders(), *filters)
+        .subquery()
+    )
+
+
+def _window_columns(rows: Subquery, prefix: str, condition: Any) -> list[Any]:
+    sales = rows.c.status.in_(SALES_STATUSES)
+    return [
+        func.sum(
+            case(
+                (
+                    and_(condition, rows.c.status.in_(SUCCESSFUL_STATUSES)),
+                    rows.c.total_amount,
+                ),
+                else_=0,
+            )
+        ).label(f"{prefix}_sales"),
+        func.sum(case((and_(condition, sales), rows.c.total_amount), else_=0)).label(
+            f"{prefix}_gross"
+        ),
+        func.sum(
+            case(
+                (and_(condition, sales), func.coalesce(rows.c.refunded, 0)),
+                else_=0,
+            )
+        ).label(f"{prefix}_refunds"),
+        func.sum(
+            case(
+                (
+                    and_(
+                        condition,
+                        rows.c.status == OrderStatus.refunded,
+                        rows.c.refunded.is_(None),
+                    ),
+                    rows.c.total_amount,
+                ),
+                else_=0,
+            )
+        ).label(f"{prefix}_missing"),
+        func.sum(case((condition, 1), else_=0)).label(f"{prefix}_orders"),
+    ]
+
+
+async def _live_totals(
+    session: AsyncSession, windows: list[tuple[datetime, datetime]]
+) -> list[SalesTotals]:
+    """Aggregate every ``[start, end)`` window in one pass over ``orders``."""
+    if not windows:
+        return []
+    rows = _order_rows(
+        or_(
+            *(
+                and_(Order.created_at >= start, Order.created_at < end)
+                for start, end in windows
+            )
+        )
+    )
+    columns: list[Any] = []
+    for idx, (start, end) in enumerate(windows):
+        condition = and_(rows.c.created_at >= start, rows.c.created_at < end)
+        columns.extend(_window_columns(rows, f"w{idx}", condition))
+    result = (await session.execute(select(*columns).select_from(rows))).one()
+    mapping = result._mapping
+    return [
+        SalesTotals(
+            sales=_decimal(mapping[f"w{idx}_sales"]),
+            gross_sales=_decimal(mapping[f"w{idx}_gross"]),
+            refunds=_decimal(mapping[f"w{idx}_refunds"]),
+            missing_refunds=_decimal(mapping[f"w{idx}_missing"]),
+            orders=int(mapping[f"w{idx}_orders"] or 0),
+        )
+        for idx in range(len(windows))
+    ]
+
+
+async def _compute_days(
+    session: AsyncSession, days: list[date]
+) -> dict[date, SalesTotals]:
+    first, last = min(days), max(days)
+    rows = _order_rows(
+        Order.created_at >= _day_start(first),
+        Order.created_at < _day_start(last + timedelta(days=1)),
+    )
+    if _dialect_name(session) == "postgresql":
+        day_expr = func.date(func.timezone("UTC", rows.c.created_at))
+    else:
+        day_expr = func.date(rows.c.created_at)
+    grouped = await session.execute(
+        select(
+            day_expr.label("day"),
+            rows.c.status,
+            func.sum(rows.c.total_amount),
+            func.sum(func.coalesce(rows.c.refunded, 0)),
+            func.sum(case((rows.c.refunded.is_(None), rows.c.total_amount), else_=0)),
+            func.count(),
+        ).group_by(day_expr, rows.c.status)
+    )
+    totals: dict[date, SalesTotals] = {day: SalesTotals() for day in days}
+    for raw_day, status_value, amount, refunded, unrefunded, count in grouped:
+        day = date.fromisoformat(raw_day) if isinstance(raw_day, str) else raw_day
+        if day not in totals:
+            continue
+        order_status = OrderStatus(status_value)
+        amount = _decimal(amount)
+        in_sales = order_status in SALES_STATUSES
+        totals[day] = totals[day] + SalesTotals(
+            sales=amount if order_status in SUCCESSFUL_STATUSES else _ZERO,
+            gross_sales=amount if in_sales else _ZERO,
+            refunds=_decimal(refunded) if in_sales else _ZERO,
+            missing_refunds=(
+                _decimal(unrefunded) if order_status == OrderStatus.refunded else _ZERO
+            ),
+            orders=int(count or 0),
+            orders_by_status={order_status.value: int(count or 0)},
+        )
+    return totals
+
+
+async def _missing_days(session: AsyncSession, first: date, last: date) -> list[date]:
+    """Days in ``[first, last]`` that have no rollup row yet."""
+    if last < first:
+        return []
+    existing = set(
+        (
+            await session.execute(
+                select(SalesDailyRollup.day).where(
+                    SalesDailyRollup.day >= first, SalesDailyRollup.day <= last
+                )
+            )
+        ).scalars()
+    )
+    return [
+        first + timedelta(days=offset)
+        for offset in range((last - first).days + 1)
+        if first + timedelta(days=offset) not in existing
+    ]
+
+
+async def _lock_days(session: AsyncSession, days: list[date]) -> list[date]:
+    """Days whose lock this transaction got; the others are being changed."""
+    if _dialect_name(session) != "postgresql":
+        return days
+    locked: list[date] = []
+    for day in sorted(days):
+        params = {"cls": _DAY_LOCK_CLASS, "day": day.toordinal()}
+        if await session.scalar(_TRY_LOCK_DAY, params):
+            locked.append(day)
+    return locked
+
+
+async def write_daily_rollups(session: AsyncSession, days: list[date]) -> int:
+    """Recompute and upsert the rollup rows of ``days`` (not committed).
+
+    Days with an uncommitted change are skipped; that change deletes their row,
+    so a later run recomputes them.
+    """
+    days = await _lock_days(session, days)
+    if not days:
+        return 0
+    computed = await _compute_days(session, days)
+    values = [
+        {
+            "day": day,
+            "sales_amount": totals.sales,
+            "gross_sales_amount": totals.gross_sales,
+            "refunds_amount": totals.refunds,
+            "missing_refunds_amount": totals.missing_refunds,
+            "net_sales_amount": totals.net_sales,
+            "orders_count": totals.orders,
+            "orders_by_status": totals.orders_by_status,
+        }
+        for day, totals in sorted(computed.items())
+    ]
+    dialect = _dialect_name(session)
+    insert_fn = (
+        pg_insert
+        if dialect == "postgresql"
+        else (sqlite_insert if dialect == "sqlite" else None)
+    )
+    if insert_fn is not None:
+        stmt = insert_fn(SalesDailyRollup).values(values)
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[SalesDailyRollup.day],
+                set_={
+                    column: stmt.excluded[column]
+                    for column in values[0]
+                    if column != "day"
+                },
+            )
+        )
+    else:
+        await session.execute(
+            delete(SalesDailyRollup).where(SalesDailyRollup.day.in_(days))
+        )
+        session.add_all(SalesDailyRollup(**row) for row in values)
+    return len(values)
+
+
+def _resettle_days() -> int:
+    return max(1, int(getattr(settings, "sales_rollup_resettle_days", 3) or 3))
+
+
+async def run_once(session: AsyncSession, *, now: datetime | None = None) -> int:
+    """Re-roll the unsettled trailing days and fill in missing older ones."""
+    today = _utc_day(now or datetime.now(timezone.utc))
+    yesterday = today - timedelta(days=1)
+    earliest = await session.scalar(select(func.min(Order.created_at)))
+    if earliest is None:
+        return 0
+    first = _utc_day(earliest)
+    if first > yesterday:
+        return 0
+    resettle_from = max(first, today - timedelta(days=_resettle_days()))
+    days = {
+        resettle_from + timedelta(days=offset)
+        for offset in range((yesterday - resettle_from).days + 1)
+    }
+    missing = await _missing_days(session, first, resettle_from - timedelta(days=1))
+    # Newest first, so a fresh install serves recent dashboards soonest.
+    days.update(sorted(missing, reverse=True)[:_MAX_DAYS_PER_RUN])
+    written = await write_daily_rollups(session, sorted(days))
+    await session.commit()
+    return written
+
+
+async def _rollup_totals(
+    session: AsyncSession, ranges: list[tuple[date, date]]
+) -> list[SalesTotals]:
+    if not ranges:
+        return []
+    columns: list[Any] = []
+    for idx, (first, last) in enumerate(ranges):
+        condition = and_(SalesDailyRollup.day >= first, SalesDailyRollup.day <= last)
+        columns.extend(
+            func.sum(case((condition, column), else_=0)).label(f"r{idx}_{name}")
+            for name, column in (
+                ("sales", SalesDailyRollup.sales_amount),
+                ("gross", SalesDailyRollup.gross_sales_amount),
+                ("refunds", SalesDailyRollup.refunds_amount),
+                ("missing", SalesDailyRollup.missing_refunds_amount),
+                ("orders", SalesDailyRollup.orders_count),
+            )
+        )
+    first = min(start for start, _ in ranges)
+    last = max(end for _, end in ranges)
+    mapping = (
+        (
+            await session.execute(
+                select(*columns).where(
+                    SalesDailyRollup.day >= first, SalesDailyRollup.day <= last
+                )
+            )
+        )
+        .one()
+        ._mapping
+    )
+    return [
+        SalesTotals(
+            sales=_decimal(mapping[f"r{idx}_sales"]),
+            gross_sales=_decimal(mapping[f"r{idx}_gross"]),
+            refunds=_decimal(mapping[f"r{idx}_refunds"]),
+            missing_refunds=_decimal(mapping[f"r{idx}_missing"]),
+            orders=int(mapping[f"r{idx}_orders"] or 0),
+        )
+        for idx in range(len(ranges))
+    ]
+
+
+async def window_totals(
+    session: AsyncSession,
+    windows: dict[str, tuple[datetime, datetime]],
+    *,
+    now: datetime,
+) -> dict[str, SalesTotals]:
+    """Sales totals for each named ``[start, end)`` window.
+
+    Whole days before today come from the rollups; the remaining edges of every
+    window are aggregated together in a single live query.
+    """
+    today_start = _day_start(_utc_day(now))
+    live: list[tuple[datetime, datetime]] = []
+    live_owner: list[str] = []
+    closed: list[tuple[date, date]] = []
+    closed_owner: list[str] = []
+
+    for name, (start, end) in windows.items():
+        first_full = _day_start(_utc_day(start))
+        if first_full < start:
+            first_full += timedelta(days=1)
+        closed_end = min(_day_start(_utc_day(end)), today_start)
+        if first_full >= closed_end:
+            live.append((start, end))
+            live_owner.append(name)
+            continue
+        closed.append((first_full.date(), closed_end.date() - timedelta(days=1)))
+        closed_owner.append(name)
+        for edge_start, edge_end in ((start, first_full), (closed_end, end)):
+            if edge_start < edge_end:
+                live.append((edge_start, edge_end))
+                live_owner.append(name)
+
+    totals: dict[str, SalesTotals] = {name: SalesTotals() for name in windows}
+    if closed:
+        missing = await _missing_days(
+            session,
+            min(first for first, _ in closed),
+            max(last for _, last in closed),
+        )
+        if missing:
+            computed = await _compute_days(session, missing)
+            for name, (first, last) in zip(closed_owner, closed):
+                for day, part in computed.items():
+                    if first <= day <= last:
+                        totals[name] = totals[name] + part
+
+    for name, part in zip(closed_owner, await _rollup_totals(session, closed)):
+        totals[name] = totals[name] + part
+    for name, part in zip(live_owner, await _live_totals(session, live)):
+        totals[name] = totals[name] + part
+    return totals
+
+
+def _history_days(obj: Order) -> set[date]:
+    history = inspect(obj).attrs.created_at.history
+    return {
+        _utc_day(value)
+        for value in (*history.added, *history.unchanged, *history.deleted)
+        if isinstance(value, datetime)
+    }
+
+
+def _attr_changed(obj: Base, attrs: tuple[str, ...]) -> bool:
+    state = inspect(obj).attrs
+    return any(state[attr].history.has_changes() for attr in attrs)
+
+
+def _affected_days(session: Session) -> set[date]:
+    order_ids: set[uuid.UUID] = set()
+    days: set[date] = set()
+    dirty = set(session.dirty)
+    for obj in (*session.new, *dirty, *session.deleted):
+        if isinstance(obj, Order):
+            if obj in dirty and not _attr_changed(obj, _WATCHED_ORDER_ATTRS):
+                continue
+            days |= _history_days(obj)
+            identity = inspect(obj).identity
+            if identity:
+                order_ids.add(identity[0])
+        elif isinstance(obj, OrderRefund):
+            if obj in dirty and not _attr_changed(obj, ("amount", "order_id")):
+                continue
+            order_ids.update(
+                value
+                for value in inspect(obj).attrs.order_id.history.sum()
+                if value is not None
+            )
+        elif isinstance(obj, OrderTag):
+            tags = inspect(obj).attrs.tag.history.sum()
+            if TEST_ORDER_TAG not in tags:
+                continue
+            if obj in dirty and not _attr_changed(obj, ("tag", "order_id")):
+                continue
+            order_ids.update(
+                value
+                for value in inspect(obj).attrs.order_id.history.sum()
+                if value is not None
+            )
+    if order_ids:
+        rows = session.connection().execute(
+            select(Order.created_at).where(Order.id.in_(order_ids))
+        )
+        days.update(_utc_day(value) for value in rows.scalars() if value is not None)
+    return days
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_rollups_after_flush(session: Session, _flush_context) -> None:
+    days = _affected_days(session)
+    if not days:
+        return
+    conn = session.connection()
+    if conn.dialect.name == "postgresql":
+        # Held until commit, so the worker cannot upsert a total read before it.
+        for day in sorted(days):
+            conn.execute(_LOCK_DAY, {"cls": _DAY_LOCK_CLASS, "day": day.toordinal()})
+    conn.execute(delete(SalesDailyRollup).where(SalesDailyRollup.day.in_(sorted(days))))
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "sales_rollup_enabled", True))
+
+
+async def _loop(stop: asyncio.Event) -> None:
+    interval = max(
+        30, int(getattr(settings, "sales_rollup_interval_seconds", 300) or 300)
+    )
+    while not stop.is_set():
+        try:
+            async with SessionLocal() as session:
+                await run_once(session)
+        except asyncio.CancelledError:
+            break
+        except Exception as exc:
+            logger.warning("sales_rollup_failed", extra={"error": str(exc)})
+
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+
+
+def start(app: FastAPI) -> None:
+    if not enabled():
+        return
+    if getattr(app.state, "sales_rollup_task", None) is not None:
+        return
+
+    stop = asyncio.Event()
+    task = asyncio.create_task(
+        leader_lock.run_as_leader(name="sales_rollup", stop=stop, work=_loop)
+    )
+    app.state.sales_rollup_stop = stop
+    app.state.sales_rollup_task = task
+
+
+async def stop(app: FastAPI) -> None:
+    stop_event = getattr(app.state, "sales_rollup_stop", None)
+    task = getattr(app.state, "sales_rollup_task", None)
+    if stop_event:
+        stop_event.set()
+    if task:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    if getattr(app.state, "sales_rollup_stop", None) is not None:
+        delattr(app.state, "sales_rollup_stop")
+    if getattr(app.state, "sales_rollup_task", None) is not None:
+        delattr(app.state, "sales_rollup_task")
@@ -8,17 +8,17 @@ import re
 from collections import Counter
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from math import asin, cos, radians, sin, sqrt
 from pathlib import Path
 from typing import Any
 from urllib.parse import quote_plus
 
 import httpx
-from sqlalchemy import desc, func, select
+from sqlalchemy import delete, desc, func, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.models.shipping_locker import (
+    ShippingLockerCity,
     ShippingLockerMirror,
     ShippingLockerProvider,
     ShippingLockerSyncRun,
@@ -30,6 +30,7 @@ from app.schemas.shipping import (
     LockerProvider,
     LockerRead,
 )
+from app.services import locker_grid
 
 logger = logging.getLogger(__name__)
 
@@ -642,32 +643,6 @@ async def _upsert_snapshot(
     return upserted, deactivated
 
 
-def _haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    r = 6371.0
-    dlat = radians(lat2 - lat1)
-    dlng = radians(lng2 - lng1)
-    a = (
-        sin(dlat / 2) ** 2
-        + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlng / 2) ** 2
-    )
-    return float(2 * r * asin(sqrt(a)))
-
-
-def _row_to_locker_read(
-    row: ShippingLockerMirror, *, lat: float, lng: float
-) -> LockerRead:
-    address = _clean_text(" · ".join(filter(None, [row.address, row.city])))
-    return LockerRead(
-        id=f"sameday:{row.external_id}",
-        provider=LockerProvider.sameday,
-        name=row.name,
-        address=address,
-        lat=float(row.lat),
-        lng=float(row.lng),
-        distance_km=_haversine_km(lat, lng, float(row.lat), float(row.lng)),
-    )
-
-
 async def sync_now(session: AsyncSession, *, trigger: str) -> ShippingLockerSyncRun:
     run = ShippingLockerSyncRun(
         provider=ShippingLockerProvider.sameday,
@@ -698,6 +673,7 @@ async def sync_now(session: AsyncSession, *, trigger: str) -> ShippingLockerSync
         upserted_count, deactivated_count = await _upsert_snapshot(
             session, normalized_items, now=now
         )
+        await rebuild_city_aggregates(session)
 
         run.status = ShippingLockerSyncStatus.success
         run.finished_at = now
@@ -729,6 +705,13 @@ async def sync_now(session: AsyncSession, *, trigger: str) -> ShippingLockerSync
                 "deactivated_count": int(run.deactivated_count),
             },
         )
+        try:
+            await locker_grid.rebuild(session)
+        except Exception as exc:
+            # Lookups rebuild the grid themselves once the fingerprint changes.
+            logger.warning(
+                "sameday_locker_grid_rebuild_failed", extra={"error": str(exc)}
+            )
         return run
     except Exception as exc:
         failure_kind, challenge_failure = _classify_failure(exc)
@@ -900,38 +883,36 @@ async def should_run_scheduled_sync(session: AsyncSession) -> bool:
     return (_now() - finished_at).total_seconds() >= interval
 
 
-async def list_city_suggestions(
-    session: AsyncSession, *, q: str, limit: int
-) -> list[LockerCityRead]:
-    stmt = (
-        select(
-            ShippingLockerMirror.city,
-            ShippingLockerMirror.county,
-            ShippingLockerMirror.lat,
-            ShippingLockerMirror.lng,
-        )
-        .where(
-            ShippingLockerMirror.provider == ShippingLockerProvider.sameday,
-            ShippingLockerMirror.is_active.is_(True),
-            ShippingLockerMirror.city.is_not(None),
-            ShippingLockerMirror.city != "",
+async def _aggregate_cities(session: AsyncSession) -> list[dict[str, Any]]:
+    rows = (
+        await session.execute(
+            select(
+                ShippingLockerMirror.city,
+                ShippingLockerMirror.county,
+                func.count(),
+                func.sum(ShippingLockerMirror.lat),
+                func.sum(ShippingLockerMirror.lng),
+            )
+            .where(
+                ShippingLockerMirror.provider == ShippingLockerProvider.sameday,
+                ShippingLockerMirror.is_active.is_(True),
+                ShippingLockerMirror.city.is_not(None),
+                ShippingLockerMirror.city != "",
+            )
+            .group_by(ShippingLockerMirror.city, ShippingLockerMirror.county)
         )
-        .limit(5000)
-    )
-    rows = (await session.execute(stmt)).all()
-    normalized_query = (q or "").strip().lower()
+    ).all()
 
     grouped: dict[str, dict[str, Any]] = {}
-    for city, county, lat, lng in rows:
+    for city, county, count, lat_sum, lng_sum in rows:
         city_name = _clean_text(city, max_len=120)
         if not city_name:
             continue
-        if normalized_query and normalized_query not in city_name.lower():
-            continue
         key = city_name.lower()
         bucket = grouped.get(key)
         if bucket is None:
             bucket = {
+                "city_key": key,
                 "city": city_name,
                 "counties": Counter(),
                 "lat_sum": 0.0,
@@ -941,35 +922,159 @@ async def list_city_suggestions(
             grouped[key] = bucket
         county_name = _clean_text(county, max_len=120)
         if county_name:
-            bucket["counties"][county_name] += 1
-        bucket["lat_sum"] += float(lat)
-        bucket["lng_sum"] += float(lng)
-        bucket["count"] += 1
-
-    ordered = sorted(
-        grouped.values(),
-        key=lambda item: (-int(item["count"]), str(item["city"]).lower()),
-    )[: max(1, min(50, int(limit or 8)))]
-
-    out: list[LockerCityRead] = []
-    for item in ordered:
-        county = item["counties"].most_common(1)[0][0] if item["counties"] else None
-        city = str(item["city"])
-        display_name = f"{city}, {county}" if county else city
+            bucket["counties"][county_name] += int(count)
+        bucket["lat_sum"] += float(lat_sum or 0.0)
+        bucket["lng_sum"] += float(lng_sum or 0.0)
+        bucket["count"] += int(count)
+
+    out: list[dict[str, Any]] = []
+    for item in grouped.values():
+        count = max(1, int(item["count"]))
         out.append(
-            LockerCityRead(
-                provider=LockerProvider.sameday,
-                city=city,
-                county=county,
-                display_name=display_name,
-                lat=float(item["lat_sum"] / max(1, int(item["count"]))),
-                lng=float(item["lng_sum"] / max(1, int(item["count"]))),
-                locker_count=int(item["count"]),
-            )
+            {
+                "provider": ShippingLockerProvider.sameday,
+                "city_key": item["city_key"],
+                "city": item["city"],
+                "county": (
+                    item["counties"].most_common(1)[0][0] if item["counties"] else None
+                ),
+                "lat": float(item["lat_sum"] / count),
+                "lng": float(item["lng_sum"] / count),
+                "locker_count": int(item["count"]),
+            }
         )
     return out
 
 
+async def rebuild_city_aggregates(session: AsyncSession) -> int:
+    """Replace the per-city locker aggregates from the active mirror (no commit)."""
+    aggregates = await _aggregate_cities(session)
+    await session.execute(
+        delete(ShippingLockerCity).where(
+            ShippingLockerCity.provider == ShippingLockerProvider.sameday
+        )
+    )
+    if aggregates:
+        await session.execute(insert(ShippingLockerCity), aggregates)
+    return len(aggregates)
+
+
+def _city_read(
+    city: str, county: str | None, lat: float, lng: float, count: int
+) -> LockerCityRead:
+    return LockerCityRead(
+        provider=LockerProvider.sameday,
+        city=city,
+        county=county,
+        display_name=f"{city}, {county}" if county else city,
+        lat=float(lat),
+        lng=float(lng),
+        locker_count=int(count),
+    )
+
+
+async def list_city_suggestions(
+    session: AsyncSession, *, q: str, limit: int
+) -> list[LockerCityRead]:
+    """Cities matching ``q``: prefix matches first, then substring matches.
+
+    Served from ``shipping_locker_cities`` (rebuilt by ``sync_now``); a mirror
+    populated some other way is aggregated on the fly until the next sync.
+    """
+    normalized_query = (q or "").strip().lower()
+    safe_limit = max(1, min(50, int(limit or 8)))
+
+    def _order(item: tuple[str, int]) -> tuple[bool, int, str]:
+        city_key, count = item
+        return (not city_key.startswith(normalized_query), -count, city_key)
+
+    has_aggregates = await session.scalar(
+        select(ShippingLockerCity.id)
+        .where(ShippingLockerCity.provider == ShippingLockerProvider.sameday)
+        .limit(1)
+    )
+    if has_aggregates is None:
+        aggregates = [
+            item
+            for item in await _aggregate_cities(session)
+            if normalized_query in item["city_key"]
+        ]
+        aggregates.sort(
+            key=lambda item: _order((item["city_key"], item["locker_count"]))
+        )
+        return [
+            _city_read(
+                item["city"],
+                item["county"],
+                item["lat"],
+                item["lng"],
+                item["locker_count"],
+            )
+            for item in aggregates[:safe_limit]
+        ]
+
+    columns = select(
+        ShippingLockerCity.city_key,
+        ShippingLockerCity.city,
+        ShippingLockerCity.county,
+        ShippingLockerCity.lat,
+        ShippingLockerCity.lng,
+        ShippingLockerCity.locker_count,
+    ).where(ShippingLockerCity.provider == ShippingLockerProvider.sameday)
+    ranked = (
+        ShippingLockerCity.locker_count.desc(),
+        ShippingLockerCity.city_key,
+    )
+    rows = list(
+        (
+            await session.execute(
+                columns.where(
+                    ShippingLockerCity.city_key.startswith(
+                        normalized_query, autoescape=True
+                    )
+                )
+                .order_by(*ranked)
+                .limit(safe_limit)
+            )
+        ).all()
+    )
+    if normalized_query and len(rows) < safe_limit:
+        # Typeahead also matches inside names ("napoca"); only needed for short lists.
+        rows += (
+            await session.execute(
+                columns.where(
+                    ShippingLockerCity.city_key.contains(
+                        normalized_query, autoescape=True
+                    ),
+                    ~ShippingLockerCity.city_key.startswith(
+                        normalized_query, autoescape=True
+                    ),
+                )
+                .order_by(*ranked)
+                .limit(safe_limit - len(rows))
+            )
+        ).all()
+    return [
+        _city_read(city, county, lat, lng, count)
+        for _, city, county, lat, lng, count in rows
+    ]
+
+
+def _grid_locker_read(
+    locker: locker_grid.GridLocker, *, distance_km: float
+) -> LockerRead:
+    address = _clean_text(" · ".join(filter(None, [locker.address, locker.city])))
+    return LockerRead(
+        id=f"sameday:{locker.external_id}",
+        provider=LockerProvider.sameday,
+        name=locker.name,
+        address=address,
+        lat=locker.lat,
+        lng=locker.lng,
+        distance_km=distance_km,
+    )
+
+
 async def list_nearby_lockers(
     session: AsyncSession,
     *,
@@ -981,51 +1086,15 @@ async def list_nearby_lockers(
     safe_radius = max(1.0, min(50.0, float(radius_km)))
     safe_limit = max(1, min(200, int(limit)))
 
-    lat_delta = safe_radius / 111.0
-    cos_lat = max(0.1, abs(cos(radians(lat))))
-    lng_delta = safe_radius / (111.0 * cos_lat)
-
-    rows = (
-        (
-            await session.execute(
-                select(ShippingLockerMirror)
-                .where(
-                    ShippingLockerMirror.provider == ShippingLockerProvider.sameday,
-                    ShippingLockerMirror.is_active.is_(True),
-                    ShippingLockerMirror.lat >= (lat - lat_delta),
-                    ShippingLockerMirror.lat <= (lat + lat_delta),
-                    ShippingLockerMirror.lng >= (lng - lng_delta),
-                    ShippingLockerMirror.lng <= (lng + lng_delta),
-                )
-                .limit(5000)
-            )
+    grid = await locker_grid.get_grid(session)
+    if not grid.size:
+        raise RuntimeError("Sameday locker mirror is not initialized")
+    return [
+        _grid_locker_read(locker, distance_km=distance)
+        for distance, locker in grid.nearest(
+            lat=float(lat), lng=float(lng), radius_km=safe_radius, limit=safe_limit
         )
-        .scalars()
-        .all()
-    )
-    candidates = [_row_to_locker_read(row, lat=lat, lng=lng) for row in rows]
-    filtered = [item for item in candidates if (item.distance_km or 0.0) <= safe_radius]
-    filtered.sort(key=lambda item: (item.distance_km or 0.0, item.name.lower()))
-    if filtered:
-        return filtered[:safe_limit]
-
-    # No nearby points in bounding box. Return empty for normal behavior only when we have data at all.
-    has_any = bool(
-        (
-            await session.scalar(
-                select(func.count())
-                .select_from(ShippingLockerMirror)
-                .where(
-                    ShippingLockerMirror.provider == ShippingLockerProvider.sameday,
-                    ShippingLockerMirror.is_active.is_(True),
-                )
-            )
-        )
-        or 0
-    )
-    if has_any:
-        return []
-    raise RuntimeError("Sameday locker mirror is not initialized")
+    ]
 
 
 def validate_fetch_hosts() -> None:
@@ -98,7 +98,7 @@ async def execute_account_deletion(session: AsyncSession, user: User) -> None:
     user.google_email = None
     user.google_picture_url = None
     user.stripe_customer_id = None
-    user.hashed_password = security.hash_password(secrets.token_urlsafe(32))
+    user.hashed_password = await security.hash_password_async(secrets.token_urlsafe(32))
 
     session.add(user)
     await session.execute(
@@ -0,0 +1,174 @@
+"""Reusable authenticated SMTP connections.
+
+Opening a connection costs a TCP connect, STARTTLS and AUTH; a burst of order
+confirmations or a back-in-stock fan-out used to pay that for every message.
+Connections are kept in a small idle pool (``smtp_pool_size``) and reused for
+up to ``smtp_max_messages_per_connection`` messages, or until they have been
+idle for ``smtp_idle_timeout_seconds`` (servers drop idle clients anyway).
+
+Everything here is blocking and meant to run in a worker thread. A reused
+connection the server has dropped in the meantime is reopened once; any other
+delivery error discards the connection so the next message starts clean.
+"""
+
+from __future__ import annotations
+
+import smtplib
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+
+from app.core.config import settings
+
+_Key = tuple[str, int, bool, str | None, str | None]
+
+
+@dataclass
+class _Connection:
+    smtp: smtplib.SMTP
+    key: _Key
+    sent: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    reused: bool = False
+
+
+_idle: list[_Connection] = []
+_lock = threading.Lock()
+
+
+def _key() -> _Key:
+    return (
+        settings.smtp_host,
+        int(settings.smtp_port),
+        bool(settings.smtp_use_tls),
+        settings.smtp_username,
+        settings.smtp_password,
+    )
+
+
+def _pool_size() -> int:
+    return max(0, int(getattr(settings, "smtp_pool_size", 2) or 0))
+
+
+def _max_messages() -> int:
+    return max(1, int(getattr(settings, "smtp_max_messages_per_connection", 100) or 1))
+
+
+def _idle_timeout() -> float:
+    return float(getattr(settings, "smtp_idle_timeout_seconds", 60) or 0)
+
+
+def _close(smtp: smtplib.SMTP) -> None:
+    try:
+        smtp.quit()
+    except Exception:
+        try:
+            smtp.close()
+        except Exception:
+            pass
+
+
+def _open(key: _Key) -> _Connection:
+    host, port, use_tls, username, password = key
+    smtp = smtplib.SMTP(host, port, timeout=10)
+    try:
+        if use_tls:
+            smtp.starttls()
+        if username and password:
+            smtp.login(username, password)
+    except Exception:
+        _close(smtp)
+        raise
+    return _Connection(smtp=smtp, key=key)
+
+
+def _acquire() -> _Connection:
+    key = _key()
+    now = time.monotonic()
+    stale: list[_Connection] = []
+    found: _Connection | None = None
+    with _lock:
+        while _idle:
+            conn = _idle.pop()
+            if conn.key == key and now - conn.last_used < _idle_timeout():
+                found = conn
+                break
+            stale.append(conn)
+    for conn in stale:
+        _close(conn.smtp)
+    if found is not None:
+        found.reused = True
+        return found
+    return _open(key)
+
+
+def _release(conn: _Connection) -> None:
+    if conn.sent < _max_messages() and conn.key == _key():
+        conn.last_used = time.monotonic()
+        with _lock:
+            if len(_idle) < _pool_size():
+                _idle.append(conn)
+                return
+    _close(conn.smtp)
+
+
+def _deliver(conn: _Connection, msg: EmailMessage) -> None:
+    try:
+        conn.smtp.send_message(msg)
+    except (smtplib.SMTPServerDisconnected, ConnectionError):
+        if not conn.reused:
+            raise
+        # The server dropped the pooled connection while it sat idle.
+        _close(conn.smtp)
+        conn.smtp = _open(conn.key).smtp
+        conn.reused = False
+        conn.smtp.send_message(msg)
+    conn.sent += 1
+
+
+def send_messages(messages: Sequence[EmailMessage]) -> list[Exception | None]:
+    """Deliver ``messages`` over one pooled connection.
+
+    Returns one entry per message: ``None`` when it was accepted, otherwise the
+    exception that stopped it. Failures never abort the rest of the batch.
+    """
+    results: list[Exception | None] = []
+    conn: _Connection | None = None
+    for msg in messages:
+        try:
+            if conn is None:
+                conn = _acquire()
+            _deliver(conn, msg)
+        except Exception as exc:
+            if conn is not None:
+                _close(conn.smtp)
+                conn = None
+            results.append(exc)
+            continue
+        results.append(None)
+        if conn.sent >= _max_messages():
+            _release(conn)
+            conn = None
+    if conn is not None:
+        _release(conn)
+    return results
+
+
+def send_message(msg: EmailMessage) -> None:
+    error = send_messages([msg])[0]
+    if error is not None:
+        raise error
+
+
+def shutdown() -> None:
+    with _lock:
+        idle = list(_idle)
+        _idle.clear()
+    for conn in idle:
+        _close(conn.smtp)
+
+
+def _reset_for_tests() -> None:
+    shutdown()
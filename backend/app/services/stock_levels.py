@@ -0,0 +1,569 @@
+"""Availability counters per product and variant (``stock_levels``).
+
+The restock list and the low-stock views used to load every active product
+with its variants, then aggregate all active carts and open orders to work
+out availability. ``stock_levels`` now keeps ``on_hand``,
+``reserved_in_carts``, ``reserved_in_orders`` and ``available`` per product
+and variant, with the effective low-stock threshold, so those views are
+index range scans on ``available`` / ``on_hand``.
+
+Rows are refreshed inside the flush that changes their inputs: product and
+variant stock (order stock commits/restores, stock adjustments, admin edits),
+order items and order status, and low-stock thresholds. This is the
+``after_flush`` approach ``sales_rollups`` uses. Only the touched keys are
+re-aggregated, every query is filtered by product id, and rows are written
+in ``item_id`` order so concurrent flushes lock them in the same order.
+
+Cart changes are the busiest writers and must not hold the row of a popular
+product for the whole cart request. Their keys are collected per flush and
+refreshed once, just before the transaction commits, on the session's own
+connection: the rows are locked first and the carts re-read under the lock,
+so concurrent refreshes never write stale counts, and the locks are held only
+for the commit itself.
+
+Cart reservations also lapse with time (a cart counts for
+``cart_reservation_window_minutes`` after its last update), and bulk UPDATEs
+bypass the flush hook. A leader-elected job therefore refreshes the keys of
+carts that aged out since its previous run. Every
+``stock_levels_full_reconcile_seconds`` it also recomputes all rows and logs
+the ones that drifted.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from collections.abc import Iterable, Sequence
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from typing import Any, Final
+
+from fastapi import FastAPI
+from sqlalchemy import case, delete, event, func, insert, inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.base import Base
+from app.db.session import SessionLocal
+from app.models.cart import Cart, CartItem
+from app.models.catalog import Category, Product, ProductVariant
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.stock_level import StockLevel
+from app.services import leader_lock
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CART_RESERVATION_WINDOW_MINUTES = 120
+OPEN_ORDER_STATUSES: Final[tuple[OrderStatus, ...]] = (
+    OrderStatus.pending_payment,
+    OrderStatus.pending_acceptance,
+)
+_CHUNK: Final[int] = 500
+# Session.info key: cart keys to refresh right before the transaction commits.
+_DEFERRED_KEY: Final[str] = "stock_levels_deferred"
+_ROW_FIELDS: Final[tuple[str, ...]] = (
+    "product_id",
+    "variant_id",
+    "on_hand",
+    "reserved_in_carts",
+    "reserved_in_orders",
+    "available",
+    "threshold",
+)
+
+Key = tuple[uuid.UUID, uuid.UUID | None]
+
+
+def cart_reservation_cutoff(now: datetime) -> datetime:
+    minutes = (
+        getattr(
+            settings,
+            "cart_reservation_window_minutes",
+            DEFAULT_CART_RESERVATION_WINDOW_MINUTES,
+        )
+        or DEFAULT_CART_RESERVATION_WINDOW_MINUTES
+    )
+    minutes_int = int(minutes)
+    if minutes_int <= 0:
+        minutes_int = DEFAULT_CART_RESERVATION_WINDOW_MINUTES
+    return now - timedelta(minutes=minutes_int)
+
+
+def _chunks(values: Sequence[Any]) -> Iterable[Sequence[Any]]:
+    for idx in range(0, len(values), _CHUNK):
+        yield values[idx : idx + _CHUNK]
+
+
+def _item_id(key: Key) -> uuid.UUID:
+    return key[1] if key[1] is not None else key[0]
+
+
+# --- Recomputing rows --------------------------------------------------------
+
+
+def _compute(
+    conn: Connection, product_ids: Sequence[uuid.UUID], wanted: set[Key] | None
+) -> dict[uuid.UUID, dict[str, Any]]:
+    """Fresh rows for ``wanted`` (or every product/variant) of ``product_ids``."""
+    cutoff = cart_reservation_cutoff(datetime.now(timezone.utc))
+    products = conn.execute(
+        select(
+            Product.id,
+            Product.stock_quantity,
+            func.coalesce(Product.low_stock_threshold, Category.low_stock_threshold),
+        )
+        .outerjoin(Category, Category.id == Product.category_id)
+        .where(Product.id.in_(product_ids))
+    ).all()
+    thresholds = {pid: threshold for pid, _, threshold in products}
+    on_hand: dict[Key, int] = {(pid, None): int(qty or 0) for pid, qty, _ in products}
+    if wanted is None or any(vid is not None for _, vid in wanted):
+        variants = conn.execute(
+            select(
+                ProductVariant.product_id,
+                ProductVariant.id,
+                ProductVariant.stock_quantity,
+            ).where(ProductVariant.product_id.in_(product_ids))
+        ).all()
+        on_hand.update(
+            {
+                (pid, vid): int(qty or 0)
+                for pid, vid, qty in variants
+                if pid in thresholds
+            }
+        )
+
+    carts = conn.execute(
+        select(
+            CartItem.product_id,
+            CartItem.variant_id,
+            func.coalesce(func.sum(CartItem.quantity), 0),
+        )
+        .join(Cart, Cart.id == CartItem.cart_id)
+        .where(CartItem.product_id.in_(product_ids), Cart.updated_at >= cutoff)
+        .group_by(CartItem.product_id, CartItem.variant_id)
+    ).all()
+    open_qty = case(
+        (
+            OrderItem.quantity > OrderItem.shipped_quantity,
+            OrderItem.quantity - OrderItem.shipped_quantity,
+        ),
+        else_=0,
+    )
+    orders = conn.execute(
+        select(
+            OrderItem.product_id,
+            OrderItem.variant_id,
+            func.coalesce(func.sum(open_qty), 0),
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(
+            OrderItem.product_id.in_(product_ids),
+            Order.status.in_(OPEN_ORDER_STATUSES),
+        )
+        .group_by(OrderItem.product_id, OrderItem.variant_id)
+    ).all()
+    in_carts = {(pid, vid): int(qty or 0) for pid, vid, qty in carts}
+    in_orders = {(pid, vid): int(qty or 0) for pid, vid, qty in orders}
+
+    rows: dict[uuid.UUID, dict[str, Any]] = {}
+    for key, stock in on_hand.items():
+        if wanted is not None and key not in wanted:
+            continue
+        carts_qty = in_carts.get(key, 0)
+        orders_qty = in_orders.get(key, 0)
+        rows[_item_id(key)] = {
+            "product_id": key[0],
+            "variant_id": key[1],
+            "on_hand": stock,
+            "reserved_in_carts": carts_qty,
+            "reserved_in_orders": orders_qty,
+            "available": stock - carts_qty - orders_qty,
+            "threshold": thresholds.get(key[0]),
+        }
+    return rows
+
+
+def _write(
+    conn: Connection,
+    rows: dict[uuid.UUID, dict[str, Any]],
+    gone: Iterable[uuid.UUID] = (),
+) -> None:
+    gone_ids = sorted(item_id for item_id in gone if item_id not in rows)
+    if gone_ids:
+        conn.execute(delete(StockLevel).where(StockLevel.item_id.in_(gone_ids)))
+    if not rows:
+        return
+    # A fixed lock order keeps concurrent multi-row upserts from deadlocking.
+    values = [{"item_id": item_id, **rows[item_id]} for item_id in sorted(rows)]
+    insert_fn: Any = None
+    if conn.dialect.name == "postgresql":
+        insert_fn = pg_insert
+    elif conn.dialect.name == "sqlite":
+        insert_fn = sqlite_insert
+    if insert_fn is None:  # pragma: no cover - other dialects
+        conn.execute(delete(StockLevel).where(StockLevel.item_id.in_(list(rows))))
+        conn.execute(insert(StockLevel), values)
+        return
+    stmt = insert_fn(StockLevel).values(values)
+    conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[StockLevel.item_id],
+            set_={
+                **{field: stmt.excluded[field] for field in _ROW_FIELDS},
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+def _refresh_keys(conn: Connection, keys: set[Key]) -> None:
+    product_ids = sorted({pid for pid, _ in keys})
+    for chunk in _chunks(product_ids):
+        chunk_keys = {key for key in keys if key[0] in set(chunk)}
+        rows = _compute(conn, chunk, chunk_keys)
+        _write(conn, rows, gone=(_item_id(key) for key in chunk_keys))
+
+
+def _lock_and_refresh(conn: Connection, keys: set[Key]) -> None:
+    """Refresh ``keys`` after locking their rows, reading carts only once locked."""
+    item_ids = sorted({_item_id(key) for key in keys})
+    for chunk in _chunks(item_ids):
+        conn.execute(
+            select(StockLevel.item_id)
+            .where(StockLevel.item_id.in_(chunk))
+            .order_by(StockLevel.item_id)
+            .with_for_update()
+        )
+    _refresh_keys(conn, keys)
+
+
+def _expand_products(conn: Connection, product_ids: set[uuid.UUID]) -> set[Key]:
+    keys: set[Key] = {(pid, None) for pid in product_ids}
+    for chunk in _chunks(sorted(product_ids)):
+        rows = conn.execute(
+            select(ProductVariant.product_id, ProductVariant.id).where(
+                ProductVariant.product_id.in_(chunk)
+            )
+        )
+        keys.update((pid, vid) for pid, vid in rows.all())
+    return keys
+
+
+async def refresh(session: AsyncSession, keys: Iterable[Key]) -> None:
+    """Recompute the rows of ``keys`` in the session's transaction."""
+    wanted = set(keys)
+    if wanted:
+        await session.run_sync(lambda sync: _refresh_keys(sync.connection(), wanted))
+
+
+async def refresh_products(
+    session: AsyncSession, product_ids: Iterable[uuid.UUID]
+) -> None:
+    """Recompute every row of the given products (e.g. after a bulk UPDATE)."""
+    ids = set(product_ids)
+    if ids:
+        await session.run_sync(
+            lambda sync: _refresh_keys(
+                sync.connection(), _expand_products(sync.connection(), ids)
+            )
+        )
+
+
+# --- Flush hook --------------------------------------------------------------
+
+
+def _changed(obj: Base, attrs: tuple[str, ...]) -> bool:
+    state = inspect(obj).attrs
+    return any(state[attr].history.has_changes() for attr in attrs)
+
+
+def _previous(obj: Base, attr: str) -> Any:
+    deleted = inspect(obj).attrs[attr].history.deleted
+    return deleted[0] if deleted else getattr(obj, attr)
+
+
+def _line_keys(obj: CartItem | OrderItem) -> set[Key]:
+    """Current and previous (product, variant) of a cart or order line."""
+    current = (obj.product_id, obj.variant_id)
+    previous = (_previous(obj, "product_id"), _previous(obj, "variant_id"))
+    return {key for key in (current, previous) if key[0] is not None}
+
+
+def _touched_keys(session: Session) -> tuple[set[Key], set[Key]]:
+    """Keys to refresh in this flush, and cart keys to refresh after commit."""
+    keys: set[Key] = set()
+    cart_keys: set[Key] = set()
+    whole_products: set[uuid.UUID] = set()
+    cart_ids: set[uuid.UUID] = set()
+    order_ids: set[uuid.UUID] = set()
+    category_ids: set[uuid.UUID] = set()
+    dirty = set(session.dirty)
+    for obj in (*session.new, *dirty, *session.deleted):
+        is_dirty = obj in dirty
+        if isinstance(obj, Product):
+            if obj in session.deleted:
+                continue
+            if not is_dirty:
+                keys.add((obj.id, None))
+            elif _changed(obj, ("low_stock_threshold", "category_id")):
+                whole_products.add(obj.id)
+            elif _changed(obj, ("stock_quantity",)):
+                keys.add((obj.id, None))
+        elif isinstance(obj, ProductVariant):
+            if not is_dirty or _changed(obj, ("stock_quantity", "product_id")):
+                keys.add((obj.product_id, obj.id))
+        elif isinstance(obj, OrderItem):
+            watched: tuple[str, ...] = ("product_id", "variant_id", "quantity")
+            watched += ("shipped_quantity", "order_id")
+            if not is_dirty or _changed(obj, watched):
+                keys |= _line_keys(obj)
+        elif isinstance(obj, CartItem):
+            watched = ("product_id", "variant_id", "quantity", "cart_id")
+            if not is_dirty or _changed(obj, watched):
+                cart_keys |= _line_keys(obj)
+        elif isinstance(obj, Cart):
+            if is_dirty:
+                cart_ids.add(obj.id)
+        elif isinstance(obj, Order):
+            if is_dirty and _changed(obj, ("status",)):
+                order_ids.add(obj.id)
+        elif isinstance(obj, Category):
+            if is_dirty and _changed(obj, ("low_stock_threshold",)):
+                category_ids.add(obj.id)
+
+    if not (whole_products or cart_ids or order_ids or category_ids):
+        return keys, cart_keys
+    conn = session.connection()
+    if cart_ids:
+        rows = conn.execute(
+            select(CartItem.product_id, CartItem.variant_id).where(
+                CartItem.cart_id.in_(cart_ids)
+            )
+        )
+        cart_keys.update(rows.tuples())
+    if order_ids:
+        rows = conn.execute(
+            select(OrderItem.product_id, OrderItem.variant_id).where(
+                OrderItem.order_id.in_(order_ids)
+            )
+        )
+        keys.update(rows.tuples())
+    if category_ids:
+        whole_products.update(
+            conn.execute(
+                select(Product.id).where(Product.category_id.in_(category_ids))
+            ).scalars()
+        )
+    if whole_products:
+        keys |= _expand_products(conn, whole_products)
+    return keys, cart_keys
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_after_flush(session: Session, _flush_context) -> None:
+    keys, cart_keys = _touched_keys(session)
+    if keys:
+        _refresh_keys(session.connection(), keys)
+    if cart_keys - keys:
+        session.info.setdefault(_DEFERRED_KEY, set()).update(cart_keys - keys)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_before_commit(session: Session) -> None:
+    # before_commit runs ahead of the commit's final flush; flush here so
+    # the cart keys it touches are refreshed too.
+    session.flush()
+    keys = session.info.pop(_DEFERRED_KEY, None)
+    if keys:
+        _lock_and_refresh(session.connection(), keys)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction: object) -> None:
+    session.info.pop(_DEFERRED_KEY, None)
+
+
+# --- Reads -------------------------------------------------------------------
+
+
+async def threshold_ceiling(session: AsyncSession, default_threshold: int) -> int:
+    """Upper bound of every effective threshold (an index lookup on ``threshold``)."""
+    highest = await session.scalar(select(func.max(StockLevel.threshold)))
+    return max(int(default_threshold), int(highest or 0))
+
+
+async def low_stock_products(
+    session: AsyncSession, *, default_threshold: int, limit: int
+) -> list[tuple[Product, int]]:
+    """Sellable products whose stock on hand is under their threshold."""
+    threshold = func.coalesce(StockLevel.threshold, default_threshold)
+    ceiling = await threshold_ceiling(session, default_threshold)
+    rows = await session.execute(
+        select(Product, threshold)
+        .join(StockLevel, StockLevel.item_id == Product.id)
+        .where(
+            StockLevel.variant_id.is_(None),
+            StockLevel.on_hand < ceiling,
+            StockLevel.on_hand < threshold,
+            Product.is_deleted.is_(False),
+            Product.is_active.is_(True),
+        )
+        .order_by(StockLevel.on_hand.asc())
+        .limit(limit)
+    )
+    return [(product, int(value)) for product, value in rows.all()]
+
+
+async def low_stock_counts(
+    session: AsyncSession, *, default_threshold: int
+) -> tuple[int, int]:
+    """Numbers of sellable products that are low on stock and out of stock."""
+    threshold = func.coalesce(StockLevel.threshold, default_threshold)
+    ceiling = await threshold_ceiling(session, default_threshold)
+    low, out = (
+        await session.execute(
+            select(
+                func.sum(case((StockLevel.on_hand < threshold, 1), else_=0)),
+                func.sum(case((StockLevel.on_hand <= 0, 1), else_=0)),
+            )
+            .select_from(StockLevel)
+            .join(Product, Product.id == StockLevel.product_id)
+            .where(
+                StockLevel.variant_id.is_(None),
+                StockLevel.on_hand < max(ceiling, 1),
+                Product.is_deleted.is_(False),
+                Product.is_active.is_(True),
+            )
+        )
+    ).one()
+    return int(low or 0), int(out or 0)
+
+
+# --- Reconcile job -----------------------------------------------------------
+
+
+def _reconcile_all(conn: Connection) -> int:
+    drifted = 0
+    after: uuid.UUID | None = None
+    while True:
+        stmt = select(Product.id).order_by(Product.id).limit(_CHUNK)
+        if after is not None:
+            stmt = stmt.where(Product.id > after)
+        product_ids = list(conn.execute(stmt).scalars())
+        if not product_ids:
+            break
+        after = product_ids[-1]
+        fresh = _compute(conn, product_ids, None)
+        current = {
+            row.item_id: {field: getattr(row, field) for field in _ROW_FIELDS}
+            for row in conn.execute(
+                select(StockLevel).where(StockLevel.product_id.in_(product_ids))
+            )
+        }
+        changed = {
+            item_id: row
+            for item_id, row in fresh.items()
+            if current.get(item_id) != row
+        }
+        gone = [item_id for item_id in current if item_id not in fresh]
+        drifted += len(changed) + len(gone)
+        _write(conn, changed, gone=gone)
+    return drifted
+
+
+async def reconcile_all(session: AsyncSession) -> int:
+    """Recompute every row; returns how many had drifted."""
+    drifted = await session.run_sync(lambda sync: _reconcile_all(sync.connection()))
+    await session.commit()
+    return int(drifted)
+
+
+async def expire_cart_reservations(
+    session: AsyncSession, *, since: datetime, until: datetime
+) -> int:
+    """Refresh keys held by carts whose window closed in [since, until)."""
+    rows = await session.execute(
+        select(CartItem.product_id, CartItem.variant_id)
+        .join(Cart, Cart.id == CartItem.cart_id)
+        .where(Cart.updated_at >= since, Cart.updated_at < until)
+        .distinct()
+    )
+    keys = set(rows.tuples())
+    await refresh(session, keys)
+    await session.commit()
+    return len(keys)
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "stock_levels_reconcile_enabled", True))
+
+
+async def _loop(stop: asyncio.Event) -> None:
+    interval = max(
+        10, int(getattr(settings, "stock_levels_reconcile_interval_seconds", 60) or 60)
+    )
+    full_every = max(
+        interval,
+        int(getattr(settings, "stock_levels_full_reconcile_seconds", 3600) or 3600),
+    )
+    last_cutoff: datetime | None = None
+    full_due = 0.0
+    while not stop.is_set():
+        try:
+            cutoff = cart_reservation_cutoff(datetime.now(timezone.utc))
+            async with SessionLocal() as session:
+                if time.monotonic() >= full_due:
+                    drifted = await reconcile_all(session)
+                    if drifted:
+                        logger.warning(
+                            "stock_levels_drift_corrected", extra={"count": drifted}
+                        )
+                    full_due = time.monotonic() + full_every
+                elif last_cutoff is not None:
+                    await expire_cart_reservations(
+                        session, since=last_cutoff, until=cutoff
+                    )
+            last_cutoff = cutoff
+        except asyncio.CancelledError:
+            break
+        except Exception as exc:
+            logger.warning("stock_levels_reconcile_failed", extra={"error": str(exc)})
+
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+
+
+def start(app: FastAPI) -> None:
+    if not enabled():
+        return
+    if getattr(app.state, "stock_levels_task", None) is not None:
+        return
+
+    stop = asyncio.Event()
+    task = asyncio.create_task(
+        leader_lock.run_as_leader(name="stock_levels", stop=stop, work=_loop)
+    )
+    app.state.stock_levels_stop = stop
+    app.state.stock_levels_task = task
+
+
+async def stop(app: FastAPI) -> None:
+    stop_event = getattr(app.state, "stock_levels_stop", None)
+    task = getattr(app.state, "stock_levels_task", None)
+    if stop_event:
+        stop_event.set()
+    if task:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    if getattr(app.state, "stock_levels_stop", None) is not None:
+        delattr(app.state, "stock_levels_stop")
+    if getattr(app.state, "stock_levels_task", None) is not None:
+        delattr(app.state, "stock_levels_task")
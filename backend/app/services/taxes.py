@@ -11,7 +11,7 @@ from sqlalchemy.orm import selectinload
 
 from app.models.catalog import Category, Product
 from app.models.taxes import TaxGroup, TaxRate
-from app.services import pricing
+from app.services import config_cache, pricing
 from app.services.checkout_settings import CheckoutSettings
 
 
@@ -42,6 +42,12 @@ def _normalize_group_code(value: str) -> str:
 
 
 async def _get_default_group_id(session: AsyncSession) -> UUID | None:
+    return await config_cache.get_or_load(
+        session, "tax_default_group_id", lambda: _load_default_group_id(session)
+    )
+
+
+async def _load_default_group_id(session: AsyncSession) -> UUID | None:
     result = await session.execute(
         select(TaxGroup.id)
         .where(TaxGroup.is_default.is_(True))
@@ -58,6 +64,20 @@ async def _get_default_group_id(session: AsyncSession) -> UUID | None:
     return result.scalar_one_or_none()
 
 
+async def _country_rates(session: AsyncSession, country: str) -> dict[UUID, Decimal]:
+    """VAT rate of every tax group for ``country``, keyed by group id."""
+
+    async def load() -> dict[UUID, Decimal]:
+        result = await session.execute(
+            select(TaxRate.group_id, TaxRate.vat_rate_percent).where(
+                TaxRate.country_code == country
+            )
+        )
+        return {gid: Decimal(rate) for gid, rate in result.all()}
+
+    return await config_cache.get_or_load(session, f"tax_rates:{country}", load)
+
+
 async def default_country_vat_rate_percent(
     session: AsyncSession, *, country_code: str | None, fallback_rate_percent: Decimal
 ) -> Decimal:
@@ -67,15 +87,10 @@ async def default_country_vat_rate_percent(
     default_group_id = await _get_default_group_id(session)
     if not default_group_id:
         return fallback_rate_percent
-    result = await session.execute(
-        select(TaxRate.vat_rate_percent).where(
-            TaxRate.group_id == default_group_id, TaxRate.country_code == country
-        )
-    )
-    rate = result.scalar_one_or_none()
+    rate = (await _country_rates(session, country)).get(default_group_id)
     if rate is None:
         return fallback_rate_percent
-    return Decimal(rate)
+    return rate
 
 
 async def list_tax_groups(session: AsyncSession) -> list[TaxGroup]:
@@ -243,14 +258,7 @@ async def vat_rates_for_products(
     if not group_ids:
         return {pid: Decimal(fallback_rate_percent) for pid in product_ids}
 
-    rates = await session.execute(
-        select(TaxRate.group_id, TaxRate.vat_rate_percent).where(
-            TaxRate.group_id.in_(group_ids), TaxRate.country_code == country
-        )
-    )
-    rate_by_group: dict[UUID, Decimal] = {
-        gid: Decimal(rate) for gid, rate in rates.all()
-    }
+    rate_by_group = await _country_rates(session, country)
     default_rate = rate_by_group.get(default_group_id) if default_group_id else None
     fallback = Decimal(fallback_rate_percent)
 
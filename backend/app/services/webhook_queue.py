@@ -0,0 +1,379 @@
+"""Asynchronous processing of payment webhooks.
+
+With ``webhook_queue_enabled`` set, the Stripe and PayPal webhook endpoints
+only verify the signature and store the event summary, then answer 2xx. The
+order state machine, stock, coupon redemption and confirmation emails run
+later in a worker. Slow SMTP or lock contention no longer delays the
+acknowledgement, and the gateway no longer retries because of it. A
+redelivered event that is already stored is acknowledged without any write.
+
+The worker runs on the leader instance only (``leader_lock``). Each event
+stores the order it refers to (``order_key``: payment intent / checkout
+session, PayPal order). A claim skips events whose order still has an earlier
+queued event outside the claim (leased by another batch or backing off), and
+groups the claimed events by order. Each group is handled in arrival order,
+and different groups run concurrently up to ``webhook_queue_concurrency``. A
+failed event is retried with exponential backoff and holds back the later
+events of its order. After
+``webhook_queue_max_attempts`` it is dead-lettered: it stays unprocessed
+with its last error and is listed in the admin ops webhook monitor, where it
+can be re-queued.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Any, Final, TypeVar
+from uuid import UUID
+
+from fastapi import BackgroundTasks, FastAPI, HTTPException
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.webhook import PayPalWebhookEvent, StripeWebhookEvent
+from app.services import queue_worker, webhook_handlers
+
+logger = logging.getLogger(__name__)
+
+WAKEUP_KEY: Final[str] = "webhooks:queue:wakeup"
+_LEASE_SECONDS: Final[int] = 300
+_DRAIN_SECONDS: Final[float] = 10.0
+
+WebhookRow = StripeWebhookEvent | PayPalWebhookEvent
+_Row = TypeVar("_Row", StripeWebhookEvent, PayPalWebhookEvent)
+_MODELS: Final[dict[str, type[WebhookRow]]] = {
+    "stripe": StripeWebhookEvent,
+    "paypal": PayPalWebhookEvent,
+}
+_EVENT_ID_FIELDS: Final[dict[str, str]] = {
+    "stripe": "stripe_event_id",
+    "paypal": "paypal_event_id",
+}
+_HANDLERS: Final[
+    dict[str, Callable[[AsyncSession, BackgroundTasks, dict], Awaitable[None]]]
+] = {
+    "stripe": webhook_handlers.process_stripe_event,
+    "paypal": webhook_handlers.process_paypal_event,
+}
+
+_wakeup = queue_worker.Wakeup(WAKEUP_KEY, name="webhook_queue")
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "webhook_queue_enabled", False))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def ingest(
+    session: AsyncSession,
+    *,
+    provider: str,
+    event_id: str,
+    event_type: str | None,
+    payload: dict[str, Any],
+) -> None:
+    """Store a verified event for processing; redeliveries are a single read.
+
+    A redelivery of an event that is neither processed nor queued (stored while
+    the queue was disabled, or dead-lettered) puts it back on the queue.
+    """
+    model = _MODELS[provider]
+    id_field = _EVENT_ID_FIELDS[provider]
+    existing: WebhookRow | None
+    if provider == "stripe":
+        existing = await session.scalar(
+            select(StripeWebhookEvent).where(
+                StripeWebhookEvent.stripe_event_id == event_id
+            )
+        )
+    else:
+        existing = await session.scalar(
+            select(PayPalWebhookEvent).where(
+                PayPalWebhookEvent.paypal_event_id == event_id
+            )
+        )
+    if existing is not None:
+        if existing.processed_at is None and (
+            existing.next_attempt_at is None or existing.dead_lettered_at is not None
+        ):
+            await requeue(session, existing)
+        return
+
+    now = _now()
+    session.add(
+        model(
+            **{id_field: event_id},
+            event_type=event_type,
+            attempts=0,
+            last_attempt_at=now,
+            next_attempt_at=now,
+            payload=payload,
+            order_key=order_key(provider, payload),
+        )
+    )
+    try:
+        await session.commit()
+    except IntegrityError:
+        # A concurrent delivery of the same event won the insert.
+        await session.rollback()
+        return
+    await _notify()
+
+
+async def requeue(session: AsyncSession, row: WebhookRow) -> WebhookRow:
+    """Schedule a failed or dead-lettered event for another round of attempts."""
+    provider = "stripe" if isinstance(row, StripeWebhookEvent) else "paypal"
+    row.attempts = 0
+    row.dead_lettered_at = None
+    row.next_attempt_at = _now()
+    # Events stored while the queue was disabled have no key yet.
+    row.order_key = row.order_key or order_key(provider, row.payload)
+    session.add(row)
+    await session.commit()
+    await session.refresh(row)
+    await _notify()
+    return row
+
+
+async def _notify() -> None:
+    await _wakeup.notify()
+
+
+def _backoff(attempts: int) -> timedelta:
+    return queue_worker.backoff(
+        attempts,
+        base_seconds=int(
+            getattr(settings, "webhook_queue_retry_base_seconds", 30) or 30
+        ),
+    )
+
+
+def order_key(provider: str, payload: dict[str, Any] | None) -> str | None:
+    """Identify the order an event refers to, for per-order serialization."""
+    payload = payload or {}
+    if provider == "paypal":
+        resource = payload.get("resource")
+        resource_id = resource.get("id") if isinstance(resource, dict) else None
+        return f"paypal:{resource_id}" if resource_id else None
+    data = payload.get("data")
+    obj = data.get("object") if isinstance(data, dict) else None
+    if not isinstance(obj, dict):
+        return None
+    # Checkout sessions carry the intent id, so both event kinds share a key.
+    ref = obj.get("payment_intent") or obj.get("id")
+    return f"stripe:{ref}" if ref else None
+
+
+async def _blocked_keys(
+    session: AsyncSession, model: type[_Row], rows: Sequence[_Row]
+) -> dict[str, datetime]:
+    """Earliest queued event per order that is not among ``rows``."""
+    keys = {row.order_key for row in rows if row.order_key}
+    if not keys:
+        return {}
+    result = await session.execute(
+        select(model.order_key, func.min(model.created_at))
+        .where(
+            model.order_key.in_(keys),
+            model.id.not_in([row.id for row in rows]),
+            model.processed_at.is_(None),
+            model.dead_lettered_at.is_(None),
+            model.next_attempt_at.is_not(None),
+        )
+        .group_by(model.order_key)
+    )
+    return {key: earliest for key, earliest in result.tuples() if key is not None}
+
+
+async def _claim_rows(
+    session: AsyncSession, model: type[_Row], *, limit: int, now: datetime
+) -> list[_Row]:
+    rows = (
+        (
+            await session.execute(
+                select(model)
+                .where(
+                    model.processed_at.is_(None),
+                    model.dead_lettered_at.is_(None),
+                    model.next_attempt_at.is_not(None),
+                    model.next_attempt_at <= now,
+                )
+                .order_by(model.created_at, model.next_attempt_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+        )
+        .scalars()
+        .all()
+    )
+    # An earlier event of the same order that is leased elsewhere, backing off
+    # or locked by a concurrent claim goes first; leave the later ones queued.
+    blocked = await _blocked_keys(session, model, rows)
+    return [
+        row
+        for row in rows
+        if row.order_key is None
+        or row.order_key not in blocked
+        or _aware(row.created_at) < _aware(blocked[row.order_key])
+    ]
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def _claim(
+    session: AsyncSession, provider: str, *, limit: int, now: datetime
+) -> list[tuple[str, UUID, str]]:
+    rows: Sequence[WebhookRow]
+    if provider == "stripe":
+        rows = await _claim_rows(session, StripeWebhookEvent, limit=limit, now=now)
+    else:
+        rows = await _claim_rows(session, PayPalWebhookEvent, limit=limit, now=now)
+    claimed: list[tuple[str, UUID, str]] = []
+    for row in rows:
+        row.next_attempt_at = now + timedelta(seconds=_LEASE_SECONDS)
+        key = row.order_key or f"{provider}-event:{row.id}"
+        claimed.append((provider, row.id, key))
+    return claimed
+
+
+async def _process_one(provider: str, row_id: UUID) -> datetime | None:
+    """Run one event; returns when it will be retried, or ``None`` when done."""
+    if provider == "stripe":
+        return await _process_event(provider, StripeWebhookEvent, row_id)
+    return await _process_event(provider, PayPalWebhookEvent, row_id)
+
+
+async def _process_event(
+    provider: str, model: type[_Row], row_id: UUID
+) -> datetime | None:
+    max_attempts = max(1, int(getattr(settings, "webhook_queue_max_attempts", 8) or 8))
+    async with SessionLocal() as session:
+        row = await session.get(model, row_id)
+        if row is None or row.processed_at is not None:
+            return None
+        attempts = int(row.attempts or 0) + 1
+        payload = dict(row.payload or {})
+        tasks = BackgroundTasks()
+        try:
+            await _HANDLERS[provider](session, tasks, payload)
+        except Exception as exc:
+            await session.rollback()
+            row = await session.get(model, row_id)
+            if row is None:
+                return None
+            now = _now()
+            error = exc.detail if isinstance(exc, HTTPException) else exc
+            row.attempts = attempts
+            row.last_attempt_at = now
+            row.last_error = str(error)[:5000]
+            retry_at: datetime | None = None
+            if attempts < max_attempts:
+                retry_at = now + _backoff(attempts)
+                row.next_attempt_at = retry_at
+            else:
+                row.next_attempt_at = None
+                row.dead_lettered_at = now
+            session.add(row)
+            await session.commit()
+            logger.warning(
+                "webhook_processing_failed",
+                extra={
+                    "provider": provider,
+                    "event_type": row.event_type,
+                    "attempts": attempts,
+                    "dead_lettered": retry_at is None,
+                    "error": row.last_error,
+                },
+            )
+            return retry_at
+
+        row = await session.get(model, row_id)
+        if row is not None:
+            row.attempts = attempts
+            row.last_attempt_at = _now()
+            row.processed_at = _now()
+            row.next_attempt_at = None
+            row.last_error = None
+            session.add(row)
+            await session.commit()
+        # Emails and other side effects only once the order changes are stored.
+        await tasks()
+    return None
+
+
+async def _process_group(
+    items: list[tuple[str, UUID]], semaphore: asyncio.Semaphore
+) -> None:
+    async with semaphore:
+        for index, (provider, row_id) in enumerate(items):
+            retry_at = await _process_one(provider, row_id)
+            if retry_at is None:
+                continue
+            # Keep the order's later events behind the failed one.
+            async with SessionLocal() as session:
+                for later_provider, later_id in items[index + 1 :]:
+                    model = _MODELS[later_provider]
+                    await session.execute(
+                        update(model)
+                        .where(model.id == later_id)
+                        .values(next_attempt_at=retry_at)
+                    )
+                await session.commit()
+            return
+
+
+async def process_batch() -> int:
+    """Claim due events and process them; returns how many were claimed."""
+    limit = max(1, int(getattr(settings, "webhook_queue_batch_size", 50) or 50))
+    concurrency = max(1, int(getattr(settings, "webhook_queue_concurrency", 4) or 4))
+    now = _now()
+    async with SessionLocal() as session:
+        claimed: list[tuple[str, UUID, str]] = []
+        for provider in _MODELS:
+            claimed.extend(await _claim(session, provider, limit=limit, now=now))
+        if not claimed:
+            return 0
+        await session.commit()
+
+    groups: dict[str, list[tuple[str, UUID]]] = {}
+    for provider, row_id, key in claimed:
+        groups.setdefault(key, []).append((provider, row_id))
+    semaphore = asyncio.Semaphore(concurrency)
+    await asyncio.gather(
+        *(_process_group(items, semaphore) for items in groups.values())
+    )
+    return len(claimed)
+
+
+async def _loop(stop: asyncio.Event) -> None:
+    poll = max(0.5, float(getattr(settings, "webhook_queue_poll_seconds", 2.0) or 2.0))
+    await queue_worker.run_batches(
+        stop,
+        name="webhook_queue",
+        process_batch=process_batch,
+        wakeup=_wakeup,
+        poll_seconds=poll,
+    )
+
+
+def start(app: FastAPI) -> None:
+    if not enabled():
+        return
+    queue_worker.start(app, "webhook_queue", _loop, wakeup=_wakeup, leader=True)
+
+
+async def stop(app: FastAPI) -> None:
+    await queue_worker.stop(
+        app, "webhook_queue", wakeup=_wakeup, drain_seconds=_DRAIN_SECONDS
+    )
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import inspect
 import json
 import logging
+import multiprocessing
 import os
+import signal
 import socket
 import time
-from collections.abc import Awaitable
+from collections.abc import Awaitable, Callable, Mapping
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import TypeVar, cast
@@ -18,7 +22,7 @@ from sqlalchemy import select
 from app.core.config import settings
 from app.core.redis_client import get_redis
 from app.db.session import SessionLocal
-from app.models.media import MediaJob, MediaJobStatus
+from app.models.media import MediaJob, MediaJobStatus, MediaJobType
 from app.services import media_dam
 
 
@@ -50,12 +54,83 @@ FALLBACK_STATS_LOG_SECONDS = max(
 FALLBACK_MAX_SLEEP_SECONDS = max(
     1.0, float(getattr(settings, "media_dam_fallback_max_sleep_seconds", 5.0) or 5.0)
 )
+WORKER_CONCURRENCY = max(
+    1, int(getattr(settings, "media_dam_worker_concurrency", 1) or 1)
+)
+CPU_PROCESSES = max(0, int(getattr(settings, "media_dam_worker_cpu_processes", 0) or 0))
+JOB_TYPE_LIMITS: Mapping[str, int] = dict(
+    getattr(settings, "media_dam_worker_job_type_limits", None) or {}
+)
+DRAIN_SECONDS = max(
+    0.0, float(getattr(settings, "media_dam_worker_drain_seconds", 60) or 0)
+)
+
+
+class JobTypeLimiter:
+    """Per-``MediaJobType`` caps shared by the consumers of one worker process.
+
+    Types without a configured cap are only bounded by the consumer count.
+    Consumers claim a slot with ``try_acquire`` before loading a job and
+    ``release`` it once the job is done. A job of a saturated type is not
+    loaded: the Redis consumer puts it back at the head of the queue and waits
+    for a release, and the no-Redis poller skips saturated types.
+    """
+
+    def __init__(self, limits: Mapping[str, int], *, concurrency: int) -> None:
+        known = {job_type.value for job_type in MediaJobType}
+        self._semaphores = {
+            job_type: asyncio.Semaphore(max(1, min(int(limit), concurrency)))
+            for job_type, limit in limits.items()
+            if job_type in known and int(limit) < concurrency
+        }
+        self._released = asyncio.Event()
+
+    @staticmethod
+    def _key(job_type: MediaJobType | str) -> str:
+        return job_type.value if isinstance(job_type, MediaJobType) else str(job_type)
+
+    def saturated(self) -> list[str]:
+        """Job types whose cap is currently reached."""
+        return [key for key, sem in self._semaphores.items() if sem.locked()]
+
+    async def try_acquire(self, job_type: MediaJobType | str) -> bool:
+        semaphore = self._semaphores.get(self._key(job_type))
+        if semaphore is None:
+            return True
+        if semaphore.locked():
+            return False
+        await semaphore.acquire()  # does not suspend: a permit is free
+        return True
+
+    def release(self, job_type: MediaJobType | str) -> None:
+        semaphore = self._semaphores.get(self._key(job_type))
+        if semaphore is not None:
+            semaphore.release()
+            self._released.set()
+
+    async def wait_for_release(self, timeout: float) -> None:
+        """Wait until any capped slot frees up (or ``timeout`` passes)."""
+        self._released.clear()
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._released.wait(), timeout=timeout)
 
 
-async def _process_job_id(raw_job_id: str) -> None:
+async def _process_job_id(
+    raw_job_id: str,
+    *,
+    limiter: JobTypeLimiter | None = None,
+    reserved: MediaJobType | None = None,
+) -> None:
+    """Process one job.
+
+    ``reserved`` is the job type whose ``limiter`` slot the caller claimed
+    before handing the job over; it is released here once the job finishes.
+    """
     try:
         job_id = UUID(str(raw_job_id))
     except Exception:
+        if limiter is not None and reserved is not None:
+            limiter.release(reserved)
         return
     async with SessionLocal() as session:
         try:
@@ -63,6 +138,21 @@ async def _process_job_id(raw_job_id: str) -> None:
             await media_dam.process_job_inline(session, job)
         except Exception:
             logger.exception("media_worker_job_failed", extra={"job_id": str(job_id)})
+        finally:
+            if limiter is not None and reserved is not None:
+                limiter.release(reserved)
+
+
+async def _job_type(raw_job_id: str) -> MediaJobType | None:
+    """The type of a queued job, read without loading the job itself."""
+    try:
+        job_id = UUID(str(raw_job_id))
+    except Exception:
+        return None
+    async with SessionLocal() as session:
+        return await session.scalar(
+            select(MediaJob.job_type).where(MediaJob.id == job_id)
+        )
 
 
 async def _enqueue_due_retries_once(limit: int = 50) -> int:
@@ -246,8 +336,214 @@ async def _await_if_needed(result: Awaitable[T] | T) -> T:
     return cast(T, result)
 
 
+def _pool_mode_enabled() -> bool:
+    return WORKER_CONCURRENCY > 1 or CPU_PROCESSES > 0
+
+
+def _start_image_pool() -> ProcessPoolExecutor | None:
+    if CPU_PROCESSES <= 0:
+        return None
+    # spawn: children must not inherit the event loop or open DB/Redis sockets.
+    executor = ProcessPoolExecutor(
+        max_workers=CPU_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+    )
+    media_dam.set_image_executor(executor)
+    return executor
+
+
+async def _housekeeping(redis, *, worker_id: str, stop: asyncio.Event) -> None:
+    heartbeat_interval = max(5.0, float(HEARTBEAT_TTL_SECONDS) / 2.0)
+    last_heartbeat = 0.0
+    last_retry_sweep = 0.0
+    while not stop.is_set():
+        try:
+            now = time.monotonic()
+            if now - last_heartbeat >= heartbeat_interval:
+                await _publish_heartbeat(redis, worker_id=worker_id)
+                last_heartbeat = now
+            if now - last_retry_sweep >= float(RETRY_SWEEP_SECONDS):
+                await _enqueue_due_retries_once(limit=100)
+                last_retry_sweep = now
+        except Exception:
+            logger.exception("media_worker_housekeeping_failed")
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stop.wait(), timeout=1.0)
+
+
+async def _consume_queue(
+    redis, *, limiter: JobTypeLimiter, stop: asyncio.Event, poll_interval: float
+) -> None:
+    # A job popped before ``stop`` is set is always finished (drain).
+    # Types of jobs handed back, so a saturated job is not read again.
+    held_back: dict[str, MediaJobType] = {}
+    while not stop.is_set():
+        try:
+            result = await _await_if_needed(
+                redis.blpop([QUEUE_KEY], timeout=max(1, int(poll_interval)))
+            )
+            if not result:
+                continue
+            _, raw = result
+            candidate = _normalize_job_id_candidate(raw)
+            if candidate is None:
+                continue
+            job_type = held_back.pop(candidate, None) or await _job_type(candidate)
+            if job_type is not None and not await limiter.try_acquire(job_type):
+                # Its type is at its cap: put it back at the head, keeping its
+                # place in line, and wait for a slot to free up.
+                held_back[candidate] = job_type
+                await _await_if_needed(redis.lpush(QUEUE_KEY, candidate))
+                await limiter.wait_for_release(timeout=max(0.1, poll_interval))
+                continue
+            await _process_job_id(candidate, limiter=limiter, reserved=job_type)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("media_worker_loop_error")
+            await asyncio.sleep(max(0.5, poll_interval))
+
+
+async def _dispatch_queued_jobs(
+    *,
+    limiter: JobTypeLimiter,
+    in_flight: dict[UUID, asyncio.Task[None]],
+    capacity: int,
+) -> int:
+    """Start up to ``capacity`` queued jobs (no-Redis mode), one session each.
+
+    Jobs of types at their cap are skipped, so they never take up capacity that
+    jobs of other types could use.
+    """
+    if capacity <= 0:
+        return 0
+    async with SessionLocal() as session:
+        stmt = (
+            select(MediaJob.id, MediaJob.job_type)
+            .where(MediaJob.status == MediaJobStatus.queued)
+            .order_by(MediaJob.created_at.asc())
+            .limit(capacity)
+        )
+        if in_flight:
+            stmt = stmt.where(MediaJob.id.not_in(list(in_flight)))
+        saturated = limiter.saturated()
+        if saturated:
+            stmt = stmt.where(MediaJob.job_type.not_in(saturated))
+        rows = (await session.execute(stmt)).all()
+
+    def _forget(job_id: UUID) -> Callable[[asyncio.Task[None]], None]:
+        def _done(_task: asyncio.Task[None]) -> None:
+            in_flight.pop(job_id, None)
+
+        return _done
+
+    started = 0
+    for job_id, job_type in rows:
+        if not await limiter.try_acquire(job_type):
+            continue
+        task = asyncio.create_task(
+            _process_job_id(str(job_id), limiter=limiter, reserved=job_type)
+        )
+        in_flight[job_id] = task
+        task.add_done_callback(_forget(job_id))
+        started += 1
+    return started
+
+
+async def _poll_database(
+    *, limiter: JobTypeLimiter, stop: asyncio.Event, poll_interval: float
+) -> None:
+    in_flight: dict[UUID, asyncio.Task[None]] = {}
+    try:
+        while not stop.is_set():
+            try:
+                await _dispatch_queued_jobs(
+                    limiter=limiter,
+                    in_flight=in_flight,
+                    capacity=WORKER_CONCURRENCY - len(in_flight),
+                )
+            except Exception:
+                logger.exception("media_worker_degraded_mode_loop_error")
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), timeout=poll_interval)
+    finally:
+        if in_flight:
+            await asyncio.gather(*in_flight.values(), return_exceptions=True)
+
+
+async def run_media_worker_pool(
+    poll_interval_seconds: float = 2.0, *, stop: asyncio.Event | None = None
+) -> None:
+    """Run ``WORKER_CONCURRENCY`` consumers until ``stop`` is set, then drain.
+
+    In-flight jobs get ``DRAIN_SECONDS`` to finish; jobs still running after
+    that are cancelled and later picked up by the stale-processing recovery.
+    """
+    stop = stop or asyncio.Event()
+    redis = get_redis()
+    worker_id = _worker_id()
+    limiter = JobTypeLimiter(JOB_TYPE_LIMITS, concurrency=WORKER_CONCURRENCY)
+    poll_interval = min(
+        FALLBACK_MAX_SLEEP_SECONDS, max(0.1, float(poll_interval_seconds))
+    )
+    executor = _start_image_pool()
+    logger.info(
+        "media_worker_pool_started",
+        extra={
+            "worker_id": worker_id,
+            "concurrency": WORKER_CONCURRENCY,
+            "cpu_processes": CPU_PROCESSES,
+            "redis": redis is not None,
+        },
+    )
+    tasks = [asyncio.create_task(_housekeeping(redis, worker_id=worker_id, stop=stop))]
+    if redis is None:
+        tasks.append(
+            asyncio.create_task(
+                _poll_database(limiter=limiter, stop=stop, poll_interval=poll_interval)
+            )
+        )
+    else:
+        tasks.extend(
+            asyncio.create_task(
+                _consume_queue(
+                    redis,
+                    limiter=limiter,
+                    stop=stop,
+                    poll_interval=float(poll_interval_seconds),
+                )
+            )
+            for _ in range(WORKER_CONCURRENCY)
+        )
+    try:
+        await stop.wait()
+        logger.info("media_worker_pool_draining", extra={"worker_id": worker_id})
+        _, pending = await asyncio.wait(tasks, timeout=DRAIN_SECONDS or None)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        for task in tasks:
+            task.cancel()
+        if executor is not None:
+            media_dam.set_image_executor(None)
+            executor.shutdown(wait=True, cancel_futures=True)
+        logger.info("media_worker_pool_stopped", extra={"worker_id": worker_id})
+
+
+async def _serve() -> None:  # pragma: no cover
+    if not _pool_mode_enabled():
+        await run_media_worker()
+        return
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+    await run_media_worker_pool(stop=stop)
+
+
 def main() -> None:  # pragma: no cover
-    asyncio.run(run_media_worker())
+    asyncio.run(_serve())
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -126,3 +126,44 @@ def _clear_auth_rate_limits() -> Generator[None, None, None]:
         auth_api.google_rate_limit,
     ):
         dep.buckets.clear()
+
+
+@pytest.fixture(autouse=True)
+def _reset_catalog_caches(
+    tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch
+) -> Generator[None, None, None]:
+    # The per-process listing cache, category and config snapshots, locker grid,
+    # pooled SMTP connections and buffered recent views outlive the per-test
+    # databases. Stored feed/OG files go to a throwaway private root per test.
+    from app.services import (
+        analytics_ingest,
+        catalog_cache,
+        category_tree,
+        config_cache,
+        locker_grid,
+        product_feed,
+        recently_viewed,
+        smtp_pool,
+    )
+    from app.core.config import settings
+
+    monkeypatch.setattr(
+        settings, "private_media_root", str(tmp_path_factory.mktemp("private"))
+    )
+    catalog_cache._reset_for_tests()
+    category_tree._reset_for_tests()
+    product_feed._reset_for_tests()
+    locker_grid._reset_for_tests()
+    smtp_pool._reset_for_tests()
+    config_cache._reset_for_tests()
+    recently_viewed._reset_for_tests()
+    analytics_ingest._reset_for_tests()
+    yield
+    catalog_cache._reset_for_tests()
+    category_tree._reset_for_tests()
+    product_feed._reset_for_tests()
+    locker_grid._reset_for_tests()
+    smtp_pool._reset_for_tests()
+    config_cache._reset_for_tests()
+    recently_viewed._reset_for_tests()
+    analytics_ingest._reset_for_tests()
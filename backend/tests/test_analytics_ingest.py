@@ -0,0 +1,143 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import func, select
+from starlette.requests import Request
+
+from app.api.v1 import analytics as analytics_api
+from app.core import metrics
+from app.core.config import settings
+from app.models.analytics_event import AnalyticsEvent
+from app.schemas.analytics import AnalyticsEventBatchCreate, AnalyticsEventCreate
+from app.services import analytics_ingest
+from tests.conftest import make_memory_session_factory
+
+
+def _row(event: str = "session_start", session_id: str = "s-1") -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "session_id": session_id,
+        "event": event,
+        "path": "/",
+        "payload": None,
+        "user_id": None,
+        "order_id": None,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+def _request() -> Request:
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": []})
+
+
+async def _count(factory) -> int:
+    async with factory() as session:
+        return int(await session.scalar(select(func.count(AnalyticsEvent.id))) or 0)
+
+
+def test_buffer_drops_past_capacity_and_flushes_in_batches(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "redis_url", None)
+    monkeypatch.setattr(settings, "analytics_buffer_max_events", 5)
+    monkeypatch.setattr(settings, "analytics_flush_batch_size", 3)
+    factory = make_memory_session_factory()
+    monkeypatch.setattr(analytics_ingest, "SessionLocal", factory)
+    before = metrics.snapshot()
+
+    async def _run() -> None:
+        monkeypatch.setattr(analytics_ingest, "_wakeup", asyncio.Event())
+        assert await analytics_ingest.enqueue([_row() for _ in range(2)]) == 2
+        assert not analytics_ingest._wakeup.is_set()
+        assert await analytics_ingest.enqueue([_row() for _ in range(4)]) == 3
+        assert analytics_ingest._wakeup.is_set()
+        assert await _count(factory) == 0
+
+        assert await analytics_ingest.flush() == 3
+        assert await analytics_ingest.flush() == 2
+        assert await analytics_ingest.flush() == 0
+        assert await _count(factory) == 5
+
+    asyncio.run(_run())
+    after = metrics.snapshot()
+    delta = {
+        outcome: after[f"analytics_events_{outcome}"]
+        - before.get(f"analytics_events_{outcome}", 0)
+        for outcome in ("accepted", "dropped", "flushed")
+    }
+    assert delta == {"accepted": 5, "dropped": 1, "flushed": 5}
+
+
+def test_batch_endpoint_validates_every_event(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "redis_url", None)
+    monkeypatch.setattr(settings, "analytics_require_token", False)
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            res = await analytics_api.ingest_analytics_events_batch(
+                AnalyticsEventBatchCreate(
+                    events=[
+                        AnalyticsEventCreate(event="session_start", session_id="s-1"),
+                        AnalyticsEventCreate(event="view_cart", session_id="s-1"),
+                    ]
+                ),
+                _request(),
+                session=session,
+                user=None,
+            )
+            assert (res.accepted, res.dropped) == (2, 0)
+            assert await _count(factory) == 2
+
+            with pytest.raises(analytics_api.HTTPException) as exc:
+                await analytics_api.ingest_analytics_events_batch(
+                    AnalyticsEventBatchCreate(
+                        events=[
+                            AnalyticsEventCreate(event="view_cart", session_id="s-1"),
+                            AnalyticsEventCreate(event="nope", session_id="s-1"),
+                        ]
+                    ),
+                    _request(),
+                    session=session,
+                    user=None,
+                )
+            assert exc.value.status_code == 400
+            assert await _count(factory) == 2
+
+    asyncio.run(_run())
+
+
+def test_flush_drops_only_the_events_the_database_rejects(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "redis_url", None)
+    factory = make_memory_session_factory()
+    monkeypatch.setattr(analytics_ingest, "SessionLocal", factory)
+
+    async def _run() -> None:
+        stored = _row()
+        async with factory() as session:
+            await analytics_ingest.insert_rows(session, [stored])
+
+        # Same primary key as the stored event: the batch insert fails.
+        duplicate = {**_row(), "id": stored["id"]}
+        assert await analytics_ingest.enqueue([_row(), duplicate, _row()]) == 3
+        assert await analytics_ingest.flush() == 2
+        assert await analytics_ingest.flush() == 0
+        assert await _count(factory) == 3
+
+    asyncio.run(_run())
+
+
+def test_unknown_order_ids_are_cleared_before_buffering() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        rows = [{**_row(), "order_id": uuid.uuid4()}, _row()]
+        async with factory() as session:
+            await analytics_ingest.drop_unknown_orders(session, rows)
+        assert [row["order_id"] for row in rows] == [None, None]
+
+    asyncio.run(_run())
@@ -0,0 +1,165 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.api.v1 import admin_dashboard as ad
+from app.core.config import settings
+from app.models.analytics_event import AnalyticsEvent
+from app.models.order import Order, OrderStatus
+from app.services import analytics_rollups
+from tests.conftest import make_memory_session_factory
+
+
+def test_sketch_estimates_and_merges() -> None:
+    small = analytics_rollups.empty_sketch()
+    for idx in range(25):
+        analytics_rollups.sketch_add(small, f"s-{idx}")
+        analytics_rollups.sketch_add(small, f"s-{idx}")
+    assert analytics_rollups.sketch_count(small) == 25
+
+    left = analytics_rollups.empty_sketch()
+    right = analytics_rollups.empty_sketch()
+    for idx in range(30_000):
+        analytics_rollups.sketch_add(left if idx % 2 else right, f"s-{idx}")
+    for idx in range(10_000):
+        analytics_rollups.sketch_add(right, f"s-{idx}")
+    analytics_rollups.sketch_merge(left, bytes(right))
+    assert analytics_rollups.sketch_count(left) == pytest.approx(30_000, rel=0.05)
+
+
+def test_dashboards_merge_rollups_with_raw_edges(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "analytics_rollup_settle_seconds", 0)
+    factory = make_memory_session_factory()
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(days=5)
+
+    async def _attribution(session) -> dict:
+        return await ad.admin_channel_attribution(
+            session=session,
+            _=None,
+            range_days=5,
+            range_from=None,
+            range_to=None,
+            limit=12,
+        )
+
+    async def _run() -> None:
+        async with factory() as session:
+            order = Order(
+                status=OrderStatus.paid,
+                total_amount=Decimal("80"),
+                created_at=now - timedelta(days=3),
+                updated_at=now - timedelta(days=3),
+                customer_email="buyer@example.com",
+                customer_name="Buyer",
+            )
+            session.add(order)
+            await session.flush()
+            for days_ago in (4, 3, 2):
+                at = now - timedelta(days=days_ago)
+                session.add_all(
+                    [
+                        AnalyticsEvent(
+                            event="session_start", session_id="shared", created_at=at
+                        ),
+                        AnalyticsEvent(
+                            event="session_start",
+                            session_id=f"day-{days_ago}",
+                            created_at=at,
+                        ),
+                        AnalyticsEvent(
+                            event="view_cart", session_id="shared", created_at=at
+                        ),
+                    ]
+                )
+            session.add_all(
+                [
+                    AnalyticsEvent(
+                        event="session_start",
+                        session_id="buyer",
+                        payload={"utm_source": "Google", "utm_medium": "cpc"},
+                        created_at=now - timedelta(days=3, hours=1),
+                    ),
+                    AnalyticsEvent(
+                        event="checkout_success",
+                        session_id="buyer",
+                        order_id=order.id,
+                        created_at=now - timedelta(days=3),
+                    ),
+                ]
+            )
+            await session.commit()
+
+            raw_funnel = await analytics_rollups.funnel_counts(
+                session, start=start, end=now
+            )
+            raw_attribution = await _attribution(session)
+
+            assert await analytics_rollups.backfill(session, now=now) > 0
+            # Events arriving after the backfill are read from the raw edge.
+            session.add(
+                AnalyticsEvent(event="session_start", session_id="late", created_at=now)
+            )
+            await session.commit()
+
+            funnel = await analytics_rollups.funnel_counts(
+                session, start=start, end=now + timedelta(seconds=1)
+            )
+            assert funnel == {**raw_funnel, "session_start": 6}
+            assert raw_funnel["session_start"] == 5
+            assert raw_funnel["view_cart"] == 1
+            assert await _attribution(session) == raw_attribution
+            assert raw_attribution["channels"][0]["source"] == "google"
+
+            # Re-running over folded events changes nothing.
+            await analytics_rollups.run_once(session, now=now)
+            assert (
+                await analytics_rollups.funnel_counts(
+                    session, start=start, end=now + timedelta(seconds=1)
+                )
+                == funnel
+            )
+
+    asyncio.run(_run())
+
+
+def test_run_once_picks_up_late_events_of_recent_days(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "analytics_rollup_settle_seconds", 0)
+    factory = make_memory_session_factory()
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(days=3)
+
+    async def _run() -> None:
+        async with factory() as session:
+            session.add(
+                AnalyticsEvent(
+                    event="session_start",
+                    session_id="early",
+                    created_at=now - timedelta(days=2),
+                )
+            )
+            await session.commit()
+            assert await analytics_rollups.backfill(session, now=now) == 1
+
+            # A buffered event from yesterday lands after its day was folded.
+            session.add(
+                AnalyticsEvent(
+                    event="session_start",
+                    session_id="late",
+                    created_at=now - timedelta(days=1),
+                )
+            )
+            await session.commit()
+            await analytics_rollups.run_once(session, now=now + timedelta(minutes=5))
+            funnel = await analytics_rollups.funnel_counts(
+                session, start=start, end=now
+            )
+            assert funnel["session_start"] == 2
+
+    asyncio.run(_run())
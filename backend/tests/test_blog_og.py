@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.models.content import ContentBlock, ContentBlockTranslation, ContentStatus
+from app.services import blog as blog_service
+from app.services import blog_og, og_images
+from tests.conftest import make_memory_session_factory
+
+
+@pytest.fixture(autouse=True)
+def _private_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "private_media_root", str(tmp_path))
+
+
+def test_images_are_rendered_once_per_version_and_served_from_disk(
+    monkeypatch,
+) -> None:
+    factory = make_memory_session_factory()
+    rendered: list[str] = []
+
+    def _render(*, title, subtitle=None, brand="momentstudio"):
+        rendered.append(title)
+        return b"\x89PNG\r\n\x1a\n" + title.encode()
+
+    monkeypatch.setattr(og_images, "render_blog_post_og", _render)
+
+    async def _run() -> None:
+        async with factory() as session:
+            block = ContentBlock(
+                key="blog.hello",
+                title="Hello",
+                body_markdown="Body",
+                status=ContentStatus.published,
+                lang="en",
+                meta={"summary": "Short"},
+            )
+            session.add(block)
+            await session.flush()
+            session.add(
+                ContentBlockTranslation(
+                    content_block_id=block.id,
+                    lang="ro",
+                    title="Salut",
+                    body_markdown="B",
+                )
+            )
+            await session.commit()
+
+            assert await blog_og.prerender_post(session, block) == 3
+            assert sorted(rendered) == ["Hello", "Hello", "Salut"]
+            # Drafts and non-blog blocks are ignored.
+            page = ContentBlock(key="page.about", title="About", body_markdown="x")
+            assert await blog_og.prerender_post(session, page) == 0
+
+            post = await blog_service.get_published_post(
+                session, slug="hello", lang="ro"
+            )
+            path = await blog_og.get_post_image(post, lang="ro")
+            assert path.read_bytes().endswith(b"Salut")
+            assert len(rendered) == 3
+
+            # A new content version replaces the stored image.
+            block.version = 2
+            session.add(block)
+            await session.commit()
+            path_v2 = await blog_og.get_post_image(block, lang=None)
+            assert path_v2.name == "hello.base.v2.png"
+            assert not (path.parent / "hello.base.v1.png").exists()
+
+            assert await blog_og.rerender_all_posts(session, force=False) == 2
+            assert await blog_og.rerender_all_posts(session) == 3
+
+    asyncio.run(_run())
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import catalog_cache
+
+
+def _digest(**overrides):
+    params = dict(
+        category_slug="cups",
+        on_sale=None,
+        is_featured=None,
+        search=None,
+        min_price=None,
+        max_price=None,
+        tags=None,
+        sort=None,
+        limit=20,
+        offset=0,
+        lang=None,
+    )
+    params.update(overrides)
+    return catalog_cache.listing_digest(**params)
+
+
+def test_listing_digest_normalizes_equivalent_filters() -> None:
+    assert _digest(tags=["b", "a", "a"]) == _digest(tags=[" a", "b"])
+    assert _digest(search="  Cup ") == _digest(search="cup")
+    assert _digest(sort="bogus") == _digest(sort="newest")
+    assert _digest(min_price=5) == _digest(min_price=5.0)
+    assert _digest(offset=20) != _digest(offset=0)
+    assert _digest(lang="ro") != _digest(lang=None)
+
+
+def test_local_cache_roundtrip_and_generation_bump(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "redis_url", None)
+    monkeypatch.setattr(settings, "catalog_listing_cache_ttl_seconds", 60)
+
+    async def _run() -> None:
+        key = await catalog_cache.listing_cache_key(_digest())
+        assert await catalog_cache.get_listing(key) is None
+        await catalog_cache.set_listing(key, {"items": []})
+        assert await catalog_cache.get_listing(key) == {"items": []}
+
+        await catalog_cache.bump_generation()
+        fresh_key = await catalog_cache.listing_cache_key(_digest())
+        assert fresh_key != key
+        assert await catalog_cache.get_listing(fresh_key) is None
+        assert await catalog_cache.get_listing(key) is None
+
+    asyncio.run(_run())
+
+
+def test_local_cache_expires_and_stays_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "redis_url", None)
+    monkeypatch.setattr(settings, "catalog_listing_cache_ttl_seconds", 60)
+    monkeypatch.setattr(catalog_cache, "_LOCAL_MAX_ENTRIES", 2)
+    clock = {"now": 100.0}
+    monkeypatch.setattr(catalog_cache.time, "monotonic", lambda: clock["now"])
+
+    async def _run() -> None:
+        for idx in range(3):
+            await catalog_cache.set_listing(f"k{idx}", {"idx": idx})
+        assert await catalog_cache.get_listing("k0") is None
+        assert await catalog_cache.get_listing("k2") == {"idx": 2}
+        clock["now"] += 61
+        assert await catalog_cache.get_listing("k2") is None
+
+    asyncio.run(_run())
+
+
+def test_cache_disabled_when_ttl_zero(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "redis_url", None)
+    monkeypatch.setattr(settings, "catalog_listing_cache_ttl_seconds", 0)
+
+    async def _run() -> None:
+        await catalog_cache.set_listing("k", {"items": []})
+        assert await catalog_cache.get_listing("k") is None
+
+    assert catalog_cache.is_enabled() is False
+    asyncio.run(_run())
+
+
+class _FailingRedis:
+    async def get(self, _key):
+        raise ConnectionError("down")
+
+    async def set(self, *_args, **_kwargs):
+        raise ConnectionError("down")
+
+    async def incr(self, _key):
+        raise ConnectionError("down")
+
+
+def test_falls_back_to_local_store_when_redis_is_down(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "catalog_listing_cache_ttl_seconds", 60)
+    monkeypatch.setattr(catalog_cache, "get_redis", lambda: _FailingRedis())
+
+    async def _run() -> None:
+        key = await catalog_cache.listing_cache_key(_digest())
+        await catalog_cache.set_listing(key, {"items": [1]})
+        assert await catalog_cache.get_listing(key) == {"items": [1]}
+        await catalog_cache.bump_generation()
+        assert await catalog_cache.get_generation() == 1
+
+    asyncio.run(_run())
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.store: dict[str, str] = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    async def incr(self, key):
+        self.store[key] = str(int(self.store.get(key) or 0) + 1)
+        return int(self.store[key])
+
+
+def test_redis_store_shares_generation(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "catalog_listing_cache_ttl_seconds", 60)
+    fake = _FakeRedis()
+    monkeypatch.setattr(catalog_cache, "get_redis", lambda: fake)
+
+    async def _run() -> None:
+        key = await catalog_cache.listing_cache_key(_digest())
+        await catalog_cache.set_listing(key, {"items": [1]})
+        assert await catalog_cache.get_listing(key) == {"items": [1]}
+        await catalog_cache.bump_generation()
+        assert fake.store[catalog_cache.GENERATION_KEY] == "1"
+        assert await catalog_cache.listing_cache_key(_digest()) != key
+
+    asyncio.run(_run())
@@ -0,0 +1,149 @@
+import asyncio
+import uuid
+
+from sqlalchemy import select
+
+from app.models.catalog import Category, CategoryClosure
+from app.services import category_tree
+from tests.conftest import make_memory_session_factory
+
+
+async def _closure(session) -> set[tuple[str, str, int]]:
+    rows = (
+        await session.execute(
+            select(
+                CategoryClosure.ancestor_id,
+                CategoryClosure.descendant_id,
+                CategoryClosure.depth,
+            )
+        )
+    ).all()
+    slugs = dict((await session.execute(select(Category.id, Category.slug))).all())
+    return {(slugs[a], slugs[d], depth) for a, d, depth in rows}
+
+
+def test_closure_follows_inserts_reparenting_and_deletes() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            root = Category(slug="root", name="Root")
+            session.add(root)
+            await session.flush()
+            child = Category(slug="child", name="Child", parent_id=root.id)
+            other = Category(slug="other", name="Other")
+            session.add_all([child, other])
+            await session.flush()
+            grand = Category(slug="grand", name="Grand", parent_id=child.id)
+            session.add(grand)
+            await session.commit()
+
+            assert await _closure(session) == {
+                ("root", "root", 0),
+                ("child", "child", 0),
+                ("other", "other", 0),
+                ("grand", "grand", 0),
+                ("root", "child", 1),
+                ("root", "grand", 2),
+                ("child", "grand", 1),
+            }
+
+            child.parent_id = other.id
+            session.add(child)
+            await session.commit()
+            closure = await _closure(session)
+            assert ("other", "grand", 2) in closure
+            assert ("root", "grand", 2) not in closure
+
+            await session.delete(grand)
+            await session.commit()
+            assert all("grand" not in (a, d) for a, d, _ in await _closure(session))
+
+    asyncio.run(_run())
+
+
+def test_snapshot_is_reused_and_invalidated_by_hierarchy_commits() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            root = Category(slug="root", name="Root")
+            hidden = Category(slug="hidden", name="Hidden", is_visible=False)
+            session.add_all([root, hidden])
+            await session.commit()
+
+            snapshot = await category_tree.get_snapshot(session)
+            assert snapshot.id_by_slug == {"root": root.id, "hidden": hidden.id}
+            assert snapshot.visible_ids == frozenset({root.id})
+            assert await category_tree.get_snapshot(session) is snapshot
+
+            child = Category(slug="child", name="Child", parent_id=root.id)
+            session.add(child)
+            await session.commit()
+            refreshed = await category_tree.get_snapshot(session)
+            assert refreshed is not snapshot
+            assert refreshed.descendant_ids(root.id) == [root.id, child.id]
+
+            # Non-hierarchy edits keep the snapshot.
+            child.name = "Renamed"
+            session.add(child)
+            await session.commit()
+            assert await category_tree.get_snapshot(session) is refreshed
+
+            child.is_visible = False
+            session.add(child)
+            await session.commit()
+            hidden_child = await category_tree.get_snapshot(session)
+            assert hidden_child is not refreshed
+            assert child.id not in hidden_child.visible_ids
+
+    asyncio.run(_run())
+
+
+def test_ancestor_chain_nearest_first() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            root = Category(slug="root", name="Root")
+            session.add(root)
+            await session.flush()
+            child = Category(slug="child", name="Child", parent_id=root.id)
+            session.add(child)
+            await session.commit()
+
+            chain = await category_tree.get_ancestor_chain(session, child.id)
+            assert chain == [(child.id, root.id), (root.id, None)]
+            assert await category_tree.get_ancestor_chain(session, uuid.uuid4()) == []
+
+    asyncio.run(_run())
+
+
+def test_closure_handles_same_flush_parents_and_orphaned_children() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            root = Category(slug="root", name="Root")
+            middle = Category(slug="middle", name="Middle", parent=root)
+            leaf = Category(slug="leaf", name="Leaf", parent=middle)
+            session.add_all([leaf, middle, root])
+            await session.commit()
+            assert ("root", "leaf", 2) in await _closure(session)
+
+            await session.delete(middle)
+            await session.commit()
+            assert await _closure(session) == {
+                ("root", "root", 0),
+                ("leaf", "leaf", 0),
+            }
+
+            # A move that would close a cycle falls back to a full rebuild.
+            leaf.parent_id = root.id
+            await session.commit()
+            root.parent_id = leaf.id
+            await session.flush()
+            assert ("root", "leaf", 1) in await _closure(session)
+            await session.rollback()
+
+    asyncio.run(_run())
@@ -0,0 +1,161 @@
+import asyncio
+from decimal import Decimal
+
+from sqlalchemy import event, select
+
+from app.models.content import ContentBlock, ContentStatus
+from app.models.taxes import TaxGroup, TaxRate
+from app.services import checkout_settings, taxes
+from tests.conftest import make_memory_session_factory
+
+
+def _count_statements(engine) -> list[str]:
+    statements: list[str] = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    return statements
+
+
+def test_checkout_settings_are_loaded_once_until_edited() -> None:
+    factory = make_memory_session_factory()
+    statements = _count_statements(factory.kw["bind"])
+
+    async def _run() -> None:
+        async with factory() as session:
+            session.add(
+                ContentBlock(
+                    key="site.checkout",
+                    title="Checkout",
+                    body_markdown="",
+                    status=ContentStatus.published,
+                    meta={"shipping_fee_ron": "15.00"},
+                )
+            )
+            await session.commit()
+
+        statements.clear()
+        async with factory() as session:
+            first = await checkout_settings.get_checkout_settings(session)
+            assert await checkout_settings.get_checkout_settings(session) is first
+        loaded = len(statements)
+        assert loaded > 0
+        assert first.shipping_fee_ron == Decimal("15.00")
+
+        # Another request is served from the process snapshot.
+        async with factory() as session:
+            assert await checkout_settings.get_checkout_settings(session) is first
+        assert len(statements) == loaded
+
+        async with factory() as session:
+            block = (
+                await session.execute(
+                    select(ContentBlock).where(ContentBlock.key == "site.checkout")
+                )
+            ).scalar_one()
+            block.meta = {"shipping_fee_ron": "9.00"}
+            await session.flush()
+            # The writing session sees its own pending change ...
+            pending = await checkout_settings.get_checkout_settings(session)
+            assert pending.shipping_fee_ron == Decimal("9.00")
+            # ... which never reaches the snapshot before it commits.
+            async with factory() as other:
+                unchanged = await checkout_settings.get_checkout_settings(other)
+                assert unchanged.shipping_fee_ron == Decimal("15.00")
+            await session.commit()
+
+        async with factory() as session:
+            edited = await checkout_settings.get_checkout_settings(session)
+            assert edited.shipping_fee_ron == Decimal("9.00")
+
+    asyncio.run(_run())
+
+
+def test_tax_rates_are_shared_and_invalidated_by_rate_edits() -> None:
+    factory = make_memory_session_factory()
+    statements = _count_statements(factory.kw["bind"])
+
+    async def _run() -> None:
+        async with factory() as session:
+            group = TaxGroup(code="standard", name="Standard", is_default=True)
+            session.add(group)
+            await session.flush()
+            session.add(
+                TaxRate(
+                    group_id=group.id,
+                    country_code="RO",
+                    vat_rate_percent=Decimal("19.00"),
+                )
+            )
+            await session.commit()
+            group_id = group.id
+
+        statements.clear()
+        async with factory() as session:
+            rate = await taxes.default_country_vat_rate_percent(
+                session, country_code="RO", fallback_rate_percent=Decimal("5")
+            )
+            assert rate == Decimal("19.00")
+        loaded = len(statements)
+
+        async with factory() as session:
+            for _ in range(3):
+                assert await taxes.default_country_vat_rate_percent(
+                    session, country_code="ro", fallback_rate_percent=Decimal("5")
+                ) == Decimal("19.00")
+        assert len(statements) == loaded
+
+        async with factory() as session:
+            group = await session.get(TaxGroup, group_id)
+            await taxes.upsert_tax_rate(
+                session, group=group, country_code="RO", vat_rate_percent=Decimal("21")
+            )
+
+        async with factory() as session:
+            assert await taxes.default_country_vat_rate_percent(
+                session, country_code="RO", fallback_rate_percent=Decimal("5")
+            ) == Decimal("21.00")
+
+    asyncio.run(_run())
+
+
+def test_memo_is_dropped_when_the_transaction_ends() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            session.add(
+                ContentBlock(
+                    key="site.checkout",
+                    title="Checkout",
+                    body_markdown="",
+                    status=ContentStatus.published,
+                    meta={"shipping_fee_ron": "15.00"},
+                )
+            )
+            await session.commit()
+
+        async with factory() as worker:
+            before = await checkout_settings.get_checkout_settings(worker)
+            assert before.shipping_fee_ron == Decimal("15.00")
+
+            async with factory() as admin:
+                block = (
+                    await admin.execute(
+                        select(ContentBlock).where(ContentBlock.key == "site.checkout")
+                    )
+                ).scalar_one()
+                block.meta = {"shipping_fee_ron": "9.00"}
+                await admin.commit()
+
+            # Stable within the worker's transaction ...
+            assert await checkout_settings.get_checkout_settings(worker) is before
+            await worker.commit()
+            # ... and current once it ends.
+            after = await checkout_settings.get_checkout_settings(worker)
+            assert after.shipping_fee_ron == Decimal("9.00")
+
+    asyncio.run(_run())
@@ -0,0 +1,100 @@
+import asyncio
+import csv
+import io
+from decimal import Decimal
+
+from app.models.catalog import (
+    Category,
+    Product,
+    ProductStatus,
+    ProductTranslation,
+    Tag,
+)
+from app.services import catalog, csv_stream, product_feed
+from tests.conftest import make_memory_session_factory
+
+
+async def _rows(count: int):
+    for idx in range(count):
+        yield (idx, f"row,{idx}")
+
+
+def test_iter_csv_yields_header_first_then_row_chunks() -> None:
+    async def _run() -> list[str]:
+        return [
+            chunk
+            async for chunk in csv_stream.iter_csv(
+                ("id", "name"), _rows(5), chunk_rows=2
+            )
+        ]
+
+    chunks = asyncio.run(_run())
+    assert chunks[0] == "id,name\r\n"
+    assert len(chunks) == 4
+    parsed = list(csv.reader(io.StringIO("".join(chunks))))
+    assert parsed[1:] == [[str(idx), f"row,{idx}"] for idx in range(5)]
+
+    async def _template() -> str:
+        return await csv_stream.collect(csv_stream.iter_csv(("id",), None))
+
+    assert asyncio.run(_template()) == "id\r\n"
+
+
+def test_streamed_product_exports_batch_tags_and_translations() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            category = Category(slug="cups", name="Cups")
+            red, blue = Tag(slug="red", name="Red"), Tag(slug="blue", name="Blue")
+            session.add_all([category, red, blue])
+            await session.flush()
+            for idx in range(3):
+                session.add(
+                    Product(
+                        category_id=category.id,
+                        slug=f"p{idx}",
+                        sku=f"P{idx}",
+                        name=f"Product {idx}",
+                        short_description="short" if idx else None,
+                        long_description="long",
+                        base_price=Decimal("10.50"),
+                        status=ProductStatus.published,
+                        is_active=True,
+                        tags=[red, blue] if idx == 0 else [],
+                    )
+                )
+            await session.flush()
+            p0 = await catalog.get_product_by_slug(session, "p0")
+            assert p0 is not None
+            session.add(ProductTranslation(product_id=p0.id, lang="ro", name="Produs"))
+            await session.commit()
+
+            exported = list(
+                csv.DictReader(
+                    io.StringIO(
+                        await csv_stream.collect(catalog.iter_products_csv(session))
+                    )
+                )
+            )
+            by_slug = {row["slug"]: row for row in exported}
+            assert set(by_slug) == {"p0", "p1", "p2"}
+            assert by_slug["p0"]["tags"] == "blue,red"
+            assert by_slug["p0"]["category_slug"] == "cups"
+            assert by_slug["p1"]["tags"] == ""
+
+            feed_file = await product_feed.get_feed_file(session, lang="ro", fmt="csv")
+            feed = {
+                row["slug"]: row
+                for row in csv.DictReader(
+                    io.StringIO(feed_file.path.read_text("utf-8"))
+                )
+            }
+            # A translation replaces the descriptions even when it has none.
+            assert feed["p0"]["name"] == "Produs"
+            assert feed["p0"]["description"] == ""
+            assert feed["p1"]["name"] == "Product 1"
+            assert feed["p1"]["description"] == "short"
+            assert feed["p1"]["price"] == "10.5"
+
+    asyncio.run(_run())
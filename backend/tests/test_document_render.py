@@ -0,0 +1,167 @@
+import asyncio
+import io
+import os
+import pickle
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from pypdf import PdfReader
+
+from app.core.config import settings
+from app.models.order import Order, OrderItem, OrderStatus
+from app.services import document_render, pick_lists
+from app.services import receipts as receipt_service
+
+
+def _order(reference_code: str = "REF-PDF") -> Order:
+    order = Order(
+        id=uuid4(),
+        reference_code=reference_code,
+        status=OrderStatus.paid,
+        customer_email="buyer@example.com",
+        customer_name="Ana Pop",
+        total_amount=Decimal("42.00"),
+        tax_amount=Decimal("0.00"),
+        shipping_amount=Decimal("12.00"),
+        currency="RON",
+        payment_method="cod",
+        created_at=datetime(2026, 1, 5, tzinfo=timezone.utc),
+    )
+    order.items = [
+        OrderItem(
+            id=uuid4(),
+            product_id=uuid4(),
+            quantity=2,
+            unit_price=Decimal("15.00"),
+            subtotal=Decimal("30.00"),
+        )
+    ]
+    return order
+
+
+def test_snapshot_is_picklable_and_keeps_loaded_state() -> None:
+    order = _order()
+    copy = document_render.snapshot(order)
+    restored = pickle.loads(pickle.dumps(copy))
+    assert restored.reference_code == "REF-PDF"
+    assert restored.items[0].quantity == 2
+    # Relationships that were never loaded are left out rather than lazy loaded.
+    assert not hasattr(restored, "user")
+    assert document_render.snapshot("plain") == "plain"
+
+
+def test_render_in_pool_matches_thread_render(monkeypatch) -> None:
+    order = _order()
+    rows = [
+        pick_lists.PickListRow(
+            sku="SKU-1",
+            product_name="Vas",
+            variant_name=None,
+            quantity=2,
+            order_refs=("REF-PDF",),
+        )
+    ]
+
+    async def _render() -> tuple[bytes, bytes]:
+        slips = await document_render.render_packing_slips([order], title="Batch")
+        picks = await document_render.render_pick_list(rows, orders=[order])
+        return slips, picks
+
+    monkeypatch.setattr(settings, "document_render_workers", 1)
+    try:
+        slips, picks = asyncio.run(_render())
+    finally:
+        document_render.shutdown_pool()
+    assert slips.startswith(b"%PDF") and picks.startswith(b"%PDF")
+
+    monkeypatch.setattr(settings, "document_render_workers", 0)
+    slips, picks = asyncio.run(_render())
+    assert slips.startswith(b"%PDF") and picks.startswith(b"%PDF")
+
+
+def test_batch_is_split_across_the_pool_and_merged(monkeypatch) -> None:
+    orders = [_order(f"REF-{idx}") for idx in range(3)]
+
+    async def _run() -> tuple[bytes, bytes]:
+        merged = await document_render.render_packing_slips(orders, title="Batch")
+        with pytest.raises(ValueError):
+            # Renderer errors are raised, not retried in a thread.
+            await document_render._render(int, "not a number")
+        return merged, await document_render.render_packing_slips(orders[:1])
+
+    monkeypatch.setattr(settings, "document_render_workers", 2)
+    try:
+        merged, single = asyncio.run(_run())
+    finally:
+        document_render.shutdown_pool()
+    reader = PdfReader(io.BytesIO(merged))
+    assert len(reader.pages) == 3
+    assert reader.metadata is not None and reader.metadata.title == "Batch"
+    text = "".join(page.extract_text() for page in reader.pages)
+    assert all(f"REF-{idx}" in text for idx in range(3))
+    assert len(PdfReader(io.BytesIO(single)).pages) == 1
+
+
+def test_receipt_is_cached_by_content(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "private_media_root", str(tmp_path))
+    monkeypatch.setattr(settings, "document_render_workers", 0)
+    calls: list[str] = []
+    render = receipt_service.render_receipt_pdf
+
+    def _counting(receipt, *, locale):
+        calls.append(receipt.reference_code or "")
+        return render(receipt, locale=locale)
+
+    monkeypatch.setattr(receipt_service, "render_receipt_pdf", _counting)
+    order = _order()
+
+    async def _run() -> None:
+        first = await document_render.render_receipt(order)
+        again = await document_render.render_receipt(order)
+        assert first == again and first.startswith(b"%PDF")
+        assert len(calls) == 1
+
+        redacted = await document_render.render_receipt(order, redacted=True)
+        assert redacted.startswith(b"%PDF")
+        assert len(calls) == 2
+
+        # A changed order renders a new PDF and replaces the stale cache entry.
+        order.tracking_number = "TRK-1"
+        await document_render.render_receipt(order)
+        assert len(calls) == 3
+        cached = sorted(p.name for p in (tmp_path / "receipts" / "cache").iterdir())
+        assert len(cached) == 2
+        assert sum(".full." in name for name in cached) == 1
+
+    asyncio.run(_run())
+
+
+def test_receipt_cache_prunes_unused_entries(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "private_media_root", str(tmp_path))
+    monkeypatch.setattr(settings, "document_render_workers", 0)
+    monkeypatch.setattr(settings, "receipt_cache_ttl_days", 7)
+    monkeypatch.setattr(document_render, "_last_cache_prune", None)
+    cache = tmp_path / "receipts" / "cache"
+    cache.mkdir(parents=True)
+    old = cache / "gone.full.abc.pdf"
+    old.write_bytes(b"%PDF-old")
+    stale = time.time() - 8 * 86400
+    os.utime(old, (stale, stale))
+
+    order = _order()
+
+    async def _run() -> None:
+        await document_render.render_receipt(order)
+        assert not old.exists()
+        cached = list(cache.iterdir())
+        assert len(cached) == 1
+
+        # A hit refreshes the entry, so a used receipt outlives the TTL.
+        os.utime(cached[0], (stale, stale))
+        await document_render.render_receipt(order)
+        assert cached[0].stat().st_mtime > stale
+
+    asyncio.run(_run())
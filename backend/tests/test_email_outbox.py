@@ -0,0 +1,172 @@
+import asyncio
+import smtplib
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+
+from app.models.email_event import EmailDeliveryEvent
+from app.models.email_failure import EmailDeliveryFailure
+from app.models.email_outbox import EmailOutboxMessage
+from app.services import email as email_service
+from app.services import email_outbox, smtp_pool
+from tests.conftest import make_memory_session_factory
+
+
+class _FakeSMTP:
+    opened: list["_FakeSMTP"] = []
+    refuse: set[str] = set()
+
+    def __init__(self, host, port, timeout=10):
+        self.logins = 0
+        self.sent: list[str] = []
+        self.dropped = False
+        _FakeSMTP.opened.append(self)
+
+    def starttls(self):
+        return None
+
+    def login(self, username, password):
+        self.logins += 1
+
+    def send_message(self, msg):
+        if self.dropped:
+            raise smtplib.SMTPServerDisconnected("gone")
+        if msg["To"] in _FakeSMTP.refuse:
+            raise smtplib.SMTPRecipientsRefused({msg["To"]: (550, b"no")})
+        self.sent.append(msg["To"])
+        return {}
+
+    def quit(self):
+        return None
+
+
+def _smtp_settings(monkeypatch) -> None:
+    _FakeSMTP.opened = []
+    _FakeSMTP.refuse = set()
+    monkeypatch.setattr(smtplib, "SMTP", _FakeSMTP)
+    monkeypatch.setattr(email_service.settings, "smtp_enabled", True)
+    monkeypatch.setattr(email_service.settings, "smtp_host", "smtp.test")
+    monkeypatch.setattr(email_service.settings, "smtp_port", 587)
+    monkeypatch.setattr(email_service.settings, "smtp_use_tls", True)
+    monkeypatch.setattr(email_service.settings, "smtp_username", "user")
+    monkeypatch.setattr(email_service.settings, "smtp_password", "pass")
+    monkeypatch.setattr(email_service.settings, "email_rate_limit_per_minute", 0)
+    monkeypatch.setattr(
+        email_service.settings, "email_rate_limit_per_recipient_per_minute", 0
+    )
+
+
+def _msg(to: str):
+    return email_service._build_message(to, "Hi", "text")
+
+
+def test_pool_reuses_authenticated_connections(monkeypatch) -> None:
+    _smtp_settings(monkeypatch)
+    monkeypatch.setattr(email_service.settings, "smtp_max_messages_per_connection", 3)
+
+    results = smtp_pool.send_messages([_msg(f"u{i}@x.com") for i in range(4)])
+    assert results == [None] * 4
+    # Three messages per connection, one login each.
+    assert [len(conn.sent) for conn in _FakeSMTP.opened] == [3, 1]
+    assert all(conn.logins == 1 for conn in _FakeSMTP.opened)
+
+    smtp_pool.send_message(_msg("again@x.com"))
+    assert len(_FakeSMTP.opened) == 2
+    assert _FakeSMTP.opened[1].sent == ["u3@x.com", "again@x.com"]
+
+    # A pooled connection the server dropped is reopened transparently.
+    _FakeSMTP.opened[1].dropped = True
+    smtp_pool.send_message(_msg("after-drop@x.com"))
+    assert _FakeSMTP.opened[-1].sent == ["after-drop@x.com"]
+
+    # A refused recipient fails alone and the batch continues.
+    _FakeSMTP.refuse = {"bad@x.com"}
+    results = smtp_pool.send_messages([_msg("bad@x.com"), _msg("ok@x.com")])
+    assert isinstance(results[0], smtplib.SMTPRecipientsRefused)
+    assert results[1] is None
+
+
+def test_queued_email_is_delivered_with_retries(monkeypatch) -> None:
+    _smtp_settings(monkeypatch)
+    factory = make_memory_session_factory()
+    monkeypatch.setattr(email_outbox, "SessionLocal", factory)
+    monkeypatch.setattr(email_service.settings, "email_queue_enabled", True)
+    monkeypatch.setattr(email_service.settings, "email_queue_max_attempts", 2)
+
+    async def _run() -> None:
+        async with email_outbox.collect():
+            assert await email_service.send_email("a@x.com", "Order", "t") is True
+            assert await email_service.send_email("bad@x.com", "Order", "t") is True
+            # Nothing is written until the fan-out finishes.
+            async with factory() as session:
+                assert (await session.execute(select(EmailOutboxMessage))).all() == []
+        assert _FakeSMTP.opened == []
+
+        _FakeSMTP.refuse = {"bad@x.com"}
+        assert await email_outbox.process_batch() == 2
+        assert len(_FakeSMTP.opened) == 1
+        async with factory() as session:
+            row = (await session.execute(select(EmailOutboxMessage))).scalar_one()
+            assert row.to_email == "bad@x.com"
+            assert row.status == "queued" and row.attempts == 1
+            assert row.last_error
+            # Backed off: not due yet.
+            assert await email_outbox.process_batch() == 0
+            await session.execute(
+                update(EmailOutboxMessage).values(
+                    next_attempt_at=datetime.now(timezone.utc) - timedelta(seconds=1)
+                )
+            )
+            await session.commit()
+
+        assert await email_outbox.process_batch() == 1
+        async with factory() as session:
+            row = (await session.execute(select(EmailOutboxMessage))).scalar_one()
+            assert row.status == "failed" and row.attempts == 2
+            events = (await session.execute(select(EmailDeliveryEvent))).scalars().all()
+            assert sorted((e.to_email, e.status) for e in events) == [
+                ("a@x.com", "sent"),
+                ("bad@x.com", "failed"),
+            ]
+            failures = (
+                (await session.execute(select(EmailDeliveryFailure))).scalars().all()
+            )
+            assert [f.to_email for f in failures] == ["bad@x.com"]
+
+    asyncio.run(_run())
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.counters: dict[str, int] = {}
+
+    async def incr(self, key):
+        self.counters[key] = self.counters.get(key, 0) + 1
+        return self.counters[key]
+
+    async def expire(self, key, seconds):
+        return True
+
+
+def test_rate_limits_are_shared_through_redis(monkeypatch) -> None:
+    redis = _FakeRedis()
+    monkeypatch.setattr(email_service, "get_redis", lambda: redis)
+    monkeypatch.setattr(email_service.settings, "email_rate_limit_per_minute", 5)
+    monkeypatch.setattr(
+        email_service.settings, "email_rate_limit_per_recipient_per_minute", 1
+    )
+    email_service._rate_global.clear()
+    email_service._rate_per_recipient.clear()
+
+    async def _run() -> None:
+        now = 1000.0
+        assert await email_service._reserve_send(now, "A@x.com") is True
+        assert await email_service._reserve_send(now, "a@x.com") is False
+        assert await email_service._reserve_send(now, "b@x.com") is True
+        # The next minute starts a fresh window.
+        assert await email_service._reserve_send(now + 60, "a@x.com") is True
+
+    asyncio.run(_run())
+    assert not any("@" in key for key in redis.counters)
+    # The in-process fallback was not used.
+    assert email_service._rate_global == []
@@ -3,6 +3,7 @@ import asyncio
 import time
 
 from app.services import email as email_service
+from app.services import smtp_pool
 
 
 def test_email_rate_limit(monkeypatch):
@@ -59,7 +60,7 @@ def test_send_email_smoke(monkeypatch):
     )
     monkeypatch.setattr(email_service, "_record_email_event", _noop)
     monkeypatch.setattr(email_service, "_record_email_failure", _noop)
-    monkeypatch.setattr(email_service.smtplib, "SMTP", DummySMTP)
+    monkeypatch.setattr(smtp_pool.smtplib, "SMTP", DummySMTP)
     email_service._rate_global.clear()
     email_service._rate_per_recipient.clear()
 
@@ -109,7 +110,7 @@ def test_email_rate_limit_does_not_log_recipient_email(monkeypatch, caplog):
     )
     monkeypatch.setattr(email_service, "_record_email_event", _noop)
     monkeypatch.setattr(email_service, "_record_email_failure", _noop)
-    monkeypatch.setattr(email_service.smtplib, "SMTP", DummySMTP)
+    monkeypatch.setattr(smtp_pool.smtplib, "SMTP", DummySMTP)
     email_service._rate_global.clear()
     email_service._rate_per_recipient.clear()
 
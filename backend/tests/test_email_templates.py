@@ -135,3 +135,29 @@ def test_email_template_renders(
     assert "English" in text_body and "Română" in text_body
     for needle in expected:
         assert needle in text_body or needle in html_body
+
+
+def test_templates_are_precompiled_and_render_timed() -> None:
+    from app.core import metrics
+    from app.services import email_templates
+
+    assert email_templates.preload() >= 30
+    metrics.reset()
+    text_body, html_body = email_service.render_bilingual_template(
+        "back_in_stock.txt.j2", {"product_name": "Vas"}, preferred_language="ro"
+    )
+    # Same sections the per-language helper builds, rendered in one pass.
+    expected_text, expected_html = email_service._bilingual_sections(
+        text_ro="Vas este din nou în stoc.",
+        text_en="Vas is back in stock.",
+        html_ro="<p>Vas este din nou în stoc.</p>",
+        html_en="<p>Vas is back in stock.</p>",
+        preferred_language="ro",
+    )
+    assert text_body.strip() == expected_text
+    assert expected_html in html_body
+
+    email_service.render_template("back_in_stock.txt.j2", {"product_name": "Vas"})
+    snap = metrics.snapshot()
+    assert snap["email_template:back_in_stock.txt.j2_count"] == 2
+    assert snap["email_template:back_in_stock.txt.j2_ms_max"] >= 0
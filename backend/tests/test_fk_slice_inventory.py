@@ -21,7 +21,7 @@ from app.models.cart import Cart, CartItem
 from app.models.catalog import Category, Product, ProductStatus, ProductVariant
 from app.models.order import Order, OrderItem, OrderStatus
 from app.schemas.inventory import RestockNoteUpsert
-from app.services import inventory
+from app.services import inventory, stock_levels
 from tests.conftest import make_memory_session_factory
 
 
@@ -78,7 +78,7 @@ async def _make_product(
 def test_cart_reservation_cutoff_clamps_zero_window(monkeypatch) -> None:
     # A configured window of 0 is falsy -> the ``or DEFAULT`` falls back (line 43).
     monkeypatch.setattr(
-        inventory.settings, "cart_reservation_window_minutes", 0, raising=False
+        stock_levels.settings, "cart_reservation_window_minutes", 0, raising=False
     )
     now = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
     cutoff = inventory._cart_reservation_cutoff(now)
@@ -88,7 +88,7 @@ def test_cart_reservation_cutoff_clamps_zero_window(monkeypatch) -> None:
 def test_cart_reservation_cutoff_clamps_negative_window(monkeypatch) -> None:
     # A truthy-but-negative window survives the ``or`` and is re-clamped (line 47).
     monkeypatch.setattr(
-        inventory.settings, "cart_reservation_window_minutes", -5, raising=False
+        stock_levels.settings, "cart_reservation_window_minutes", -5, raising=False
     )
     now = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
     cutoff = inventory._cart_reservation_cutoff(now)
@@ -97,7 +97,7 @@ def test_cart_reservation_cutoff_clamps_negative_window(monkeypatch) -> None:
 
 def test_cart_reservation_cutoff_uses_configured_window(monkeypatch) -> None:
     monkeypatch.setattr(
-        inventory.settings, "cart_reservation_window_minutes", 30, raising=False
+        stock_levels.settings, "cart_reservation_window_minutes", 30, raising=False
     )
     now = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
     cutoff = inventory._cart_reservation_cutoff(now)
@@ -0,0 +1,292 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.catalog import Category, Product, ProductStatus, Tag
+from app.models.media import (
+    MediaAsset,
+    MediaAssetStatus,
+    MediaAssetType,
+    MediaVisibility,
+)
+from app.models.order import Order, OrderStatus
+from app.services import catalog, keyset, media_dam
+from app.services import order as order_service
+from tests.conftest import make_memory_session_factory
+
+BASE = datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+
+
+async def _all_product_pages(
+    session, *, sort: str | None, limit: int, tags: list[str] | None = None
+) -> list[str]:
+    slugs: list[str] = []
+    cursor = None
+    while True:
+        items, cursor = await catalog.list_products_after_cursor(
+            session,
+            category_slug=None,
+            on_sale=None,
+            is_featured=None,
+            search=None,
+            min_price=None,
+            max_price=None,
+            tags=tags,
+            sort=sort,
+            limit=limit,
+            cursor=cursor,
+        )
+        slugs.extend(item.slug for item in items)
+        if cursor is None:
+            return slugs
+
+
+def test_cursor_roundtrip_and_rejects_foreign_cursors() -> None:
+    columns = (
+        keyset.KeysetColumn(Product.created_at, "datetime", descending=True),
+        keyset.KeysetColumn(Product.base_price, "decimal"),
+        keyset.KeysetColumn(Product.id, "uuid", descending=True),
+    )
+    product_id = uuid.uuid4()
+    token = keyset.encode_cursor("newest", [BASE, Decimal("12.50"), product_id])
+    assert "=" not in token
+    assert keyset.decode_cursor(token, sort="newest", columns=columns) == [
+        BASE,
+        Decimal("12.50"),
+        product_id,
+    ]
+
+    for bad in (token[:-3], "not-a-cursor", keyset.encode_cursor("newest", ["x"])):
+        with pytest.raises(HTTPException) as exc:
+            keyset.decode_cursor(bad, sort="newest", columns=columns)
+        assert exc.value.status_code == 400
+    # A cursor issued for another sort is not reusable.
+    with pytest.raises(HTTPException):
+        keyset.decode_cursor(token, sort="oldest", columns=columns)
+
+
+def test_after_clause_bounds_the_leading_column() -> None:
+    from sqlalchemy.dialects import postgresql
+
+    def compiled(columns, values) -> str:
+        clause = keyset.after_clause(columns, values)
+        return str(clause.compile(dialect=postgresql.dialect()))
+
+    newest = (
+        keyset.KeysetColumn(Product.created_at, "datetime", descending=True),
+        keyset.KeysetColumn(Product.id, "uuid", descending=True),
+    )
+    uniform = compiled(newest, [BASE, uuid.uuid4()])
+    assert uniform.startswith("(products.created_at, products.id) < ")
+
+    recommended = (
+        keyset.KeysetColumn(Product.sort_order, "int"),
+        *newest,
+    )
+    mixed = compiled(recommended, [3, BASE, uuid.uuid4()])
+    assert mixed.startswith("products.sort_order >= ")
+    assert " OR " in mixed
+
+
+def test_product_cursor_pages_visit_every_row_once() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            category = Category(slug="cups", name="Cups")
+            session.add(category)
+            await session.flush()
+            for idx in range(7):
+                session.add(
+                    Product(
+                        category_id=category.id,
+                        slug=f"p{idx}",
+                        sku=f"P{idx}",
+                        name=f"Product {idx % 3}",
+                        base_price=Decimal("10.00") + (idx % 2),
+                        status=ProductStatus.published,
+                        is_active=True,
+                        # Ties on created_at are broken by id.
+                        created_at=BASE + timedelta(minutes=idx // 3),
+                    )
+                )
+            await session.commit()
+
+            expected, _ = await catalog.list_products_with_filters(
+                session,
+                category_slug=None,
+                on_sale=None,
+                is_featured=None,
+                search=None,
+                min_price=None,
+                max_price=None,
+                tags=None,
+                sort="newest",
+                limit=20,
+                offset=0,
+            )
+            newest = await _all_product_pages(session, sort="newest", limit=3)
+            assert len(newest) == 7
+            assert newest[0] == "p6"
+            assert sorted(newest) == sorted(p.slug for p in expected)
+
+            for sort in ("price_asc", "price_desc", "name_asc", "recommended"):
+                slugs = await _all_product_pages(session, sort=sort, limit=2)
+                assert sorted(slugs) == [f"p{idx}" for idx in range(7)], sort
+
+            with pytest.raises(HTTPException) as exc:
+                await catalog.list_products_after_cursor(
+                    session,
+                    category_slug=None,
+                    on_sale=None,
+                    is_featured=None,
+                    search="product",
+                    min_price=None,
+                    max_price=None,
+                    tags=None,
+                    sort="relevance",
+                    limit=2,
+                    cursor=None,
+                )
+            assert exc.value.status_code == 400
+
+    asyncio.run(_run())
+
+
+def test_product_cursor_pages_with_multi_tag_matches_are_full() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            category = Category(slug="mugs", name="Mugs")
+            red = Tag(slug="red", name="Red")
+            blue = Tag(slug="blue", name="Blue")
+            session.add_all([category, red, blue])
+            await session.flush()
+            for idx in range(5):
+                session.add(
+                    Product(
+                        category_id=category.id,
+                        slug=f"m{idx}",
+                        sku=f"M{idx}",
+                        name=f"Mug {idx}",
+                        base_price=Decimal("10.00"),
+                        status=ProductStatus.published,
+                        is_active=True,
+                        created_at=BASE + timedelta(minutes=idx),
+                        # Every product matches both requested tags.
+                        tags=[red, blue],
+                    )
+                )
+            await session.commit()
+
+            slugs = await _all_product_pages(
+                session, sort="newest", limit=2, tags=["red", "blue"]
+            )
+            assert slugs == ["m4", "m3", "m2", "m1", "m0"]
+            assert (
+                await catalog.count_products_with_filters(
+                    session,
+                    category_slug=None,
+                    on_sale=None,
+                    is_featured=None,
+                    search=None,
+                    min_price=None,
+                    max_price=None,
+                    tags=["red", "blue"],
+                )
+                == 5
+            )
+
+    asyncio.run(_run())
+
+
+def test_admin_orders_cursor_pages_newest_first() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            orders = [
+                Order(
+                    status=OrderStatus.paid,
+                    total_amount=Decimal("10"),
+                    customer_email=f"buyer{idx}@example.com",
+                    customer_name="Buyer",
+                    created_at=BASE + timedelta(hours=idx // 2),
+                    updated_at=BASE,
+                )
+                for idx in range(5)
+            ]
+            session.add_all(orders)
+            await session.commit()
+
+            seen: list[uuid.UUID] = []
+            cursor = None
+            totals = []
+            while True:
+                (
+                    rows,
+                    total,
+                    cursor,
+                ) = await order_service.admin_search_orders_after_cursor(
+                    session, cursor=cursor, limit=2, include_total=not seen
+                )
+                seen.extend(row[0].id for row in rows)
+                totals.append(total)
+                if cursor is None:
+                    break
+            assert totals == [5, None, None]
+            assert len(seen) == len(set(seen)) == 5
+            created = [
+                next(o.created_at for o in orders if o.id == order_id)
+                for order_id in seen
+            ]
+            assert created == sorted(created, reverse=True)
+
+    asyncio.run(_run())
+
+
+def test_media_assets_cursor_pages_and_rejects_unsupported_sort() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            for idx in range(5):
+                session.add(
+                    MediaAsset(
+                        id=uuid.uuid4(),
+                        asset_type=MediaAssetType.image,
+                        status=MediaAssetStatus.approved,
+                        visibility=MediaVisibility.public,
+                        storage_key=f"originals/{idx}.png",
+                        public_url=f"/media/originals/{idx}.png",
+                        original_filename=f"{idx}.png",
+                        created_at=BASE + timedelta(days=idx),
+                    )
+                )
+            await session.commit()
+
+            names: list[str] = []
+            cursor = ""
+            while cursor is not None:
+                items, meta = await media_dam.list_assets(
+                    session,
+                    media_dam.MediaListFilters(
+                        sort="oldest", limit=2, cursor=cursor, include_total=False
+                    ),
+                )
+                names.extend(item.original_filename for item in items)
+                assert meta["total_items"] is None
+                cursor = meta["next_cursor"]
+            assert names == [f"{idx}.png" for idx in range(5)]
+
+            with pytest.raises(ValueError):
+                await media_dam.list_assets(
+                    session, media_dam.MediaListFilters(sort="name_asc", cursor="")
+                )
+
+    asyncio.run(_run())
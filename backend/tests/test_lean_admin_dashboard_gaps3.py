@@ -483,7 +483,7 @@ def test_export_stock_adjustments_with_rows_and_reason(
             )
         )
         await session.commit()
-        return await ad.export_stock_adjustments(
+        resp = await ad.export_stock_adjustments(
             request=_Req(),
             product_id=product.id,
             reason=StockAdjustmentReason.manual_correction,
@@ -493,10 +493,13 @@ def test_export_stock_adjustments_with_rows_and_reason(
             session=session,
             admin=admin,
         )
+        # The export streams from the session, so drain it before it closes.
+        body = "".join([chunk async for chunk in resp.body_iterator])
+        return resp, body
 
-    resp = run(session_factory, _scenario)
+    resp, body = run(session_factory, _scenario)
     assert resp.media_type == "text/csv"
-    assert "restock" in resp.body.decode()
+    assert "restock" in body
 
 
 # --------------------------------------------------------------------------- #
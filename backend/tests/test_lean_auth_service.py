@@ -504,6 +504,26 @@ async def test_authenticate_user_paths(session_factory) -> None:
             await svc.authenticate_user(session, "ghost", "password1")
 
 
+async def test_authenticate_user_upgrades_hash_cost(
+    session_factory, monkeypatch
+) -> None:
+    async with session_factory() as session:
+        user = await _new_user(session)
+        monkeypatch.setattr(security.settings, "password_bcrypt_rounds", 4)
+        assert security.password_needs_rehash(user.hashed_password)
+
+        await svc.authenticate_user(session, user.email, "password1")
+        await session.refresh(user)
+        assert user.hashed_password.startswith("$2b$04$")
+        assert not security.password_needs_rehash(user.hashed_password)
+        # A failed login leaves the stored hash alone.
+        monkeypatch.setattr(security.settings, "password_bcrypt_rounds", 5)
+        with pytest.raises(HTTPException):
+            await svc.authenticate_user(session, user.email, "wrong")
+        await session.refresh(user)
+        assert user.hashed_password.startswith("$2b$04$")
+
+
 async def test_authenticate_user_google_incomplete_and_deleted(
     session_factory,
 ) -> None:
@@ -8,11 +8,12 @@ the receipt-token decode guard for a missing/blank order id.
 
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime, timedelta, timezone
 
 import jwt
 
-from app.core import security
+from app.core import metrics, security
 from app.core.config import settings
 from app.core.security import (
     create_admin_ip_bypass_token,
@@ -92,3 +93,39 @@ def test_decode_receipt_token_round_trip_and_guards() -> None:
 
 def test_decode_token_invalid_returns_none() -> None:
     assert decode_token("garbage.token.value") is None
+
+
+def test_async_hashing_runs_on_the_hash_pool_and_reports_depth(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "password_bcrypt_rounds", 4)
+    monkeypatch.setattr(settings, "password_hash_workers", 2)
+    security.shutdown_hash_pool()
+    metrics.reset()
+
+    async def _run() -> list[bool]:
+        hashed = await security.hash_password_async("s3cret")
+        assert hashed.startswith("$2b$04$")
+        return list(
+            await asyncio.gather(
+                *(security.verify_password_async("s3cret", hashed) for _ in range(5)),
+                security.verify_password_async("wrong", hashed),
+            )
+        )
+
+    try:
+        assert asyncio.run(_run()) == [True] * 5 + [False]
+        snap = metrics.snapshot()
+        assert snap["password_hash_pending_peak"] >= 1
+        assert snap["password_hash_in_flight"] == 0
+        assert snap["password_hash_queue_depth"] == 0
+    finally:
+        security.shutdown_hash_pool()
+        metrics.reset()
+
+
+def test_password_needs_rehash_compares_the_cost(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "password_bcrypt_rounds", 4)
+    hashed = hash_password("s3cret")
+    assert security.password_needs_rehash(hashed) is False
+    monkeypatch.setattr(settings, "password_bcrypt_rounds", 5)
+    assert security.password_needs_rehash(hashed) is True
+    assert security.password_needs_rehash("not-a-bcrypt-hash") is False
@@ -1136,3 +1136,106 @@ async def test_reserve_assigned_with_assignment_and_release_active(
             )
         ).scalar_one_or_none()
         assert leftover is None
+
+
+async def test_evaluate_coupon_set_uses_grouped_counters(session_factory) -> None:
+    from sqlalchemy import event
+
+    from app.models.coupons_v2 import CouponRedemption
+
+    async with session_factory() as session:
+        user = await _make_user(session)
+        other = await _make_user(session)
+        capped = await _make_coupon(
+            session,
+            code="BATCH-CAP",
+            global_max_redemptions=3,
+            per_customer_max_redemptions=2,
+        )
+        mine = await _make_coupon(
+            session,
+            code="BATCH-MINE",
+            visibility=CouponVisibility.assigned,
+            per_customer_max_redemptions=1,
+        )
+        unassigned = await _make_coupon(
+            session, code="BATCH-NOPE", visibility=CouponVisibility.assigned
+        )
+        session.add(CouponAssignment(coupon_id=mine.id, user_id=user.id))
+        now = svc._now()
+        for owner, coupon, voided in (
+            (user, capped, False),
+            (other, capped, False),
+            (user, capped, True),
+            (user, mine, False),
+        ):
+            order = await _make_order(session, owner)
+            session.add(
+                CouponRedemption(
+                    coupon_id=coupon.id,
+                    user_id=owner.id,
+                    order_id=order.id,
+                    voided_at=now if voided else None,
+                )
+            )
+        for owner, expires in (
+            (other, now + timedelta(hours=1)),
+            (user, now - timedelta(hours=1)),
+        ):
+            order = await _make_order(session, owner)
+            session.add(
+                CouponReservation(
+                    coupon_id=capped.id,
+                    user_id=owner.id,
+                    order_id=order.id,
+                    expires_at=expires,
+                )
+            )
+        await session.commit()
+
+        cart = _cart([_item("100.00", 1)])
+        coupons = [capped, mine, unassigned]
+        statements: list[str] = []
+
+        def _count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = session_factory.kw["bind"].sync_engine
+        event.listen(engine, "before_cursor_execute", _count)
+        try:
+            batched = await svc.evaluate_coupons_for_cart(
+                session,
+                user_id=user.id,
+                coupons=coupons,
+                cart=cart,
+                checkout=CheckoutSettings(),
+                shipping_method_rate_flat=None,
+                shipping_method_rate_per_kg=None,
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", _count)
+        # Expired-reservation cleanup, redemptions, reservations, assignments.
+        assert len(statements) == 4
+
+        singles = [
+            await svc.evaluate_coupon_for_cart(
+                session,
+                user_id=user.id,
+                coupon=coupon,
+                cart=cart,
+                checkout=CheckoutSettings(),
+                shipping_method_rate_flat=None,
+                shipping_method_rate_per_kg=None,
+            )
+            for coupon in coupons
+        ]
+        assert batched == singles
+
+        by_code = {r.coupon.code: r for r in batched}
+        # 2 live redemptions + 1 active reservation; the expired one is purged.
+        assert by_code["BATCH-CAP"].global_remaining == 0
+        assert by_code["BATCH-CAP"].customer_remaining == 1
+        assert by_code["BATCH-CAP"].reasons == ["sold_out"]
+        assert by_code["BATCH-MINE"].customer_remaining == 0
+        assert by_code["BATCH-MINE"].reasons == ["per_customer_limit_reached"]
+        assert by_code["BATCH-NOPE"].reasons == ["not_assigned"]
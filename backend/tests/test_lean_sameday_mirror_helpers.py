@@ -178,11 +178,6 @@ def test_classify_failure() -> None:
     assert m._classify_failure(RuntimeError("weird"))[0] == "unknown"
 
 
-def test_haversine_km() -> None:
-    assert m._haversine_km(44.4, 26.1, 44.4, 26.1) == pytest.approx(0.0)
-    assert m._haversine_km(44.4, 26.1, 45.4, 26.1) > 100
-
-
 def test_validate_fetch_hosts_ok() -> None:
     # The configured allow-list is valid -> no error.
     m.validate_fetch_hosts()
@@ -797,22 +792,3 @@ def test_upsert_snapshot_unchanged_and_inactive(monkeypatch):
             assert up2 == 0
 
     asyncio.run(run())
-
-
-def test_row_to_locker_read():
-    from app.models.shipping_locker import ShippingLockerMirror, ShippingLockerProvider
-
-    row = ShippingLockerMirror(
-        provider=ShippingLockerProvider.sameday,
-        external_id="r1",
-        name="Locker R1",
-        address="Str 1",
-        city="Buc",
-        county="If",
-        lat=44.4,
-        lng=26.1,
-        is_active=True,
-    )
-    read = m._row_to_locker_read(row, lat=44.5, lng=26.2)
-    assert read.id == "sameday:r1"
-    assert read.distance_km is not None
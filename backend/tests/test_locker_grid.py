@@ -0,0 +1,136 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app.models.shipping_locker import (
+    ShippingLockerCity,
+    ShippingLockerMirror,
+    ShippingLockerProvider,
+)
+from app.services import locker_grid, sameday_easybox_mirror
+from tests.conftest import make_memory_session_factory
+
+
+def _payload(*rows: tuple[str, str, str, float, float]):
+    async def _fetch():
+        return (
+            [
+                {
+                    "lockerId": locker_id,
+                    "name": f"Easybox {locker_id}",
+                    "address": "Str. Test",
+                    "city": city,
+                    "county": county,
+                    "lat": lat,
+                    "lng": lng,
+                }
+                for locker_id, city, county, lat, lng in rows
+            ],
+            "https://sameday.ro/api/easybox/locations",
+        )
+
+    return _fetch
+
+
+def test_sync_rebuilds_grid_and_city_aggregates(monkeypatch) -> None:
+    factory = make_memory_session_factory()
+    monkeypatch.setattr(
+        sameday_easybox_mirror,
+        "_fetch_raw_payload",
+        _payload(
+            ("A1", "Bucuresti", "Ilfov", 44.40, 26.10),
+            ("A2", "Bucuresti", "Ilfov", 44.43, 26.12),
+            ("A3", "Buftea", "Ilfov", 44.56, 25.94),
+            ("C1", "Cluj-Napoca", "Cluj", 46.77, 23.59),
+            ("C2", "Floresti Napoca", "Cluj", 46.75, 23.49),
+        ),
+    )
+
+    async def _run() -> None:
+        async with factory() as session:
+            await sameday_easybox_mirror.sync_now(session, trigger="test")
+
+            cities = (await session.execute(select(ShippingLockerCity))).scalars().all()
+            by_key = {row.city_key: row for row in cities}
+            assert by_key["bucuresti"].locker_count == 2
+            assert by_key["bucuresti"].county == "Ilfov"
+
+            suggestions = await sameday_easybox_mirror.list_city_suggestions(
+                session, q="Bu", limit=5
+            )
+            assert [item.city for item in suggestions] == ["Bucuresti", "Buftea"]
+            # Prefix matches rank ahead of matches inside the name.
+            napoca = await sameday_easybox_mirror.list_city_suggestions(
+                session, q="napoca", limit=5
+            )
+            assert [item.city for item in napoca] == ["Cluj-Napoca", "Floresti Napoca"]
+            none = await sameday_easybox_mirror.list_city_suggestions(
+                session, q="b%", limit=5
+            )
+            assert none == []
+
+            # The sync loaded the grid; lookups no longer query the mirror.
+            grid = await locker_grid.get_grid(session)
+            assert grid.size == 5
+            near = await sameday_easybox_mirror.list_nearby_lockers(
+                session, lat=44.425, lng=26.118, radius_km=10, limit=1
+            )
+            assert [item.id for item in near] == ["sameday:A2"]
+            assert near[0].distance_km is not None and near[0].distance_km < 3
+
+    asyncio.run(_run())
+
+
+def test_grid_reloads_when_the_mirror_changes(monkeypatch) -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            session.add(
+                ShippingLockerMirror(
+                    provider=ShippingLockerProvider.sameday,
+                    external_id="L1",
+                    name="Locker 1",
+                    city="Iasi",
+                    lat=47.16,
+                    lng=27.58,
+                    is_active=True,
+                )
+            )
+            await session.commit()
+            first = await sameday_easybox_mirror.list_nearby_lockers(
+                session, lat=47.16, lng=27.58, radius_km=5, limit=10
+            )
+            assert [item.id for item in first] == ["sameday:L1"]
+
+            session.add(
+                ShippingLockerMirror(
+                    provider=ShippingLockerProvider.sameday,
+                    external_id="L2",
+                    name="Locker 2",
+                    city="Iasi",
+                    lat=47.17,
+                    lng=27.59,
+                    is_active=True,
+                )
+            )
+            await session.commit()
+            # Within the check interval the snapshot is served as is.
+            cached = await sameday_easybox_mirror.list_nearby_lockers(
+                session, lat=47.16, lng=27.58, radius_km=5, limit=10
+            )
+            assert len(cached) == 1
+
+            monkeypatch.setattr(locker_grid, "_CHECK_INTERVAL_SECONDS", 0.0)
+            fresh = await sameday_easybox_mirror.list_nearby_lockers(
+                session, lat=47.16, lng=27.58, radius_km=5, limit=10
+            )
+            assert [item.id for item in fresh] == ["sameday:L1", "sameday:L2"]
+
+            # Without aggregates yet, suggestions are computed from the mirror.
+            cities = await sameday_easybox_mirror.list_city_suggestions(
+                session, q="ia", limit=5
+            )
+            assert [(item.city, item.locker_count) for item in cities] == [("Iasi", 2)]
+
+    asyncio.run(_run())
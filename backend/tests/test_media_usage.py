@@ -0,0 +1,132 @@
+import asyncio
+import uuid
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app.models.catalog import Category, Product, ProductImage
+from app.models.content import ContentBlock, ContentBlockTranslation, ContentImage
+from app.models.media import (
+    MediaAsset,
+    MediaAssetStatus,
+    MediaAssetType,
+    MediaJob,
+    MediaJobType,
+    MediaUsageEdge,
+    MediaVisibility,
+)
+from app.services import media_dam, media_usage
+from tests.conftest import make_memory_session_factory
+
+
+def _asset(name: str) -> MediaAsset:
+    return MediaAsset(
+        id=uuid.uuid4(),
+        asset_type=MediaAssetType.image,
+        status=MediaAssetStatus.approved,
+        visibility=MediaVisibility.public,
+        storage_key=f"originals/{name}",
+        public_url=f"/media/originals/{name}",
+        original_filename=name,
+    )
+
+
+def _edge_keys(rows) -> set[tuple]:
+    return {
+        (row.source_type, row.source_key, row.source_id, row.field_path, row.lang)
+        for row in rows
+    }
+
+
+def test_extract_media_refs_normalizes_urls() -> None:
+    text = (
+        "![a](/media/originals/A.png?v=2) see https://cdn.example.com/media/x/b.jpg."
+        ' {"icon": "/media/originals/c.svg#frag"}'
+    )
+    assert media_usage.extract_media_refs(text) == {
+        "/media/originals/a.png",
+        "/media/x/b.jpg",
+        "/media/originals/c.svg",
+    }
+
+
+def test_bulk_reconcile_matches_the_per_asset_scan() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            hero, icon, unused = _asset("hero.jpg"), _asset("icon.png"), _asset("x.gif")
+            session.add_all([hero, icon, unused])
+            block = ContentBlock(
+                key="page.about",
+                title="About",
+                body_markdown=f"![hero]({hero.public_url})",
+            )
+            social = ContentBlock(
+                key="site.social",
+                title="Social",
+                body_markdown="-",
+                meta={"instagram": {"icon": icon.public_url.upper()}},
+            )
+            category = Category(slug="cups", name="Cups")
+            session.add_all([block, social, category])
+            await session.flush()
+            session.add_all(
+                [
+                    ContentBlockTranslation(
+                        content_block_id=block.id,
+                        lang="ro",
+                        title="Despre",
+                        body_markdown=f"<img src='{icon.public_url}'>",
+                    ),
+                    ContentImage(content_block_id=block.id, url=hero.public_url),
+                    Product(
+                        category_id=category.id,
+                        slug="mug",
+                        sku="MUG",
+                        name="Mug",
+                        base_price=Decimal("10.00"),
+                        images=[ProductImage(url=hero.public_url)],
+                    ),
+                    # Stale edge: the asset is no longer referenced there.
+                    MediaUsageEdge(
+                        asset_id=unused.id,
+                        source_type="content_block",
+                        source_key="page.old",
+                        field_path="auto_scan",
+                    ),
+                ]
+            )
+            await session.commit()
+
+            expected = {}
+            for asset in (hero, icon, unused):
+                refs = await media_dam._collect_usage_refs(session, asset)
+                expected[asset.id] = {tuple(ref) for ref in refs}
+
+            result = await media_usage.reconcile_usage_edges(session, batch_size=2)
+            await session.commit()
+            assert result.deleted == 1
+            assert result.edges == result.inserted == 7
+
+            rows = (await session.execute(select(MediaUsageEdge))).scalars().all()
+            for asset_id, refs in expected.items():
+                actual = _edge_keys(row for row in rows if row.asset_id == asset_id)
+                assert actual == refs
+            assert expected[unused.id] == set()
+
+            # A second run keeps the rows (same ids) and only touches last_seen_at.
+            before = {row.id for row in rows}
+            again = await media_usage.reconcile_usage_edges(session)
+            await session.commit()
+            assert (again.inserted, again.deleted) == (0, 0)
+            ids = set((await session.execute(select(MediaUsageEdge.id))).scalars())
+            assert ids == before
+
+            job = MediaJob(job_type=MediaJobType.usage_reconcile, payload_json="{}")
+            session.add(job)
+            await session.flush()
+            await media_dam._process_usage_reconcile_job(session, job)
+            assert job.progress_pct == 100
+
+    asyncio.run(_run())
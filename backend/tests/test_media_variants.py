@@ -0,0 +1,186 @@
+import asyncio
+import json
+import uuid
+from typing import get_args
+
+import pytest
+from PIL import Image, features
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.media import (
+    MediaAsset,
+    MediaAssetStatus,
+    MediaAssetType,
+    MediaJob,
+    MediaJobType,
+    MediaVariant,
+    MediaVisibility,
+)
+from app.schemas.media import MediaVariantProfileLiteral, MediaVariantRequest
+from app.services import media_dam
+from tests.conftest import make_memory_session_factory
+
+
+@pytest.fixture(autouse=True)
+def _media_roots(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "media_root", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "private_media_root", str(tmp_path / "private"))
+
+
+def test_render_variant_files_decodes_once_for_every_profile(tmp_path) -> None:
+    src = tmp_path / "source.jpg"
+    Image.new("RGB", (2000, 1000), color=(200, 40, 40)).save(src, format="JPEG")
+    profiles = [("thumb-320", (320, 320)), ("web-1280", (1280, 1280))]
+
+    outputs = media_dam._render_variant_files(src, tmp_path, profiles, ["jpeg", "webp"])
+
+    sizes = {
+        (row["profile"], row["format"]): (row["width"], row["height"])
+        for row in outputs
+    }
+    assert sizes == {
+        ("web-1280", "jpeg"): (1280, 640),
+        ("web-1280", "webp"): (1280, 640),
+        ("thumb-320", "jpeg"): (320, 160),
+        ("thumb-320", "webp"): (320, 160),
+    }
+    with Image.open(tmp_path / "thumb-320.webp") as img:
+        assert img.format == "WEBP"
+        assert img.size == (320, 160)
+    # Sources smaller than a profile box are not upscaled.
+    small = media_dam._render_variant_files(
+        src, tmp_path, [("huge", (4000, 4000))], ["jpeg"]
+    )
+    assert (small[0]["width"], small[0]["height"]) == (2000, 1000)
+
+
+def test_variant_job_writes_every_profile_and_format_and_upserts_rows() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            asset = MediaAsset(
+                id=uuid.uuid4(),
+                asset_type=MediaAssetType.image,
+                status=MediaAssetStatus.approved,
+                visibility=MediaVisibility.public,
+                storage_key="originals/photo.png",
+                public_url="/media/originals/photo.png",
+                original_filename="photo.png",
+            )
+            session.add(asset)
+            await session.commit()
+            path = media_dam._storage_path_for_key(asset.storage_key, public_root=True)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            Image.new("RGBA", (900, 600), color=(0, 90, 200, 128)).save(path)
+
+            for _ in range(2):
+                job = MediaJob(
+                    asset_id=asset.id,
+                    job_type=MediaJobType.variant,
+                    payload_json=json.dumps(
+                        {"profiles": list(media_dam.PROFILE_DIMENSIONS)}
+                    ),
+                )
+                await media_dam._process_variant_job(session, job)
+                await session.commit()
+
+            rows = (
+                (
+                    await session.execute(
+                        select(MediaVariant).where(MediaVariant.asset_id == asset.id)
+                    )
+                )
+                .scalars()
+                .all()
+            )
+            formats = {"jpeg", "webp"} | ({"avif"} if features.check("avif") else set())
+            assert {(row.profile, row.format) for row in rows} == {
+                (profile, fmt)
+                for profile in media_dam.PROFILE_DIMENSIONS
+                for fmt in formats
+            }
+            by_key = {(row.profile, row.format): row for row in rows}
+            webp = by_key[("web-640", "webp")]
+            assert webp.public_url == f"/media/variants/{asset.id}/web-640.webp"
+            assert (webp.width, webp.height) == (640, 427)
+            assert by_key[("web-1280", "jpeg")].width == 900
+
+            await session.refresh(asset, attribute_names=["variants"])
+            preview = media_dam.resolve_asset_preview_path(
+                asset, variant_profile="web-640"
+            )
+            assert preview.name == "web-640.jpg"
+
+    asyncio.run(_run())
+
+
+def test_variant_request_accepts_only_known_profiles() -> None:
+    assert set(get_args(MediaVariantProfileLiteral)) == set(
+        media_dam.PROFILE_DIMENSIONS
+    )
+    assert MediaVariantRequest(profiles=["thumb-320", "web-640"]).profiles == [
+        "thumb-320",
+        "web-640",
+    ]
+    for bad in (["all"], ["web-9999"], ["x" * 65]):
+        with pytest.raises(ValidationError):
+            MediaVariantRequest(profiles=bad)
+
+
+def test_image_ingest_queues_one_variant_job_for_every_profile(monkeypatch) -> None:
+    factory = make_memory_session_factory()
+    queued: list[uuid.UUID] = []
+
+    async def _queue(job_id: uuid.UUID) -> None:
+        queued.append(job_id)
+
+    monkeypatch.setattr(media_dam, "_maybe_queue_job", _queue)
+
+    async def _run() -> None:
+        async with factory() as session:
+            asset = MediaAsset(
+                id=uuid.uuid4(),
+                asset_type=MediaAssetType.image,
+                status=MediaAssetStatus.draft,
+                visibility=MediaVisibility.public,
+                storage_key="originals/upload.png",
+                public_url="/media/originals/upload.png",
+                original_filename="upload.png",
+            )
+            session.add(asset)
+            await session.commit()
+            path = media_dam._storage_path_for_key(asset.storage_key, public_root=True)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            Image.new("RGB", (400, 300), color=(10, 20, 30)).save(path)
+
+            ingest = await media_dam.enqueue_job(
+                session,
+                asset_id=asset.id,
+                job_type=MediaJobType.ingest,
+                payload={"reason": "upload"},
+                created_by_user_id=None,
+            )
+            await session.commit()
+            await media_dam.process_job_inline(session, ingest)
+
+            variants = (
+                (
+                    await session.execute(
+                        select(MediaJob).where(
+                            MediaJob.asset_id == asset.id,
+                            MediaJob.job_type == MediaJobType.variant,
+                        )
+                    )
+                )
+                .scalars()
+                .all()
+            )
+            assert len(variants) == 1
+            payload = json.loads(variants[0].payload_json)
+            assert payload["profiles"] == list(media_dam.PROFILE_DIMENSIONS)
+            assert queued == [variants[0].id]
+
+    asyncio.run(_run())
@@ -148,3 +148,168 @@ async def test_run_media_worker_logs_warning_on_invalid_payload(
 
     process_mock.assert_not_awaited()
     assert "media_worker_invalid_job_payload" in caplog.text
+
+
+@pytest.mark.anyio("asyncio")
+async def test_job_type_limiter_caps_only_configured_types() -> None:
+    limiter = media_worker.JobTypeLimiter(
+        {"variant": 1, "ingest": 8, "bogus": 1}, concurrency=4
+    )
+    assert await limiter.try_acquire(MediaJobType.variant)
+    assert not await limiter.try_acquire(MediaJobType.variant)
+    assert limiter.saturated() == ["variant"]
+    # ingest's cap is above the consumer count, so it is not capped at all.
+    for _ in range(5):
+        assert await limiter.try_acquire(MediaJobType.ingest)
+
+    waiter = asyncio.create_task(limiter.wait_for_release(timeout=5))
+    await asyncio.sleep(0)
+    limiter.release(MediaJobType.variant)
+    await asyncio.wait_for(waiter, timeout=1)
+    assert limiter.saturated() == []
+    assert await limiter.try_acquire(MediaJobType.variant)
+
+
+@pytest.mark.anyio("asyncio")
+async def test_worker_pool_processes_jobs_concurrently_and_drains(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    test_session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with test_session_factory() as session:
+        session.add_all(
+            MediaJob(
+                job_type=MediaJobType.variant,
+                status=MediaJobStatus.queued,
+                payload_json="{}",
+            )
+            for _ in range(6)
+        )
+        await session.commit()
+
+    stop = asyncio.Event()
+    running = 0
+    peak = 0
+    done: list[str] = []
+
+    async def _fake_process_job_inline(session, job):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        job.status = MediaJobStatus.completed
+        session.add(job)
+        await session.commit()
+        running -= 1
+        done.append(str(job.id))
+        if len(done) == 6:
+            stop.set()
+        return job
+
+    monkeypatch.setattr(media_worker, "SessionLocal", test_session_factory)
+    monkeypatch.setattr(media_worker, "get_redis", lambda: None)
+    monkeypatch.setattr(media_worker, "_publish_heartbeat", AsyncMock())
+    monkeypatch.setattr(media_worker, "_enqueue_due_retries_once", AsyncMock())
+    monkeypatch.setattr(media_worker, "WORKER_CONCURRENCY", 4)
+    monkeypatch.setattr(media_worker, "JOB_TYPE_LIMITS", {"variant": 3})
+    monkeypatch.setattr(
+        media_worker.media_dam, "process_job_inline", _fake_process_job_inline
+    )
+
+    await asyncio.wait_for(
+        media_worker.run_media_worker_pool(poll_interval_seconds=0.1, stop=stop),
+        timeout=10,
+    )
+    assert sorted(done) == sorted(set(done)) and len(done) == 6
+    assert peak == 3
+    await engine.dispose()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_consumer_requeues_saturated_jobs_at_the_head(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    test_session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    variant = MediaJob(
+        job_type=MediaJobType.variant, status=MediaJobStatus.queued, payload_json="{}"
+    )
+    ingest = MediaJob(
+        job_type=MediaJobType.ingest, status=MediaJobStatus.queued, payload_json="{}"
+    )
+    async with test_session_factory() as session:
+        session.add_all([variant, ingest])
+        await session.commit()
+
+    stop = asyncio.Event()
+    processed: list[MediaJobType] = []
+    type_reads: list[str] = []
+    limiter = media_worker.JobTypeLimiter({"variant": 1}, concurrency=2)
+
+    class _ListRedis:
+        def __init__(self, items: list[str]) -> None:
+            self.items = items
+            self.requeued: list[str] = []
+
+        async def blpop(self, _keys, timeout: int = 0):
+            if not self.items:
+                stop.set()
+                return None
+            return (media_worker.QUEUE_KEY, self.items.pop(0))
+
+        async def lpush(self, _key, value):
+            self.requeued.append(value)
+            self.items.insert(0, value)
+            # The other consumer finishes its variant job.
+            asyncio.get_running_loop().call_later(
+                0.01, limiter.release, MediaJobType.variant
+            )
+            return len(self.items)
+
+    real_job_type = media_worker._job_type
+
+    async def _counting_job_type(raw_job_id: str):
+        type_reads.append(raw_job_id)
+        return await real_job_type(raw_job_id)
+
+    real_get_job = media_worker.media_dam.get_job_or_404
+    loaded: list[str] = []
+
+    async def _recording_get_job(session, job_id):
+        loaded.append(str(job_id))
+        return await real_get_job(session, job_id)
+
+    async def _fake_process_job_inline(_session, job):
+        processed.append(job.job_type)
+        if len(processed) == 2:
+            stop.set()
+        return job
+
+    monkeypatch.setattr(media_worker, "SessionLocal", test_session_factory)
+    monkeypatch.setattr(media_worker, "_job_type", _counting_job_type)
+    monkeypatch.setattr(media_worker.media_dam, "get_job_or_404", _recording_get_job)
+    monkeypatch.setattr(
+        media_worker.media_dam, "process_job_inline", _fake_process_job_inline
+    )
+    # Another consumer is busy with a variant job.
+    assert await limiter.try_acquire(MediaJobType.variant)
+    redis = _ListRedis([str(variant.id), str(ingest.id)])
+
+    await asyncio.wait_for(
+        media_worker._consume_queue(
+            redis, limiter=limiter, stop=stop, poll_interval=0.01
+        ),
+        timeout=5,
+    )
+    # The variant job kept its place in line and ran before the ingest job.
+    assert processed == [MediaJobType.variant, MediaJobType.ingest]
+    assert redis.requeued == [str(variant.id)]
+    # The saturated job was neither loaded nor read again after its requeue.
+    assert type_reads == [str(variant.id), str(ingest.id)]
+    assert loaded == [str(variant.id), str(ingest.id)]
+    assert limiter.saturated() == []
+    await engine.dispose()
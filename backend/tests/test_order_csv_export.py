@@ -0,0 +1,184 @@
+import asyncio
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.order import Order, OrderStatus, ShippingMethod
+from app.models.order_document_export import (
+    OrderDocumentExport,
+    OrderDocumentExportKind,
+    OrderDocumentExportStatus,
+)
+from app.services import csv_stream, order_csv_export, private_storage
+from tests.conftest import make_memory_session_factory
+
+
+async def _seed(session) -> None:
+    method = ShippingMethod(name="Courier")
+    session.add(method)
+    await session.flush()
+    now = datetime.now(timezone.utc)
+    for idx, (order_status, age_days) in enumerate(
+        [
+            (OrderStatus.paid, 1),
+            (OrderStatus.shipped, 2),
+            (OrderStatus.paid, 40),
+        ]
+    ):
+        session.add(
+            Order(
+                reference_code=f"REF-{idx}",
+                status=order_status,
+                customer_email=f"buyer{idx}@example.com",
+                customer_name="Ana Pop",
+                total_amount=Decimal("25.00"),
+                currency="RON",
+                payment_method="stripe",
+                shipping_method_id=method.id if idx == 0 else None,
+                created_at=now - timedelta(days=age_days),
+            )
+        )
+    await session.commit()
+
+
+def _parse(text: str) -> list[dict[str, str]]:
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def test_export_selects_filters_and_masks() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            await _seed(session)
+            columns = order_csv_export.parse_columns(
+                ["reference_code,status", "customer_email", "shipping_method"]
+            )
+            recent = order_csv_export.OrderExportFilters(
+                from_dt=datetime.now(timezone.utc) - timedelta(days=7),
+                statuses=(OrderStatus.paid,),
+            )
+            rows = _parse(
+                await csv_stream.collect(
+                    order_csv_export.iter_csv(
+                        session, columns, recent, include_pii=False
+                    )
+                )
+            )
+            assert rows == [
+                {
+                    "reference_code": "REF-0",
+                    "status": "paid",
+                    "customer_email": rows[0]["customer_email"],
+                    "shipping_method": "Courier",
+                }
+            ]
+            assert rows[0]["customer_email"] != "buyer0@example.com"
+
+            everything = _parse(
+                await csv_stream.collect(
+                    order_csv_export.iter_csv(
+                        session,
+                        ["reference_code", "customer_email"],
+                        order_csv_export.OrderExportFilters(),
+                        include_pii=True,
+                    )
+                )
+            )
+            # Newest first; unmasked with include_pii.
+            assert [row["reference_code"] for row in everything] == [
+                "REF-0",
+                "REF-1",
+                "REF-2",
+            ]
+            assert everything[1]["customer_email"] == "buyer1@example.com"
+
+    asyncio.run(_run())
+
+    stmt, _ = order_csv_export.build_statement(
+        ["id", "status"], order_csv_export.OrderExportFilters()
+    )
+    assert "shipping_methods" not in str(stmt)
+    assert order_csv_export.parse_columns(None) == list(
+        order_csv_export.DEFAULT_COLUMNS
+    )
+    with pytest.raises(HTTPException) as exc:
+        order_csv_export.parse_columns(["id,nope"])
+    assert exc.value.status_code == 400
+
+
+def test_background_export_is_registered_as_a_document(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "private_media_root", str(tmp_path))
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            await _seed(session)
+            queued = await order_csv_export.queue_export(
+                session, created_by_user_id=None
+            )
+            assert queued.status == OrderDocumentExportStatus.pending
+        await order_csv_export.run_export_job(
+            factory.kw["bind"],
+            export_id=queued.id,
+            columns=["reference_code", "status"],
+            filters=order_csv_export.OrderExportFilters(
+                statuses=(OrderStatus.shipped,)
+            ),
+            include_pii=False,
+        )
+        async with factory() as session:
+            export = (
+                await session.execute(
+                    select(OrderDocumentExport).where(
+                        OrderDocumentExport.id == queued.id
+                    )
+                )
+            ).scalar_one()
+            assert export.kind == OrderDocumentExportKind.orders_csv
+            assert export.status == OrderDocumentExportStatus.succeeded
+            assert export.mime_type == "text/csv"
+            path = private_storage.resolve_private_path(export.file_path)
+            assert _parse(path.read_text("utf-8")) == [
+                {"reference_code": "REF-1", "status": "shipped"}
+            ]
+
+    asyncio.run(_run())
+
+
+def test_failed_background_export_is_recorded(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "private_media_root", str(tmp_path))
+    factory = make_memory_session_factory()
+
+    async def _broken_rows(*_args, **_kwargs):
+        raise RuntimeError("query failed")
+        yield []
+
+    monkeypatch.setattr(order_csv_export, "iter_rows", _broken_rows)
+
+    async def _run() -> None:
+        async with factory() as session:
+            queued = await order_csv_export.queue_export(
+                session, created_by_user_id=None
+            )
+        await order_csv_export.run_export_job(
+            factory.kw["bind"],
+            export_id=queued.id,
+            columns=["reference_code"],
+            filters=order_csv_export.OrderExportFilters(),
+            include_pii=False,
+        )
+        async with factory() as session:
+            export = await session.get(OrderDocumentExport, queued.id)
+            assert export is not None
+            assert export.status == OrderDocumentExportStatus.failed
+            assert export.error_message == "query failed"
+        assert not list((tmp_path / "exports" / "orders").iterdir())
+
+    asyncio.run(_run())
@@ -0,0 +1,191 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.db.session import get_session
+from app.main import app
+from app.models.catalog import Category, Product, ProductStatus
+from app.services import catalog_cache, product_feed
+from tests.conftest import make_memory_session_factory
+
+
+@pytest.fixture(autouse=True)
+def _feed_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "private_media_root", str(tmp_path))
+
+
+async def _seed(session, **kw) -> Product:
+    category = Category(slug="cups", name="Cups")
+    session.add(category)
+    await session.flush()
+    product = Product(
+        category_id=category.id,
+        slug="mug",
+        sku="MUG",
+        name="Mug",
+        base_price=Decimal("20.00"),
+        status=ProductStatus.published,
+        is_active=True,
+        **kw,
+    )
+    session.add(product)
+    await session.commit()
+    return product
+
+
+def _read(feed: product_feed.FeedFile) -> list[dict]:
+    return json.loads(feed.path.read_bytes())
+
+
+def test_snapshot_is_reused_until_the_catalog_changes() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            product = await _seed(session)
+            first = await product_feed.get_feed_file(session, lang=None, fmt="json")
+            assert [item["slug"] for item in _read(first)] == ["mug"]
+            assert gzip.decompress(first.gzip_path.read_bytes()) == (
+                first.path.read_bytes()
+            )
+
+            # Writes that skip the generation bump are not seen (by design).
+            product.name = "Renamed"
+            session.add(product)
+            await session.commit()
+            again = await product_feed.get_feed_file(session, lang=None, fmt="json")
+            assert again == first
+
+            await catalog_cache.bump_generation()
+            rebuilt = await product_feed.get_feed_file(session, lang=None, fmt="json")
+            assert rebuilt.etag != first.etag
+            assert _read(rebuilt)[0]["name"] == "Renamed"
+            csv_feed = await product_feed.get_feed_file(session, lang=None, fmt="csv")
+            assert "Renamed" in csv_feed.path.read_text("utf-8")
+
+    asyncio.run(_run())
+
+
+def test_concurrent_requests_and_other_processes_share_one_build(monkeypatch) -> None:
+    factory = make_memory_session_factory()
+    builds: list[str] = []
+    real_build = product_feed._build
+
+    async def _counting_build(session, **kw):
+        builds.append(kw["token"])
+        return await real_build(session, **kw)
+
+    monkeypatch.setattr(product_feed, "_build", _counting_build)
+
+    async def _run() -> None:
+        async with factory() as session:
+            await _seed(session)
+            feeds = await asyncio.gather(
+                *(
+                    product_feed.get_feed_file(session, lang=None, fmt="json")
+                    for _ in range(5)
+                )
+            )
+            assert len(builds) == 1
+            assert {feed.etag for feed in feeds} == {feeds[0].etag}
+
+            # Another worker without Redis (own token and counter) reuses it.
+            monkeypatch.setattr(product_feed, "_process_token", "other-worker")
+            again = await product_feed.get_feed_file(session, lang=None, fmt="json")
+            assert again.etag == feeds[0].etag
+            assert len(builds) == 1
+
+            # ...until that worker sees a catalog write of its own.
+            await catalog_cache.bump_generation()
+            await product_feed.get_feed_file(session, lang=None, fmt="json")
+            assert len(builds) == 2
+
+    asyncio.run(_run())
+
+
+def test_snapshot_expires_at_the_next_sale_boundary(monkeypatch) -> None:
+    factory = make_memory_session_factory()
+    sale_start = datetime.now(timezone.utc) + timedelta(minutes=30)
+
+    async def _run() -> None:
+        async with factory() as session:
+            await _seed(
+                session,
+                sale_price=Decimal("15.00"),
+                sale_start_at=sale_start,
+            )
+            before = await product_feed.get_feed_file(session, lang=None, fmt="json")
+            assert _read(before)[0]["price"] == 20.0
+
+            manifest = json.loads(
+                (before.path.parent / "product-feed-base.manifest.json").read_text()
+            )
+            assert manifest["valid_until"] == pytest.approx(sale_start.timestamp())
+
+            # Once the sale has started: the snapshot is rebuilt.
+            later = sale_start + timedelta(hours=1)
+
+            class _Clock(datetime):
+                @classmethod
+                def now(cls, tz=None):
+                    return later
+
+            monkeypatch.setattr(product_feed.time, "time", later.timestamp)
+            monkeypatch.setattr(product_feed, "datetime", _Clock)
+            after = await product_feed.get_feed_file(session, lang=None, fmt="json")
+            assert after.etag != before.etag
+            assert _read(after)[0]["price"] == 15.0
+
+    asyncio.run(_run())
+
+
+def test_feed_endpoints_send_validators_and_honour_conditional_gets() -> None:
+    factory = make_memory_session_factory()
+
+    async def _prepare() -> None:
+        async with factory() as session:
+            await _seed(session)
+
+    asyncio.run(_prepare())
+
+    async def override_get_session():
+        async with factory() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    try:
+        with TestClient(app) as client:
+            res = client.get("/api/v1/catalog/products/feed")
+            assert res.status_code == 200
+            assert res.headers["content-encoding"] == "gzip"
+            assert res.json()[0]["slug"] == "mug"
+            etag = res.headers["etag"]
+            last_modified = res.headers["last-modified"]
+
+            res = client.get(
+                "/api/v1/catalog/products/feed", headers={"If-None-Match": etag}
+            )
+            assert res.status_code == 304
+            assert res.headers["etag"] == etag
+            res = client.get(
+                "/api/v1/catalog/products/feed",
+                headers={"If-Modified-Since": last_modified},
+            )
+            assert res.status_code == 304
+
+            res = client.get(
+                "/api/v1/catalog/products/feed.csv",
+                headers={"Accept-Encoding": "identity", "If-None-Match": etag},
+            )
+            assert res.status_code == 200
+            assert "content-encoding" not in res.headers
+            assert res.text.splitlines()[0].startswith("slug,name,price")
+            assert "product_feed.csv" in res.headers["content-disposition"]
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.catalog import Category, Product, ProductStatus
+from app.services import catalog_cache, product_schedules
+from tests.conftest import make_memory_session_factory
+
+
+def _product(category_id, slug: str, **kw) -> Product:
+    defaults = dict(
+        category_id=category_id,
+        slug=slug,
+        sku=slug.upper(),
+        name=slug,
+        base_price=Decimal("50.00"),
+        currency="RON",
+        stock_quantity=5,
+        status=ProductStatus.draft,
+        is_active=True,
+    )
+    defaults.update(kw)
+    return Product(**defaults)
+
+
+async def _statuses(factory) -> dict[str, ProductStatus]:
+    async with factory() as session:
+        rows = await session.execute(select(Product.slug, Product.status))
+        return {slug: status for slug, status in rows.all()}
+
+
+def test_due_transitions_apply_in_one_batch(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "redis_url", None)
+    factory = make_memory_session_factory()
+    now = datetime.now(timezone.utc)
+    past = now - timedelta(minutes=5)
+    soon = now + timedelta(hours=1)
+    later = now + timedelta(days=1)
+
+    async def _run() -> None:
+        async with factory() as session:
+            category = Category(slug="cups", name="Cups")
+            session.add(category)
+            await session.flush()
+            session.add_all(
+                [
+                    _product(category.id, "due-pub", publish_scheduled_for=past),
+                    _product(
+                        category.id,
+                        "due-unpub",
+                        status=ProductStatus.published,
+                        unpublish_scheduled_for=past,
+                    ),
+                    _product(
+                        category.id,
+                        "due-sale",
+                        sale_price=Decimal("40.00"),
+                        sale_auto_publish=True,
+                        sale_start_at=past,
+                        sale_end_at=later,
+                    ),
+                    _product(category.id, "future", publish_scheduled_for=soon),
+                ]
+            )
+            await session.commit()
+
+            generation = await catalog_cache.get_generation()
+            assert await product_schedules.apply_due_transitions(session) == 3
+            assert await catalog_cache.get_generation() == generation + 1
+            assert await product_schedules.apply_due_transitions(session) == 0
+
+            boundaries = await product_schedules.upcoming_boundaries(
+                session, after=now
+            )
+            assert boundaries == [soon, later]
+
+        assert await _statuses(factory) == {
+            "due-pub": ProductStatus.published,
+            "due-unpub": ProductStatus.archived,
+            "due-sale": ProductStatus.published,
+            "future": ProductStatus.draft,
+        }
+
+    asyncio.run(_run())
+
+
+def test_scheduler_wakes_at_the_next_boundary(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "redis_url", None)
+    factory = make_memory_session_factory()
+    monkeypatch.setattr(product_schedules, "SessionLocal", factory)
+
+    async def _run() -> None:
+        async with factory() as session:
+            category = Category(slug="cups", name="Cups")
+            session.add(category)
+            await session.flush()
+            session.add(_product(category.id, "empty", status=ProductStatus.published))
+            await session.commit()
+
+        product_schedules._wakeup.open()
+        stop = asyncio.Event()
+        task = asyncio.create_task(product_schedules._loop(stop))
+        try:
+            await asyncio.sleep(0.1)
+            # A schedule added after startup is picked up through notify().
+            async with factory() as session:
+                category_id = await session.scalar(select(Category.id))
+                session.add(
+                    _product(
+                        category_id,
+                        "soon",
+                        publish_scheduled_for=datetime.now(timezone.utc)
+                        + timedelta(milliseconds=300),
+                    )
+                )
+                await session.commit()
+            await product_schedules.notify()
+            await asyncio.sleep(0.1)
+            assert (await _statuses(factory))["soon"] == ProductStatus.draft
+            await asyncio.sleep(0.5)
+            assert (await _statuses(factory))["soon"] == ProductStatus.published
+        finally:
+            stop.set()
+            await asyncio.wait_for(task, timeout=2)
+            await product_schedules._wakeup.close()
+
+    asyncio.run(_run())
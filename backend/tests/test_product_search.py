@@ -0,0 +1,116 @@
+import asyncio
+from decimal import Decimal
+
+from app.models.catalog import (
+    Category,
+    Product,
+    ProductStatus,
+    ProductTranslation,
+)
+from app.services import catalog, product_search
+from tests.conftest import make_memory_session_factory
+
+
+def _product(category: Category, slug: str, name: str, **kw) -> Product:
+    return Product(
+        category_id=category.id,
+        slug=slug,
+        sku=slug.upper(),
+        name=name,
+        base_price=Decimal("10.00"),
+        status=ProductStatus.published,
+        is_active=True,
+        **kw,
+    )
+
+
+async def _search(session, term: str, *, sort: str | None = None) -> list[str]:
+    items, total = await catalog.list_products_with_filters(
+        session,
+        category_slug=None,
+        on_sale=None,
+        is_featured=None,
+        search=term,
+        min_price=None,
+        max_price=None,
+        tags=None,
+        sort=sort,
+        limit=20,
+        offset=0,
+    )
+    assert total == len(items)
+    return [item.slug for item in items]
+
+
+def test_build_search_document_is_unaccented_and_ordered() -> None:
+    assert (
+        product_search.build_search_document("Cană Țărănească", None, "  Lut ARS ")
+        == "cana taraneasca lut ars"
+    )
+    assert product_search.build_search_document("", None, None) == ""
+
+
+def test_search_document_follows_writes_and_translations() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            category = Category(slug="cups", name="Cups")
+            session.add(category)
+            await session.flush()
+            mug = _product(category, "mug", "Cană pictată", short_description="100%")
+            bowl = _product(category, "bowl", "Bowl")
+            session.add_all([mug, bowl])
+            await session.flush()
+            session.add(
+                ProductTranslation(product_id=bowl.id, lang="ro", name="Bol de lut")
+            )
+            await session.commit()
+
+            assert mug.search_document == "cana pictata 100%"
+            assert await _search(session, "PICTATĂ") == ["mug"]
+            assert await _search(session, "bol de") == ["bowl"]
+            # LIKE wildcards in the term are matched literally.
+            assert await _search(session, "100%") == ["mug"]
+            assert await _search(session, "%") == ["mug"]
+            assert await _search(session, "_") == []
+
+            bowl.long_description = "Glazură pictată manual"
+            session.add(bowl)
+            await session.commit()
+            assert bowl.search_document == "bowl glazura pictata manual"
+            assert set(await _search(session, "pictata")) == {"mug", "bowl"}
+
+    asyncio.run(_run())
+
+
+def test_relevance_sort_prefers_name_matches() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            category = Category(slug="decor", name="Decor")
+            session.add(category)
+            await session.flush()
+            session.add_all(
+                [
+                    _product(
+                        category,
+                        "plate",
+                        "Plate",
+                        long_description="pairs with a vase",
+                        sort_order=0,
+                    ),
+                    _product(category, "tall-vase", "Tall vase", sort_order=1),
+                    _product(category, "vase", "Vase", sort_order=2),
+                ]
+            )
+            await session.commit()
+
+            assert await _search(session, "vase", sort="relevance") == [
+                "vase",
+                "tall-vase",
+                "plate",
+            ]
+
+    asyncio.run(_run())
@@ -0,0 +1,97 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from app.services import queue_worker
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.items: list[str] = []
+        self.pushed = asyncio.Event()
+        self.closed = False
+
+    async def rpush(self, _key, value):
+        self.items.append(value)
+        self.pushed.set()
+        return len(self.items)
+
+    async def ltrim(self, _key, _start, _end):
+        return True
+
+    async def blpop(self, keys, timeout=0):
+        await asyncio.wait_for(self.pushed.wait(), timeout=timeout)
+        self.pushed.clear()
+        return (keys[0], self.items.pop(0))
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_backoff_doubles_up_to_the_cap() -> None:
+    assert queue_worker.backoff(1, base_seconds=30) == timedelta(seconds=30)
+    assert queue_worker.backoff(3, base_seconds=30) == timedelta(seconds=120)
+    assert queue_worker.backoff(20, base_seconds=30) == timedelta(seconds=3600)
+
+
+def test_wait_uses_its_own_connection_and_drops_it_when_cancelled(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    shared = _FakeRedis()
+    blocking: list[_FakeRedis] = []
+
+    def _new_client() -> _FakeRedis:
+        client = _FakeRedis()
+        # Pushes through the shared client reach the blocking connections.
+        client.items, client.pushed = shared.items, shared.pushed
+        blocking.append(client)
+        return client
+
+    monkeypatch.setattr(queue_worker, "get_redis", lambda: shared)
+    monkeypatch.setattr(queue_worker, "create_redis_client", _new_client)
+    wakeup = queue_worker.Wakeup("test:wakeup", name="test")
+
+    async def _run() -> None:
+        stop = asyncio.Event()
+        # A push from another process wakes the waiter through BLPOP.
+        waiter = asyncio.create_task(wakeup.wait(stop, 5))
+        await asyncio.sleep(0.05)
+        await shared.rpush("test:wakeup", "1")
+        assert await asyncio.wait_for(waiter, timeout=1) is True
+        assert len(blocking) == 1 and not blocking[0].closed
+
+        # Stopping cancels the BLPOP in flight; its connection is not reused.
+        waiter = asyncio.create_task(wakeup.wait(stop, 5))
+        await asyncio.sleep(0.05)
+        stop.set()
+        assert await asyncio.wait_for(waiter, timeout=1) is False
+        assert blocking[0].closed
+
+        stop.clear()
+        waiter = asyncio.create_task(wakeup.wait(stop, 5))
+        await asyncio.sleep(0.05)
+        await shared.rpush("test:wakeup", "1")
+        assert await asyncio.wait_for(waiter, timeout=1) is True
+        assert len(blocking) == 2
+        await wakeup.close()
+        assert blocking[1].closed
+
+    asyncio.run(_run())
+
+
+def test_local_wakeup_without_redis(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(queue_worker, "get_redis", lambda: None)
+    wakeup = queue_worker.Wakeup("test:wakeup", name="test")
+
+    async def _run() -> None:
+        wakeup.open()
+        stop = asyncio.Event()
+        waiter = asyncio.create_task(wakeup.wait(stop, 5))
+        await asyncio.sleep(0.01)
+        await wakeup.notify()
+        assert await asyncio.wait_for(waiter, timeout=1) is True
+        assert await wakeup.wait(stop, 0.01) is False
+        await wakeup.close()
+
+    asyncio.run(_run())
@@ -0,0 +1,118 @@
+import asyncio
+import uuid
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select, text
+
+from app.core.config import settings
+from app.models.catalog import (
+    Category,
+    Product,
+    ProductStatus,
+    RecentlyViewedProduct,
+)
+from app.services import catalog, recently_viewed
+from tests.conftest import make_memory_session_factory
+
+
+async def _seed(session, count: int) -> list[Product]:
+    category = Category(slug="cups", name="Cups")
+    session.add(category)
+    await session.flush()
+    products = [
+        Product(
+            category_id=category.id,
+            slug=f"cup-{i}",
+            sku=f"CUP-{i}",
+            name=f"Cup {i}",
+            base_price=Decimal("10.00"),
+            currency="RON",
+            stock_quantity=1,
+            status=ProductStatus.published,
+            is_active=True,
+        )
+        for i in range(count)
+    ]
+    session.add_all(products)
+    await session.commit()
+    return products
+
+
+def test_views_are_buffered_then_flushed_in_batches(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "redis_url", None)
+    factory = make_memory_session_factory()
+    user_id = uuid.uuid4()
+
+    async def _run() -> None:
+        async with factory() as session:
+            products = await _seed(session, 4)
+            for product in products:
+                await catalog.record_recently_viewed(
+                    session, product, user_id, None, limit=3
+                )
+                await catalog.record_recently_viewed(
+                    session, product, None, "guest-1", limit=3
+                )
+            # Nothing is written on the request path.
+            assert (await session.execute(select(RecentlyViewedProduct))).first() is None
+            recent = await catalog.get_recently_viewed(session, user_id, None, limit=5)
+            assert [p.slug for p in recent] == ["cup-3", "cup-2", "cup-1"]
+
+            assert await recently_viewed.flush(session) == 2
+            assert await recently_viewed.flush(session) == 0
+
+            # A repeat view is an upsert; the window trims the oldest row.
+            await catalog.record_recently_viewed(
+                session, products[0], user_id, None, limit=3
+            )
+            assert await recently_viewed.flush(session) == 1
+            rows = (
+                await session.execute(
+                    select(RecentlyViewedProduct.user_id, RecentlyViewedProduct.product_id)
+                )
+            ).all()
+            user_rows = {pid for uid, pid in rows if uid == user_id}
+            guest_rows = [pid for uid, pid in rows if uid is None]
+            assert user_rows == {products[0].id, products[2].id, products[3].id}
+            assert len(guest_rows) == 3
+
+            # After a restart the table answers what the buffer no longer has.
+            recently_viewed._reset_for_tests()
+            recent = await catalog.get_recently_viewed(session, user_id, None, limit=5)
+            assert [p.slug for p in recent] == ["cup-0", "cup-3", "cup-2"]
+
+    asyncio.run(_run())
+
+
+def test_flush_drops_views_of_deleted_users_and_products(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "redis_url", None)
+    factory = make_memory_session_factory()
+    missing_user = uuid.uuid4()
+
+    async def _run() -> None:
+        async with factory() as session:
+            await session.execute(text("PRAGMA foreign_keys=ON"))
+            product_id = (await _seed(session, 1))[0].id
+            await recently_viewed.record(missing_user, None, product_id)
+            await recently_viewed.record(None, "guest-1", product_id)
+            await recently_viewed.record(None, "guest-1", uuid.uuid4())
+
+            assert await recently_viewed.flush(session) == 2
+            rows = (
+                await session.execute(
+                    select(
+                        RecentlyViewedProduct.session_id,
+                        RecentlyViewedProduct.product_id,
+                    )
+                )
+            ).all()
+            assert rows == [("guest-1", product_id)]
+            # The dropped views are not retried on the next flush.
+            assert await recently_viewed.flush(session) == 0
+
+    asyncio.run(_run())
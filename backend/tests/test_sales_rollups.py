@@ -0,0 +1,236 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app.models.order import Order, OrderRefund, OrderStatus, OrderTag
+from app.models.sales_rollup import SalesDailyRollup
+from app.services import sales_rollups
+from tests.conftest import make_memory_session_factory
+
+NOW = datetime(2026, 3, 10, 15, 30, tzinfo=timezone.utc)
+TODAY = datetime(2026, 3, 10, tzinfo=timezone.utc)
+
+
+def _order(status: OrderStatus, amount: str, created_at: datetime) -> Order:
+    return Order(
+        status=status,
+        total_amount=Decimal(amount),
+        customer_email="buyer@example.com",
+        customer_name="Buyer",
+        created_at=created_at,
+        updated_at=created_at,
+    )
+
+
+async def _rollup_days(session) -> set:
+    return set((await session.execute(select(SalesDailyRollup.day))).scalars())
+
+
+def test_window_totals_combine_rollups_with_live_edges() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            refunded = _order(
+                OrderStatus.refunded, "40", TODAY - timedelta(days=2, hours=-3)
+            )
+            partial = _order(
+                OrderStatus.paid, "100", TODAY - timedelta(days=1, hours=-8)
+            )
+            test_order = _order(
+                OrderStatus.paid, "999", TODAY - timedelta(days=1, hours=-9)
+            )
+            session.add_all(
+                [
+                    # Before the window start (10 Mar 15:30 - 3 days).
+                    _order(OrderStatus.paid, "7", TODAY - timedelta(days=3, hours=-2)),
+                    # Partial first day, inside the window.
+                    _order(
+                        OrderStatus.shipped, "11", TODAY - timedelta(days=3, hours=-20)
+                    ),
+                    refunded,
+                    partial,
+                    test_order,
+                    _order(
+                        OrderStatus.cancelled,
+                        "500",
+                        TODAY - timedelta(days=1, hours=-1),
+                    ),
+                    _order(OrderStatus.delivered, "25", TODAY + timedelta(hours=2)),
+                ]
+            )
+            await session.flush()
+            session.add(OrderRefund(order_id=partial.id, amount=Decimal("30")))
+            session.add(OrderTag(order_id=test_order.id, tag="test"))
+            await session.commit()
+
+            totals = await sales_rollups.window_totals(
+                session,
+                {
+                    "3d": (NOW - timedelta(days=3), NOW),
+                    "today": (TODAY, NOW),
+                    "yesterday": (TODAY - timedelta(days=1), TODAY),
+                },
+                now=NOW,
+            )
+            window = totals["3d"]
+            assert window.sales == Decimal("136")
+            assert window.gross_sales == Decimal("176")
+            assert window.refunds == Decimal("30")
+            assert window.missing_refunds == Decimal("40")
+            assert window.net_sales == Decimal("106")
+            assert window.orders == 5
+            assert totals["today"].sales == Decimal("25")
+            assert totals["yesterday"].orders == 2
+            assert totals["yesterday"].net_sales == Decimal("70")
+
+            # Reads never write; the worker materializes closed days only.
+            assert await _rollup_days(session) == set()
+            assert await sales_rollups.run_once(session, now=NOW) == 3
+            assert await _rollup_days(session) == {
+                (TODAY - timedelta(days=offset)).date() for offset in (1, 2, 3)
+            }
+            rolled = await sales_rollups.window_totals(
+                session,
+                {
+                    "3d": (NOW - timedelta(days=3), NOW),
+                    "today": (TODAY, NOW),
+                    "yesterday": (TODAY - timedelta(days=1), TODAY),
+                },
+                now=NOW,
+            )
+            assert {
+                name: (t.sales, t.net_sales, t.orders) for name, t in rolled.items()
+            } == {name: (t.sales, t.net_sales, t.orders) for name, t in totals.items()}
+            yesterday = await session.get(
+                SalesDailyRollup, (TODAY - timedelta(days=1)).date()
+            )
+            assert yesterday is not None
+            assert yesterday.orders_by_status == {"paid": 1, "cancelled": 1}
+
+    asyncio.run(_run())
+
+
+def test_order_changes_invalidate_their_day() -> None:
+    factory = make_memory_session_factory()
+    yesterday = (TODAY - timedelta(days=1)).date()
+    windows = {"yesterday": (TODAY - timedelta(days=1), TODAY)}
+
+    async def _run() -> None:
+        async with factory() as session:
+            order = _order(OrderStatus.paid, "100", TODAY - timedelta(hours=10))
+            other = _order(OrderStatus.paid, "50", TODAY - timedelta(hours=12))
+            session.add_all([order, other])
+            await session.commit()
+
+            await sales_rollups.run_once(session, now=NOW)
+            assert await _rollup_days(session) == {yesterday}
+            totals = await sales_rollups.window_totals(session, windows, now=NOW)
+            assert totals["yesterday"].sales == Decimal("150")
+
+            order.status = OrderStatus.refunded
+            session.add(order)
+            await session.commit()
+            assert await _rollup_days(session) == set()
+            totals = await sales_rollups.window_totals(session, windows, now=NOW)
+            assert totals["yesterday"].sales == Decimal("50")
+            assert totals["yesterday"].missing_refunds == Decimal("100")
+
+            session.add(OrderRefund(order_id=order.id, amount=Decimal("100")))
+            await session.commit()
+            assert await _rollup_days(session) == set()
+            totals = await sales_rollups.window_totals(session, windows, now=NOW)
+            assert totals["yesterday"].refunds == Decimal("100")
+            assert totals["yesterday"].missing_refunds == Decimal("0")
+
+            # Unrelated tags keep the rollup; the test tag drops the order.
+            await sales_rollups.run_once(session, now=NOW)
+            session.add(OrderTag(order_id=other.id, tag="vip"))
+            await session.commit()
+            assert await _rollup_days(session) == {yesterday}
+            session.add(OrderTag(order_id=other.id, tag="test"))
+            await session.commit()
+            totals = await sales_rollups.window_totals(session, windows, now=NOW)
+            assert totals["yesterday"].orders == 1
+
+    asyncio.run(_run())
+
+
+def test_worker_rerolls_unsettled_days_with_late_orders() -> None:
+    factory = make_memory_session_factory()
+    yesterday = TODAY - timedelta(days=1)
+    windows = {"yesterday": (yesterday, TODAY)}
+
+    async def _run() -> None:
+        async with factory() as session:
+            session.add(_order(OrderStatus.paid, "10", yesterday + timedelta(hours=1)))
+            await session.commit()
+            await sales_rollups.run_once(session, now=NOW)
+
+            # A late row that bypasses the ORM hooks (e.g. a bulk import).
+            await session.execute(
+                Order.__table__.insert().values(
+                    id=uuid.uuid4(),
+                    status=OrderStatus.paid,
+                    total_amount=Decimal("5"),
+                    customer_email="late@example.com",
+                    customer_name="Late",
+                    created_at=yesterday + timedelta(hours=2),
+                    updated_at=yesterday + timedelta(hours=2),
+                )
+            )
+            await session.commit()
+            await sales_rollups.run_once(session, now=NOW)
+            totals = await sales_rollups.window_totals(session, windows, now=NOW)
+            assert totals["yesterday"].sales == Decimal("15")
+
+    asyncio.run(_run())
+
+
+def test_worker_skips_days_locked_by_an_order_change(monkeypatch) -> None:
+    locked_by_writer = (TODAY - timedelta(days=2)).date()
+    days = [(TODAY - timedelta(days=offset)).date() for offset in (3, 2, 1)]
+    tried: list[int] = []
+
+    class _PgSession:
+        def get_bind(self):
+            return type("Bind", (), {"dialect": type("D", (), {"name": "postgresql"})})
+
+        async def scalar(self, _stmt, params):
+            tried.append(params["day"])
+            return params["day"] != locked_by_writer.toordinal()
+
+    locked = asyncio.run(sales_rollups._lock_days(_PgSession(), days))
+    assert locked == [days[0], days[2]]
+    assert tried == sorted(day.toordinal() for day in days)
+
+
+def test_worker_refills_invalidated_days_outside_the_resettle_window() -> None:
+    factory = make_memory_session_factory()
+    old_day = TODAY - timedelta(days=30)
+
+    async def _run() -> None:
+        async with factory() as session:
+            order = _order(OrderStatus.paid, "40", old_day + timedelta(hours=3))
+            session.add(order)
+            await session.commit()
+            await sales_rollups.run_once(session, now=NOW)
+            assert old_day.date() in await _rollup_days(session)
+
+            order.status = OrderStatus.refunded
+            session.add(order)
+            await session.commit()
+            assert old_day.date() not in await _rollup_days(session)
+
+            await sales_rollups.run_once(session, now=NOW)
+            row = await session.scalar(
+                select(SalesDailyRollup).where(SalesDailyRollup.day == old_day.date())
+            )
+            assert row is not None
+            assert row.sales_amount == Decimal("0")
+            assert row.orders_by_status == {"refunded": 1}
+
+    asyncio.run(_run())
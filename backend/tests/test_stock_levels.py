@@ -0,0 +1,207 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import select, update
+
+from app.models.cart import Cart, CartItem
+from app.models.catalog import Category, Product, ProductStatus, ProductVariant
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.stock_level import StockLevel
+from app.services import inventory, stock_levels
+from tests.conftest import make_memory_session_factory
+
+
+async def _level(session, item_id) -> tuple[int, int, int, int, int | None]:
+    row = (
+        await session.execute(select(StockLevel).where(StockLevel.item_id == item_id))
+    ).scalar_one()
+    await session.refresh(row)
+    return (
+        row.on_hand,
+        row.reserved_in_carts,
+        row.reserved_in_orders,
+        row.available,
+        row.threshold,
+    )
+
+
+def test_writes_keep_stock_levels_current() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            category = Category(slug="cups", name="Cups", low_stock_threshold=4)
+            product = Product(
+                slug="cup",
+                name="Cup",
+                base_price=Decimal("20"),
+                currency="RON",
+                category=category,
+                stock_quantity=6,
+                status=ProductStatus.published,
+            )
+            variant = ProductVariant(product=product, name="Blue", stock_quantity=3)
+            session.add_all([category, product, variant])
+            await session.commit()
+            assert await _level(session, product.id) == (6, 0, 0, 6, 4)
+            assert await _level(session, variant.id) == (3, 0, 0, 3, 4)
+
+            cart = Cart(session_id="guest")
+            session.add(cart)
+            await session.flush()
+            session.add(
+                CartItem(
+                    cart_id=cart.id,
+                    product_id=product.id,
+                    quantity=2,
+                    unit_price_at_add=Decimal("20"),
+                )
+            )
+            order = Order(
+                status=OrderStatus.pending_payment,
+                total_amount=Decimal("20"),
+                customer_email="buyer@example.com",
+                customer_name="Buyer",
+            )
+            session.add(order)
+            await session.flush()
+            session.add(
+                OrderItem(
+                    order_id=order.id,
+                    product_id=product.id,
+                    variant_id=variant.id,
+                    quantity=1,
+                    unit_price=Decimal("20"),
+                    subtotal=Decimal("20"),
+                )
+            )
+            await session.commit()
+            assert await _level(session, product.id) == (6, 2, 0, 4, 4)
+            assert await _level(session, variant.id) == (3, 0, 1, 2, 4)
+
+            order.status = OrderStatus.paid
+            product.stock_quantity = 1
+            category.low_stock_threshold = 2
+            await session.commit()
+            assert await _level(session, product.id) == (1, 2, 0, -1, 2)
+            assert await _level(session, variant.id) == (3, 0, 0, 3, 2)
+
+            await session.delete(variant)
+            await session.commit()
+            assert (
+                await session.scalar(
+                    select(StockLevel).where(StockLevel.item_id == variant.id)
+                )
+            ) is None
+
+            low = await stock_levels.low_stock_products(
+                session, default_threshold=5, limit=10
+            )
+            assert [(p.id, threshold) for p, threshold in low] == [(product.id, 2)]
+            assert await stock_levels.low_stock_counts(
+                session, default_threshold=5
+            ) == (1, 0)
+
+            restock = await inventory.list_restock_list(
+                session, include_variants=True, default_threshold=5
+            )
+            assert [(item.product_id, item.available_quantity) for item in restock] == [
+                (product.id, -1)
+            ]
+
+    asyncio.run(_run())
+
+
+def test_reconcile_fixes_drift_and_expires_carts() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            category = Category(slug="mugs", name="Mugs")
+            product = Product(
+                slug="mug",
+                name="Mug",
+                base_price=Decimal("30"),
+                currency="RON",
+                category=category,
+                stock_quantity=10,
+                status=ProductStatus.published,
+            )
+            session.add_all([category, product])
+            await session.flush()
+            cart = Cart(session_id="guest")
+            session.add(cart)
+            await session.flush()
+            session.add(
+                CartItem(
+                    cart_id=cart.id,
+                    product_id=product.id,
+                    quantity=3,
+                    unit_price_at_add=Decimal("30"),
+                )
+            )
+            await session.commit()
+            assert await _level(session, product.id) == (10, 3, 0, 7, None)
+
+            # Bulk UPDATEs bypass the flush hook; the reconcile catches them.
+            await session.execute(
+                update(Product).where(Product.id == product.id).values(stock_quantity=8)
+            )
+            await session.commit()
+            assert await stock_levels.reconcile_all(session) == 1
+            assert await stock_levels.reconcile_all(session) == 0
+            assert await _level(session, product.id) == (8, 3, 0, 5, None)
+
+            now = datetime.now(timezone.utc)
+            stale = now - timedelta(days=1)
+            await session.execute(
+                update(Cart).where(Cart.id == cart.id).values(updated_at=stale)
+            )
+            await session.commit()
+            assert (
+                await stock_levels.expire_cart_reservations(
+                    session, since=stale - timedelta(minutes=1), until=now
+                )
+                == 1
+            )
+            assert await _level(session, product.id) == (8, 0, 0, 8, None)
+
+    asyncio.run(_run())
+
+
+def test_cart_reservations_are_refreshed_at_commit() -> None:
+    factory = make_memory_session_factory()
+
+    async def _run() -> None:
+        async with factory() as session:
+            category = Category(slug="bowls", name="Bowls")
+            product = Product(
+                slug="bowl",
+                name="Bowl",
+                base_price=Decimal("15"),
+                currency="RON",
+                category=category,
+                stock_quantity=5,
+                status=ProductStatus.published,
+            )
+            cart = Cart(session_id="guest")
+            session.add_all([category, product, cart])
+            await session.commit()
+
+            session.add(
+                CartItem(
+                    cart_id=cart.id,
+                    product_id=product.id,
+                    quantity=2,
+                    unit_price_at_add=Decimal("15"),
+                )
+            )
+            await session.flush()
+            # The cart request does not lock the product's row...
+            assert await _level(session, product.id) == (5, 0, 0, 5, None)
+            await session.commit()
+            # ...its reservation is counted once it commits.
+            assert await _level(session, product.id) == (5, 2, 0, 3, None)
+
+    asyncio.run(_run())
@@ -1112,6 +1112,41 @@ def test_admin_export_masked_columns(test_app) -> None:
     assert res.status_code == 200
 
 
+def test_admin_export_filters_and_background_job(
+    test_app, tmp_path, monkeypatch
+) -> None:
+    monkeypatch.setattr(settings, "private_media_root", str(tmp_path))
+    client = test_app["client"]
+    sf = test_app["session_factory"]
+    _seed_order(sf, payment_method="stripe", status=OrderStatus.paid)
+    _seed_order(sf, payment_method="cod", status=OrderStatus.cancelled)
+    headers = auth_headers(_admin(test_app))
+    res = client.get(
+        "/api/v1/orders/admin/export",
+        params={"columns": "status", "status": "paid"},
+        headers=headers,
+    )
+    assert res.status_code == 200
+    assert res.text.splitlines() == ["status", "paid"]
+    bad_range = client.get(
+        "/api/v1/orders/admin/export",
+        params={"from": "2026-02-01", "to": "2026-01-01"},
+        headers=headers,
+    )
+    assert bad_range.status_code == 400
+
+    queued = client.post(
+        "/api/v1/orders/admin/export/jobs",
+        params={"columns": "reference_code", "status": "cancelled"},
+        headers=headers,
+    )
+    assert queued.status_code == 202, queued.text
+    listed = client.get("/api/v1/orders/admin/exports", headers=headers).json()
+    assert [
+        (item["id"], item["kind"], item["status"]) for item in listed["items"]
+    ] == [(queued.json()["export_id"], "orders_csv", "succeeded")]
+
+
 def test_admin_export_invalid_columns(test_app) -> None:
     client = test_app["client"]
     res = client.get(
@@ -61,8 +61,10 @@ from app.schemas.catalog import (
 )
 from app.services import auth as auth_service
 from app.services import catalog
+from app.services import csv_stream
 from app.services import email as email_service
 from app.services import notifications as notifications_service
+from app.services import product_schedules
 
 UTC = timezone.utc
 pytestmark = pytest.mark.anyio
@@ -996,13 +998,10 @@ async def test_apply_due_schedules_and_auto_publish() -> None:
         )
         await session.commit()
 
-        applied = await catalog.apply_due_product_schedules(session)
-        assert applied >= 2
-        published = await catalog.auto_publish_due_sales(session)
-        assert published >= 1
+        applied = await product_schedules.apply_due_transitions(session)
+        assert applied == 3
         # second call: nothing due -> 0
-        assert await catalog.apply_due_product_schedules(session) == 0
-        assert await catalog.auto_publish_due_sales(session) == 0
+        assert await product_schedules.apply_due_transitions(session) == 0
     await engine.dispose()
 
 
@@ -1266,8 +1265,9 @@ async def test_product_feed_and_csv() -> None:
         assert any(item.slug == "feedprod" for item in feed)
         feed_plain = await catalog.get_product_feed(session)
         assert feed_plain
-        csv_out = await catalog.get_product_feed_csv(session)
-        assert "feedprod" in csv_out
+        csv_rows = [catalog.product_feed_csv_row(item) for item in feed_plain]
+        assert all(len(row) == len(catalog.PRODUCT_FEED_CSV_HEADER) for row in csv_rows)
+        assert "feedprod" in [row[0] for row in csv_rows]
     await engine.dispose()
 
 
@@ -1312,7 +1312,15 @@ async def _seed_filter_fixture(session):
 
 @pytest.mark.parametrize(
     "sort",
-    ["recommended", "price_asc", "price_desc", "name_asc", "name_desc", None],
+    [
+        "recommended",
+        "price_asc",
+        "price_desc",
+        "name_asc",
+        "name_desc",
+        "relevance",
+        None,
+    ],
 )
 async def test_list_products_with_filters_sorts(sort) -> None:
     engine, local = _make_engine_and_local()
@@ -1611,12 +1619,14 @@ async def test_export_csv() -> None:
         await _seed_product(session, child, sku="SKU-EXP", tags=["x"])
         await session.commit()
 
-        products_csv = await catalog.export_products_csv(session)
+        products_csv = await csv_stream.collect(catalog.iter_products_csv(session))
         assert "prod" in products_csv
-        cats_csv = await catalog.export_categories_csv(session)
+        cats_csv = await csv_stream.collect(catalog.iter_categories_csv(session))
         assert "ccat" in cats_csv
         # template returns just the header
-        template = await catalog.export_categories_csv(session, template=True)
+        template = await csv_stream.collect(
+            catalog.iter_categories_csv(session, template=True)
+        )
         assert "slug" in template and "ccat" not in template
     await engine.dispose()
 
@@ -20,6 +20,7 @@ from types import SimpleNamespace
 import pytest
 
 from app.services import email as e
+from app.services import smtp_pool
 
 
 def _run(coro):
@@ -329,7 +330,7 @@ def test_send_email_success_with_tls_and_auth(monkeypatch):
     monkeypatch.setattr(e.settings, "smtp_use_tls", True)
     monkeypatch.setattr(e.settings, "smtp_username", "user")
     monkeypatch.setattr(e.settings, "smtp_password", "pass")
-    monkeypatch.setattr(e.smtplib, "SMTP", _DummySMTP)
+    monkeypatch.setattr(smtp_pool.smtplib, "SMTP", _DummySMTP)
 
     async def _noop(**kwargs):
         return None
@@ -350,7 +351,7 @@ def test_send_email_failure(monkeypatch, caplog):
         def send_message(self, msg):
             raise RuntimeError("smtp down")
 
-    monkeypatch.setattr(e.smtplib, "SMTP", _BoomSMTP)
+    monkeypatch.setattr(smtp_pool.smtplib, "SMTP", _BoomSMTP)
     recorded = {}
 
     async def _ev(**kwargs):
@@ -367,6 +368,8 @@ def test_send_email_failure(monkeypatch, caplog):
     assert _run(e.send_email("a@x.com", "S", "t")) is False
     assert recorded["event"]["status"] == "failed"
     assert "failure" in recorded
+    # The failed send no longer counts against the rate limits.
+    assert e._rate_global == [] and e._rate_per_recipient == {}
 
 
 def test_record_email_event_success_and_error(monkeypatch, caplog):
@@ -16,7 +16,7 @@ from uuid import uuid4
 
 import httpx
 import pytest
-from fastapi import HTTPException
+from fastapi import BackgroundTasks, HTTPException
 
 from app.api.v1 import content as c
 from app.models.user import UserRole
@@ -1003,6 +1003,7 @@ async def test_admin_update_content(monkeypatch) -> None:
     out = await c.admin_update_content(
         key="page.about",
         payload=ContentBlockUpdate(),
+        background_tasks=BackgroundTasks(),
         session=object(),
         admin=_user(),
     )
@@ -1049,6 +1050,7 @@ async def test_admin_create_content_exists(monkeypatch) -> None:
         await c.admin_create_content(
             key="page.new",
             payload=ContentBlockCreate(title="T", body_markdown="b"),
+            background_tasks=BackgroundTasks(),
             session=object(),
             admin=_user(),
         )
@@ -1067,6 +1069,7 @@ async def test_admin_create_content_ok(monkeypatch) -> None:
     out = await c.admin_create_content(
         key="page.new",
         payload=ContentBlockCreate(title="T", body_markdown="b"),
+        background_tasks=BackgroundTasks(),
         session=object(),
         admin=_user(),
     )
@@ -0,0 +1,295 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.db.session import get_session
+from app.main import app
+from app.models.webhook import PayPalWebhookEvent, StripeWebhookEvent
+from app.services import ops as ops_service
+from app.services import webhook_handlers, webhook_queue
+from tests.conftest import make_memory_session_factory
+
+
+def _stripe_event(event_id: str, intent: str, event_type: str) -> dict:
+    return {
+        "id": event_id,
+        "type": event_type,
+        "data": {"object": {"id": intent, "object": "payment_intent"}},
+    }
+
+
+def test_webhook_is_acknowledged_before_processing(monkeypatch) -> None:
+    factory = make_memory_session_factory()
+
+    async def override_get_session():
+        async with factory() as session:
+            yield session
+
+    async def fail_processing(session, background_tasks, event) -> None:
+        raise AssertionError("processed inline")
+
+    monkeypatch.setattr(settings, "webhook_queue_enabled", True)
+    monkeypatch.setattr(settings, "stripe_webhook_secret", "whsec_test")
+    monkeypatch.setattr(
+        "app.services.payments.stripe.Webhook.construct_event",
+        lambda payload, sig_header, secret: _stripe_event(
+            "evt_q1", "pi_1", "payment_intent.succeeded"
+        ),
+    )
+    monkeypatch.setattr(webhook_handlers, "process_stripe_event", fail_processing)
+    app.dependency_overrides[get_session] = override_get_session
+    client = TestClient(app)
+    try:
+        for _ in range(2):
+            res = client.post(
+                "/api/v1/payments/webhook",
+                content=b"{}",
+                headers={"Stripe-Signature": "t=1,v1=test"},
+            )
+            assert res.status_code == 200, res.text
+            assert res.json() == {"received": True, "type": "payment_intent.succeeded"}
+    finally:
+        client.close()
+        app.dependency_overrides.clear()
+
+    async def rows() -> list[StripeWebhookEvent]:
+        async with factory() as session:
+            return list((await session.execute(select(StripeWebhookEvent))).scalars())
+
+    stored = asyncio.run(rows())
+    # The redelivery is acknowledged without a second row or attempt.
+    assert len(stored) == 1
+    assert stored[0].attempts == 0
+    assert stored[0].processed_at is None
+    assert stored[0].next_attempt_at is not None
+    assert webhook_queue.order_key("stripe", stored[0].payload) == "stripe:pi_1"
+
+
+def test_worker_serializes_per_order_and_dead_letters(monkeypatch) -> None:
+    factory = make_memory_session_factory()
+    monkeypatch.setattr(webhook_queue, "SessionLocal", factory)
+    monkeypatch.setattr(settings, "webhook_queue_max_attempts", 2)
+    monkeypatch.setattr(settings, "webhook_queue_retry_base_seconds", 60)
+
+    handled: list[str] = []
+    failing = {"evt_a1"}
+
+    async def fake_stripe(session, background_tasks, event) -> None:
+        if event["id"] in failing:
+            raise RuntimeError("lock timeout")
+        handled.append(event["id"])
+
+    async def fake_paypal(session, background_tasks, event) -> None:
+        handled.append(event["id"])
+
+    monkeypatch.setitem(webhook_queue._HANDLERS, "stripe", fake_stripe)
+    monkeypatch.setitem(webhook_queue._HANDLERS, "paypal", fake_paypal)
+
+    async def run() -> None:
+        async with factory() as session:
+            for event_id, intent in (
+                ("evt_a1", "pi_a"),
+                ("evt_a2", "pi_a"),
+                ("evt_b1", "pi_b"),
+            ):
+                await webhook_queue.ingest(
+                    session,
+                    provider="stripe",
+                    event_id=event_id,
+                    event_type="payment_intent.succeeded",
+                    payload=_stripe_event(event_id, intent, "payment_intent.succeeded"),
+                )
+            await webhook_queue.ingest(
+                session,
+                provider="paypal",
+                event_id="WH-1",
+                event_type="PAYMENT.CAPTURE.COMPLETED",
+                payload={"id": "WH-1", "resource": {"id": "CAP-1"}},
+            )
+
+        assert await webhook_queue.process_batch() == 4
+        # pi_a stalls behind its failed first event; other orders go through.
+        assert sorted(handled) == ["WH-1", "evt_b1"]
+
+        async with factory() as session:
+            first = await session.scalar(
+                select(StripeWebhookEvent).where(
+                    StripeWebhookEvent.stripe_event_id == "evt_a1"
+                )
+            )
+            second = await session.scalar(
+                select(StripeWebhookEvent).where(
+                    StripeWebhookEvent.stripe_event_id == "evt_a2"
+                )
+            )
+            assert first is not None and second is not None
+            assert first.attempts == 1
+            assert first.last_error == "lock timeout"
+            assert first.next_attempt_at is not None
+            assert second.processed_at is None
+            assert second.next_attempt_at == first.next_attempt_at
+            # Nothing is due until the backoff expires.
+            assert await webhook_queue.process_batch() == 0
+
+            past = datetime.now(timezone.utc) - timedelta(seconds=1)
+            await session.execute(
+                update(StripeWebhookEvent).values(next_attempt_at=past)
+            )
+            await session.commit()
+
+        assert await webhook_queue.process_batch() == 2
+        # A dead-lettered event no longer holds back the rest of its order.
+        assert handled[-1] == "evt_a2"
+
+        async with factory() as session:
+            dead = await ops_service.list_recent_webhooks(session, dead_letter=True)
+            assert [(w.event_id, w.status) for w in dead] == [("evt_a1", "dead_letter")]
+            assert dead[0].attempts == 2
+
+            failing.clear()
+            row = await session.scalar(
+                select(StripeWebhookEvent).where(
+                    StripeWebhookEvent.stripe_event_id == "evt_a1"
+                )
+            )
+            assert row is not None
+            await webhook_queue.requeue(session, row)
+
+        assert await webhook_queue.process_batch() == 1
+        assert handled[-1] == "evt_a1"
+        async with factory() as session:
+            assert await ops_service.list_recent_webhooks(session, dead_letter=True) == []
+            paypal = await session.scalar(select(PayPalWebhookEvent))
+            assert paypal is not None and paypal.processed_at is not None
+
+    asyncio.run(run())
+
+
+def test_claim_skips_events_behind_an_earlier_one_in_flight(monkeypatch) -> None:
+    factory = make_memory_session_factory()
+    monkeypatch.setattr(webhook_queue, "SessionLocal", factory)
+    handled: list[str] = []
+
+    async def fake_stripe(session, background_tasks, event) -> None:
+        handled.append(event["id"])
+
+    monkeypatch.setitem(webhook_queue._HANDLERS, "stripe", fake_stripe)
+
+    async def run() -> None:
+        async with factory() as session:
+            for event_id in ("evt_1", "evt_2"):
+                await webhook_queue.ingest(
+                    session,
+                    provider="stripe",
+                    event_id=event_id,
+                    event_type="payment_intent.succeeded",
+                    payload=_stripe_event(event_id, "pi_c", "payment_intent.succeeded"),
+                )
+            # The first event is leased by another batch that is still running.
+            leased = datetime.now(timezone.utc) + timedelta(minutes=5)
+            await session.execute(
+                update(StripeWebhookEvent)
+                .where(StripeWebhookEvent.stripe_event_id == "evt_1")
+                .values(next_attempt_at=leased)
+            )
+            await session.commit()
+
+        assert await webhook_queue.process_batch() == 0
+        assert handled == []
+
+        async with factory() as session:
+            await session.execute(
+                update(StripeWebhookEvent)
+                .where(StripeWebhookEvent.stripe_event_id == "evt_1")
+                .values(processed_at=datetime.now(timezone.utc), next_attempt_at=None)
+            )
+            await session.commit()
+
+        assert await webhook_queue.process_batch() == 1
+        assert handled == ["evt_2"]
+
+    asyncio.run(run())
+
+
+def test_redelivery_requeues_unqueued_and_dead_lettered_events(monkeypatch) -> None:
+    factory = make_memory_session_factory()
+    notified: list[bool] = []
+
+    async def fake_notify() -> None:
+        notified.append(True)
+
+    monkeypatch.setattr(webhook_queue, "_notify", fake_notify)
+
+    async def run() -> None:
+        now = datetime.now(timezone.utc)
+        async with factory() as session:
+            session.add_all(
+                [
+                    # Stored while the queue was disabled and never processed.
+                    StripeWebhookEvent(
+                        stripe_event_id="evt_idle",
+                        attempts=1,
+                        last_attempt_at=now,
+                        payload=_stripe_event("evt_idle", "pi_i", "charge.refunded"),
+                    ),
+                    StripeWebhookEvent(
+                        stripe_event_id="evt_dead",
+                        attempts=5,
+                        last_attempt_at=now,
+                        next_attempt_at=now,
+                        dead_lettered_at=now,
+                        payload=_stripe_event("evt_dead", "pi_d", "charge.refunded"),
+                    ),
+                    StripeWebhookEvent(
+                        stripe_event_id="evt_done",
+                        attempts=1,
+                        last_attempt_at=now,
+                        processed_at=now,
+                        payload=_stripe_event("evt_done", "pi_x", "charge.refunded"),
+                    ),
+                ]
+            )
+            await session.commit()
+
+            for event_id in ("evt_idle", "evt_dead", "evt_done"):
+                await webhook_queue.ingest(
+                    session,
+                    provider="stripe",
+                    event_id=event_id,
+                    event_type="charge.refunded",
+                    payload={},
+                )
+
+            rows = {
+                row.stripe_event_id: row
+                for row in (await session.execute(select(StripeWebhookEvent))).scalars()
+            }
+            for event_id in ("evt_idle", "evt_dead"):
+                assert rows[event_id].next_attempt_at is not None
+                assert rows[event_id].dead_lettered_at is None
+                assert rows[event_id].attempts == 0
+            assert rows["evt_idle"].order_key == "stripe:pi_i"
+            assert rows["evt_done"].next_attempt_at is None
+            assert len(notified) == 2
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    ("provider", "payload", "expected"),
+    [
+        (
+            "stripe",
+            {"data": {"object": {"id": "cs_1", "payment_intent": "pi_9"}}},
+            "stripe:pi_9",
+        ),
+        ("paypal", {"resource": {"id": "ORDER-1"}}, "paypal:ORDER-1"),
+        ("paypal", {"resource": None}, None),
+    ],
+)
+def test_order_key(provider, payload, expected) -> None:
+    assert webhook_queue.order_key(provider, payload) == expected
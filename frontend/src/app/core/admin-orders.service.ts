@@ -52,7 +52,8 @@ export type OrderDocumentExportKind =
   | 'packing_slip'
   | 'packing_slips_batch'
   | 'shipping_label'
-  | 'receipt';
+  | 'receipt'
+  | 'orders_csv';
 
 export interface AdminOrderDocumentExport {
   id: string;
@@ -64,6 +65,8 @@ export interface AdminOrderDocumentExport {
   order_id?: string | null;
   order_reference?: string | null;
   order_count?: number;
+  status?: 'pending' | 'running' | 'succeeded' | 'failed';
+  error_message?: string | null;
 }
 
 export interface AdminOrderDocumentExportListResponse {
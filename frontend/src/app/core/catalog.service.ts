@@ -10,7 +10,8 @@ export type SortOption =
   | 'price_asc'
   | 'price_desc'
   | 'name_asc'
-  | 'name_desc';
+  | 'name_desc'
+  | 'relevance';
 export type CatalogLang = 'en' | 'ro';
 
 export interface Category {
@@ -84,7 +84,7 @@ export interface ShippingSimulationResult {
 }
 
 export type WebhookProvider = 'stripe' | 'paypal';
-export type WebhookStatus = 'received' | 'processed' | 'failed';
+export type WebhookStatus = 'received' | 'processed' | 'failed' | 'dead_letter';
 
 export interface FailureCount {
   failed: number;
@@ -106,6 +106,8 @@ export interface WebhookEventRead {
   last_attempt_at: string;
   processed_at?: string | null;
   last_error?: string | null;
+  next_attempt_at?: string | null;
+  dead_lettered_at?: string | null;
   status: WebhookStatus;
 }
 
@@ -241,8 +243,10 @@ export class OpsService {
     return this.api.post<ShippingSimulationResult>('/ops/admin/shipping-simulate', payload as any);
   }
 
-  listWebhooks(limit = 50): Observable<WebhookEventRead[]> {
-    return this.api.get<WebhookEventRead[]>('/ops/admin/webhooks', { limit });
+  listWebhooks(limit = 50, deadLetter = false): Observable<WebhookEventRead[]> {
+    const params: Record<string, unknown> = { limit };
+    if (deadLetter) params['dead_letter'] = true;
+    return this.api.get<WebhookEventRead[]>('/ops/admin/webhooks', params as any);
   }
 
   getWebhookFailureStats(params?: { since_hours?: number }): Observable<FailureCount> {
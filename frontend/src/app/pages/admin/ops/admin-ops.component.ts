@@ -1272,13 +1272,25 @@ import { AdminPageHeaderComponent } from '../shared/admin-page-header.component'
                 {{ 'adminUi.ops.webhooks.hint' | translate }}
               </div>
             </div>
-            <app-button
-              size="sm"
-              variant="ghost"
-              [label]="'adminUi.ops.webhooks.refresh' | translate"
-              [disabled]="webhooksLoading()"
-              (action)="loadWebhooks()"
-            ></app-button>
+            <div class="flex flex-wrap items-center gap-3">
+              <label
+                class="inline-flex items-center gap-2 text-sm text-slate-700 dark:text-slate-200"
+              >
+                <input
+                  type="checkbox"
+                  [(ngModel)]="webhooksDeadLetterOnly"
+                  (ngModelChange)="loadWebhooks()"
+                />
+                <span class="font-medium">{{ 'adminUi.ops.webhooks.deadLetterOnly' | translate }}</span>
+              </label>
+              <app-button
+                size="sm"
+                variant="ghost"
+                [label]="'adminUi.ops.webhooks.refresh' | translate"
+                [disabled]="webhooksLoading()"
+                (action)="loadWebhooks()"
+              ></app-button>
+            </div>
           </div>
 
           <div
@@ -1475,6 +1487,7 @@ export class AdminOpsComponent implements OnInit {
   webhooks = signal<WebhookEventRead[]>([]);
   selectedWebhook = signal<WebhookEventDetail | null>(null);
   webhookRetrying = signal<string | null>(null);
+  webhooksDeadLetterOnly = false;
 
   constructor(
     private readonly adminService: AdminService,
@@ -1813,7 +1826,7 @@ export class AdminOpsComponent implements OnInit {
 
   webhookStatusClasses(status: string): string {
     const s = (status || '').toLowerCase();
-    if (s === 'failed') {
+    if (s === 'failed' || s === 'dead_letter') {
       return 'bg-rose-50 text-rose-800 dark:bg-rose-950/30 dark:text-rose-100';
     }
     if (s === 'processed') {
@@ -1892,7 +1905,7 @@ export class AdminOpsComponent implements OnInit {
   loadWebhooks(): void {
     this.webhooksLoading.set(true);
     this.webhooksError.set(null);
-    this.ops.listWebhooks().subscribe({
+    this.ops.listWebhooks(50, this.webhooksDeadLetterOnly).subscribe({
       next: (rows) => {
         this.webhooks.set(rows || []);
         this.webhooksLoading.set(false);
@@ -110,6 +110,17 @@ import { AdminPageHeaderComponent } from '../shared/admin-page-header.component'
               </td>
               <td class="px-4 py-3 text-slate-700 dark:text-slate-200">
                 <span class="truncate block max-w-[340px]">{{ item.filename }}</span>
+                <span
+                  *ngIf="item.status && item.status !== 'succeeded'"
+                  class="block text-xs"
+                  [ngClass]="
+                    item.status === 'failed'
+                      ? 'text-rose-700 dark:text-rose-300'
+                      : 'text-slate-500 dark:text-slate-400'
+                  "
+                  [title]="item.error_message || ''"
+                  >{{ 'adminUi.orders.exports.status.' + item.status | translate }}</span
+                >
               </td>
               <td class="px-4 py-3 text-slate-600 dark:text-slate-300">
                 {{ item.created_at | date: 'short' }}
@@ -125,7 +136,7 @@ import { AdminPageHeaderComponent } from '../shared/admin-page-header.component'
                   size="sm"
                   variant="ghost"
                   [label]="'adminUi.orders.exports.download' | translate"
-                  [disabled]="busyId() === item.id || isExpired(item)"
+                  [disabled]="busyId() === item.id || isExpired(item) || !isReady(item)"
                   (action)="download(item)"
                 ></app-button>
               </td>
@@ -223,6 +234,10 @@ export class AdminOrderExportsComponent implements OnInit {
     });
   }
 
+  isReady(item: AdminOrderDocumentExport): boolean {
+    return !item.status || item.status === 'succeeded';
+  }
+
   isExpired(item: AdminOrderDocumentExport): boolean {
     const raw = (item.expires_at || '').trim();
     if (!raw) return false;
@@ -240,7 +255,9 @@ export class AdminOrderExportsComponent implements OnInit {
             ? 'adminUi.orders.exports.kinds.shippingLabel'
             : kind === 'receipt'
               ? 'adminUi.orders.exports.kinds.receipt'
-              : null;
+              : kind === 'orders_csv'
+                ? 'adminUi.orders.exports.kinds.ordersCsv'
+                : null;
     return key ? this.translate.instant(key) : kind;
   }
 
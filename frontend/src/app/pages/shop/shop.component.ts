@@ -1139,6 +1139,7 @@ export class ShopComponent implements OnInit, OnDestroy {
     { label: 'shop.sortPriceDesc', value: 'price_desc' },
     { label: 'shop.sortNameAsc', value: 'name_asc' },
     { label: 'shop.sortNameDesc', value: 'name_desc' },
+    { label: 'shop.sortRelevance', value: 'relevance' },
   ];
 
   private langSub?: Subscription;
@@ -2705,6 +2706,7 @@ export class ShopComponent implements OnInit, OnDestroy {
       'price_desc',
       'name_asc',
       'name_desc',
+      'relevance',
     ];
     this.filters.sort = allowedSorts.includes(rawSort as SortOption)
       ? (rawSort as SortOption)